@@ -613,6 +613,12 @@ class ExtensionActions:
     _insert_mode(context)
     actions.user.insert_via_clipboard(editor_action.text)
 
+  def scrambler_replace_range_action(editor_action: st.EditorAction, context: st.Context):
+    # Leaving visual mode to type would lose the selection, so delete the range instead. Deleting
+    # ends in insert mode.
+    actions.user.scrambler_delete_range_action(editor_action, context)
+    actions.user.insert_via_clipboard(editor_action.text)
+
   def select_line_range_including_line_break(from_index: int, to_index: int = 0):
     if to_index > 0:
       to_index = number_util.copy_leading_decimal_digits(from_index, to_index)
@@ -5,7 +5,7 @@
 # mypy: ignore-errors
 
 from talon import Context, Module, actions
-from ..core.lib import scrambler_types as st
+from ..core.lib import scrambler_potato, scrambler_types as st
 from ..core.scrambler import ScramblerMatch
 
 mod = Module()
@@ -145,3 +145,7 @@ class ExtensionActions:
     # character counts for the current selection, and appears to group multiple consecutive line
     # breaks into a single line break.
     return True
+
+  def scrambler_potato_profile() -> scrambler_potato.PotatoProfile:
+    # Obsidian uses CodeMirror. Lines are wrapped, so only word motions are reliable.
+    return scrambler_potato.CODEMIRROR_PROFILE
@@ -6,7 +6,7 @@
 
 from typing import Optional
 from talon import Context, Module, actions
-from .lib import format_util, homophone_util, text_util
+from .lib import format_util, homophone_util, regex_cache, text_util
 from .user_settings import load_lists_from_csv
 
 mod = Module()
@@ -18,6 +18,10 @@ _HOMOGRAPH_HOMOPHONE_SETS = homophone_util.get_homograph_homophone_sets(
 _WORD_TO_HOMOPHONE_SET = homophone_util.get_word_to_homophone_set_dict(
     _HOMOPHONE_SETS, _HOMOGRAPH_HOMOPHONE_SETS)
 
+# Talon reloads this file when the homophone lists change, so drop search regexes built with the
+# previous lists.
+regex_cache.get_search_regex_cache().invalidate_homophones()
+
 
 @mod.action_class
 class Actions:
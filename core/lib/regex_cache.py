@@ -0,0 +1,72 @@
+"""Cache of compiled search regexes. Scrambler modifiers and OCR searches build a regex for every
+search, and phrase regexes also expand every word into its homophones. Repeated commands for the
+same search reuse the compiled regex instead."""
+
+from collections import OrderedDict
+import re
+from typing import Callable, Optional
+
+# Maximum number of regexes kept by the shared cache used by `get_search_regex`.
+_MAX_CACHED_REGEXES = 256
+
+
+class RegexCache:
+  """Least recently used cache of compiled, case insensitive regexes. Entries are keyed by search
+  text, the kind of regex built from it (e.g. a reversed phrase regex) and the homophone function
+  it was built with, if any, as phrase regexes depend on homophones."""
+
+  def __init__(self, max_size: int):
+    if max_size < 1:
+      raise ValueError(f"Invalid cache size: {max_size}")
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._regexes: OrderedDict[tuple[str, str, Optional[Callable[[str], list[str]]]],
+                               re.Pattern] = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._regexes)
+
+  def get(self,
+          search: str,
+          kind: str,
+          build_regex: Callable[[], str],
+          homophones: Optional[Callable[[str], list[str]]] = None) -> re.Pattern:
+    """Gets the compiled regex of the given kind for a search. `build_regex` is only called on a
+    cache miss and should return the regex text. `homophones` is the function that gets the
+    homophones of a word, if the regex is built with one. Callers should pass the same function
+    object for each search, or the regex is built again."""
+    key = (search, kind, homophones)
+    regex = self._regexes.get(key)
+    if regex is not None:
+      self.hits += 1
+      self._regexes.move_to_end(key)
+      return regex
+
+    self.misses += 1
+    regex = re.compile(build_regex(), re.IGNORECASE)
+    self._regexes[key] = regex
+    if len(self._regexes) > self.max_size:
+      self._regexes.popitem(last=False)
+    return regex
+
+  def invalidate_homophones(self):
+    """Drops all regexes, as any of them may have been built with the current homophone table. Call
+    when homophones change."""
+    self._regexes.clear()
+
+
+_search_regex_cache = RegexCache(_MAX_CACHED_REGEXES)
+
+
+def get_search_regex(search: str,
+                     kind: str,
+                     build_regex: Callable[[], str],
+                     homophones: Optional[Callable[[str], list[str]]] = None) -> re.Pattern:
+  """Gets a compiled regex from the cache shared by all searches. See `RegexCache.get`."""
+  return _search_regex_cache.get(search, kind, build_regex, homophones)
+
+
+def get_search_regex_cache() -> RegexCache:
+  """Gets the cache shared by all searches, e.g. to read its hit and miss counters."""
+  return _search_regex_cache
@@ -0,0 +1,69 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .regex_cache import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class RegexCacheTestCase(unittest.TestCase):
+
+  def test_hit_and_miss(self):
+    cache = RegexCache(4)
+    regex = cache.get("foo", "exact", lambda: "foo")
+    self.assertIsNotNone(regex.search("FOO"))
+    self.assertIs(cache.get("foo", "exact", lambda: "unused"), regex)
+    self.assertEqual(cache.hits, 1)
+    self.assertEqual(cache.misses, 1)
+
+  def test_kind_is_part_of_key(self):
+    cache = RegexCache(4)
+    forward = cache.get("foo", "forward", lambda: "foo")
+    backward = cache.get("foo", "backward", lambda: "oof")
+    self.assertIsNot(forward, backward)
+    self.assertEqual(backward.pattern, "oof")
+    self.assertEqual(cache.misses, 2)
+
+  def test_evicts_least_recently_used(self):
+    cache = RegexCache(2)
+    cache.get("a", "exact", lambda: "a")
+    cache.get("b", "exact", lambda: "b")
+    cache.get("a", "exact", lambda: "a")
+    cache.get("c", "exact", lambda: "c")
+    self.assertEqual(len(cache), 2)
+    cache.get("a", "exact", lambda: "a")
+    self.assertEqual(cache.hits, 2)
+    cache.get("b", "exact", lambda: "b")
+    self.assertEqual(cache.misses, 4)
+
+  def test_homophones_are_part_of_key(self):
+    cache = RegexCache(4)
+
+    def few_homophones(word: str) -> list[str]:
+      return [word]
+
+    def more_homophones(word: str) -> list[str]:
+      return [word, word + "r"]
+
+    few = cache.get("there", "phrase", lambda: "there", few_homophones)
+    more = cache.get("there", "phrase", lambda: "there|therer", more_homophones)
+    self.assertEqual(few.pattern, "there")
+    self.assertEqual(more.pattern, "there|therer")
+    self.assertIs(cache.get("there", "phrase", lambda: "unused", few_homophones), few)
+
+  def test_invalidate_homophones(self):
+    cache = RegexCache(4)
+    cache.get("there", "phrase", lambda: "there|their")
+    cache.invalidate_homophones()
+    self.assertEqual(len(cache), 0)
+    regex = cache.get("there", "phrase", lambda: "there|their|they're")
+    self.assertEqual(regex.pattern, "there|their|they're")
+    self.assertEqual(cache.misses, 2)
+
+  def test_invalid_size(self):
+    with self.assertRaises(ValueError):
+      RegexCache(0)
+
+  def test_shared_cache(self):
+    cache = get_search_regex_cache()
+    hits = cache.hits
+    regex = get_search_regex("shared", "test", lambda: "shared")
+    self.assertIs(get_search_regex("shared", "test", lambda: "shared"), regex)
+    self.assertEqual(cache.hits, hits + 1)
@@ -0,0 +1,196 @@
+"""Approximate phrase search for Scrambler modifiers, for when speech recognition gets a letter or two
+of a phrase wrong. Uses the bit-parallel edit distance recurrence of Wu and Manber, transposed so
+each Python int holds one bit per position in the text. Every step of the recurrence then handles
+all positions at once, and Python only loops over the characters of the phrase."""
+
+import re
+from typing import Iterable, Optional
+from .scrambler_types import TextRange
+
+# Phrases need at least this many characters per allowed error, so short words do not match
+# everything.
+_MIN_CHARACTERS_PER_ERROR = 4
+
+# Size of the first window searched from the cursor. Grows by `_WINDOW_GROWTH` on each miss, so
+# nearby matches are found without building tables for the whole text.
+_INITIAL_WINDOW = 2048
+_WINDOW_GROWTH = 4
+
+# Approximate matching runs after every exact miss, so a search that finds nothing must stay within
+# about a millisecond on any text, even when it runs in both directions for a closest match. The
+# work grows with the distance searched from the cursor, the length of the phrase and the number of
+# errors, so the distance in each direction is chosen to keep their product under this bound.
+_MAX_SEARCH_CELLS = 400_000
+
+
+def get_error_budget(search: str, max_errors: int) -> int:
+  """Gets the number of errors allowed when approximately matching the given search."""
+  return max(min(max_errors, len(search) // _MIN_CHARACTERS_PER_ERROR), 0)
+
+
+def get_max_distance(search: str, errors: int) -> int:
+  """Gets the number of characters from the cursor to look for approximate matches of the search
+  in, in each direction."""
+  return _MAX_SEARCH_CELLS // (max(len(search), 1) * (errors + 1))
+
+
+def _encode(text: str) -> bytes:
+  """Gets lowercase bytes for the text with one byte per character. Characters outside ASCII become
+  `?`."""
+  return text.encode("ascii", "replace").lower()
+
+
+def _character_masks(data: bytes, characters: Iterable[int]) -> dict[int, int]:
+  """Gets a bitset for each character, with bit `i + 1` set where `data[i]` is that character.
+  Positions of up to eight characters are found with a single translation of the data into one bit
+  per character. The bytes are then split by position modulo eight, so each slice converts to an
+  int whose bits only need to be shifted into place."""
+  characters = sorted(set(characters))
+  ones = int.from_bytes(b"\x01" * ((len(data) + 7) // 8), "little")
+  masks = {}
+  for group_start in range(0, len(characters), 8):
+    group = characters[group_start:group_start + 8]
+    table = bytearray(256)
+    for bit, character in enumerate(group):
+      table[character] = 1 << bit
+    translated = data.translate(table)
+    slices = [int.from_bytes(translated[offset::8], "little") for offset in range(8)]
+    for bit, character in enumerate(group):
+      mask = 0
+      for offset, bits in enumerate(slices):
+        mask |= ((bits >> bit) & ones) << offset
+      masks[character] = mask << 1
+  return masks
+
+
+def _match_distances(data: bytes, pattern: bytes, errors: int) -> list[int]:
+  """Gets a bitset for each number of edits up to `errors`, with bit `i` set if the pattern matches a
+  substring of the data ending at `i` with at most that many edits."""
+  masks = _character_masks(data, pattern)
+  all_positions = (1 << (len(data) + 1)) - 1
+  # Positions where each prefix of the pattern ends, by number of errors. The empty prefix ends
+  # everywhere.
+  row = [all_positions] * (errors + 1)
+  for character in pattern:
+    mask = masks[character]
+    previous_row = row
+    row = [(previous_row[0] << 1) & mask]
+    for e in range(1, errors + 1):
+      fewer_errors = previous_row[e - 1]
+      # Match, substitution, deletion from the pattern and insertion into the text.
+      row.append(((previous_row[e] << 1) & mask) | (fewer_errors << 1) | fewer_errors |
+                 (row[e - 1] << 1))
+  return [bits & all_positions for bits in row]
+
+
+def _best_end(distances: list[int], first: int, last: int) -> int:
+  """Gets the end between `first` and `last` inclusive with the fewest edits, preferring the last.
+  Ends near each other belong to the same match, e.g. "qui", "quic" and "quick" for "quik"."""
+  for bits in distances:
+    bits = (bits >> first) & ((1 << (last - first + 1)) - 1)
+    if bits:
+      return first + bits.bit_length() - 1
+  raise ValueError("No match between the given ends")
+
+
+def _match_start(data: bytes, pattern: bytes, errors: int, end: int, limit: int) -> int:
+  """Gets the start of the closest match of the pattern ending at `end`, not before `limit`. Prefers
+  fewer edits, then a length closer to the pattern's."""
+  window = data[max(end - len(pattern) - errors, limit):end][::-1]
+  reversed_pattern = pattern[::-1]
+  # Edit distances between the reversed pattern and each prefix of the reversed window.
+  distances = list(range(len(window) + 1))
+  for i, pattern_character in enumerate(reversed_pattern):
+    previous = distances
+    distances = [i + 1]
+    for j, window_character in enumerate(window):
+      distances.append(
+          min(previous[j] + (pattern_character != window_character), previous[j + 1] + 1,
+              distances[j] + 1))
+  length = min(range(len(distances)), key=lambda j: (distances[j], abs(j - len(pattern)), -j))
+  assert distances[length] <= errors
+  return end - length
+
+
+def _get_piece_regex(pattern: bytes, errors: int) -> re.Pattern:
+  """Gets a regex for any of `errors + 1` pieces of the pattern. A match with that many errors
+  contains at least one of the pieces unchanged."""
+  piece_count = errors + 1
+  pieces = []
+  for i in range(piece_count):
+    pieces.append(
+        re.escape(pattern[i * len(pattern) // piece_count:(i + 1) * len(pattern) // piece_count]))
+  return re.compile(b"|".join(pieces))
+
+
+def find_approximate_next(text: str,
+                          search: str,
+                          errors: int,
+                          start: int,
+                          max_distance: Optional[int] = None) -> Optional[TextRange]:
+  """Finds the approximate match of the search at or after `start` that ends first, within
+  `max_distance` characters of `start`. Defaults to `get_max_distance`."""
+  pattern = _encode(search)
+  if not pattern:
+    return None
+  if max_distance is None:
+    max_distance = get_max_distance(search, errors)
+  # Offsets in `data` are relative to `start`.
+  data = _encode(text[start:start + max_distance])
+  first_piece = _get_piece_regex(pattern, errors).search(data)
+  if first_piece is None:
+    return None
+  # Every match contains a piece, so none starts long before the first piece.
+  window_start = max(first_piece.start() - len(pattern) - errors, 0)
+  window = _INITIAL_WINDOW
+  while True:
+    window_end = min(window_start + window, len(data))
+    distances = _match_distances(data[window_start:window_end], pattern, errors)
+    ends = distances[errors]
+    if ends:
+      first = (ends & -ends).bit_length() - 1
+      end = window_start + _best_end(distances, first, min(first + errors,
+                                                           window_end - window_start))
+      return TextRange(_match_start(data, pattern, errors, end, window_start) + start, end + start)
+    if window_end == len(data):
+      return None
+    window *= _WINDOW_GROWTH
+
+
+def find_approximate_previous(text: str,
+                              search: str,
+                              errors: int,
+                              end: int,
+                              max_distance: Optional[int] = None) -> Optional[TextRange]:
+  """Finds the approximate match of the search before `end` that ends last, within `max_distance`
+  characters of `end`. Defaults to `get_max_distance`."""
+  pattern = _encode(search)
+  if not pattern:
+    return None
+  if max_distance is None:
+    max_distance = get_max_distance(search, errors)
+  # Offsets in `data` are relative to `limit`.
+  limit = max(end - max_distance, 0)
+  data = _encode(text[limit:end])
+  end -= limit
+  piece_regex = _get_piece_regex(pattern, errors)
+  if piece_regex.search(data) is None:
+    return None
+  window = _INITIAL_WINDOW
+  while True:
+    window_start = max(end - window, 0)
+    distances = _match_distances(data[window_start:end], pattern, errors)
+    if window_start > 0:
+      # Matches ending near the start of the window may start before it, and hide later matches
+      # that also do.
+      distances = [
+          (bits >> (len(pattern) + errors)) << (len(pattern) + errors) for bits in distances
+      ]
+    ends = distances[errors]
+    if ends:
+      last = ends.bit_length() - 1
+      match_end = window_start + _best_end(distances, max(last - errors, 0), last)
+      return TextRange(_match_start(data, pattern, errors, match_end, 0) + limit, match_end + limit)
+    if window_start == 0:
+      return None
+    window *= _WINDOW_GROWTH
@@ -0,0 +1,51 @@
+"""Benchmark for approximate phrase searches that find nothing, which run after every exact miss. A
+closest search looks in both directions from the cursor in the middle of a 100 KB document, and
+must stay within `MAX_MISS_MS` for any phrase. Run from the repository root:
+
+python3 -m core.lib.scrambler_approximate_benchmark"""
+
+import timeit
+from .scrambler_approximate import find_approximate_next, find_approximate_previous, get_error_budget
+from .scrambler_benchmark import make_document
+
+MAX_MISS_MS = 1.0
+DOCUMENT_SIZE = 100_000
+# Phrases made of common words, so many pieces of them occur in the document, and the search
+# verifies many windows without finding a match.
+SEARCHES = [
+    "zzzz their zzzz",
+    "target zzzzzz quick",
+    "the quick brown fox jumps over the lazy dog",
+    "function name argument other argument comment",
+]
+_REPEAT = 7
+_ITERATIONS = 10
+
+
+def measure_miss_ms(text: str, search: str, errors: int, cursor: int) -> float:
+  """Gets the best time in milliseconds to search for the phrase in both directions from the
+  cursor."""
+
+  def search_both_directions():
+    find_approximate_next(text, search, errors, cursor)
+    find_approximate_previous(text, search, errors, cursor)
+
+  seconds = min(timeit.repeat(search_both_directions, repeat=_REPEAT, number=_ITERATIONS))
+  return seconds / _ITERATIONS * 1000
+
+
+def main():
+  text = make_document("prose", DOCUMENT_SIZE)
+  cursor = len(text) // 2
+  print(f"{'search':<50}{'errors':>8}{'time':>12}")
+  slowest_ms = 0.0
+  for search in SEARCHES:
+    errors = get_error_budget(search, len(search))
+    miss_ms = measure_miss_ms(text, search, errors, cursor)
+    slowest_ms = max(slowest_ms, miss_ms)
+    print(f"{search:<50}{errors:>8}{miss_ms:>10.3f}ms")
+  assert slowest_ms < MAX_MISS_MS, f"Slowest search took {slowest_ms:.3f}ms"
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,14 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_approximate_benchmark import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_approximate import get_error_budget
+from .scrambler_benchmark import make_document
+
+
+class MissLatencyTestCase(unittest.TestCase):
+
+  def test_within_limit(self):
+    text = make_document("prose", DOCUMENT_SIZE)
+    for search in SEARCHES:
+      errors = get_error_budget(search, len(search))
+      self.assertLess(measure_miss_ms(text, search, errors, len(text) // 2), MAX_MISS_MS, search)
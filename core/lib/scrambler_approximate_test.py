@@ -0,0 +1,144 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import random
+import time
+import unittest
+from typing import Optional
+from .scrambler_approximate import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+def _edit_distance(a: str, b: str) -> int:
+  distances = list(range(len(b) + 1))
+  for i, a_character in enumerate(a):
+    previous = distances
+    distances = [i + 1]
+    for j, b_character in enumerate(b):
+      distances.append(
+          min(previous[j] + (a_character != b_character), previous[j + 1] + 1, distances[j] + 1))
+  return distances[-1]
+
+
+def _best_match_end(text: str, search: str, errors: int, start: int, end: int,
+                    forward: bool) -> Optional[int]:
+  """Gets the end of the first or last approximate match within the given range, by brute force.
+  Nearby ends with fewer edits are preferred, then the last of them."""
+  text = text.lower()
+  search = search.lower()
+  distances = {}
+  for match_end in range(start, end + 1):
+    distance = min(
+        _edit_distance(text[match_start:match_end], search)
+        for match_start in range(start, match_end + 1))
+    if distance <= errors:
+      distances[match_end] = distance
+  if not distances:
+    return None
+  if forward:
+    first = min(distances)
+    candidates = [e for e in distances if e <= first + errors]
+  else:
+    last = max(distances)
+    candidates = [e for e in distances if e >= last - errors]
+  return min(candidates, key=lambda e: (distances[e], -e))
+
+
+class ErrorBudgetTestCase(unittest.TestCase):
+
+  def test_error_budget(self):
+    self.assertEqual(get_error_budget("cat", 2), 0)
+    self.assertEqual(get_error_budget("hello", 2), 1)
+    self.assertEqual(get_error_budget("hello world", 2), 2)
+    self.assertEqual(get_error_budget("hello world", 0), 0)
+    self.assertEqual(get_error_budget("hello world", -1), 0)
+
+
+class FindApproximateTestCase(unittest.TestCase):
+
+  def test_substitution(self):
+    text = "the quick brown fox"
+    self.assertEqual(find_approximate_next(text, "quack", 1, 0), TextRange(4, 9))
+    self.assertEqual(find_approximate_previous(text, "quack", 1, len(text)), TextRange(4, 9))
+
+  def test_insertion_and_deletion(self):
+    text = "the quick brown fox"
+    # "qui", "quic" and "quick" all match with one edit. Only ends near the first are considered.
+    self.assertEqual(find_approximate_next(text, "quik", 1, 0), TextRange(4, 8))
+    self.assertEqual(find_approximate_next(text, "quicck", 1, 0), TextRange(4, 9))
+
+  def test_too_many_errors(self):
+    self.assertIsNone(find_approximate_next("the quick brown fox", "quack", 0, 0))
+    self.assertIsNone(find_approximate_next("the quick brown fox", "qxxck", 1, 0))
+
+  def test_ignores_case(self):
+    self.assertEqual(find_approximate_next("The Quick fox", "quack", 1, 0), TextRange(4, 9))
+
+  def test_direction(self):
+    text = "hello there, hallo there, hullo there"
+    self.assertEqual(find_approximate_next(text, "hello", 1, 6), TextRange(13, 18))
+    self.assertEqual(find_approximate_next(text, "hello", 1, 19), TextRange(26, 31))
+    self.assertEqual(find_approximate_previous(text, "hello", 1, 25), TextRange(13, 18))
+    self.assertEqual(find_approximate_previous(text, "hello", 1, 12), TextRange(0, 5))
+    # Matches may start or end inside a token.
+    self.assertEqual(find_approximate_next(text, "hello", 1, 1), TextRange(1, 5))
+    self.assertIsNone(find_approximate_previous(text, "hello", 1, 3))
+
+  def test_long_text(self):
+    filler = "lorem ipsum dolor sit amet " * 2000
+    text = filler + "recognition" + filler + "recognitoin" + filler
+    first = TextRange(len(filler), len(filler) + 11)
+    second = TextRange(2 * len(filler) + 11, 2 * len(filler) + 22)
+    distance = len(text)
+    self.assertEqual(find_approximate_next(text, "recognition", 2, 0, distance), first)
+    self.assertEqual(find_approximate_next(text, "recognition", 2, first.end, distance), second)
+    self.assertEqual(find_approximate_previous(text, "recognition", 2, len(text), distance), second)
+    self.assertEqual(find_approximate_previous(text, "recognition", 2, second.start, distance),
+                     first)
+    self.assertIsNone(find_approximate_next(text, "recognition", 2, second.end, distance))
+
+  def test_max_distance(self):
+    filler = "lorem ipsum dolor sit amet " * 2000
+    text = filler + "recognitoin" + filler
+    self.assertIsNone(find_approximate_next(text, "recognition", 2, 0))
+    self.assertIsNone(find_approximate_previous(text, "recognition", 2, len(text)))
+    distance = get_max_distance("recognition", 2)
+    start = len(filler) - distance + 11
+    self.assertEqual(find_approximate_next(text, "recognition", 2, start),
+                     TextRange(len(filler),
+                               len(filler) + 11))
+    self.assertIsNone(find_approximate_next(text, "recognition", 2, start - 11))
+    end = len(filler) + distance
+    self.assertEqual(find_approximate_previous(text, "recognition", 2, end),
+                     TextRange(len(filler),
+                               len(filler) + 11))
+    self.assertIsNone(find_approximate_previous(text, "recognition", 2, end + 11))
+
+  def test_same_as_brute_force(self):
+    rng = random.Random(0)
+    for _ in range(300):
+      text = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 30)))
+      search = "".join(rng.choice("abc") for _ in range(rng.randint(1, 6)))
+      errors = rng.randint(0, 2)
+      position = rng.randint(0, len(text))
+
+      for forward in (True, False):
+        if forward:
+          expected_end = _best_match_end(text, search, errors, position, len(text), forward)
+          match = find_approximate_next(text, search, errors, position)
+        else:
+          expected_end = _best_match_end(text, search, errors, 0, position, forward)
+          match = find_approximate_previous(text, search, errors, position)
+        if expected_end is None:
+          self.assertIsNone(match)
+          continue
+        assert match is not None
+        self.assertEqual(match.end, expected_end)
+        self.assertGreaterEqual(match.start, position if forward else 0)
+        self.assertLessEqual(_edit_distance(text[match.start:match.end].lower(), search), errors)
+
+  def test_nearby_match_is_fast(self):
+    text = "lorem ipsum dolor sit amet " * 4000
+    position = len(text) // 2
+    text = text[:position] + "misrecognized" + text[position:]
+    start_time = time.perf_counter()
+    match = find_approximate_next(text, "misrecognised", 2, 0, len(text))
+    self.assertLess(time.perf_counter() - start_time, 0.1)
+    self.assertEqual(match, TextRange(position, position + 13))
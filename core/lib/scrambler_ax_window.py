@@ -0,0 +1,109 @@
+"""Paged reads of editor text through the accessibility API. Accessibility APIs appear to return at
+most 10,000 characters of an element's value, so commands in larger documents used to fall back to
+potato mode. Instead, a window of text around the selection is read in pages with parameterized
+range reads (`AXStringForRange`), and the window grows when a command needs text beyond its
+edges."""
+
+from typing import Callable, Optional
+from .scrambler_types import Context, TextRange
+
+# Accessibility APIs appear to be limited to this many characters per read.
+MAX_READ_CHARS = 10000
+
+# Characters to read on each side of the selection at first. Grows by `_RADIUS_GROWTH` each time a
+# command runs off the edge of the window.
+INITIAL_RADIUS = 4000
+_RADIUS_GROWTH = 4
+
+# Never read more than this many characters on each side of the selection. A command that finds no
+# match at all grows the window all the way, so this is only a few steps from the initial radius.
+MAX_RADIUS = INITIAL_RADIUS * _RADIUS_GROWTH**2
+
+# Editor texts of at most this many characters are read in full when a command finds no match in the
+# largest window, so that targets anywhere in them are found.
+MAX_FULL_READ_CHARS = 256_000
+
+
+def get_read_range(selection_range: TextRange, text_length: int, radius: int) -> TextRange:
+  """Gets the range of editor text to read for a window of `radius` characters on each side of the
+  selection, in editor coordinates."""
+  return TextRange(max(selection_range.start - radius, 0),
+                   min(selection_range.end + radius, text_length))
+
+
+def read_pages(read_range: Callable[[TextRange], Optional[str]],
+               text_range: TextRange,
+               page_chars: int = MAX_READ_CHARS) -> Optional[str]:
+  """Reads a range of editor text in pages of at most `page_chars` characters. `read_range` reads a
+  range of editor text, and returns None if it cannot. Returns None if any page cannot be read, or
+  if a page is shorter than requested, e.g. because the text changed during the reads."""
+  if page_chars < 1:
+    raise ValueError(f"Invalid page size: {page_chars}")
+  pages = []
+  for page_start in range(text_range.start, text_range.end, page_chars):
+    page_range = TextRange(page_start, min(page_start + page_chars, text_range.end))
+    page = read_range(page_range)
+    if page is None or len(page) != page_range.length():
+      return None
+    pages.append(page)
+  return "".join(pages)
+
+
+def trim_to_lines(text: str, keep: TextRange, at_start: bool, at_end: bool) -> TextRange:
+  """Gets the part of the window text made of whole lines, keeping the given range. The start is
+  left alone if the window begins at the start of the editor text, and the end if it finishes at the
+  end of it. Lines that overlap the range to keep may stay partial."""
+  start = 0
+  if not at_start:
+    line_break = text.find("\n", 0, keep.start)
+    if line_break >= 0:
+      start = line_break + 1
+  end = len(text)
+  if not at_end:
+    line_break = text.rfind("\n", keep.end)
+    if line_break >= 0:
+      end = line_break + 1
+  return TextRange(start, end)
+
+
+def read_window(read_text: Callable[[TextRange], str],
+                selection_range: TextRange,
+                text_length: int,
+                radius: int = INITIAL_RADIUS) -> Context:
+  """Reads a window of editor text around the selection and returns a context for it. `read_text`
+  reads any range of the editor text, e.g. `TextSource.read`, and raises if it cannot. The text of
+  the context starts and ends on line boundaries where possible, and `text_offset` and
+  `chars_after_text` locate it in the editor. `selection_range` is in editor coordinates."""
+  if selection_range.start < 0 or selection_range.end > text_length:
+    raise ValueError(f"Selection outside of text: {selection_range}, length: {text_length}")
+  read = get_read_range(selection_range, text_length, radius)
+  text = read_text(read)
+  keep = TextRange(selection_range.start - read.start, selection_range.end - read.start)
+  lines = trim_to_lines(text, keep, read.start == 0, read.end == text_length)
+  text_offset = read.start + lines.start
+  return Context(lines.extract(text),
+                 TextRange(selection_range.start - text_offset, selection_range.end - text_offset),
+                 potato_mode=False,
+                 text_offset=text_offset,
+                 chars_after_text=text_length - read.start - lines.end)
+
+
+def is_window(context: Context) -> bool:
+  """Whether the context holds a window of the editor text that does not cover all of it."""
+  return context.chars_after_text is not None and (context.text_offset > 0 or
+                                                   context.chars_after_text > 0)
+
+
+def expand_radius(radius: int, context: Context) -> Optional[int]:
+  """Gets the radius of the window to read when a command runs off the edge of the given context.
+  Past `MAX_RADIUS`, the entire editor text is read once if it is short enough. Returns None if the
+  context already covers the entire editor text or the window cannot grow any further."""
+  if not is_window(context):
+    return None
+  if radius < MAX_RADIUS:
+    return min(radius * _RADIUS_GROWTH, MAX_RADIUS)
+  assert context.chars_after_text is not None
+  text_length = context.text_offset + len(context.text) + context.chars_after_text
+  if radius < text_length <= MAX_FULL_READ_CHARS:
+    return text_length
+  return None
@@ -0,0 +1,157 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from typing import Optional
+from .scrambler_ax_window import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_sim import simulate_actions
+from .scrambler_text_source import PagedTextSource
+from .scrambler_types import EditorAction, EditorActionType
+
+
+class _FakeElement:
+  """An accessibility element that returns at most `MAX_READ_CHARS` characters per read."""
+
+  def __init__(self, text: str):
+    self.text = text
+    self.reads: list[TextRange] = []
+
+  def read_range(self, text_range: TextRange) -> Optional[str]:
+    self.reads.append(text_range)
+    if text_range.start < 0 or text_range.end > len(self.text):
+      return None
+    return self.text[text_range.start:min(text_range.end, text_range.start + MAX_READ_CHARS)]
+
+
+def _make_text(line_count: int) -> str:
+  return "".join(f"line {i}\n" for i in range(line_count))
+
+
+def _read_window(element: _FakeElement,
+                 selection_range: TextRange,
+                 radius: int = INITIAL_RADIUS) -> Context:
+  source = PagedTextSource(element.read_range, len(element.text))
+  return read_window(source.read, selection_range, len(element.text), radius)
+
+
+class ReadPagesTestCase(unittest.TestCase):
+
+  def test_pages(self):
+    element = _FakeElement(_make_text(5000))
+    text = read_pages(element.read_range, TextRange(100, 25100))
+    self.assertEqual(text, element.text[100:25100])
+    self.assertEqual(element.reads,
+                     [TextRange(100, 10100),
+                      TextRange(10100, 20100),
+                      TextRange(20100, 25100)])
+
+  def test_empty_range(self):
+    element = _FakeElement("abc")
+    self.assertEqual(read_pages(element.read_range, TextRange(1, 1)), "")
+    self.assertEqual(element.reads, [])
+
+  def test_short_read(self):
+    element = _FakeElement(_make_text(5000))
+    # Pages longer than the element returns are detected instead of leaving gaps.
+    self.assertIsNone(read_pages(element.read_range, TextRange(0, 25000), page_chars=20000))
+
+  def test_failed_read(self):
+    self.assertIsNone(read_pages(lambda _: None, TextRange(0, 10)))
+
+  def test_invalid_page_size(self):
+    with self.assertRaises(ValueError):
+      read_pages(lambda _: "", TextRange(0, 10), page_chars=0)
+
+
+class ReadWindowTestCase(unittest.TestCase):
+
+  def test_whole_text(self):
+    element = _FakeElement("abc\ndef")
+    context = _read_window(element, TextRange(5, 6))
+    self.assertEqual(context.text, "abc\ndef")
+    self.assertEqual(context.selection_range, TextRange(5, 6))
+    self.assertEqual(context.text_offset, 0)
+    self.assertEqual(context.chars_after_text, 0)
+    self.assertFalse(context.potato_mode)
+    self.assertFalse(is_window(context))
+
+  def test_window_of_full_lines(self):
+    element = _FakeElement(_make_text(10000))
+    selection = TextRange(50000, 50003)
+    context = _read_window(element, selection, radius=1000)
+    self.assertTrue(is_window(context))
+    self.assertTrue(context.text.endswith("\n"))
+    self.assertEqual(element.text[context.text_offset - 1], "\n")
+    self.assertEqual(context.text_offset + len(context.text) + context.chars_after_text,
+                     len(element.text))
+    self.assertEqual(context.text,
+                     element.text[context.text_offset:context.text_offset + len(context.text)])
+    self.assertEqual(context.selection_range.start + context.text_offset, selection.start)
+    self.assertEqual(context.selection_range.length(), 3)
+    self.assertLessEqual(len(context.text), 2003)
+
+  def test_window_larger_than_read_limit(self):
+    element = _FakeElement(_make_text(10000))
+    selection = TextRange(50000, 50000)
+    context = _read_window(element, selection, radius=20000)
+    self.assertGreater(len(context.text), MAX_READ_CHARS)
+    self.assertEqual(context.text,
+                     element.text[context.text_offset:context.text_offset + len(context.text)])
+    self.assertTrue(all(read.length() <= MAX_READ_CHARS for read in element.reads))
+
+  def test_long_line(self):
+    element = _FakeElement("x" * 50000)
+    context = _read_window(element, TextRange(25000, 25000), radius=100)
+    # Lines that do not fit the window are kept partial.
+    self.assertEqual(context.text, "x" * 200)
+    self.assertEqual(context.text_offset, 24900)
+    self.assertEqual(context.selection_range, TextRange(100, 100))
+
+  def test_failed_read(self):
+    source = PagedTextSource(lambda _: None, 10)
+    with self.assertRaises(RuntimeError):
+      read_window(source.read, TextRange(0, 0), 10)
+
+  def test_selection_outside_text(self):
+    with self.assertRaises(ValueError):
+      read_window(lambda _: "", TextRange(5, 20), 10)
+
+  def test_edits_map_to_editor(self):
+    element = _FakeElement(_make_text(10000))
+    context = _read_window(element, TextRange(50000, 50000), radius=1000)
+    offset = context.text_offset
+    simulate_actions(context, [
+        EditorAction(EditorActionType.DELETE_RANGE, TextRange(10, 15)),
+        EditorAction(EditorActionType.INSERT_TEXT, text="abc")
+    ])
+    # Applying the same edits at `text_offset` in the editor gives the same text.
+    expected = element.text[:offset + 10] + "abc" + element.text[offset + 15:]
+    self.assertEqual(context.text, expected[offset:offset + len(context.text)])
+    self.assertEqual(offset + len(context.text) + context.chars_after_text, len(expected))
+
+
+class ExpandRadiusTestCase(unittest.TestCase):
+
+  def test_expand(self):
+    element = _FakeElement(_make_text(10000))
+    context = _read_window(element, TextRange(50000, 50000))
+    self.assertEqual(expand_radius(INITIAL_RADIUS, context), INITIAL_RADIUS * 4)
+    self.assertEqual(expand_radius(MAX_RADIUS // 2, context), MAX_RADIUS)
+
+  def test_full_read(self):
+    element = _FakeElement(_make_text(10000))
+    context = _read_window(element, TextRange(50000, 50000))
+    self.assertLess(len(element.text), MAX_FULL_READ_CHARS)
+    self.assertEqual(expand_radius(MAX_RADIUS, context), len(element.text))
+
+  def test_long_text(self):
+    element = _FakeElement(_make_text(40000))
+    context = _read_window(element, TextRange(200000, 200000))
+    self.assertGreater(len(element.text), MAX_FULL_READ_CHARS)
+    self.assertIsNone(expand_radius(MAX_RADIUS, context))
+
+  def test_whole_text(self):
+    context = _read_window(_FakeElement("abc"), TextRange(0, 0))
+    self.assertIsNone(expand_radius(INITIAL_RADIUS, context))
+
+  def test_unknown_window(self):
+    # Contexts from editor extensions do not say how much text follows them.
+    self.assertIsNone(expand_radius(INITIAL_RADIUS, Context("abc", TextRange(0, 0), text_offset=5)))
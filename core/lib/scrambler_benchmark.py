@@ -0,0 +1,325 @@
+"""Benchmark for how Scrambler modifiers and commands scale with document size and cursor position.
+Times every modifier type and command type through `run_command` on synthetic prose, Python, C++ and
+markdown documents. Run from the repository root:
+
+python3 -m core.lib.scrambler_benchmark --output results.json
+python3 -m core.lib.scrambler_benchmark --sizes 1000 100000 --baseline results.json"""
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Optional, Sequence
+from .scrambler_index import clear_text_index_cache
+from .scrambler_run import run_command
+from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_types import Command, CommandType, Modifier, ModifierType, TextRange
+
+DOCUMENT_KINDS = ["prose", "python", "cpp", "markdown"]
+DOCUMENT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+CURSOR_POSITIONS = ["start", "middle", "end"]
+
+# Language passed to `run_command` for each kind of document.
+_LANGUAGE_BY_DOCUMENT_KIND = {"prose": "", "python": "python", "cpp": "cpp", "markdown": "markdown"}
+
+# Searches used by modifiers that need one. Every document contains these words regularly.
+_SEARCH_BY_MODIFIER_TYPE = {
+    ModifierType.WORD_SUBSTRING_CLOSEST: "targ",
+    ModifierType.WORD_SUBSTRING_NEXT: "targ",
+    ModifierType.WORD_SUBSTRING_PREVIOUS: "targ",
+    ModifierType.EXACT_WORD_CLOSEST: "target",
+    ModifierType.EXACT_WORD_NEXT: "target",
+    ModifierType.EXACT_WORD_PREVIOUS: "target",
+    ModifierType.PHRASE_CLOSEST: "their target",
+    ModifierType.PHRASE_NEXT: "their target",
+    ModifierType.PHRASE_PREVIOUS: "their target",
+}
+
+# Stop repeating a case once it has run for this long, so slow cases on large documents finish.
+_MAX_SECONDS_PER_CASE = 2.0
+
+# Default settings for flagging regressions against a baseline.
+_DEFAULT_THRESHOLD = 1.5
+_DEFAULT_MIN_DELTA_MS = 0.1
+
+_PROSE_WORDS = [
+    "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "there", "they're", "target",
+    "sentence", "with", "some", "words", "and", "a", "clause"
+]
+
+
+def _make_prose_block(rng: random.Random, n: int) -> str:
+  sentences = []
+  for i in range(rng.randint(3, 6)):
+    words = [rng.choice(_PROSE_WORDS) for _ in range(rng.randint(5, 15))]
+    if i == 0:
+      words[-2:] = ["their", f"target{n % 10}"]
+    if rng.random() < 0.3:
+      words.insert(rng.randint(1, len(words) - 1), "e.g.")
+    if rng.random() < 0.3:
+      words[len(words) // 2] += ","
+    sentence = " ".join(words)
+    if rng.random() < 0.2:
+      sentence += " \"quoted (words)\""
+    sentences.append(sentence[0].upper() + sentence[1:] + rng.choice([".", ".", "!", "?"]))
+  return " ".join(sentences) + "\n\n"
+
+
+def _make_python_block(rng: random.Random, n: int) -> str:
+  return (f"def function_{n}(argument, other_argument={rng.randint(0, 9)}):\n"
+          f"  \"\"\"Docstring for their target {n}.\"\"\"\n"
+          f"  # Comment about the target.\n"
+          f"  if argument > {rng.randint(0, 99)}:\n"
+          f"    value = call(argument, [1, 2, 3], {{\"key\": 'value'}})\n"
+          f"    return value\n"
+          f"  for item in range(other_argument):\n"
+          f"    print(f\"{{item}} is their target\")\n"
+          f"  return None\n\n\n")
+
+
+def _make_cpp_block(rng: random.Random, n: int) -> str:
+  return (f"// Computes their target {n}.\n"
+          f"int Function{n}(const std::vector<int>& values, int target) {{\n"
+          f"  /* Block comment with a ) bracket. */\n"
+          f"  for (int i = 0; i < values.size(); ++i) {{\n"
+          f"    if (values[i] == target + {rng.randint(0, 99)}) {{\n"
+          f"      return Call(values[i], \"string (with brackets)\", 'c');\n"
+          f"    }}\n"
+          f"  }}\n"
+          f"  return -1;\n"
+          f"}}\n\n")
+
+
+def _make_markdown_block(rng: random.Random, n: int) -> str:
+  return (f"## Section {n}\n\n"
+          f"Some text about their target with a [link {n}](https://example.com/{n}) and "
+          f"`inline code`. {_make_prose_block(rng, n)}"
+          f"- List item {rng.randint(0, 99)}\n"
+          f"- Another item with a target\n\n"
+          f"```python\n"
+          f"print(\"target\")\n"
+          f"```\n\n")
+
+
+_BLOCK_FUNCTIONS: dict[str, Callable[[random.Random, int], str]] = {
+    "prose": _make_prose_block,
+    "python": _make_python_block,
+    "cpp": _make_cpp_block,
+    "markdown": _make_markdown_block,
+}
+
+
+def make_document(kind: str, size: int, seed: int = 0) -> str:
+  """Generates a synthetic document of the given kind with about `size` characters. The document
+  ends with a line break and is the same for the same seed."""
+  if kind not in _BLOCK_FUNCTIONS:
+    raise ValueError(f"Unknown document kind: {kind}")
+  rng = random.Random(seed)
+  blocks = []
+  length = 0
+  n = 0
+  while length < size:
+    block = _BLOCK_FUNCTIONS[kind](rng, n)
+    blocks.append(block)
+    length += len(block)
+    n += 1
+  text = "".join(blocks)[:size]
+  # End on a full line.
+  last_line_break = text.rfind("\n")
+  return text[:last_line_break + 1] if last_line_break >= 0 else text + "\n"
+
+
+def get_benchmark_commands() -> dict[str, Command]:
+  """Gets the commands to benchmark, keyed by name. Every modifier type is timed with a select
+  command, and every command type is timed with a word substring target."""
+  commands = {}
+  for modifier_type in ModifierType:
+    modifier = Modifier(modifier_type, search=_SEARCH_BY_MODIFIER_TYPE.get(modifier_type, ""))
+    commands[f"modifier:{modifier_type.name}"] = Command(CommandType.SELECT, [modifier])
+
+  target = [Modifier(ModifierType.WORD_SUBSTRING_CLOSEST, search="targ")]
+  for command_type in CommandType:
+    command = Command(command_type, target)
+    if command_type in (CommandType.REPLACE, CommandType.REPLACE_WORD_MATCH_CASE):
+      command.insert_text = "replacement"
+    elif command_type == CommandType.REPLACE_WITH_LAMBDA:
+      command.lambda_func = str.upper
+    elif command_type == CommandType.NEXT_HOMOPHONE:
+      command.modifiers = [Modifier(ModifierType.PHRASE_CLOSEST, search="their")]
+    commands[f"command:{command_type.name}"] = command
+  return commands
+
+
+def _get_cursor_index(text: str, cursor: str) -> int:
+  if cursor == "start":
+    return 0
+  if cursor == "middle":
+    return len(text) // 2
+  if cursor == "end":
+    return len(text)
+  raise ValueError(f"Unknown cursor position: {cursor}")
+
+
+@dataclass
+class BenchmarkResult:
+  """Timing for one command on one document."""
+  document: str
+  size: int
+  cursor: str
+  operation: str
+  # Time for the first run, including building lookup tables for the document.
+  cold_ms: float
+  # Median time for repeated runs on the same document.
+  warm_ms: float
+  iterations: int
+  # Error raised by the command, e.g. if there is no match.
+  error: Optional[str] = None
+
+  def key(self) -> tuple[str, int, str, str]:
+    return (self.document, self.size, self.cursor, self.operation)
+
+
+def _time_command(command: Command, text: str, selection_range: TextRange, language: str,
+                  iterations: int) -> tuple[float, float, int, Optional[str]]:
+  """Returns cold and warm times in milliseconds, the number of warm iterations and any error."""
+  error = None
+
+  def run():
+    nonlocal error
+    try:
+      run_command(command, text, selection_range, UTILITY_FUNCTIONS, language)
+    except Exception as e:  # pylint: disable=broad-except
+      # Some modifiers fail on some documents. Time them anyway and report the failure.
+      error = f"{type(e).__name__}: {e}"
+
+  clear_text_index_cache()
+  start = time.perf_counter()
+  run()
+  cold = time.perf_counter() - start
+
+  durations = []
+  deadline = time.perf_counter() + _MAX_SECONDS_PER_CASE
+  while len(durations) < iterations and (not durations or time.perf_counter() < deadline):
+    start = time.perf_counter()
+    run()
+    durations.append(time.perf_counter() - start)
+  return cold * 1000, statistics.median(durations) * 1000, len(durations), error
+
+
+def run_benchmark(
+    kinds: Sequence[str] = tuple(DOCUMENT_KINDS),
+    sizes: Sequence[int] = tuple(DOCUMENT_SIZES),
+    cursors: Sequence[str] = tuple(CURSOR_POSITIONS),
+    operations: Optional[Sequence[str]] = None,
+    iterations: int = 5,
+    progress: Optional[Callable[[BenchmarkResult], None]] = None) -> list[BenchmarkResult]:
+  """Times commands on every combination of document kind, size and cursor position. `operations`
+  limits the commands to the given names from `get_benchmark_commands`."""
+  commands = get_benchmark_commands()
+  if operations is not None:
+    unknown = set(operations) - set(commands)
+    if unknown:
+      raise ValueError(f"Unknown operations: {sorted(unknown)}")
+    commands = {name: commands[name] for name in operations}
+
+  results = []
+  for kind in kinds:
+    for size in sizes:
+      text = make_document(kind, size)
+      for cursor in cursors:
+        index = _get_cursor_index(text, cursor)
+        for name, command in commands.items():
+          cold_ms, warm_ms, count, error = _time_command(command, text, TextRange(index, index),
+                                                         _LANGUAGE_BY_DOCUMENT_KIND[kind],
+                                                         iterations)
+          result = BenchmarkResult(kind, size, cursor, name, cold_ms, warm_ms, count, error)
+          results.append(result)
+          if progress is not None:
+            progress(result)
+  return results
+
+
+def results_to_json(results: Sequence[BenchmarkResult]) -> str:
+  return json.dumps({"results": [asdict(result) for result in results]}, indent=2)
+
+
+def results_from_json(data: str) -> list[BenchmarkResult]:
+  return [BenchmarkResult(**result) for result in json.loads(data)["results"]]
+
+
+@dataclass
+class Regression:
+  """A result that is slower than its baseline."""
+  result: BenchmarkResult
+  baseline: BenchmarkResult
+
+  def __str__(self) -> str:
+    document, size, cursor, operation = self.result.key()
+    return (f"{operation} on {size:,} character {document} document, cursor at {cursor}: "
+            f"{self.baseline.warm_ms:.3f}ms -> {self.result.warm_ms:.3f}ms")
+
+
+def compare_results(results: Sequence[BenchmarkResult],
+                    baseline: Sequence[BenchmarkResult],
+                    threshold: float = _DEFAULT_THRESHOLD,
+                    min_delta_ms: float = _DEFAULT_MIN_DELTA_MS) -> list[Regression]:
+  """Finds results whose warm time is more than `threshold` times their baseline. Differences
+  smaller than `min_delta_ms` are treated as noise. Results missing from the baseline are
+  ignored."""
+  baseline_by_key = {result.key(): result for result in baseline}
+  regressions = []
+  for result in results:
+    previous = baseline_by_key.get(result.key())
+    if previous is None:
+      continue
+    if (result.warm_ms > previous.warm_ms * threshold and
+        result.warm_ms - previous.warm_ms > min_delta_ms):
+      regressions.append(Regression(result, previous))
+  return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__,
+                                   formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--kinds", nargs="+", default=DOCUMENT_KINDS, choices=DOCUMENT_KINDS)
+  parser.add_argument("--sizes", nargs="+", type=int, default=DOCUMENT_SIZES)
+  parser.add_argument("--cursors", nargs="+", default=CURSOR_POSITIONS, choices=CURSOR_POSITIONS)
+  parser.add_argument("--operations",
+                      nargs="+",
+                      help="Names of operations to run, e.g. modifier:STRING or command:BRING.")
+  parser.add_argument("--iterations", type=int, default=5)
+  parser.add_argument("--output", help="Path to write results to, as JSON.")
+  parser.add_argument("--baseline", help="Path to results to compare against, as JSON.")
+  parser.add_argument("--threshold", type=float, default=_DEFAULT_THRESHOLD)
+  parser.add_argument("--min-delta-ms", type=float, default=_DEFAULT_MIN_DELTA_MS)
+  args = parser.parse_args(argv)
+
+  def print_result(result: BenchmarkResult):
+    print(f"{result.document:<9}{result.size:>12,} {result.cursor:<7}{result.operation:<40}"
+          f"{result.cold_ms:>11.3f}ms{result.warm_ms:>11.3f}ms" +
+          ("" if result.error is None else "  (error)"))
+
+  print(f"{'document':<9}{'size':>12} {'cursor':<7}{'operation':<40}{'cold':>13}{'warm':>13}")
+  results = run_benchmark(args.kinds, args.sizes, args.cursors, args.operations, args.iterations,
+                          print_result)
+  if args.output:
+    with open(args.output, "w", encoding="utf-8") as f:
+      f.write(results_to_json(results))
+
+  if args.baseline:
+    with open(args.baseline, encoding="utf-8") as f:
+      baseline = results_from_json(f.read())
+    regressions = compare_results(results, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+      print(f"Regression: {regression}")
+    print(f"{len(regressions)} regressions in {len(results)} results.")
+    if regressions:
+      return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,69 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_benchmark import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+def _make_result(operation: str, warm_ms: float) -> BenchmarkResult:
+  return BenchmarkResult("prose", 1000, "end", operation, warm_ms, warm_ms, 1)
+
+
+class MakeDocumentTestCase(unittest.TestCase):
+
+  def test_size(self):
+    for kind in DOCUMENT_KINDS:
+      text = make_document(kind, 10_000)
+      self.assertGreater(len(text), 9_000)
+      self.assertLessEqual(len(text), 10_000)
+      self.assertTrue(text.endswith("\n"))
+      self.assertIn("their target", text)
+
+  def test_deterministic(self):
+    self.assertEqual(make_document("prose", 5_000), make_document("prose", 5_000))
+    self.assertNotEqual(make_document("prose", 5_000), make_document("prose", 5_000, seed=1))
+
+  def test_unknown_kind(self):
+    with self.assertRaises(ValueError):
+      make_document("latex", 1_000)
+
+
+class RunBenchmarkTestCase(unittest.TestCase):
+
+  def test_covers_all_types(self):
+    names = set(get_benchmark_commands())
+    for modifier_type in ModifierType:
+      self.assertIn(f"modifier:{modifier_type.name}", names)
+    for command_type in CommandType:
+      self.assertIn(f"command:{command_type.name}", names)
+
+  def test_run(self):
+    results = run_benchmark(["python"], [1_000], ["start", "end"],
+                            ["modifier:STRING", "command:BRING"],
+                            iterations=2)
+    self.assertEqual([(result.cursor, result.operation) for result in results],
+                     [("start", "modifier:STRING"), ("start", "command:BRING"),
+                      ("end", "modifier:STRING"), ("end", "command:BRING")])
+    for result in results:
+      self.assertEqual(result.iterations, 2)
+      self.assertIsNone(result.error)
+
+  def test_unknown_operation(self):
+    with self.assertRaises(ValueError):
+      run_benchmark(operations=["modifier:UNKNOWN"])
+
+  def test_json(self):
+    results = [_make_result("modifier:STRING", 1.0)]
+    self.assertEqual(results_from_json(results_to_json(results)), results)
+
+
+class CompareResultsTestCase(unittest.TestCase):
+
+  def test_regression(self):
+    baseline = [_make_result("a", 1.0), _make_result("b", 1.0), _make_result("c", 0.01)]
+    results = [
+        _make_result("a", 1.2),
+        _make_result("b", 2.0),
+        _make_result("c", 0.05),
+        _make_result("d", 100.0)
+    ]
+    regressions = compare_results(results, baseline, threshold=1.5, min_delta_ms=0.1)
+    self.assertEqual([regression.result.operation for regression in regressions], ["b"])
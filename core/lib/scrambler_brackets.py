@@ -0,0 +1,198 @@
+"""Bracket pairs for structural Scrambler modifiers. Every bracket is paired with its partner in a
+single pass over the text, so modifiers can look up the enclosing pair or the bounds of an argument
+instead of walking the text one character at a time while counting nesting depth."""
+
+import bisect
+import re
+from typing import Optional, Sequence
+from .scrambler_types import TextRange
+
+OPEN_BRACKETS = "([{<"
+CLOSE_BRACKETS = ")]}>"
+ARGUMENT_DELIMITERS = ",;"
+_OPEN_BRACKET_BY_CLOSE_BRACKET = dict(zip(CLOSE_BRACKETS, OPEN_BRACKETS))
+
+# Brackets and argument delimiters, along with the strings and comments that hide them. Strings are
+# double quoted and may not span lines. Line comments must follow whitespace so that URLs are not
+# treated as comments.
+_REGEX_STRUCTURE = re.compile(r"\"(?:\\.|[^\"\\\n])*\"|/\*.*?\*/|(?<!\S)//[^\n]*|[()\[\]{}<>,;]",
+                              re.DOTALL)
+_REGEX_STRUCTURE_CHARACTERS = re.compile(r"[()\[\]{}<>,;]")
+
+
+class BracketTable:
+  """Bracket pairs and argument delimiters for a piece of text. Each type of bracket is paired
+  independently, so an unbalanced `<` used as a comparison does not affect parentheses. Brackets and
+  delimiters inside strings and comments are ignored. The text must not change after the table is
+  created.
+
+  Strings and comments can be given as sorted, non-overlapping `ignored_ranges`, e.g. from a lexer
+  for the language of the text. Otherwise, double quoted strings and C style comments are found with
+  a regex."""
+
+  def __init__(self, text: str, ignored_ranges: Optional[Sequence[TextRange]] = None):
+    self.text = text
+    # Sorted positions of each bracket and delimiter character outside strings and comments.
+    self._positions: dict[str, list[int]] = {c: [] for c in OPEN_BRACKETS + CLOSE_BRACKETS}
+    self._positions.update({c: [] for c in ARGUMENT_DELIMITERS})
+    # Closing bracket for each matched opening bracket.
+    self._partners: dict[int, int] = {}
+    # Enclosing opening bracket of the same type for each opening bracket. -1 if there is none.
+    self._parents: dict[int, int] = {}
+    # Closing brackets without an opening bracket, by type.
+    self._unmatched_closes: dict[str, list[int]] = {c: [] for c in OPEN_BRACKETS}
+    # Argument delimiters keyed by their enclosing parenthesis, or -1 outside parentheses.
+    self._delimiters_by_parenthesis: dict[int, list[int]] = {}
+    # Strings and comments, and tables for brackets inside them.
+    self._ignored_starts: list[int] = []
+    self._ignored_ends: list[int] = []
+    self._ignored_tables: dict[int, BracketTable] = {}
+
+    if ignored_ranges is None:
+      regex = _REGEX_STRUCTURE
+    else:
+      regex = _REGEX_STRUCTURE_CHARACTERS
+      self._ignored_starts = [r.start for r in ignored_ranges]
+      self._ignored_ends = [r.end for r in ignored_ranges]
+    # Index of the next given ignored range.
+    next_ignored = 0
+    stacks: dict[str, list[int]] = {c: [] for c in OPEN_BRACKETS}
+    parentheses = stacks["("]
+    for match in regex.finditer(text):
+      position = match.start()
+      c = match.group()
+      if len(c) > 1:
+        self._ignored_starts.append(position)
+        self._ignored_ends.append(match.end())
+        continue
+      if ignored_ranges is not None:
+        ends = self._ignored_ends
+        while next_ignored < len(ends) and ends[next_ignored] <= position:
+          next_ignored += 1
+        if next_ignored < len(ends) and self._ignored_starts[next_ignored] <= position:
+          continue
+
+      self._positions[c].append(position)
+      if c in stacks:
+        stack = stacks[c]
+        self._parents[position] = stack[-1] if stack else -1
+        stack.append(position)
+      elif c in _OPEN_BRACKET_BY_CLOSE_BRACKET:
+        open_bracket = _OPEN_BRACKET_BY_CLOSE_BRACKET[c]
+        stack = stacks[open_bracket]
+        if stack:
+          self._partners[stack.pop()] = position
+        else:
+          self._unmatched_closes[open_bracket].append(position)
+      else:
+        parenthesis = parentheses[-1] if parentheses else -1
+        self._delimiters_by_parenthesis.setdefault(parenthesis, []).append(position)
+
+  def find_next(self, index: int, characters: str) -> int:
+    """Gets the index of the first of the given bracket or delimiter characters at or after the
+    given index, ignoring strings and comments. Returns -1 if there is none."""
+    result = -1
+    for c in characters:
+      positions = self._positions[c]
+      i = bisect.bisect_left(positions, index)
+      if i < len(positions) and (result < 0 or positions[i] < result):
+        result = positions[i]
+    return result
+
+  def find_previous(self, index: int, characters: str) -> int:
+    """Gets the index of the last of the given bracket or delimiter characters before the given
+    index, ignoring strings and comments. Returns -1 if there is none."""
+    result = -1
+    for c in characters:
+      positions = self._positions[c]
+      i = bisect.bisect_left(positions, index) - 1
+      if i >= 0:
+        result = max(result, positions[i])
+    return result
+
+  def partner(self, open_index: int) -> int:
+    """Gets the index of the closing bracket for the opening bracket at the given index. Returns -1
+    if it is never closed."""
+    return self._partners.get(open_index, -1)
+
+  def enclosing_open(self, index: int, bracket: str) -> int:
+    """Gets the index of the innermost opening bracket of the given type before the given index that
+    is not closed before it. Returns -1 if there is none."""
+    opens = self._positions[bracket]
+    i = bisect.bisect_left(opens, index) - 1
+    if i < 0:
+      return -1
+    # If the nearest opening bracket was closed before the index, so were any brackets nested in it.
+    # Continue with the brackets enclosing it.
+    open_index = opens[i]
+    while open_index >= 0 and -1 < self.partner(open_index) < index:
+      open_index = self._parents[open_index]
+    return open_index
+
+  def enclosing_pair(self, index: int) -> Optional[TextRange]:
+    """Gets the innermost pair of brackets of any type around the given index, from the opening
+    bracket to the closing bracket. The range ends at the end of the text if the opening bracket is
+    never closed. Inside a string or comment, brackets within it take priority."""
+    ignored_range = self._ignored_range_at(index)
+    if ignored_range is not None:
+      table = self._ignored_tables.get(ignored_range.start)
+      if table is None:
+        table = BracketTable(ignored_range.extract(self.text), ignored_ranges=[])
+        self._ignored_tables[ignored_range.start] = table
+      pair = table.enclosing_pair(index - ignored_range.start)
+      if pair is not None and pair.end < len(table.text):
+        return TextRange(pair.start + ignored_range.start, pair.end + ignored_range.start)
+
+    open_index = max(self.enclosing_open(index, bracket) for bracket in OPEN_BRACKETS)
+    if open_index < 0:
+      return None
+    close_index = self.partner(open_index)
+    return TextRange(open_index, len(self.text) if close_index < 0 else close_index)
+
+  def scope_end(self, open_index: int, start: int, bracket: str) -> int:
+    """Gets the index of the closing bracket for a scope opened at `open_index`, which may be -1 to
+    use the top level of the text. At the top level, the scope ends at the first unmatched closing
+    bracket at or after `start`. Returns the length of the text if the scope is never closed."""
+    if open_index >= 0:
+      close_index = self.partner(open_index)
+    else:
+      unmatched_closes = self._unmatched_closes[bracket]
+      i = bisect.bisect_left(unmatched_closes, start)
+      close_index = unmatched_closes[i] if i < len(unmatched_closes) else -1
+    return len(self.text) if close_index < 0 else close_index
+
+  def argument_start(self, index: int) -> int:
+    """Gets the start of the argument containing the given index: after the previous argument
+    delimiter or opening parenthesis at the same nesting level, or the start of the text."""
+    parenthesis = self.enclosing_open(index, "(")
+    # At the top level, an unmatched closing parenthesis ends the search.
+    lower_bound = parenthesis
+    if parenthesis < 0:
+      unmatched_closes = self._unmatched_closes["("]
+      i = bisect.bisect_left(unmatched_closes, index) - 1
+      if i >= 0:
+        lower_bound = unmatched_closes[i]
+
+    delimiters = self._delimiters_by_parenthesis.get(parenthesis, [])
+    i = bisect.bisect_left(delimiters, index) - 1
+    if i >= 0 and delimiters[i] > lower_bound:
+      return delimiters[i] + 1
+    return parenthesis + 1 if parenthesis >= 0 else 0
+
+  def argument_end(self, index: int) -> int:
+    """Gets the end of the argument containing the given index: the next argument delimiter or
+    closing parenthesis at the same nesting level, or the end of the text."""
+    parenthesis = self.enclosing_open(index, "(")
+    upper_bound = self.scope_end(parenthesis, index, "(")
+    delimiters = self._delimiters_by_parenthesis.get(parenthesis, [])
+    i = bisect.bisect_left(delimiters, index)
+    if i < len(delimiters) and delimiters[i] < upper_bound:
+      return delimiters[i]
+    return upper_bound
+
+  def _ignored_range_at(self, index: int) -> Optional[TextRange]:
+    """Gets the string or comment strictly containing the given index, if any."""
+    i = bisect.bisect_left(self._ignored_starts, index) - 1
+    if i < 0 or index >= self._ignored_ends[i]:
+      return None
+    return TextRange(self._ignored_starts[i], self._ignored_ends[i])
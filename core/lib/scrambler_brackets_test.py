@@ -0,0 +1,116 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_brackets import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class PairTestCase(unittest.TestCase):
+
+  def test_partner(self):
+    table = BracketTable("f(a[0], (b))")
+    self.assertEqual(table.partner(1), 11)
+    self.assertEqual(table.partner(3), 5)
+    self.assertEqual(table.partner(8), 10)
+    self.assertEqual(table.partner(0), -1)
+
+  def test_unclosed(self):
+    table = BracketTable("f(a, (b)")
+    self.assertEqual(table.partner(1), -1)
+    self.assertEqual(table.partner(5), 7)
+
+  def test_enclosing_open(self):
+    table = BracketTable("f(a, (b), c)")
+    self.assertEqual(table.enclosing_open(0, "("), -1)
+    self.assertEqual(table.enclosing_open(2, "("), 1)
+    self.assertEqual(table.enclosing_open(6, "("), 5)
+    self.assertEqual(table.enclosing_open(10, "("), 1)
+    self.assertEqual(table.enclosing_open(12, "("), -1)
+
+  def test_bracket_types_are_independent(self):
+    table = BracketTable("(a < b)")
+    self.assertEqual(table.partner(0), 6)
+    self.assertEqual(table.enclosing_open(6, "("), 0)
+    self.assertEqual(table.enclosing_open(6, "<"), 3)
+
+  def test_enclosing_pair(self):
+    table = BracketTable("[a, {b: (c)}]")
+    self.assertEqual(table.enclosing_pair(2), TextRange(0, 12))
+    self.assertEqual(table.enclosing_pair(6), TextRange(4, 11))
+    self.assertEqual(table.enclosing_pair(9), TextRange(8, 10))
+    self.assertIsNone(table.enclosing_pair(13))
+
+  def test_enclosing_pair_unclosed(self):
+    table = BracketTable("[a, b")
+    self.assertEqual(table.enclosing_pair(2), TextRange(0, 5))
+
+
+class StringAndCommentTestCase(unittest.TestCase):
+
+  def test_string(self):
+    table = BracketTable("f(\")\", x)")
+    self.assertEqual(table.partner(1), 8)
+
+  def test_escaped_quote(self):
+    table = BracketTable("f(\"\\\")\", x)")
+    self.assertEqual(table.partner(1), 10)
+
+  def test_line_comment(self):
+    table = BracketTable("f(a, // )\n  b)")
+    self.assertEqual(table.partner(1), 13)
+
+  def test_url_is_not_comment(self):
+    table = BracketTable("(see http://example.com)")
+    self.assertEqual(table.partner(0), 23)
+
+  def test_block_comment(self):
+    table = BracketTable("{ /* } */ }")
+    self.assertEqual(table.partner(0), 10)
+
+  def test_brackets_inside_string(self):
+    text = "f(\"a (b) c\")"
+    table = BracketTable(text)
+    self.assertEqual(table.enclosing_pair(7), TextRange(5, 7))
+    self.assertEqual(table.enclosing_pair(4), TextRange(1, 11))
+
+  def test_ignored_ranges(self):
+    text = "f(a, '(', # )\n  b)"
+    table = BracketTable(text, [TextRange(5, 8), TextRange(10, 13)])
+    self.assertEqual(table.partner(1), 17)
+    self.assertEqual(table.argument_end(9), 17)
+    self.assertEqual(table.enclosing_pair(6), TextRange(1, 17))
+
+  def test_find_ignores_strings(self):
+    table = BracketTable("a\"(,\"(,")
+    self.assertEqual(table.find_next(0, "("), 5)
+    self.assertEqual(table.find_next(0, ARGUMENT_DELIMITERS), 6)
+    self.assertEqual(table.find_previous(5, "("), -1)
+
+
+class ArgumentTestCase(unittest.TestCase):
+
+  def test_argument_bounds(self):
+    text = "f(a, g(b, c), d)"
+    table = BracketTable(text)
+    self.assertEqual(table.argument_start(8), 7)
+    self.assertEqual(table.argument_end(8), 8)
+    self.assertEqual(table.argument_start(11), 9)
+    self.assertEqual(table.argument_start(14), 13)
+    self.assertEqual(table.argument_end(14), 15)
+    self.assertEqual(table.argument_start(2), 2)
+    self.assertEqual(table.argument_end(5), 12)
+
+  def test_delimiter_in_string(self):
+    table = BracketTable("f(\"a, b\", c)")
+    self.assertEqual(table.argument_start(5), 2)
+    self.assertEqual(table.argument_end(5), 8)
+
+  def test_top_level(self):
+    table = BracketTable("a, b) c, d")
+    self.assertEqual(table.argument_start(3), 2)
+    self.assertEqual(table.argument_end(3), 4)
+    self.assertEqual(table.argument_start(10), 8)
+    self.assertEqual(table.argument_start(7), 0)
+
+  def test_scope_end(self):
+    table = BracketTable("a } { b }")
+    self.assertEqual(table.scope_end(-1, 0, "{"), 2)
+    self.assertEqual(table.scope_end(4, 5, "{"), 8)
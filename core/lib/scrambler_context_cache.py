@@ -0,0 +1,89 @@
+"""Cache of the Scrambler context between consecutive commands. Reading the full text of an editor
+through the accessibility API is slow, but after a command the text and selection are already known
+from simulating its editor actions. The next command can reuse them after a cheap check that the
+editor has not changed in the meantime: the selection, the length of the editor text and the text
+around the selection must all be unchanged."""
+
+import copy
+import hashlib
+from typing import Any, Optional
+from .scrambler_types import Context, TextRange
+
+# Characters on each side of the cursor that are compared to validate a cached context.
+_VALIDATION_RADIUS = 256
+
+# Cached contexts older than this are never used. Guards against edits that happen to leave the
+# text around the cursor and the selection unchanged.
+_MAX_AGE_SECONDS = 30.0
+
+
+def _hash_text(text: str) -> bytes:
+  return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ContextCache:
+  """Holds the context after the last command, along with the editor it belongs to. The editor is
+  identified by an arbitrary key, e.g. the focused accessibility element."""
+
+  def __init__(self,
+               validation_radius: int = _VALIDATION_RADIUS,
+               max_age_seconds: float = _MAX_AGE_SECONDS):
+    if validation_radius < 1:
+      raise ValueError(f"Invalid validation radius: {validation_radius}")
+    self.validation_radius = validation_radius
+    self.max_age_seconds = max_age_seconds
+    self.hits = 0
+    self.misses = 0
+    self._context: Optional[Context] = None
+    self._editor_key: Any = None
+    self._stored_at = 0.0
+    self._window: Optional[TextRange] = None
+    self._window_hash = b""
+    # Length of the editor text when the context was stored.
+    self._text_length = 0
+
+  def store(self, context: Context, editor_key: Any, now: float):
+    """Caches a copy of the given context. Should be called after the context has been updated to
+    reflect all actions performed in the editor."""
+    self._context = copy.copy(context)
+    self._editor_key = editor_key
+    self._stored_at = now
+    selection = context.selection_range
+    self._window = TextRange(max(selection.start - self.validation_radius, 0),
+                             min(selection.end + self.validation_radius, len(context.text)))
+    self._window_hash = _hash_text(self._window.extract(context.text))
+    self._text_length = context.text_offset + len(context.text) + (context.chars_after_text or 0)
+
+  def invalidate(self):
+    """Drops the cached context, e.g. after an action whose effect on the text is unknown."""
+    self._context = None
+    self._editor_key = None
+    self._window = None
+
+  def validation_window(self, editor_key: Any, selection_range: TextRange,
+                        text_length: Optional[int], now: float) -> Optional[TextRange]:
+    """Gets the range of editor text that must be read to validate the cached context, in editor
+    coordinates. `text_length` is the current length of the editor text, if known. Returns None if
+    the cache cannot be used, without needing to read any text. Edits far from the selection, e.g.
+    by a formatter, usually change the length of the text."""
+    if (self._context is None or self._window is None or editor_key != self._editor_key or
+        now - self._stored_at > self.max_age_seconds or text_length != self._text_length):
+      return None
+    offset = self._context.text_offset
+    cached_selection = self._context.selection_range
+    if (selection_range.start != cached_selection.start + offset or
+        selection_range.end != cached_selection.end + offset):
+      return None
+    return TextRange(self._window.start + offset, self._window.end + offset)
+
+  def lookup(self, editor_key: Any, selection_range: TextRange, text_length: Optional[int],
+             window_text: Optional[str], now: float) -> Optional[Context]:
+    """Gets the cached context if it is still valid. `selection_range` and `text_length` are the
+    current selection and length of the editor text, and `window_text` is the editor text read from
+    `validation_window`. Returns a copy, so callers may modify the result."""
+    window = self.validation_window(editor_key, selection_range, text_length, now)
+    if window is None or window_text is None or _hash_text(window_text) != self._window_hash:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return copy.copy(self._context)
@@ -0,0 +1,90 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_context_cache import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_sim import simulate_actions
+from .scrambler_types import EditorAction, EditorActionType
+
+
+class ContextCacheTestCase(unittest.TestCase):
+
+  def test_hit(self):
+    cache = ContextCache(validation_radius=4)
+    text = "The quick brown fox"
+    cache.store(Context(text, TextRange(4, 9)), "editor", 0.0)
+    window = cache.validation_window("editor", TextRange(4, 9), len(text), 1.0)
+    self.assertEqual(window, TextRange(0, 13))
+    assert window is not None
+    context = cache.lookup("editor", TextRange(4, 9), len(text), window.extract(text), 1.0)
+    assert context is not None
+    self.assertEqual(context.text, text)
+    self.assertEqual(context.selection_range, TextRange(4, 9))
+    self.assertEqual(cache.hits, 1)
+
+  def test_returns_copy(self):
+    cache = ContextCache(validation_radius=4)
+    text = "The quick brown fox"
+    cache.store(Context(text, TextRange(4, 4)), "editor", 0.0)
+    context = cache.lookup("editor", TextRange(4, 4), len(text), "The quic", 0.0)
+    assert context is not None
+    context.selection_range = TextRange(0, 0)
+    context = cache.lookup("editor", TextRange(4, 4), len(text), "The quic", 0.0)
+    assert context is not None
+    self.assertEqual(context.selection_range, TextRange(4, 4))
+
+  def test_chained_commands(self):
+    cache = ContextCache(validation_radius=4)
+    context = Context("The quick brown fox", TextRange(0, 0), potato_mode=False)
+    simulate_actions(context, [
+        EditorAction(EditorActionType.DELETE_RANGE, TextRange(4, 10)),
+        EditorAction(EditorActionType.INSERT_TEXT, text="slow "),
+    ])
+    cache.store(context, "editor", 0.0)
+    editor_text = "The slow brown fox"
+    window = cache.validation_window("editor", TextRange(9, 9), len(editor_text), 0.0)
+    assert window is not None
+    cached = cache.lookup("editor", TextRange(9, 9), len(editor_text), window.extract(editor_text),
+                          0.0)
+    assert cached is not None
+    self.assertEqual(cached.text, editor_text)
+
+  def test_text_offset(self):
+    cache = ContextCache(validation_radius=2)
+    cache.store(Context("abcdef", TextRange(3, 3), text_offset=100), "editor", 0.0)
+    self.assertIsNone(cache.validation_window("editor", TextRange(3, 3), 106, 0.0))
+    self.assertEqual(cache.validation_window("editor", TextRange(103, 103), 106, 0.0),
+                     TextRange(101, 105))
+
+  def test_text_length(self):
+    cache = ContextCache(validation_radius=4)
+    text = "The quick brown fox"
+    cache.store(Context(text, TextRange(4, 4)), "editor", 0.0)
+    # Edits far from the selection leave the text around it unchanged.
+    self.assertIsNone(cache.lookup("editor", TextRange(4, 4), len(text) + 1, "The quic", 0.0))
+    self.assertIsNone(cache.lookup("editor", TextRange(4, 4), None, "The quic", 0.0))
+    # Text after a window counts towards the length of the editor text.
+    cache.store(Context("abc", TextRange(1, 1), text_offset=10, chars_after_text=5), "editor", 0.0)
+    self.assertIsNone(cache.validation_window("editor", TextRange(11, 11), 13, 0.0))
+    self.assertIsNotNone(cache.validation_window("editor", TextRange(11, 11), 18, 0.0))
+
+  def test_miss(self):
+    cache = ContextCache(validation_radius=4, max_age_seconds=10.0)
+    text = "The quick brown fox"
+    cache.store(Context(text, TextRange(4, 4)), "editor", 0.0)
+    length = len(text)
+    self.assertIsNone(cache.lookup("other", TextRange(4, 4), length, "The quic", 0.0))
+    self.assertIsNone(cache.lookup("editor", TextRange(5, 5), length, "he quick", 0.0))
+    self.assertIsNone(cache.lookup("editor", TextRange(4, 4), length, "The quac", 0.0))
+    self.assertIsNone(cache.lookup("editor", TextRange(4, 4), length, None, 0.0))
+    self.assertIsNone(cache.lookup("editor", TextRange(4, 4), length, "The quic", 11.0))
+    self.assertEqual(cache.misses, 5)
+    self.assertIsNotNone(cache.lookup("editor", TextRange(4, 4), length, "The quic", 10.0))
+
+  def test_invalidate(self):
+    cache = ContextCache()
+    cache.store(Context("abc", TextRange(0, 0)), "editor", 0.0)
+    cache.invalidate()
+    self.assertIsNone(cache.validation_window("editor", TextRange(0, 0), 3, 0.0))
+
+  def test_invalid_radius(self):
+    with self.assertRaises(ValueError):
+      ContextCache(validation_radius=0)
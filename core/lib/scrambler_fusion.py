@@ -0,0 +1,124 @@
+"""Fusion of Scrambler editor actions. Commands often produce sequences like a deletion followed by an
+insertion, or a selection that the next action overrides. Every editor action is a round trip to the
+editor followed by a wait for it to settle, so the actions are rewritten into fewer actions before
+they are executed. Editors declare which fused action types they support.
+
+Fused actions are only checked against `scrambler_sim`, so they assume editors behave like it does:
+inserting text replaces the selection, and replacing a range (`REPLACE_RANGE`) leaves the inserted
+text in its place, deleting the range even if the text is empty. An insertion of empty text is
+never fused with a selection, since pasting nothing leaves the selection in place in most
+editors."""
+
+from typing import Collection, Optional, Sequence
+from .scrambler_types import EditorAction, EditorActionType, TextRange
+
+# Editor action types that only exist as the result of fusing other actions.
+FUSED_ACTION_TYPES = (EditorActionType.REPLACE_RANGE,)
+
+
+def _selection_after(action: EditorAction,
+                     selection_before: Optional[TextRange]) -> Optional[TextRange]:
+  """Gets the selection after the given action, or None if it depends on the text."""
+  if action.action_type == EditorActionType.SET_SELECTION_RANGE:
+    return action.text_range
+  if action.action_type == EditorActionType.DELETE_RANGE:
+    assert action.text_range is not None
+    return TextRange(action.text_range.start, action.text_range.start)
+  if action.action_type == EditorActionType.REPLACE_RANGE:
+    assert action.text_range is not None
+    cursor = action.text_range.start + len(action.text)
+    return TextRange(cursor, cursor)
+  if action.action_type == EditorActionType.INSERT_TEXT:
+    if selection_before is None:
+      return None
+    cursor = selection_before.start + len(action.text)
+    return TextRange(cursor, cursor)
+  # Clipboard actions do not change the selection.
+  return selection_before
+
+
+def _fuse_pair(previous: EditorAction, action: EditorAction,
+               fused_types: Collection[EditorActionType]) -> Optional[list[EditorAction]]:
+  """Gets the actions that replace two consecutive actions, or None if they cannot be fused."""
+  previous_type = previous.action_type
+  action_type = action.action_type
+  if previous_type == EditorActionType.SET_SELECTION_RANGE:
+    # A selection is redundant if the next action sets the selection itself.
+    if action_type in (EditorActionType.SET_SELECTION_RANGE, EditorActionType.DELETE_RANGE,
+                       EditorActionType.REPLACE_RANGE):
+      return [action]
+    # Typing over a selection replaces it. Inserting nothing does not clear the selection in most
+    # editors, unlike in the simulation, so the actions are left as they are.
+    if (action_type == EditorActionType.INSERT_TEXT and action.text and
+        EditorActionType.REPLACE_RANGE in fused_types):
+      return [EditorAction(EditorActionType.REPLACE_RANGE, previous.text_range, action.text)]
+
+  elif previous_type == EditorActionType.DELETE_RANGE:
+    assert previous.text_range is not None
+    # Inserting nothing after a deletion does nothing, as the selection is empty.
+    if action_type == EditorActionType.INSERT_TEXT and not action.text:
+      return [previous]
+    if (action_type == EditorActionType.INSERT_TEXT and
+        EditorActionType.REPLACE_RANGE in fused_types):
+      return [EditorAction(EditorActionType.REPLACE_RANGE, previous.text_range, action.text)]
+    if action_type == EditorActionType.DELETE_RANGE:
+      assert action.text_range is not None
+      # Deleting the text right before or right after the deleted range.
+      if action.text_range.end == previous.text_range.start:
+        return [
+            EditorAction(EditorActionType.DELETE_RANGE,
+                         TextRange(action.text_range.start, previous.text_range.end))
+        ]
+      if action.text_range.start == previous.text_range.start:
+        return [
+            EditorAction(
+                EditorActionType.DELETE_RANGE,
+                TextRange(previous.text_range.start,
+                          previous.text_range.end + action.text_range.length()))
+        ]
+
+  elif previous_type == EditorActionType.INSERT_TEXT:
+    if action_type == EditorActionType.INSERT_TEXT:
+      return [EditorAction(EditorActionType.INSERT_TEXT, text=previous.text + action.text)]
+
+  elif previous_type == EditorActionType.REPLACE_RANGE:
+    if action_type == EditorActionType.INSERT_TEXT:
+      return [
+          EditorAction(EditorActionType.REPLACE_RANGE, previous.text_range,
+                       previous.text + action.text)
+      ]
+  return None
+
+
+def fuse_actions(
+    actions: Sequence[EditorAction],
+    fused_types: Collection[EditorActionType] = FUSED_ACTION_TYPES) -> list[EditorAction]:
+  """Rewrites a list of editor actions into fewer actions with the same simulated result. Only uses
+  the fused action types in `fused_types`, in addition to the basic action types. Merges a deletion
+  or selection followed by an insertion into a replacement, drops selections that are overridden or
+  already in place, and merges consecutive insertions and adjacent deletions. The result is only
+  equivalent for actions that are valid for the text they act on, as the original actions would
+  fail in the same places, and for editors that behave as the module docstring describes."""
+  result: list[EditorAction] = []
+  # Known selection after each action in the result. None where it depends on the text.
+  selections: list[Optional[TextRange]] = []
+  for action in actions:
+    pending = [action]
+    while pending:
+      action = pending.pop()
+      selection_before = selections[-1] if selections else None
+      # A selection that is already in place is redundant. The editor mode is also unchanged, as
+      # only selections set by a previous selection action can be longer than zero.
+      if (action.action_type == EditorActionType.SET_SELECTION_RANGE and result and
+          action.text_range == selection_before):
+        continue
+      fused = _fuse_pair(result[-1], action, fused_types) if result else None
+      if fused is None:
+        result.append(action)
+        selections.append(_selection_after(action, selection_before))
+        continue
+      # The fused actions may fuse with the action before them in turn.
+      result.pop()
+      selections.pop()
+      pending.extend(reversed(fused))
+  return result
@@ -0,0 +1,146 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import random
+import unittest
+from .scrambler_fusion import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_run import run_command
+from .scrambler_sim import simulate_actions
+from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_types import Command, CommandType, Context, Modifier, ModifierType
+
+
+def _select(start: int, end: int) -> EditorAction:
+  return EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(start, end))
+
+
+def _delete(start: int, end: int) -> EditorAction:
+  return EditorAction(EditorActionType.DELETE_RANGE, TextRange(start, end))
+
+
+def _insert(text: str) -> EditorAction:
+  return EditorAction(EditorActionType.INSERT_TEXT, text=text)
+
+
+def _replace(start: int, end: int, text: str) -> EditorAction:
+  return EditorAction(EditorActionType.REPLACE_RANGE, TextRange(start, end), text)
+
+
+def _simulate(text: str, selection_range: TextRange,
+              actions: list[EditorAction]) -> tuple[str, TextRange, str, str]:
+  context = Context(text, selection_range, editor_mode="n")
+  clipboard = simulate_actions(context, actions)
+  return context.text, context.selection_range, context.editor_mode, clipboard
+
+
+def _random_actions(rng: random.Random, text: str,
+                    selection_range: TextRange) -> list[EditorAction]:
+  """Gets a random list of editor actions that is valid for the given text and selection."""
+  context = Context(text, selection_range)
+  result = []
+  for _ in range(rng.randint(0, 8)):
+    length = len(context.text)
+    start = rng.randint(0, length)
+    end = rng.randint(start, min(start + 3, length))
+    action = rng.choice([
+        _select(start, end),
+        _select(start, start),
+        _delete(start, end),
+        _insert(rng.choice(["", "a", "bc"])),
+        EditorAction(EditorActionType.SET_CLIPBOARD_NO_HISTORY, text=rng.choice(["x", "y"])),
+    ])
+    simulate_actions(context, [action])
+    result.append(action)
+  return result
+
+
+class FuseActionsTestCase(unittest.TestCase):
+
+  def test_empty(self):
+    self.assertEqual(fuse_actions([]), [])
+
+  def test_delete_and_insert(self):
+    self.assertEqual(fuse_actions([_delete(2, 5), _insert("abc")]), [_replace(2, 5, "abc")])
+    # Without support for replacement, the actions are left alone.
+    self.assertEqual(fuse_actions([_delete(2, 5), _insert("abc")], ()),
+                     [_delete(2, 5), _insert("abc")])
+
+  def test_delete_and_insert_nothing(self):
+    # Pasting nothing does nothing in editors, so the deletion must stay a deletion.
+    self.assertEqual(fuse_actions([_delete(2, 5), _insert("")]), [_delete(2, 5)])
+    self.assertEqual(fuse_actions([_delete(2, 5), _insert(""),
+                                   _insert("a")]), [_replace(2, 5, "a")])
+    self.assertEqual(fuse_actions([_select(2, 5), _insert("")]), [_select(2, 5), _insert("")])
+
+  def test_replace_with_nothing_command(self):
+    text = "one two three"
+    command = Command(CommandType.REPLACE_WITH_LAMBDA,
+                      [Modifier(ModifierType.EXACT_WORD_NEXT, search="two")],
+                      lambda_func=lambda _: "")
+    actions = run_command(command, text, TextRange(0, 0), UTILITY_FUNCTIONS)
+    fused = fuse_actions(actions)
+    self.assertNotIn(EditorActionType.REPLACE_RANGE, [action.action_type for action in fused])
+    self.assertEqual(_simulate(text, TextRange(0, 0), fused),
+                     _simulate(text, TextRange(0, 0), actions))
+
+  def test_select_and_insert(self):
+    self.assertEqual(fuse_actions([_select(2, 5), _insert("abc"),
+                                   _insert("d")]), [_replace(2, 5, "abcd")])
+    self.assertEqual(fuse_actions([_select(2, 5), _insert("abc")], ()),
+                     [_select(2, 5), _insert("abc")])
+
+  def test_overridden_selection(self):
+    self.assertEqual(fuse_actions([_select(2, 5), _select(3, 3), _delete(1, 4)]), [_delete(1, 4)])
+
+  def test_selection_already_in_place(self):
+    self.assertEqual(fuse_actions([_delete(2, 5), _select(2, 2)]), [_delete(2, 5)])
+    self.assertEqual(fuse_actions([_replace(2, 5, "abc"), _select(5, 5)]), [_replace(2, 5, "abc")])
+    self.assertEqual(fuse_actions([_select(2, 5), _insert("ab"),
+                                   _select(4, 4)]), [_replace(2, 5, "ab")])
+    self.assertEqual(
+        fuse_actions([
+            _select(2, 5),
+            EditorAction(EditorActionType.SET_CLIPBOARD_WITH_HISTORY, text="x"),
+            _select(2, 5)
+        ], ()),
+        [_select(2, 5),
+         EditorAction(EditorActionType.SET_CLIPBOARD_WITH_HISTORY, text="x")])
+    # The selection after the first action depends on the editor.
+    self.assertEqual(fuse_actions([_insert("ab"), _select(2, 2)]), [_insert("ab"), _select(2, 2)])
+    self.assertEqual(fuse_actions([_select(2, 2)]), [_select(2, 2)])
+
+  def test_adjacent_deletions(self):
+    # Deleting before the deleted range.
+    self.assertEqual(fuse_actions([_delete(4, 6), _delete(2, 4)]), [_delete(2, 6)])
+    # Deleting after it.
+    self.assertEqual(fuse_actions([_delete(4, 6), _delete(4, 7)]), [_delete(4, 9)])
+    # Deletions elsewhere are left alone.
+    self.assertEqual(fuse_actions([_delete(4, 6), _delete(1, 2)]), [_delete(4, 6), _delete(1, 2)])
+
+  def test_replace_command(self):
+    text = "one two three"
+    command = Command(CommandType.REPLACE, [Modifier(ModifierType.EXACT_WORD_NEXT, search="two")],
+                      insert_text="four")
+    actions = run_command(command, text, TextRange(0, 0), UTILITY_FUNCTIONS)
+    fused = fuse_actions(actions)
+    self.assertLess(len(fused), len(actions))
+    self.assertEqual(fused[0], _replace(4, 7, "four"))
+    self.assertEqual(_simulate(text, TextRange(0, 0), fused),
+                     _simulate(text, TextRange(0, 0), actions))
+
+  def test_same_result_as_actions(self):
+    rng = random.Random(0)
+    for _ in range(2000):
+      text = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 10)))
+      start = rng.randint(0, len(text))
+      selection_range = TextRange(start, rng.randint(start, len(text)))
+      actions = _random_actions(rng, text, selection_range)
+      for fused_types in ((), FUSED_ACTION_TYPES):
+        fused = fuse_actions(actions, fused_types)
+        self.assertLessEqual(len(fused), len(actions))
+        self.assertEqual(_simulate(text, selection_range, fused),
+                         _simulate(text, selection_range, actions), actions)
+        if not fused_types:
+          self.assertNotIn(EditorActionType.REPLACE_RANGE, [action.action_type for action in fused])
+        # Replacing with nothing relies on editors deleting the range, so it is never produced.
+        for action in fused:
+          if action.action_type == EditorActionType.REPLACE_RANGE:
+            self.assertNotEqual(action.text, "")
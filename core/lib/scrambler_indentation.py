@@ -0,0 +1,112 @@
+"""Indentation blocks for the Python scope modifiers. The indentation of every line is measured and
+the blocks it forms are linked into a tree in a single pass, so modifiers can look up the scope of a
+line, its parent and its siblings instead of walking the text one line at a time."""
+
+
+class IndentationTree:
+  """Indentation blocks for a piece of text. A block at a given indentation level is a maximal run
+  of lines indented by at least that level, ignoring lines that are just whitespace. The scope of a
+  line is the block at its own indentation level. Blocks nest, so they form a tree whose root
+  contains every line that is not just whitespace. The text must not change after the tree is
+  created."""
+
+  def __init__(self, text: str):
+    # Indentation of every line in characters. -1 for lines that are just whitespace.
+    self.indentation: list[int] = []
+    # Scope of every line. Lines that are just whitespace take the scope of the previous line that
+    # is not. -1 if there is no such line.
+    self._scopes: list[int] = []
+    # Indentation level, and first and last line that is not just whitespace, of each block.
+    self._levels: list[int] = []
+    self._first_lines: list[int] = []
+    self._last_lines: list[int] = []
+    # Enclosing block of each block. -1 for the root.
+    self._parents: list[int] = []
+    # Nested blocks of each block, in order, and the position of each block among its siblings.
+    self._children: list[list[int]] = []
+    self._child_positions: list[int] = []
+
+    # Open blocks, from the outermost. Their levels are strictly increasing.
+    stack: list[int] = []
+    scope = -1
+    previous_line_number = -1
+    for line_number, line in enumerate(text.split("\n")):
+      stripped = line.lstrip()
+      if not stripped:
+        self.indentation.append(-1)
+        self._scopes.append(scope)
+        continue
+      level = len(line) - len(stripped)
+      self.indentation.append(level)
+
+      # Close deeper blocks. The outermost of them is nested in the block at this level, which
+      # starts where it does if it is not already open.
+      outermost_closed = -1
+      while stack and self._levels[stack[-1]] > level:
+        block = stack.pop()
+        self._last_lines[block] = previous_line_number
+        if stack and self._levels[stack[-1]] >= level:
+          self._adopt(stack[-1], block)
+        else:
+          outermost_closed = block
+      if stack and self._levels[stack[-1]] == level:
+        scope = stack[-1]
+      else:
+        first_line = line_number if outermost_closed == -1 else self._first_lines[outermost_closed]
+        scope = self._add_block(level, first_line)
+        stack.append(scope)
+        if outermost_closed != -1:
+          self._adopt(scope, outermost_closed)
+      self._scopes.append(scope)
+      previous_line_number = line_number
+
+    while stack:
+      block = stack.pop()
+      self._last_lines[block] = previous_line_number
+      if stack:
+        self._adopt(stack[-1], block)
+
+  def _add_block(self, level: int, first_line: int) -> int:
+    """Adds a block without a parent and returns it."""
+    self._levels.append(level)
+    self._first_lines.append(first_line)
+    self._last_lines.append(first_line)
+    self._parents.append(-1)
+    self._children.append([])
+    self._child_positions.append(0)
+    return len(self._levels) - 1
+
+  def _adopt(self, parent: int, block: int):
+    """Nests a block in the given parent, after the parent's other children."""
+    self._parents[block] = parent
+    self._child_positions[block] = len(self._children[parent])
+    self._children[parent].append(block)
+
+  def scope(self, line_number: int) -> int:
+    """Gets the scope of the given line, or of the previous line that is not just whitespace.
+    Returns -1 if there is no such line."""
+    return self._scopes[line_number]
+
+  def level(self, block: int) -> int:
+    """Gets the indentation level of the given block."""
+    return self._levels[block]
+
+  def block_lines(self, block: int) -> tuple[int, int]:
+    """Gets the first and last line of the given block that are not just whitespace."""
+    return self._first_lines[block], self._last_lines[block]
+
+  def parent(self, block: int) -> int:
+    """Gets the block enclosing the given block. Returns -1 for the root."""
+    return self._parents[block]
+
+  def sibling(self, block: int, offset: int) -> int:
+    """Gets the block `offset` places after the given block in its parent, or before it if the
+    offset is negative. Returns -1 if there is none."""
+    parent = self._parents[block]
+    if parent == -1:
+      return -1
+    siblings = self._children[parent]
+    position = self._child_positions[block] + offset
+    if position < 0 or position >= len(siblings):
+      return -1
+    return siblings[position]
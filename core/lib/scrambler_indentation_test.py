@@ -0,0 +1,50 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_indentation import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class IndentationTreeTestCase(unittest.TestCase):
+
+  def test_indentation(self):
+    tree = IndentationTree("a\n  b\n \n\tc")
+    self.assertEqual(tree.indentation, [0, 2, -1, 1])
+
+  def test_scope(self):
+    tree = IndentationTree("\na\n  b\n\n  c\nd")
+    self.assertEqual(tree.scope(0), -1)
+    self.assertEqual(tree.block_lines(tree.scope(1)), (1, 5))
+    self.assertEqual(tree.block_lines(tree.scope(2)), (2, 4))
+    self.assertEqual(tree.scope(3), tree.scope(2))
+    self.assertEqual(tree.scope(4), tree.scope(2))
+    self.assertEqual(tree.level(tree.scope(4)), 2)
+
+  def test_parent(self):
+    tree = IndentationTree("a\n  b\n    c")
+    scope = tree.scope(2)
+    self.assertEqual(tree.parent(scope), tree.scope(1))
+    self.assertEqual(tree.parent(tree.parent(scope)), tree.scope(0))
+    self.assertEqual(tree.parent(tree.scope(0)), -1)
+
+  def test_sibling(self):
+    tree = IndentationTree("a\n  b\nc\n  d\ne\n  f")
+    first = tree.scope(1)
+    self.assertEqual(tree.sibling(first, 1), tree.scope(3))
+    self.assertEqual(tree.sibling(first, 2), tree.scope(5))
+    self.assertEqual(tree.sibling(first, 3), -1)
+    self.assertEqual(tree.sibling(tree.scope(5), -2), first)
+    self.assertEqual(tree.sibling(first, -1), -1)
+    self.assertEqual(tree.sibling(tree.scope(0), 1), -1)
+
+  def test_uneven_dedent(self):
+    # The block at the level of "c" starts at "b", which is indented further.
+    tree = IndentationTree("a\n    b\n  c\n    d")
+    scope = tree.scope(2)
+    self.assertEqual(tree.block_lines(scope), (1, 3))
+    self.assertEqual(tree.parent(tree.scope(1)), scope)
+    self.assertEqual(tree.sibling(tree.scope(1), 1), tree.scope(3))
+    self.assertEqual(tree.parent(scope), tree.scope(0))
+
+  def test_empty(self):
+    tree = IndentationTree("")
+    self.assertEqual(tree.indentation, [-1])
+    self.assertEqual(tree.scope(0), -1)
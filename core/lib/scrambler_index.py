@@ -0,0 +1,328 @@
+"""Precomputed index over Scrambler context text. Allows modifiers to look up lines, tokens and
+whitespace with a binary search instead of walking the text one character at a time."""
+
+import bisect
+import re
+from typing import Optional
+from .scrambler_brackets import BracketTable
+from .scrambler_indentation import IndentationTree
+from .scrambler_lexer import SUPPORTED_LANGUAGES, ScramblerLexer
+from .scrambler_types import TextRange, unchecked_text_range
+
+# Must match the token definition used by modifiers. Note: \w includes underscores.
+_REGEX_TOKEN: re.Pattern = re.compile(r"\w+", re.IGNORECASE)
+
+# Whitespace characters that delimit text for the between whitespace modifier.
+_REGEX_WHITESPACE: re.Pattern = re.compile(r"[ \t\n]+")
+
+# Characters that end sentences and clauses. A period followed by a token character is part of a
+# number, a file name or an abbreviation like "e.g", so it does not end a sentence.
+_REGEX_CLAUSE_END: re.Pattern = re.compile(r"[!?\n,():;]|\.(?!\w)")
+_SENTENCE_END_CHARACTERS = ".!?\n"
+
+# Abbreviations whose final period does not end a sentence: initialisms like "e.g." or "U.S." and
+# common titles. Matched against the text before the period.
+_REGEX_ABBREVIATION: re.Pattern = re.compile(
+    r"(?<![\w.])(?:(?:[a-z]\.)+[a-z]|mrs?|ms|dr|prof|st|vs|cf)\Z", re.IGNORECASE)
+# Length of the text before a period that is checked for abbreviations.
+_MAX_ABBREVIATION_LENGTH = 16
+
+# Maximum number of indexes to keep in the cache used by `get_text_index`.
+_MAX_CACHED_INDEXES = 4
+
+
+class ScramblerTextIndex:
+  """Lookup tables for a single piece of text. Each table is built on first use, so creating an
+  index is cheap and text that is only searched with regexes never pays for tokenization. The text
+  must not change after the index is created."""
+
+  def __init__(self, text: str, language: str = ""):
+    self.text = text
+    self.language = language
+    self._line_starts: Optional[list[int]] = None
+    self._token_starts: Optional[list[int]] = None
+    self._token_ends: Optional[list[int]] = None
+    self._whitespace_starts: Optional[list[int]] = None
+    self._whitespace_ends: Optional[list[int]] = None
+    self._sentence_ends: Optional[list[int]] = None
+    self._clause_ends: Optional[list[int]] = None
+    self._char_set_regexes: dict[str, re.Pattern] = {}
+    self._bracket_table: Optional[BracketTable] = None
+    self._indentation_tree: Optional[IndentationTree] = None
+    self._lexer: Optional[ScramblerLexer] = None
+
+  def __len__(self) -> int:
+    return len(self.text)
+
+  @property
+  def line_starts(self) -> list[int]:
+    """Offsets of the first character of every line. The first line always starts at zero."""
+    if self._line_starts is None:
+      starts = [0]
+      offset = 0
+      for line in self.text.split("\n")[:-1]:
+        offset += len(line) + 1
+        starts.append(offset)
+      self._line_starts = starts
+    return self._line_starts
+
+  def _build_tokens(self):
+    """Builds the token span tables."""
+    starts = []
+    ends = []
+    for match in _REGEX_TOKEN.finditer(self.text):
+      starts.append(match.start())
+      ends.append(match.end())
+    self._token_starts = starts
+    self._token_ends = ends
+
+  @property
+  def token_starts(self) -> list[int]:
+    """Start offsets of all tokens, in order."""
+    if self._token_starts is None:
+      self._build_tokens()
+    assert self._token_starts is not None
+    return self._token_starts
+
+  @property
+  def token_ends(self) -> list[int]:
+    """End offsets of all tokens, in order."""
+    if self._token_ends is None:
+      self._build_tokens()
+    assert self._token_ends is not None
+    return self._token_ends
+
+  def _build_whitespace(self):
+    """Builds the whitespace run tables."""
+    starts = []
+    ends = []
+    for match in _REGEX_WHITESPACE.finditer(self.text):
+      starts.append(match.start())
+      ends.append(match.end())
+    self._whitespace_starts = starts
+    self._whitespace_ends = ends
+
+  @property
+  def whitespace_starts(self) -> list[int]:
+    """Start offsets of all runs of whitespace, in order."""
+    if self._whitespace_starts is None:
+      self._build_whitespace()
+    assert self._whitespace_starts is not None
+    return self._whitespace_starts
+
+  @property
+  def whitespace_ends(self) -> list[int]:
+    """End offsets of all runs of whitespace, in order."""
+    if self._whitespace_ends is None:
+      self._build_whitespace()
+    assert self._whitespace_ends is not None
+    return self._whitespace_ends
+
+  def _build_sentences(self):
+    """Builds the sentence and clause end tables in one pass. Every sentence end is also a clause
+    end."""
+    text = self.text
+    sentence_ends = []
+    clause_ends = []
+    for match in _REGEX_CLAUSE_END.finditer(text):
+      i = match.start()
+      character = text[i]
+      if character == "." and _REGEX_ABBREVIATION.search(text, max(i - _MAX_ABBREVIATION_LENGTH, 0),
+                                                         i) is not None:
+        continue
+      clause_ends.append(i)
+      if character in _SENTENCE_END_CHARACTERS:
+        sentence_ends.append(i)
+    self._sentence_ends = sentence_ends
+    self._clause_ends = clause_ends
+
+  @property
+  def sentence_ends(self) -> list[int]:
+    """Offsets of the characters that end sentences, in order: periods, exclamation marks, question
+    marks and line breaks. Periods in abbreviations and numbers are not included."""
+    if self._sentence_ends is None:
+      self._build_sentences()
+    assert self._sentence_ends is not None
+    return self._sentence_ends
+
+  @property
+  def clause_ends(self) -> list[int]:
+    """Offsets of the characters that end clauses, in order: sentence ends, commas, colons,
+    semicolons and parentheses."""
+    if self._clause_ends is None:
+      self._build_sentences()
+    assert self._clause_ends is not None
+    return self._clause_ends
+
+  @property
+  def bracket_table(self) -> BracketTable:
+    """Bracket pairs and argument delimiters, ignoring strings and comments. Uses the lexer to find
+    strings and comments if the language is supported."""
+    if self._bracket_table is None:
+      lexer = self.lexer
+      if lexer is None:
+        self._bracket_table = BracketTable(self.text)
+      else:
+        self._bracket_table = BracketTable(self.text, [span.text_range for span in lexer.spans()])
+    return self._bracket_table
+
+  @property
+  def indentation_tree(self) -> IndentationTree:
+    """Indentation of every line and the blocks it forms."""
+    if self._indentation_tree is None:
+      self._indentation_tree = IndentationTree(self.text)
+    return self._indentation_tree
+
+  @property
+  def lexer(self) -> Optional[ScramblerLexer]:
+    """Strings and comments in the text. None if the language is unknown or not supported."""
+    if self._lexer is None and self.language in SUPPORTED_LANGUAGES:
+      self._lexer = ScramblerLexer(self.text, self.language)
+    return self._lexer
+
+  def line_number(self, index: int) -> int:
+    """Gets the zero-based number of the line containing the given index. A line break belongs to
+    the line it terminates."""
+    if index < 0 or index > len(self.text):
+      raise ValueError(f"Index outside of text: {index}")
+    return bisect.bisect_right(self.line_starts, index) - 1
+
+  def line_range_by_number(self, line_number: int, include_trailing_line_break: bool) -> TextRange:
+    """Gets the range of the given line."""
+    line_starts = self.line_starts
+    start = line_starts[line_number]
+    if line_number + 1 < len(line_starts):
+      end = line_starts[line_number + 1]
+      if not include_trailing_line_break:
+        end -= 1
+    else:
+      end = len(self.text)
+    return TextRange(start, end)
+
+  def line_range(self, index: int, include_trailing_line_break: bool) -> TextRange:
+    """Gets the range of the line containing the given index."""
+    return self.line_range_by_number(self.line_number(index), include_trailing_line_break)
+
+  def token_after(self, index: int, count: int = 1) -> Optional[TextRange]:
+    """Gets the first token at or after the given index. If the index is inside a token, only the
+    part of the token after the index is included. A count greater than one skips tokens, giving the
+    same result as repeatedly getting the token after the previous result."""
+    i = bisect.bisect_right(self.token_ends, index) + count - 1
+    if i >= len(self.token_ends):
+      return None
+    if count > 1:
+      return unchecked_text_range(self.token_starts[i], self.token_ends[i])
+    return unchecked_text_range(max(self.token_starts[i], index), self.token_ends[i])
+
+  def token_before(self, index: int, count: int = 1) -> Optional[TextRange]:
+    """Gets the last token before the given index. If the index is inside a token, only the part of
+    the token before the index is included. A count greater than one skips tokens, giving the same
+    result as repeatedly getting the token before the previous result."""
+    i = bisect.bisect_left(self.token_starts, index) - count
+    if i < 0:
+      return None
+    if count > 1:
+      return unchecked_text_range(self.token_starts[i], self.token_ends[i])
+    return unchecked_text_range(self.token_starts[i], min(self.token_ends[i], index))
+
+  def whitespace_before(self, index: int) -> int:
+    """Gets the index after the last whitespace character before the given index. Zero if there is
+    no whitespace before the index."""
+    i = bisect.bisect_left(self.whitespace_starts, index) - 1
+    if i < 0:
+      return 0
+    return min(self.whitespace_ends[i], index)
+
+  def whitespace_after(self, index: int) -> int:
+    """Gets the index of the first whitespace character at or after the given index. The length of
+    the text if there is no whitespace after the index."""
+    i = bisect.bisect_right(self.whitespace_ends, index)
+    if i == len(self.whitespace_ends):
+      return len(self.text)
+    return max(self.whitespace_starts[i], index)
+
+  def skip_whitespace(self, index: int) -> int:
+    """Gets the index of the first character at or after the given index that is not whitespace.
+    The length of the text if there is none."""
+    i = bisect.bisect_right(self.whitespace_ends, index)
+    if i < len(self.whitespace_ends) and self.whitespace_starts[i] <= index:
+      return self.whitespace_ends[i]
+    return index
+
+  def next_sentence_end(self, index: int) -> int:
+    """Gets the index of the first sentence end at or after the given index. Returns -1 if there is
+    none."""
+    return _find_next_in_table(self.sentence_ends, index)
+
+  def previous_sentence_end(self, index: int) -> int:
+    """Gets the index of the last sentence end before the given index. Returns -1 if there is
+    none."""
+    return _find_previous_in_table(self.sentence_ends, index)
+
+  def is_sentence_end(self, index: int) -> bool:
+    """Whether the character at the given index ends a sentence."""
+    return self.next_sentence_end(index) == index
+
+  def next_clause_end(self, index: int) -> int:
+    """Gets the index of the first clause end at or after the given index. Returns -1 if there is
+    none."""
+    return _find_next_in_table(self.clause_ends, index)
+
+  def previous_clause_end(self, index: int) -> int:
+    """Gets the index of the last clause end before the given index. Returns -1 if there is none."""
+    return _find_previous_in_table(self.clause_ends, index)
+
+  def find_next(self, index: int, characters: str) -> int:
+    """Gets the index of the first instance of any of the given characters at or after the given
+    index. Returns -1 if there is none."""
+    regex = self._char_set_regexes.get(characters)
+    if regex is None:
+      regex = re.compile(f"[{re.escape(characters)}]")
+      self._char_set_regexes[characters] = regex
+    match = regex.search(self.text, index)
+    return -1 if match is None else match.start()
+
+  def find_previous(self, index: int, characters: str) -> int:
+    """Gets the index of the last instance of any of the given characters before the given index.
+    Returns -1 if there is none."""
+    return max(self.text.rfind(c, 0, max(index, 0)) for c in characters)
+
+
+def _find_next_in_table(table: list[int], index: int) -> int:
+  """Gets the first offset in a sorted table at or after the given index, or -1."""
+  i = bisect.bisect_left(table, index)
+  return table[i] if i < len(table) else -1
+
+
+def _find_previous_in_table(table: list[int], index: int) -> int:
+  """Gets the last offset in a sorted table before the given index, or -1."""
+  i = bisect.bisect_left(table, index)
+  return table[i - 1] if i > 0 else -1
+
+
+_cached_indexes: dict[tuple[str, str], ScramblerTextIndex] = {}
+
+
+def get_text_index(text: str, language: str = "") -> ScramblerTextIndex:
+  """Gets an index for the given text, reusing a recent index for identical text. Consecutive
+  modifiers and commands in the same context share an index this way. When the text has changed, the
+  lexer of the most recent index in the same language is updated instead of lexing from scratch."""
+  key = (text, language)
+  index = _cached_indexes.get(key)
+  if index is not None:
+    return index
+  index = ScramblerTextIndex(text, language)
+  for previous in reversed(_cached_indexes.values()):
+    if previous.language == language and previous._lexer is not None:  # pylint: disable=protected-access
+      index._lexer = previous._lexer.update(text)  # pylint: disable=protected-access
+      break
+  if len(_cached_indexes) >= _MAX_CACHED_INDEXES:
+    # Dicts preserve insertion order, so this evicts the oldest index.
+    del _cached_indexes[next(iter(_cached_indexes))]
+  _cached_indexes[key] = index
+  return index
+
+
+def clear_text_index_cache():
+  """Drops all cached indexes, e.g. to measure the cost of building them."""
+  _cached_indexes.clear()
@@ -0,0 +1,159 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_index import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class LineTestCase(unittest.TestCase):
+
+  def test_line_starts(self):
+    self.assertEqual(ScramblerTextIndex("").line_starts, [0])
+    self.assertEqual(ScramblerTextIndex("abc").line_starts, [0])
+    self.assertEqual(ScramblerTextIndex("abc\n").line_starts, [0, 4])
+    self.assertEqual(ScramblerTextIndex("a\n\nbc\nd").line_starts, [0, 2, 3, 6])
+
+  def test_line_range(self):
+    index = ScramblerTextIndex("ab\ncd\n\nef")
+    self.assertEqual(index.line_range(0, include_trailing_line_break=True), TextRange(0, 3))
+    self.assertEqual(index.line_range(2, include_trailing_line_break=True), TextRange(0, 3))
+    self.assertEqual(index.line_range(2, include_trailing_line_break=False), TextRange(0, 2))
+    self.assertEqual(index.line_range(3, include_trailing_line_break=False), TextRange(3, 5))
+    self.assertEqual(index.line_range(6, include_trailing_line_break=True), TextRange(6, 7))
+    self.assertEqual(index.line_range(6, include_trailing_line_break=False), TextRange(6, 6))
+    self.assertEqual(index.line_range(9, include_trailing_line_break=True), TextRange(7, 9))
+
+  def test_line_range_trailing_line_break(self):
+    index = ScramblerTextIndex("ab\n")
+    self.assertEqual(index.line_range(3, include_trailing_line_break=True), TextRange(3, 3))
+
+  def test_line_number(self):
+    index = ScramblerTextIndex("ab\ncd")
+    self.assertEqual(index.line_number(0), 0)
+    self.assertEqual(index.line_number(2), 0)
+    self.assertEqual(index.line_number(3), 1)
+    self.assertEqual(index.line_number(5), 1)
+
+  def test_invalid_index(self):
+    index = ScramblerTextIndex("ab\ncd")
+    with self.assertRaises(ValueError):
+      index.line_number(-1)
+    with self.assertRaises(ValueError):
+      index.line_range(6, include_trailing_line_break=True)
+
+
+class TokenTestCase(unittest.TestCase):
+
+  def test_token_after(self):
+    index = ScramblerTextIndex("This is_a, test")
+    self.assertEqual(index.token_after(0), TextRange(0, 4))
+    self.assertEqual(index.token_after(2), TextRange(2, 4))
+    self.assertEqual(index.token_after(4), TextRange(5, 9))
+    self.assertEqual(index.token_after(9), TextRange(11, 15))
+    self.assertIsNone(index.token_after(15))
+
+  def test_token_before(self):
+    index = ScramblerTextIndex("This is_a, test")
+    self.assertIsNone(index.token_before(0))
+    self.assertEqual(index.token_before(2), TextRange(0, 2))
+    self.assertEqual(index.token_before(5), TextRange(0, 4))
+    self.assertEqual(index.token_before(11), TextRange(5, 9))
+    self.assertEqual(index.token_before(15), TextRange(11, 15))
+
+  def test_token_count(self):
+    index = ScramblerTextIndex("This is_a, test")
+    self.assertEqual(index.token_after(2, 2), TextRange(5, 9))
+    self.assertEqual(index.token_after(0, 3), TextRange(11, 15))
+    self.assertIsNone(index.token_after(0, 4))
+    self.assertEqual(index.token_before(13, 2), TextRange(5, 9))
+    self.assertEqual(index.token_before(15, 3), TextRange(0, 4))
+    self.assertIsNone(index.token_before(15, 4))
+
+  def test_no_tokens(self):
+    index = ScramblerTextIndex(" , ")
+    self.assertIsNone(index.token_after(0))
+    self.assertIsNone(index.token_before(3))
+
+
+class WhitespaceTestCase(unittest.TestCase):
+
+  def test_whitespace_before(self):
+    index = ScramblerTextIndex("ab  cd\tef")
+    self.assertEqual(index.whitespace_before(0), 0)
+    self.assertEqual(index.whitespace_before(2), 0)
+    self.assertEqual(index.whitespace_before(3), 3)
+    self.assertEqual(index.whitespace_before(5), 4)
+    self.assertEqual(index.whitespace_before(9), 7)
+
+  def test_whitespace_after(self):
+    index = ScramblerTextIndex("ab  cd\tef")
+    self.assertEqual(index.whitespace_after(0), 2)
+    self.assertEqual(index.whitespace_after(3), 3)
+    self.assertEqual(index.whitespace_after(4), 6)
+    self.assertEqual(index.whitespace_after(7), 9)
+
+  def test_skip_whitespace(self):
+    index = ScramblerTextIndex("ab  cd\t\n")
+    self.assertEqual(index.skip_whitespace(0), 0)
+    self.assertEqual(index.skip_whitespace(2), 4)
+    self.assertEqual(index.skip_whitespace(3), 4)
+    self.assertEqual(index.skip_whitespace(6), 8)
+    self.assertEqual(index.skip_whitespace(8), 8)
+
+
+class SentenceTestCase(unittest.TestCase):
+
+  def test_sentence_ends(self):
+    index = ScramblerTextIndex("One. Two!\nThree? Four, five; six (seven): eight")
+    self.assertEqual(index.sentence_ends, [3, 8, 9, 15])
+    self.assertEqual(index.clause_ends, [3, 8, 9, 15, 21, 27, 33, 39, 40])
+
+  def test_abbreviations(self):
+    text = "Use e.g. this, i.e. that. Ask Dr. Smith in the U.S. about v1.2 at example.com. Done"
+    index = ScramblerTextIndex(text)
+    self.assertEqual(index.sentence_ends, [24, 77])
+    self.assertEqual([text[i] for i in index.clause_ends], [",", ".", "."])
+
+  def test_abbreviation_inside_word(self):
+    # Only whole words are abbreviations.
+    index = ScramblerTextIndex("Ask the editor. Then stop.")
+    self.assertEqual(index.sentence_ends, [14, 25])
+
+  def test_lookups(self):
+    index = ScramblerTextIndex("a. b, c. d")
+    self.assertEqual(index.next_sentence_end(0), 1)
+    self.assertEqual(index.next_sentence_end(2), 7)
+    self.assertEqual(index.next_sentence_end(8), -1)
+    self.assertEqual(index.previous_sentence_end(7), 1)
+    self.assertEqual(index.previous_sentence_end(8), 7)
+    self.assertEqual(index.previous_sentence_end(1), -1)
+    self.assertTrue(index.is_sentence_end(7))
+    self.assertFalse(index.is_sentence_end(4))
+    self.assertEqual(index.next_clause_end(2), 4)
+    self.assertEqual(index.previous_clause_end(7), 4)
+
+
+class FindTestCase(unittest.TestCase):
+
+  def test_find_next(self):
+    index = ScramblerTextIndex("a.b!c")
+    self.assertEqual(index.find_next(0, ".!"), 1)
+    self.assertEqual(index.find_next(1, ".!"), 1)
+    self.assertEqual(index.find_next(2, ".!"), 3)
+    self.assertEqual(index.find_next(4, ".!"), -1)
+    self.assertEqual(index.find_next(0, "]"), -1)
+
+  def test_find_previous(self):
+    index = ScramblerTextIndex("a.b!c")
+    self.assertEqual(index.find_previous(5, ".!"), 3)
+    self.assertEqual(index.find_previous(3, ".!"), 1)
+    self.assertEqual(index.find_previous(1, ".!"), -1)
+    self.assertEqual(index.find_previous(0, ".!"), -1)
+
+
+class GetTextIndexTestCase(unittest.TestCase):
+
+  def test_reuses_index(self):
+    text = "This is a test"
+    index = get_text_index(text)
+    self.assertIs(get_text_index(text), index)
+    self.assertIs(get_text_index("This is a " + "test"), index)
+    self.assertIsNot(get_text_index("Another test"), index)
@@ -0,0 +1,227 @@
+"""Lexer that finds string literals and comments in source code. Lets Scrambler modifiers look up the
+string or comment around the cursor instead of scanning for delimiter characters, which is fooled by
+escaped quotes and by delimiters inside comments."""
+
+import bisect
+from dataclasses import dataclass
+from enum import Enum, unique
+import re
+from typing import Optional, Sequence
+from .scrambler_types import TextRange, unchecked_text_range
+
+
+@unique
+class SpanKind(Enum):
+  """Kinds of spans found by the lexer. Text outside of all spans is code."""
+  STRING = 1
+  COMMENT = 2
+
+
+@dataclass(frozen=True)
+class LexedSpan:
+  """A string literal or comment."""
+  kind: SpanKind
+  # The full span, including delimiters and prefixes such as `f"` or `@"`.
+  text_range: TextRange
+  # The span without its delimiters. For comments, this is the same as `text_range`.
+  content_range: TextRange
+
+
+# Rules for each language, in order of priority. Each rule has `open` and `close` groups for the
+# delimiters around the content. Unterminated strings end at the end of the line, or at the end of
+# the text for multiline strings.
+_C_LINE_COMMENT = (SpanKind.COMMENT, r"(?P<open>)//[^\n]*(?P<close>)")
+_C_BLOCK_COMMENT = (SpanKind.COMMENT, r"(?P<open>)/\*[\s\S]*?(?:\*/|\Z)(?P<close>)")
+_DOUBLE_QUOTED_STRING = (SpanKind.STRING, r"(?P<open>\")(?:\\[\s\S]|[^\"\\\n])*(?P<close>\"?)")
+_SINGLE_QUOTED_STRING = (SpanKind.STRING, r"(?P<open>')(?:\\[\s\S]|[^'\\\n])*(?P<close>'?)")
+_PYTHON_STRING_PREFIX = r"(?:(?<!\w)[rRbBuUfF]{1,2})?"
+
+_RULES_BY_LANGUAGE: dict[str, list[tuple[SpanKind, str]]] = {
+    "cpp": [
+        _C_LINE_COMMENT,
+        _C_BLOCK_COMMENT,
+        (SpanKind.STRING, r"(?P<open>(?<!\w)(?:u8|u|U|L)?R\"(?P<raw_delimiter>[^()\\\s\"]{0,16})\()"
+         r"[\s\S]*?(?P<close>\)(?P=raw_delimiter)\"|\Z)"),
+        (SpanKind.STRING,
+         r"(?P<open>(?:(?<!\w)(?:u8|u|U|L))?\")(?:\\[\s\S]|[^\"\\\n])*(?P<close>\"?)"),
+        # Ignore digit separators, e.g. 1'000'000.
+        (SpanKind.STRING, r"(?P<open>(?:(?<!\w)(?:u8|u|U|L)|(?<!\w))')(?:\\[\s\S]|[^'\\\n])*"
+         r"(?P<close>'?)"),
+    ],
+    "csharp": [
+        _C_LINE_COMMENT,
+        _C_BLOCK_COMMENT,
+        (SpanKind.STRING, r"(?P<open>\$*\"\"\")[\s\S]*?(?P<close>\"\"\"|\Z)"),
+        (SpanKind.STRING, r"(?P<open>(?:\$@|@\$?)\")(?:\"\"|[^\"])*(?P<close>\"?)"),
+        (SpanKind.STRING, r"(?P<open>\$?\")(?:\\[\s\S]|[^\"\\\n])*(?P<close>\"?)"),
+        _SINGLE_QUOTED_STRING,
+    ],
+    "markdown": [
+        (SpanKind.COMMENT, r"(?P<open>)<!--[\s\S]*?(?:-->|\Z)(?P<close>)"),
+        (SpanKind.STRING, r"(?P<open>```[^\n]*\n?)[\s\S]*?(?P<close>```|\Z)"),
+        # Inline code may span lines, but not paragraphs.
+        (SpanKind.STRING, r"(?P<open>`)(?:[^`\n]|\n(?!\n))*(?P<close>`?)"),
+    ],
+    "protobuf": [
+        _C_LINE_COMMENT,
+        _C_BLOCK_COMMENT,
+        _DOUBLE_QUOTED_STRING,
+        _SINGLE_QUOTED_STRING,
+    ],
+    "python": [
+        (SpanKind.COMMENT, r"(?P<open>)#[^\n]*(?P<close>)"),
+        (SpanKind.STRING, rf"(?P<open>{_PYTHON_STRING_PREFIX}\"\"\")(?:\\[\s\S]|[^\\])*?"
+         r"(?P<close>\"\"\"|\\?\Z)"),
+        (SpanKind.STRING, rf"(?P<open>{_PYTHON_STRING_PREFIX}''')(?:\\[\s\S]|[^\\])*?"
+         r"(?P<close>'''|\\?\Z)"),
+        (SpanKind.STRING,
+         rf"(?P<open>{_PYTHON_STRING_PREFIX}\")(?:\\[\s\S]|[^\"\\\n])*(?P<close>\"?)"),
+        (SpanKind.STRING,
+         rf"(?P<open>{_PYTHON_STRING_PREFIX}')(?:\\[\s\S]|[^'\\\n])*(?P<close>'?)"),
+    ],
+    "talon": [
+        # Comments must follow whitespace, as `#` is also used in key names.
+        (SpanKind.COMMENT, r"(?P<open>)(?<!\S)#[^\n]*(?P<close>)"),
+        _DOUBLE_QUOTED_STRING,
+        _SINGLE_QUOTED_STRING,
+    ],
+    "typescript": [
+        _C_LINE_COMMENT,
+        _C_BLOCK_COMMENT,
+        _DOUBLE_QUOTED_STRING,
+        _SINGLE_QUOTED_STRING,
+        (SpanKind.STRING, r"(?P<open>`)(?:\\[\s\S]|[^`\\])*(?P<close>`?)"),
+    ],
+}
+
+SUPPORTED_LANGUAGES = frozenset(_RULES_BY_LANGUAGE)
+
+
+class _LanguageRules:
+  """Compiled rules for a language. Spans are found with a single regex that combines all rules,
+  then matched again with the individual rule to get its delimiters."""
+
+  def __init__(self, rules: list[tuple[SpanKind, str]]):
+    self.kinds = [kind for kind, _ in rules]
+    self.regexes = [re.compile(regex) for _, regex in rules]
+    alternatives = []
+    for i, (_, regex) in enumerate(rules):
+      unnamed = regex.replace("(?P<open>", "(?:").replace("(?P<close>", "(?:")
+      alternatives.append(f"(?P<rule{i}>{unnamed})")
+    self.combined_regex = re.compile("|".join(alternatives))
+
+
+_compiled_rules: dict[str, _LanguageRules] = {}
+
+
+def _get_rules(language: str) -> _LanguageRules:
+  rules = _compiled_rules.get(language)
+  if rules is None:
+    rules = _LanguageRules(_RULES_BY_LANGUAGE[language])
+    _compiled_rules[language] = rules
+  return rules
+
+
+class ScramblerLexer:
+  """Lazily lexes text in the given language. Spans are only found as far into the text as needed
+  to answer a query, and `update` reuses spans before the first change to the text."""
+
+  def __init__(self, text: str, language: str, known_spans: Sequence[LexedSpan] = ()):
+    if language not in SUPPORTED_LANGUAGES:
+      raise ValueError(f"Unsupported language: {language}")
+    self.text = text
+    self.language = language
+    self._rules = _get_rules(language)
+    # Spans found so far, in order. Starts with `known_spans`, the first spans of the text if they
+    # are already known.
+    self._spans: list[LexedSpan] = list(known_spans)
+    self._span_starts: list[int] = [span.text_range.start for span in self._spans]
+    # Position to continue lexing from. No spans start between the last span and this position.
+    self._lexed_to = self._spans[-1].text_range.end if self._spans else 0
+
+  def update(self, text: str) -> "ScramblerLexer":
+    """Gets a lexer for a new version of the text, reusing spans that end before the first changed
+    character."""
+    changed_index = 0
+    max_common_length = min(len(text), len(self.text))
+    # Compare in chunks, so long unchanged prefixes are compared in native code.
+    chunk = 4096
+    while changed_index < max_common_length and text[changed_index:changed_index + chunk] == \
+        self.text[changed_index:changed_index + chunk]:
+      changed_index += chunk
+    changed_index = min(changed_index, max_common_length)
+    while changed_index < max_common_length and text[changed_index] == self.text[changed_index]:
+      changed_index += 1
+
+    # Reuse spans that end before the change. Text right after a span may extend it, e.g. a line
+    # comment, or an escape sequence after a trailing backslash in an unterminated string.
+    kept = bisect.bisect_left(self._span_starts, changed_index)
+    while kept > 0 and self._spans[kept - 1].text_range.end + 1 >= changed_index:
+      kept -= 1
+    return ScramblerLexer(text, self.language, self._spans[:kept])
+
+  def _lex_next(self) -> bool:
+    """Finds the next span. Returns false if there are no more spans."""
+    if self._lexed_to > len(self.text):
+      return False
+    match = self._rules.combined_regex.search(self.text, self._lexed_to)
+    if match is None:
+      self._lexed_to = len(self.text) + 1
+      return False
+
+    assert match.lastgroup is not None
+    rule_index = int(match.lastgroup[len("rule"):])
+    rule_match = self._rules.regexes[rule_index].match(self.text, match.start())
+    assert rule_match is not None
+    kind = self._rules.kinds[rule_index]
+    text_range = unchecked_text_range(rule_match.start(), rule_match.end())
+    content_range = text_range
+    if kind == SpanKind.STRING:
+      content_range = unchecked_text_range(rule_match.end("open"), rule_match.start("close"))
+    self._spans.append(LexedSpan(kind, text_range, content_range))
+    self._span_starts.append(text_range.start)
+    # Spans are never empty, so lexing always makes progress.
+    self._lexed_to = text_range.end
+    return True
+
+  def _lex_past(self, index: int):
+    """Lexes until all spans starting at or before the given index are known."""
+    while self._lexed_to <= index and self._lex_next():
+      pass
+
+  def spans(self) -> list[LexedSpan]:
+    """Gets all spans in the text, in order."""
+    self._lex_past(len(self.text))
+    return self._spans
+
+  def span_at(self, index: int) -> Optional[LexedSpan]:
+    """Gets the span containing the given index. A span contains both of its ends, so the cursor is
+    inside a string when it is next to either quote."""
+    self._lex_past(index)
+    i = bisect.bisect_right(self._span_starts, index) - 1
+    if i < 0 or self._spans[i].text_range.end < index:
+      return None
+    return self._spans[i]
+
+  def next_span(self, index: int, kind: SpanKind) -> Optional[LexedSpan]:
+    """Gets the first span of the given kind starting at or after the given index."""
+    self._lex_past(index)
+    i = bisect.bisect_left(self._span_starts, index)
+    while True:
+      while i >= len(self._spans):
+        if not self._lex_next():
+          return None
+      if self._spans[i].kind == kind:
+        return self._spans[i]
+      i += 1
+
+  def previous_span(self, index: int, kind: SpanKind) -> Optional[LexedSpan]:
+    """Gets the last span of the given kind ending at or before the given index."""
+    self._lex_past(index)
+    i = bisect.bisect_right(self._span_starts, index) - 1
+    while i >= 0:
+      span = self._spans[i]
+      if span.kind == kind and span.text_range.end <= index:
+        return span
+      i -= 1
+    return None
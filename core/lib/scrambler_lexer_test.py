@@ -0,0 +1,133 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_lexer import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+def _extract_spans(text: str, language: str) -> list[tuple[SpanKind, str, str]]:
+  return [(span.kind, span.text_range.extract(text), span.content_range.extract(text))
+          for span in ScramblerLexer(text, language).spans()]
+
+
+class PythonTestCase(unittest.TestCase):
+
+  def test_strings_and_comments(self):
+    text = "x = 'a' + \"b\"  # 'c'"
+    self.assertEqual(_extract_spans(text, "python"), [
+        (SpanKind.STRING, "'a'", "a"),
+        (SpanKind.STRING, "\"b\"", "b"),
+        (SpanKind.COMMENT, "# 'c'", "# 'c'"),
+    ])
+
+  def test_escaped_quote(self):
+    text = "s = \"a \\\" # b\""
+    self.assertEqual(_extract_spans(text, "python"), [(SpanKind.STRING, text[4:], "a \\\" # b")])
+
+  def test_prefixed_and_triple_quoted(self):
+    text = "f\"{x}\" + r'''a\n'b'\n'''"
+    self.assertEqual(_extract_spans(text, "python"), [
+        (SpanKind.STRING, "f\"{x}\"", "{x}"),
+        (SpanKind.STRING, "r'''a\n'b'\n'''", "a\n'b'\n"),
+    ])
+
+  def test_unterminated_string_ends_at_line_break(self):
+    text = "x = \"abc\ny = 'd'"
+    self.assertEqual(_extract_spans(text, "python"), [
+        (SpanKind.STRING, "\"abc", "abc"),
+        (SpanKind.STRING, "'d'", "d"),
+    ])
+
+
+class CppTestCase(unittest.TestCase):
+
+  def test_comments(self):
+    text = "a; // \"b\"\n/* 'c'\n */ d"
+    self.assertEqual(_extract_spans(text, "cpp"), [
+        (SpanKind.COMMENT, "// \"b\"", "// \"b\""),
+        (SpanKind.COMMENT, "/* 'c'\n */", "/* 'c'\n */"),
+    ])
+
+  def test_raw_string(self):
+    text = "R\"x(a \")\" b)x\";"
+    self.assertEqual(_extract_spans(text, "cpp"), [(SpanKind.STRING, text[:-1], "a \")\" b")])
+
+  def test_digit_separator_is_not_string(self):
+    text = "int x = 1'000'000; char c = 'c';"
+    self.assertEqual(_extract_spans(text, "cpp"), [(SpanKind.STRING, "'c'", "c")])
+
+
+class OtherLanguagesTestCase(unittest.TestCase):
+
+  def test_csharp_verbatim_string(self):
+    text = "@\"a\\\"\"b\" + $\"{c}\""
+    self.assertEqual(_extract_spans(text, "csharp"), [
+        (SpanKind.STRING, "@\"a\\\"\"b\"", "a\\\"\"b"),
+        (SpanKind.STRING, "$\"{c}\"", "{c}"),
+    ])
+
+  def test_typescript_template(self):
+    text = "`a\n${b}` // c"
+    self.assertEqual(_extract_spans(text, "typescript"), [
+        (SpanKind.STRING, "`a\n${b}`", "a\n${b}"),
+        (SpanKind.COMMENT, "// c", "// c"),
+    ])
+
+  def test_talon_comment(self):
+    text = "# a\nkey(ctrl-#): \"b # c\""
+    self.assertEqual(_extract_spans(text, "talon"), [
+        (SpanKind.COMMENT, "# a", "# a"),
+        (SpanKind.STRING, "\"b # c\"", "b # c"),
+    ])
+
+  def test_markdown(self):
+    text = "Use `x`.\n\n```py\ny\n```\n<!-- z -->"
+    self.assertEqual(_extract_spans(text, "markdown"), [
+        (SpanKind.STRING, "`x`", "x"),
+        (SpanKind.STRING, "```py\ny\n```", "y\n"),
+        (SpanKind.COMMENT, "<!-- z -->", "<!-- z -->"),
+    ])
+
+  def test_unsupported_language(self):
+    with self.assertRaises(ValueError):
+      ScramblerLexer("", "cobol")
+
+
+class QueryTestCase(unittest.TestCase):
+
+  def test_span_at(self):
+    text = "a 'b' c"
+    lexer = ScramblerLexer(text, "python")
+    self.assertIsNone(lexer.span_at(1))
+    span = lexer.span_at(3)
+    assert span is not None
+    self.assertEqual(span.text_range, TextRange(2, 5))
+    self.assertEqual(lexer.span_at(5), span)
+    self.assertIsNone(lexer.span_at(6))
+
+  def test_next_and_previous(self):
+    text = "'a' # b\n'c'"
+    lexer = ScramblerLexer(text, "python")
+    span = lexer.next_span(1, SpanKind.STRING)
+    assert span is not None
+    self.assertEqual(span.text_range, TextRange(8, 11))
+    span = lexer.previous_span(8, SpanKind.STRING)
+    assert span is not None
+    self.assertEqual(span.text_range, TextRange(0, 3))
+    self.assertIsNone(lexer.previous_span(2, SpanKind.STRING))
+    self.assertIsNone(lexer.next_span(9, SpanKind.COMMENT))
+
+  def test_lexes_lazily(self):
+    text = "'a'" + " 'b'" * 1000
+    lexer = ScramblerLexer(text, "python")
+    lexer.span_at(1)
+    self.assertLess(len(lexer._spans), 3)  # pylint: disable=protected-access
+
+  def test_update(self):
+    text = "'a' 'b' 'c'"
+    lexer = ScramblerLexer(text, "python")
+    lexer.spans()
+    updated = lexer.update("'a' 'b # 'c'")
+    self.assertEqual(
+        [span.text_range for span in updated.spans()],
+        [TextRange(0, 3), TextRange(4, 10), TextRange(11, 12)])
+    # Spans before the change are reused.
+    self.assertIs(updated.spans()[0], lexer.spans()[0])
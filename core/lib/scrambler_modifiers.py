@@ -2,18 +2,22 @@
 modification."""
 
 import re
-from typing import Callable, Optional, Sequence
-from .scrambler_types import Modifier, ModifierType, TextMatch, TextRange, UtilityFunctions
+from typing import Callable, Iterator, Optional, Sequence, Union
+from .regex_cache import get_search_regex
+from .scrambler_approximate import find_approximate_next, find_approximate_previous, get_error_budget
+from .scrambler_brackets import ARGUMENT_DELIMITERS, CLOSE_BRACKETS, OPEN_BRACKETS
+from .scrambler_index import ScramblerTextIndex, get_text_index
+from .scrambler_lexer import LexedSpan, SpanKind
+from .scrambler_phrase import (PhraseMatcher, get_expanded_phrase_regex, get_phrase_alternatives,
+                               get_phrase_tree_regex)
+from .scrambler_search import search_backward, search_closest
+from .scrambler_types import (Modifier, ModifierType, TextMatch, TextRange, UtilityFunctions,
+                              unchecked_text_range)
 
 # Regexes for matching a token. Note: \w includes underscores.
 _TOKEN_CHAR = r"\w"  # Determines which characters are allowed in a token.
 _NON_TOKEN_CHAR = r"[^\w]"
-_REGEX_TOKEN: re.Pattern = re.compile(_TOKEN_CHAR + r"+", re.IGNORECASE)
-
-_OPEN_BRACKETS = ["(", "[", "{", "<"]
-_CLOSE_BRACKETS = [")", "]", "}", ">"]
-_BRACKET_PAIRS = dict(zip(_OPEN_BRACKETS, _CLOSE_BRACKETS))
-_SENTENCE_DELIMITERS = [".", "!", "?", "\n"]
+_TOKEN_CHAR_REGEX = re.compile(_TOKEN_CHAR)
 
 
 def get_phrase_regex(words: Sequence[str], get_homophones: Callable[[str], list[str]]) -> str:
@@ -33,38 +37,55 @@ def get_phrase_regex(words: Sequence[str], get_homophones: Callable[[str], list[
   return r"[ .,\-\_\"]*".join(alts)
 
 
+def _is_token_char_at(text: str, index: int) -> bool:
+  """Whether there is a token character at the given index."""
+  return 0 <= index < len(text) and _TOKEN_CHAR_REGEX.match(text, index) is not None
+
+
+def _find_nth_match(regex: Union[re.Pattern, PhraseMatcher], text: str, start: int,
+                    n: int) -> Optional[re.Match]:
+  """Finds the nth match of a regex at or after the given index, with each search starting where the
+  previous match ended. Only for regexes without `^`, `\\b` or lookbehind, which behave differently
+  at `start` than when searching `text[start:]`. An empty match would be found again by every later
+  search, so it is returned as is."""
+  match = None
+  for _ in range(n):
+    match = regex.search(text, start)
+    if match is None or match.start() == match.end():
+      return match
+    start = match.end()
+  return match
+
+
 def _make_match(start: int, end: int) -> TextMatch:
   """Match a text match using a single range."""
   return TextMatch(TextRange(start, end))
 
 
-def _get_line_at_index(text: str, index: int, include_trailing_line_break: bool) -> TextRange:
-  """Get the line containing the given index."""
-  start_index = index
-  while start_index > 0 and text[start_index - 1] != "\n":
-    start_index -= 1
-  end_index = index
-  while end_index < len(text) and text[end_index] != "\n":
-    end_index += 1
-  if include_trailing_line_break and end_index < len(text) and text[end_index] == "\n":
-    end_index += 1
-  return TextRange(start_index, end_index)
+def _index_of_next_character(index: ScramblerTextIndex, start: int, characters: str) -> int:
+  """Given an index in some text, get the index of the next instance of any of the given characters.
+  Returns the end of the text if there are none."""
+  result = index.find_next(start, characters)
+  return max(start, len(index)) if result < 0 else result
 
 
-def _index_of_next_character(text: str, index: int, characters: list[str]):
-  """Given an index in some text, get the index after the next instance of any of the given
-  characters."""
-  while index < len(text) and text[index] not in characters:
-    index += 1
-  return index
+def _index_of_previous_character(index: ScramblerTextIndex, start: int, characters: str) -> int:
+  """Given an index in some text, get the index of the last instance of any of the given characters
+  at or before it. Returns zero if there are none."""
+  return max(index.find_previous(min(start + 1, len(index)), characters), 0)
 
 
-def _index_of_previous_character(text: str, index: int, characters: list[str]):
-  """Given an index in some text, get the index before the last instance of any of the given
-  characters."""
-  while index > 0 and (index == len(text) or text[index] not in characters):
-    index -= 1
-  return index
+def _index_of_next_bracket(index: ScramblerTextIndex, start: int, characters: str) -> int:
+  """Like `_index_of_next_character`, but only finds brackets and argument delimiters outside of
+  strings and comments."""
+  result = index.bracket_table.find_next(start, characters)
+  return max(start, len(index)) if result < 0 else result
+
+
+def _index_of_previous_bracket(index: ScramblerTextIndex, start: int, characters: str) -> int:
+  """Like `_index_of_previous_character`, but only finds brackets and argument delimiters outside of
+  strings and comments."""
+  return max(index.bracket_table.find_previous(min(start + 1, len(index)), characters), 0)
 
 
 def _maybe_add_token_deletion_range(text: str, start: int, end: int) -> TextMatch:
@@ -89,41 +110,60 @@ def _maybe_add_token_deletion_range(text: str, start: int, end: int) -> TextMatc
   return TextMatch(text_range=text_range)
 
 
-def _apply_token_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                               utilities: UtilityFunctions) -> TextMatch:
+def _apply_token_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                               modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Gets the next token after the input match."""
   del modifier, utilities
-  search_text = text[input_match.text_range.end:]
-  match = _REGEX_TOKEN.search(search_text)
-  if match is None:
+  token_range = index.token_after(input_match.text_range.end)
+  if token_range is None:
     raise ValueError(f"No token found after input match: {input_match}")
-  return _maybe_add_token_deletion_range(text, input_match.text_range.end + match.start(),
-                                         input_match.text_range.end + match.end())
+  return _maybe_add_token_deletion_range(index.text, token_range.start, token_range.end)
 
 
-def _apply_token_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                   utilities: UtilityFunctions) -> TextMatch:
+def _apply_token_next_modifier_repeated(index: ScramblerTextIndex, input_match: TextMatch,
+                                        modifier: Modifier,
+                                        utilities: UtilityFunctions) -> TextMatch:
+  """Gets the nth token after the input match, where n is the modifier's repeat count."""
+  del utilities
+  token_range = index.token_after(input_match.text_range.end, modifier.repeat)
+  if token_range is None:
+    raise ValueError(f"Fewer than {modifier.repeat} tokens after input match: {input_match}")
+  return _maybe_add_token_deletion_range(index.text, token_range.start, token_range.end)
+
+
+def _apply_token_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                   modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Gets the previous token before the input match."""
   del modifier, utilities
-  # Reverse the string for searching. The order of characters in a token is not important, so
-  # reversing them does not affect the match.
-  search_text = text[:input_match.text_range.start][::-1]
-  match = _REGEX_TOKEN.search(search_text)
-  if match is None:
+  token_range = index.token_before(input_match.text_range.start)
+  if token_range is None:
     raise ValueError(f"No token found before input match: {input_match}")
-  return _maybe_add_token_deletion_range(text, input_match.text_range.start - match.end(),
-                                         input_match.text_range.start - match.start())
+  return _maybe_add_token_deletion_range(index.text, token_range.start, token_range.end)
 
 
-def _get_word_start_token_match_after(search_text: str, search: str) -> Optional[TextRange]:
-  """Tries to find a token starting with the given substring."""
+def _apply_token_previous_modifier_repeated(index: ScramblerTextIndex, input_match: TextMatch,
+                                            modifier: Modifier,
+                                            utilities: UtilityFunctions) -> TextMatch:
+  """Gets the nth token before the input match, where n is the modifier's repeat count."""
+  del utilities
+  token_range = index.token_before(input_match.text_range.start, modifier.repeat)
+  if token_range is None:
+    raise ValueError(f"Fewer than {modifier.repeat} tokens before input match: {input_match}")
+  return _maybe_add_token_deletion_range(index.text, token_range.start, token_range.end)
+
+
+def _get_word_start_regex_after(search: str) -> str:
+  """Gets a regex for finding a token starting with the given substring."""
   # If the query begins with a non-token character, do not expand to full tokens.
   if len(search) > 0 and re.match(_NON_TOKEN_CHAR, search[0]):
-    word_start_regex_text = f"(^|{_NON_TOKEN_CHAR})({re.escape(search)})"
-  else:
-    word_start_regex_text = f"(^|{_NON_TOKEN_CHAR})({re.escape(search)}{_TOKEN_CHAR}*)"
+    return f"(^|{_NON_TOKEN_CHAR})({re.escape(search)})"
+  return f"(^|{_NON_TOKEN_CHAR})({re.escape(search)}{_TOKEN_CHAR}*)"
 
-  word_start_regex = re.compile(word_start_regex_text, re.IGNORECASE)
+
+def _get_word_start_token_match_after(search_text: str, search: str) -> Optional[TextRange]:
+  """Tries to find a token starting with the given substring."""
+  word_start_regex = get_search_regex(search, "word_start_after",
+                                      lambda: _get_word_start_regex_after(search))
   match = word_start_regex.search(search_text)
   if match is None:
     return None
@@ -131,71 +171,113 @@ def _get_word_start_token_match_after(search_text: str, search: str) -> Optional
   return TextRange(start, end)
 
 
-def _get_word_start_token_match_before(search_text: str, search: str) -> Optional[TextRange]:
-  """Tries to find a token starting with the given substring, searching reversed text."""
-  # Use a reversed search regex as the search text should also be reversed.
+def _get_word_start_regex_anchored(search: str) -> str:
+  """Gets a regex for a token starting with the given substring, to match at the index where a
+  search starts. Equivalent to the `^` branch of `_get_word_start_regex_after`."""
+  if len(search) > 0 and re.match(_NON_TOKEN_CHAR, search[0]):
+    return re.escape(search)
+  return f"{re.escape(search)}{_TOKEN_CHAR}*"
+
+
+def _get_word_start_regex_before(search: str) -> str:
+  """Gets a reversed regex for finding a token starting with the given substring in reversed
+  text."""
   # If the query begins with a non-token character, do not expand to full tokens.
   if len(search) > 0 and re.match(_NON_TOKEN_CHAR, search[0]):
-    word_start_regex_text = f"({re.escape(search[::-1])})($|{_NON_TOKEN_CHAR})"
-  else:
-    word_start_regex_text = f"({_TOKEN_CHAR}*{re.escape(search[::-1])})($|{_NON_TOKEN_CHAR})"
+    return f"({re.escape(search[::-1])})($|{_NON_TOKEN_CHAR})"
+  return f"({_TOKEN_CHAR}*{re.escape(search[::-1])})($|{_NON_TOKEN_CHAR})"
 
-  word_start_regex = re.compile(word_start_regex_text, re.IGNORECASE)
-  match = word_start_regex.search(search_text)
+
+def _get_word_start_token_match_before(text: str, end: int, search: str) -> Optional[TextRange]:
+  """Tries to find a token starting with the given substring before the given index. The result is
+  in reversed coordinates: offsets before `end`."""
+  word_start_regex = get_search_regex(search, "word_start_before",
+                                      lambda: _get_word_start_regex_before(search))
+  match = search_backward(text, end, word_start_regex, search)
   if match is None:
     return None
   start, end = match.span(1)
   return TextRange(start, end)
 
 
-def _get_substring_token_match(search_text: str, search: str) -> Optional[TextRange]:
-  """Tries to find a token containing the given substring."""
+def _get_substring_token_regex(search: str) -> str:
+  """Gets a regex for finding a token containing the given substring."""
   # If the query begins with a non-token character, do not expand to full tokens.
   if len(search) > 0 and re.match(_NON_TOKEN_CHAR, search[0]):
-    substring_regex_text = re.escape(search)
-  else:
-    substring_regex_text = f"{_TOKEN_CHAR}*{re.escape(search)}{_TOKEN_CHAR}*"
+    return re.escape(search)
+  return f"{_TOKEN_CHAR}*{re.escape(search)}{_TOKEN_CHAR}*"
 
-  substring_regex = re.compile(substring_regex_text, re.IGNORECASE)
-  match = substring_regex.search(search_text)
-  return None if match is None else TextRange(match.start(), match.end())
 
+def _get_substring_token_match(search_text: str, search: str) -> Optional[TextRange]:
+  """Tries to find a token containing the given substring."""
+  regex = get_search_regex(search, "substring", lambda: _get_substring_token_regex(search))
+  match = regex.search(search_text)
+  return None if match is None else unchecked_text_range(match.start(), match.end())
 
-def _apply_word_substring_closest_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+
+def _get_substring_token_match_before(text: str, end: int, search: str) -> Optional[TextRange]:
+  """Tries to find a token containing the given substring before the given index. The result is in
+  reversed coordinates: offsets before `end`."""
+  # The order of characters in a token is not important, so a reversed token regex will match.
+  regex = get_search_regex(search, "substring_reversed",
+                           lambda: _get_substring_token_regex(search[::-1]))
+  match = search_backward(text, end, regex, search)
+  return None if match is None else unchecked_text_range(match.start(), match.end())
+
+
+def _apply_word_substring_closest_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                           modifier: Modifier,
                                            utilities: UtilityFunctions) -> TextMatch:
   """Gets the closest token matching a given substring."""
   del utilities
-  search_text_forward = text[input_match.text_range.end:]
-  search_text_backward = text[:input_match.text_range.start][::-1]
+  text = index.text
+  search = modifier.search
+  start = input_match.text_range.start
+  end = input_match.text_range.end
 
   # First try to match the start of a word.
-  match_forward = _get_word_start_token_match_after(search_text_forward, modifier.search)
-  match_backward = _get_word_start_token_match_before(search_text_backward, modifier.search)
+  match_forward, match_backward = search_closest(
+      text,
+      start,
+      end,
+      get_search_regex(search, "word_start_after", lambda: _get_word_start_regex_after(search)),
+      get_search_regex(search, "word_start_before", lambda: _get_word_start_regex_before(search)),
+      search,
+      forward_distance=lambda match: match.start(2))
+  range_forward = None if match_forward is None else TextRange(*match_forward.span(2))
+  range_backward = None if match_backward is None else TextRange(*match_backward.span(1))
 
   # Match a substring if no word start is found.
-  if match_forward is None and match_backward is None:
-    match_forward = _get_substring_token_match(search_text_forward, modifier.search)
-    match_backward = _get_substring_token_match(search_text_backward, modifier.search[::-1])
-
-  if match_forward is None and match_backward is None:
-    raise ValueError(f"No match for substring: {modifier.search}")
-
-  forward_result = match_backward is None or (match_forward is not None and
-                                              match_forward.start < match_backward.start)
+  if range_forward is None and range_backward is None:
+    # The order of characters in a token is not important, so a reversed token regex will match.
+    match_forward, match_backward = search_closest(
+        text, start, end,
+        get_search_regex(search, "substring", lambda: _get_substring_token_regex(search)),
+        get_search_regex(search, "substring_reversed",
+                         lambda: _get_substring_token_regex(search[::-1])), search)
+    range_forward = None if match_forward is None else TextRange(*match_forward.span())
+    range_backward = None if match_backward is None else TextRange(*match_backward.span())
+
+  if range_forward is None and range_backward is None:
+    raise ValueError(f"No match for substring: {search}")
+
+  forward_result = range_backward is None or (range_forward is not None and
+                                              range_forward.start < range_backward.start)
   if forward_result:
-    assert match_forward is not None
-    return _maybe_add_token_deletion_range(text, input_match.text_range.end + match_forward.start,
-                                           input_match.text_range.end + match_forward.end)
-  assert match_backward is not None
-  return _maybe_add_token_deletion_range(text, input_match.text_range.start - match_backward.end,
-                                         input_match.text_range.start - match_backward.start)
+    assert range_forward is not None
+    return _maybe_add_token_deletion_range(text, end + range_forward.start, end + range_forward.end)
+  assert range_backward is not None
+  return _maybe_add_token_deletion_range(text, start - range_backward.end,
+                                         start - range_backward.start)
 
 
-def _apply_word_substring_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_word_substring_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                        modifier: Modifier,
                                         utilities: UtilityFunctions) -> TextMatch:
   """Gets the next token matching a given substring after the input match. Tries to match the start
   of a word first."""
   del utilities
+  text = index.text
   search_text = text[input_match.text_range.end:]
   match = _get_word_start_token_match_after(search_text, modifier.search)
   if match is None:
@@ -207,15 +289,77 @@ def _apply_word_substring_next_modifier(text: str, input_match: TextMatch, modif
                                          input_match.text_range.end + match.end)
 
 
-def _apply_word_substring_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _iter_word_substring_matches(text: str, start: int, search: str) -> Iterator[TextRange]:
+  """Iterates over the tokens matching a given substring after the given index, with each search
+  starting where the previous match ended. Gives the same matches as applying
+  `_apply_word_substring_next_modifier` repeatedly, but searches the text in place instead of slicing
+  it after every match. An empty match would be found again by every later search, so it is the last
+  one."""
+  word_start_regex = get_search_regex(search, "word_start_after",
+                                      lambda: _get_word_start_regex_after(search))
+  anchored_regex = get_search_regex(search, "word_start_anchored",
+                                    lambda: _get_word_start_regex_anchored(search))
+  substring_regex = get_search_regex(search, "substring",
+                                     lambda: _get_substring_token_regex(search))
+  end = start
+  # Once there are no word starts after an index, there are none after any later index either.
+  # Only the anchored regex can still match.
+  word_starts_left = True
+  while True:
+    # In a sliced text, `^` matches a word start at the index where the search starts.
+    match = anchored_regex.match(text, end)
+    if match is not None:
+      start, end = match.span()
+    else:
+      match = word_start_regex.search(text, end) if word_starts_left else None
+      if match is not None:
+        start, end = match.span(2)
+      else:
+        word_starts_left = False
+        match = substring_regex.search(text, end)
+        if match is None:
+          return
+        start, end = match.span()
+    yield TextRange(start, end)
+    if start == end:
+      return
+
+
+def _nth_match(matches: Iterator[TextRange], n: int) -> Optional[TextRange]:
+  """Gets the nth match from one of the match iterators, or None if there are fewer matches. The
+  iterators end after an empty match, which stands in for all later matches."""
+  for count, match in enumerate(matches, 1):
+    if count == n or match.length() == 0:
+      return match
+  return None
+
+
+def _apply_word_substring_next_modifier_repeated(index: ScramblerTextIndex, input_match: TextMatch,
+                                                 modifier: Modifier,
+                                                 utilities: UtilityFunctions) -> TextMatch:
+  """Gets the nth token matching a given substring after the input match, where n is the modifier's
+  repeat count. Gives the same result as applying `_apply_word_substring_next_modifier` repeatedly,
+  but searches the text in place instead of slicing it after every match."""
+  del utilities
+  match = _nth_match(
+      _iter_word_substring_matches(index.text, input_match.text_range.end, modifier.search),
+      modifier.repeat)
+  if match is None:
+    raise ValueError(f"Fewer than {modifier.repeat} matches for substring after input match: "
+                     f"{input_match}. Substring: {modifier.search}")
+  return _maybe_add_token_deletion_range(index.text, match.start, match.end)
+
+
+def _apply_word_substring_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                            modifier: Modifier,
                                             utilities: UtilityFunctions) -> TextMatch:
   """Gets the previous token matching a given substring before the input match. Tries to match the
   start of a word first."""
   del utilities
-  search_text = text[:input_match.text_range.start][::-1]
-  match = _get_word_start_token_match_before(search_text, modifier.search)
+  text = index.text
+  match = _get_word_start_token_match_before(text, input_match.text_range.start, modifier.search)
   if match is None:
-    match = _get_substring_token_match(search_text, modifier.search[::-1])
+    match = _get_substring_token_match_before(text, input_match.text_range.start, modifier.search)
   if match is None:
     raise ValueError(
         f"No match for substring before input match: {input_match}. Substring: {modifier.search}")
@@ -223,22 +367,24 @@ def _apply_word_substring_previous_modifier(text: str, input_match: TextMatch, m
                                          input_match.text_range.start - match.start)
 
 
-def _get_phrase_regex_with_expanded_tokens(search: str, get_homophones: Callable[[str],
-                                                                                 list[str]]) -> str:
-  phrase_regex = get_phrase_regex(search.split(" "), get_homophones)
-  return f"{_TOKEN_CHAR}*{phrase_regex}{_TOKEN_CHAR}*"
+def _get_exact_word_regex(search: str) -> str:
+  """Gets a regex for finding the given text as a whole word."""
+  return f"\\b{re.escape(search)}\\b"
 
 
-def _apply_exact_word_closest_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_exact_word_closest_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                       modifier: Modifier,
                                        utilities: UtilityFunctions) -> TextMatch:
   """Gets the closest exact matching word."""
   del utilities
-  search_text_forward = text[input_match.text_range.end:]
-  search_text_backward = text[:input_match.text_range.start][::-1]
-  regex_forward = re.compile(f"\\b{re.escape(modifier.search)}\\b", re.IGNORECASE)
-  regex_backward = re.compile(f"\\b{re.escape(modifier.search[::-1])}\\b", re.IGNORECASE)
-  match_forward = regex_forward.search(search_text_forward)
-  match_backward = regex_backward.search(search_text_backward)
+  text = index.text
+  regex_forward = get_search_regex(modifier.search, "exact_word",
+                                   lambda: _get_exact_word_regex(modifier.search))
+  regex_backward = get_search_regex(modifier.search, "exact_word_reversed",
+                                    lambda: _get_exact_word_regex(modifier.search[::-1]))
+  match_forward, match_backward = search_closest(text, input_match.text_range.start,
+                                                 input_match.text_range.end, regex_forward,
+                                                 regex_backward, modifier.search)
   if match_forward is None and match_backward is None:
     raise ValueError(f"No exact match found: {modifier.search}")
 
@@ -253,12 +399,14 @@ def _apply_exact_word_closest_modifier(text: str, input_match: TextMatch, modifi
                                          input_match.text_range.start - match_backward.start())
 
 
-def _apply_exact_word_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                    utilities: UtilityFunctions) -> TextMatch:
+def _apply_exact_word_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                    modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Gets the next exact matching word after the input match."""
   del utilities
+  text = index.text
   search_text = text[input_match.text_range.end:]
-  regex = re.compile(f"\\b{re.escape(modifier.search)}\\b", re.IGNORECASE)
+  regex = get_search_regex(modifier.search, "exact_word",
+                           lambda: _get_exact_word_regex(modifier.search))
   match = regex.search(search_text)
   if match is None:
     raise ValueError(f"No exact match found after input match: {input_match}")
@@ -266,53 +414,138 @@ def _apply_exact_word_next_modifier(text: str, input_match: TextMatch, modifier:
                                          input_match.text_range.end + match.end())
 
 
-def _apply_exact_word_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _get_exact_word_regex_anchored(search: str) -> str:
+  """Gets a regex for finding the given text as a whole word at the index where a search starts.
+  Searching a sliced text only checks the characters after that index for the leading `\\b`."""
+  return f"{re.escape(search)}\\b"
+
+
+def _iter_exact_word_matches(text: str, start: int, search: str) -> Iterator[TextRange]:
+  """Iterates over the exact matching words after the given index, with each search starting where
+  the previous match ended. Gives the same matches as applying `_apply_exact_word_next_modifier`
+  repeatedly, but searches the text in place instead of slicing it after every match. The search
+  must not be empty."""
+  assert search
+  regex = get_search_regex(search, "exact_word", lambda: _get_exact_word_regex(search))
+  anchored_regex = get_search_regex(search, "exact_word_anchored",
+                                    lambda: _get_exact_word_regex_anchored(search))
+  end = start
+  while True:
+    if not _is_token_char_at(text, end - 1):
+      # The leading `\b` sees the same characters as in a sliced text.
+      match = regex.search(text, end)
+    else:
+      # A sliced text would start with a word boundary exactly when it starts with a token
+      # character. Check that index on its own, then search the rest as usual.
+      match = anchored_regex.match(text, end) if _is_token_char_at(text, end) else None
+      if match is None and end < len(text):
+        match = regex.search(text, end + 1)
+    if match is None:
+      return
+    end = match.end()
+    yield TextRange(match.start(), end)
+
+
+def _apply_exact_word_next_modifier_repeated(index: ScramblerTextIndex, input_match: TextMatch,
+                                             modifier: Modifier,
+                                             utilities: UtilityFunctions) -> TextMatch:
+  """Gets the nth exact matching word after the input match, where n is the modifier's repeat count.
+  Gives the same result as applying `_apply_exact_word_next_modifier` repeatedly, but searches the
+  text in place instead of slicing it after every match."""
+  if not modifier.search:
+    # An empty search matches word boundaries, which depend on the text before the search start.
+    result = input_match
+    for _ in range(modifier.repeat):
+      result = _apply_exact_word_next_modifier(index, result, modifier, utilities)
+    return result
+  match = _nth_match(
+      _iter_exact_word_matches(index.text, input_match.text_range.end, modifier.search),
+      modifier.repeat)
+  if match is None:
+    raise ValueError(
+        f"Fewer than {modifier.repeat} exact matches found after input match: {input_match}")
+  return _maybe_add_token_deletion_range(index.text, match.start, match.end)
+
+
+def _apply_exact_word_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                        modifier: Modifier,
                                         utilities: UtilityFunctions) -> TextMatch:
   """Gets the previous exact matching word before the input match."""
   del utilities
-  search_text = text[:input_match.text_range.start][::-1]
-  regex = re.compile(f"\\b{re.escape(modifier.search[::-1])}\\b", re.IGNORECASE)
-  match = regex.search(search_text)
+  text = index.text
+  regex = get_search_regex(modifier.search, "exact_word_reversed",
+                           lambda: _get_exact_word_regex(modifier.search[::-1]))
+  match = search_backward(text, input_match.text_range.start, regex, modifier.search)
   if match is None:
     raise ValueError(f"No exact match found before input match: {input_match}")
   return _maybe_add_token_deletion_range(text, input_match.text_range.start - match.end(),
                                          input_match.text_range.start - match.start())
 
 
-def _get_phrase_regex_with_expanded_tokens_reversed(
-    search: str, get_homophones: Callable[[str], list[str]]) -> str:
-  """Gets a phrase regex with all words reversed."""
-  words = search.split(" ")
-  alt_sets: list[list[str]] = []
-  for word in words:
-    # Get all homophones in lowercase and escaped for use in a regex.
-    phones = list(map(lambda w: w.lower(), get_homophones(word)))
-    # Reverse the words.
-    for i in range(len(phones)):
-      phones[i] = re.escape(phones[i][::-1])
-    alt_sets.append(phones)
-
-  # Iterate through alt sets in reverse order.
-  reversed_alts = []
-  for alt_set in alt_sets[::-1]:
-    reversed_alts.append(f"({'|'.join(alt_set[::-1])})")  # pylint: disable=inconsistent-quotes
-
-  phrase_regex = r"[ .,\-\_\"]*".join(reversed_alts)
-  return f"{_TOKEN_CHAR}*{phrase_regex}{_TOKEN_CHAR}*"
-
-
-def _apply_phrase_closest_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                   utilities: UtilityFunctions) -> TextMatch:
-  """Gets the closest phrase matching the given words."""
-  search_text_forward = text[input_match.text_range.end:]
-  search_text_backward = text[:input_match.text_range.start][::-1]
-  regex_forward = _get_phrase_regex_with_expanded_tokens(modifier.search, utilities.get_homophones)
-  regex_backward = _get_phrase_regex_with_expanded_tokens_reversed(modifier.search,
-                                                                   utilities.get_homophones)
-  match_forward = re.search(regex_forward, search_text_forward, re.IGNORECASE)
-  match_backward = re.search(regex_backward, search_text_backward, re.IGNORECASE)
+def _get_phrase_matcher(search: str,
+                        get_homophones: Callable[[str], list[str]],
+                        reverse: bool = False) -> PhraseMatcher:
+  """Gets a matcher for the given phrase expanded to whole tokens. If `reverse` is set, the matcher
+  finds the phrase in reversed text."""
+  kind = "phrase_reversed" if reverse else "phrase"
+  phrase_regex = get_search_regex(
+      search, f"{kind}_tree", lambda: get_phrase_tree_regex(
+          get_phrase_alternatives(search.split(" "), get_homophones, reverse)), get_homophones)
+  expanded_regex = get_search_regex(search, kind,
+                                    lambda: get_expanded_phrase_regex(phrase_regex.pattern),
+                                    get_homophones)
+  return PhraseMatcher(phrase_regex, expanded_regex)
+
+
+def _expand_to_tokens(text: str, start: int, end: int, start_limit: int,
+                      end_limit: int) -> TextRange:
+  """Expands a range to the whole tokens at either end, without crossing the given limits."""
+  while start > start_limit and _TOKEN_CHAR_REGEX.match(text, start - 1):
+    start -= 1
+  while end < end_limit and _TOKEN_CHAR_REGEX.match(text, end):
+    end += 1
+  return TextRange(start, end)
+
+
+def _find_approximate_phrase_after(index: ScramblerTextIndex, modifier: Modifier,
+                                   start: int) -> Optional[TextRange]:
+  """Finds the next phrase at or after `start` with up to `modifier.max_errors` misrecognized
+  characters, expanded to whole tokens. None if approximate matching is off or there is no match."""
+  errors = get_error_budget(modifier.search, modifier.max_errors)
+  if errors == 0:
+    return None
+  match = find_approximate_next(index.text, modifier.search, errors, start)
+  if match is None:
+    return None
+  return _expand_to_tokens(index.text, match.start, match.end, start, len(index.text))
+
+
+def _find_approximate_phrase_before(index: ScramblerTextIndex, modifier: Modifier,
+                                    end: int) -> Optional[TextRange]:
+  """Finds the previous phrase before `end` with up to `modifier.max_errors` misrecognized
+  characters, expanded to whole tokens. None if approximate matching is off or there is no match."""
+  errors = get_error_budget(modifier.search, modifier.max_errors)
+  if errors == 0:
+    return None
+  match = find_approximate_previous(index.text, modifier.search, errors, end)
+  if match is None:
+    return None
+  return _expand_to_tokens(index.text, match.start, match.end, 0, end)
+
+
+def _apply_phrase_closest_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                   modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
+  """Gets the closest phrase matching the given words. Falls back to approximate matching if there
+  is no exact match in either direction."""
+  text = index.text
+  matcher_forward = _get_phrase_matcher(modifier.search, utilities.get_homophones)
+  matcher_backward = _get_phrase_matcher(modifier.search, utilities.get_homophones, reverse=True)
+  # Every character the phrase regex can match literally appears in its pattern.
+  match_forward, match_backward = search_closest(text, input_match.text_range.start,
+                                                 input_match.text_range.end, matcher_forward,
+                                                 matcher_backward, matcher_backward.pattern)
   if match_forward is None and match_backward is None:
-    raise ValueError(f"No match for phrase: {modifier.search}")
+    return _apply_approximate_phrase_closest_modifier(index, input_match, modifier)
 
   forward_result = match_backward is None or (match_forward is not None and
                                               match_forward.start() < match_backward.start())
@@ -325,90 +558,125 @@ def _apply_phrase_closest_modifier(text: str, input_match: TextMatch, modifier:
                                          input_match.text_range.start - match_backward.start())
 
 
-def _apply_phrase_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                utilities: UtilityFunctions) -> TextMatch:
-  """Gets the next matching phrase after the input match."""
-  search_text = text[input_match.text_range.end:]
-  phrase_regex = _get_phrase_regex_with_expanded_tokens(modifier.search, utilities.get_homophones)
-  match = re.search(phrase_regex, search_text, re.IGNORECASE)
+def _apply_approximate_phrase_closest_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                               modifier: Modifier) -> TextMatch:
+  """Gets the closest phrase with up to `modifier.max_errors` misrecognized characters."""
+  match_forward = _find_approximate_phrase_after(index, modifier, input_match.text_range.end)
+  match_backward = _find_approximate_phrase_before(index, modifier, input_match.text_range.start)
+  if match_forward is None and match_backward is None:
+    raise ValueError(f"No match for phrase: {modifier.search}")
+
+  forward_result = match_backward is None or (match_forward is not None and
+                                              match_forward.start - input_match.text_range.end
+                                              < input_match.text_range.start - match_backward.end)
+  result = match_forward if forward_result else match_backward
+  assert result is not None
+  return _maybe_add_token_deletion_range(index.text, result.start, result.end)
+
+
+def _apply_phrase_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
+  """Gets the next matching phrase after the input match. Falls back to approximate matching if
+  there is no exact match."""
+  text = index.text
+  matcher = _get_phrase_matcher(modifier.search, utilities.get_homophones)
+  # Phrase regexes have no anchors or word boundaries, so searching in place gives the same result as
+  # searching a sliced text.
+  match = matcher.search(text, input_match.text_range.end)
   if match is None:
-    raise ValueError(f"No phrase found after input match: {input_match}")
-  return _maybe_add_token_deletion_range(text, input_match.text_range.end + match.start(),
-                                         input_match.text_range.end + match.end())
+    approximate_match = _find_approximate_phrase_after(index, modifier, input_match.text_range.end)
+    if approximate_match is None:
+      raise ValueError(f"No phrase found after input match: {input_match}")
+    return _maybe_add_token_deletion_range(text, approximate_match.start, approximate_match.end)
+  return _maybe_add_token_deletion_range(text, match.start(), match.end())
 
 
-def _apply_phrase_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                    utilities: UtilityFunctions) -> TextMatch:
-  """Gets the previous matching phrase before the input match."""
-  search_text = text[:input_match.text_range.start][::-1]
-  phrase_regex = _get_phrase_regex_with_expanded_tokens_reversed(modifier.search,
-                                                                 utilities.get_homophones)
-  match = re.search(phrase_regex, search_text, re.IGNORECASE)
+def _apply_phrase_next_modifier_repeated(index: ScramblerTextIndex, input_match: TextMatch,
+                                         modifier: Modifier,
+                                         utilities: UtilityFunctions) -> TextMatch:
+  """Gets the nth matching phrase after the input match, where n is the modifier's repeat count."""
+  text = index.text
+  matcher = _get_phrase_matcher(modifier.search, utilities.get_homophones)
+  match = _find_nth_match(matcher, text, input_match.text_range.end, modifier.repeat)
+  if match is None and modifier.max_errors > 0:
+    # Some of the phrases may only match approximately.
+    result = input_match
+    for _ in range(modifier.repeat):
+      result = _apply_phrase_next_modifier(index, result, modifier, utilities)
+    return result
+  if match is None:
+    raise ValueError(f"Fewer than {modifier.repeat} phrases found after input match: {input_match}")
+  return _maybe_add_token_deletion_range(text, match.start(), match.end())
+
+
+def _apply_phrase_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                    modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
+  """Gets the previous matching phrase before the input match. Falls back to approximate matching
+  if there is no exact match."""
+  text = index.text
+  matcher = _get_phrase_matcher(modifier.search, utilities.get_homophones, reverse=True)
+  # Every character the phrase regex can match literally appears in its pattern.
+  match = search_backward(text, input_match.text_range.start, matcher, matcher.pattern)
   if match is None:
-    raise ValueError(f"No phrase found before input match: {input_match}")
+    approximate_match = _find_approximate_phrase_before(index, modifier,
+                                                        input_match.text_range.start)
+    if approximate_match is None:
+      raise ValueError(f"No phrase found before input match: {input_match}")
+    return _maybe_add_token_deletion_range(text, approximate_match.start, approximate_match.end)
   return _maybe_add_token_deletion_range(text, input_match.text_range.start - match.end(),
                                          input_match.text_range.start - match.start())
 
 
-def _apply_comment_modifier(text: str, input_match: TextMatch, modifier,
+def _apply_comment_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier,
                             utilities: UtilityFunctions) -> TextMatch:
   """Takes the comment containing the match."""
   del modifier, utilities
-  block_comment = False
-  start_index = input_match.text_range.start
+  lexer = index.lexer
+  if lexer is not None:
+    span = lexer.span_at(input_match.text_range.start)
+    if span is None or span.kind != SpanKind.COMMENT or \
+        span.text_range.end < input_match.text_range.end:
+      return input_match
+    return _make_match(span.text_range.start, span.text_range.end)
 
-  # Search for the beginning of the comment.
-  while start_index > 0:
-    if text[start_index] == "#":
-      break
-    elif len(text) > start_index + 1 and text[start_index:start_index + 2] == "//":
-      break
-    elif len(text) > start_index + 1 and text[start_index:start_index + 2] == "/*":
-      block_comment = True
-      break
-    start_index -= 1
+  text = index.text
+
+  # Search for the beginning of the comment. It may start at the start of the input match.
+  start_index = input_match.text_range.start
+  block_comment_index = text.rfind("/*", 0, start_index + 2)
+  start_index = max(text.rfind("#", 0, start_index + 1), text.rfind("//", 0, start_index + 2),
+                    block_comment_index)
 
   # If no comment start found, return the input match.
-  if start_index == 0 and not (text[start_index] == "#" or text[:2] in ["//", "/*"]):
+  if start_index < 0:
     return input_match
+  block_comment = start_index > 0 and start_index == block_comment_index
 
   # Use start of input match to ensure we always take a single line if not a block comment.
   end_index = input_match.text_range.start
   if not block_comment:
-    while end_index < len(text) and text[end_index] != "\n":
-      end_index += 1
+    end_index = _index_of_next_character(index, end_index, "\n")
   else:
-    while end_index < len(text) - 1:
-      if text[end_index:end_index + 2] == "*/":
-        end_index += 2
-        break
-      end_index += 1
+    block_comment_end_index = text.find("*/", end_index)
+    if block_comment_end_index >= 0:
+      end_index = block_comment_end_index + 2
+    else:
+      end_index = max(end_index, len(text) - 1)
 
   return _make_match(start_index, end_index)
 
 
-def _apply_argument_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_argument_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier: Modifier,
                              utilities: UtilityFunctions) -> TextMatch:
   """Takes the current argument."""
   del modifier, utilities
+  text = index.text
 
   if text == "":
     raise ValueError("No text to match.")
 
-  # Find the first argument delimiter before the match. Track close parentheses to handle nested
-  # calls.
-  start_index = input_match.text_range.start
-  close_parentheses = 0
-  while start_index > 0:
-    if text[start_index - 1] == ")":
-      close_parentheses += 1
-    elif text[start_index - 1] == "(":
-      if close_parentheses == 0:
-        break
-      close_parentheses -= 1
-    elif text[start_index - 1] in (",", ";") and close_parentheses == 0:
-      break
-    start_index -= 1
+  # Find the first argument delimiter before the match, skipping nested calls.
+  start_index = index.bracket_table.argument_start(input_match.text_range.start)
 
   # Deletion range start includes leading whitespace, but remove it from the selection range.
   deletion_start_index = start_index
@@ -422,19 +690,8 @@ def _apply_argument_modifier(text: str, input_match: TextMatch, modifier: Modifi
     deletion_start_index -= 1
     found_leading_delimiter = True
 
-  # Find the next argument delimiter after the match. Track open parentheses to handle nested calls.
-  end_index = input_match.text_range.end
-  open_parentheses = 0
-  while end_index < len(text):
-    if text[end_index] == "(":
-      open_parentheses += 1
-    elif text[end_index] == ")":
-      if open_parentheses == 0:
-        break
-      open_parentheses -= 1
-    elif text[end_index] in (",", ";") and open_parentheses == 0:
-      break
-    end_index += 1
+  # Find the next argument delimiter after the match, skipping nested calls.
+  end_index = index.bracket_table.argument_end(input_match.text_range.end)
 
   # Deletion range end includes trailing whitespace, but remove it from the selection range.
   deletion_end_index = end_index
@@ -454,44 +711,47 @@ def _apply_argument_modifier(text: str, input_match: TextMatch, modifier: Modifi
                    TextRange(deletion_start_index, deletion_end_index))
 
 
-def _apply_argument_first_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                   utilities: UtilityFunctions) -> TextMatch:
+def _apply_argument_first_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                   modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Finds the next function call and takes the first argument from it. Assumes the initial match is
   outside the function call."""
+  text = index.text
   # Find the start of the next function call. Start looking from the end of the current match.
-  paren_index = _index_of_next_character(text, input_match.text_range.end, ["("])
+  paren_index = _index_of_next_bracket(index, input_match.text_range.end, "(")
   # Skip over empty function calls: func()
   while paren_index < len(text) - 1 and text[paren_index + 1] == ")":
-    paren_index = _index_of_next_character(text, paren_index + 1, ["("])
+    paren_index = _index_of_next_bracket(index, paren_index + 1, "(")
   paren_index = min(paren_index + 1, len(text))
 
   # Match the argument after the opening parenthesis.
-  return _apply_argument_modifier(text, _make_match(paren_index, paren_index), modifier, utilities)
+  return _apply_argument_modifier(index, _make_match(paren_index, paren_index), modifier, utilities)
 
 
-def _apply_argument_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_argument_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From a match inside an argument, takes the next argument."""
-  divider_index = _index_of_next_character(text, input_match.text_range.end, [",", ";"])
-  divider_index = min(divider_index + 1, len(text))
-  return _apply_argument_modifier(text, _make_match(divider_index + 1, divider_index + 1), modifier,
-                                  utilities)
+  divider_index = _index_of_next_bracket(index, input_match.text_range.end, ARGUMENT_DELIMITERS)
+  divider_index = min(divider_index + 1, len(index))
+  return _apply_argument_modifier(index, _make_match(divider_index + 1, divider_index + 1),
+                                  modifier, utilities)
 
 
-def _apply_argument_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                      utilities: UtilityFunctions) -> TextMatch:
+def _apply_argument_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                      modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From a match inside an argument, takes the previous argument."""
-  divider_index = _index_of_previous_character(text, input_match.text_range.start, [",", ";"])
+  divider_index = _index_of_previous_bracket(index, input_match.text_range.start,
+                                             ARGUMENT_DELIMITERS)
   divider_index = max(divider_index - 1, 0)
-  return _apply_argument_modifier(text, _make_match(divider_index, divider_index), modifier,
+  return _apply_argument_modifier(index, _make_match(divider_index, divider_index), modifier,
                                   utilities)
 
 
-def _apply_function_call_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_function_call_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes the current function call. Assumes the input match is in the function name, not inside
   the parentheses."""
   del modifier, utilities
+  text = index.text
 
   # Find the start of the function call.
   # Try to be permissive and include balanced parentheses to allow complex C++ calls such as:
@@ -511,75 +771,97 @@ def _apply_function_call_modifier(text: str, input_match: TextMatch, modifier: M
   # Find the end of the function call. Look for an opening parenthesis after the input match, then
   # its balanced close. Use the input match so we can get the entire call if the input match is in
   # `method` in the  example above.
-  end_index = input_match.text_range.end
-  nested_parentheses = -1  # Start with -1 to so we stop after closing the first open parenthesis.
-  while end_index < len(text):
-    if text[end_index] == "(":
-      nested_parentheses += 1
-    elif text[end_index] == ")":
-      if nested_parentheses == 0:
-        # Include closing parenthesis.
-        end_index += 1
-        break
-      nested_parentheses -= 1
-    end_index += 1
+  table = index.bracket_table
+  open_index = table.find_next(input_match.text_range.end, "(")
+  close_index = -1 if open_index < 0 else table.partner(open_index)
+  # Include closing parenthesis.
+  end_index = len(text) if close_index < 0 else close_index + 1
 
   return _make_match(start_index, end_index)
 
 
-def _apply_function_call_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_function_call_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                       modifier: Modifier,
                                        utilities: UtilityFunctions) -> TextMatch:
   """From inside a function call, takes the next function call."""
+  text = index.text
   # Find the start of the next function call.
-  start_index = _index_of_next_character(text, input_match.text_range.end, ["("])
+  start_index = _index_of_next_bracket(index, input_match.text_range.end, "(")
   # Skip over parens without a function name before them.
   while start_index > 0 and not text[start_index - 1].isalnum():
-    start_index = _index_of_next_character(text, start_index + 1, ["("])
+    start_index = _index_of_next_bracket(index, start_index + 1, "(")
   start_index = max(start_index - 1, 0)
 
   # Match the function call before the opening parenthesis.
-  return _apply_function_call_modifier(text, _make_match(start_index, start_index), modifier,
+  return _apply_function_call_modifier(index, _make_match(start_index, start_index), modifier,
                                        utilities)
 
 
-def _apply_function_call_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_function_call_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                           modifier: Modifier,
                                            utilities: UtilityFunctions) -> TextMatch:
   """From inside a function call, takes the previous function call."""
+  text = index.text
   # Find the start of the previous function call.
-  start_index = _index_of_previous_character(text, input_match.text_range.start, ["("])
+  start_index = _index_of_previous_bracket(index, input_match.text_range.start, "(")
   # Skip over parens without a function name before them.
   while start_index > 0 and not text[start_index - 1].isalnum():
-    start_index = _index_of_previous_character(text, start_index - 1, ["("])
+    start_index = _index_of_previous_bracket(index, start_index - 1, "(")
   start_index = max(start_index - 1, 0)
 
   # Match the function call before the opening parenthesis.
-  return _apply_function_call_modifier(text, _make_match(start_index, start_index), modifier,
+  return _apply_function_call_modifier(index, _make_match(start_index, start_index), modifier,
                                        utilities)
 
 
-def _apply_string_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _get_lexed_string_at(index: ScramblerTextIndex, input_match: TextMatch) -> Optional[LexedSpan]:
+  """Gets the lexed string containing the match, if any."""
+  assert index.lexer is not None
+  span = index.lexer.span_at(input_match.text_range.start)
+  if span is None or span.kind != SpanKind.STRING or \
+      span.text_range.end < input_match.text_range.end:
+    return None
+  return span
+
+
+def _use_lexer_for_strings(index: ScramblerTextIndex, modifier: Modifier) -> bool:
+  """Whether string modifiers should use lexed strings. An explicit delimiter always takes
+  precedence."""
+  return index.lexer is not None and not modifier.delimiter
+
+
+def _apply_string_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier: Modifier,
                            utilities: UtilityFunctions) -> TextMatch:
   """Takes the content between symmetric delimiters containing the match. Defaults to C-style
-  strings."""
+  strings, or the lexed string when the language is known. Outside of lexed strings, e.g. inside a
+  comment, falls back to delimiters."""
   del utilities
+  if _use_lexer_for_strings(index, modifier):
+    span = _get_lexed_string_at(index, input_match)
+    if span is not None:
+      return _make_match(span.content_range.start, span.content_range.end)
   delimiter = "\"" if not modifier.delimiter else modifier.delimiter
-  start_index = input_match.text_range.start
-  while start_index > 0 and text[start_index - 1] != delimiter:
-    start_index -= 1
-  end_index = input_match.text_range.end
-  while end_index < len(text) and text[end_index] != delimiter:
-    end_index += 1
+  start_index = index.find_previous(input_match.text_range.start, delimiter) + 1
+  end_index = _index_of_next_character(index, input_match.text_range.end, delimiter)
 
   return _make_match(start_index, end_index)
 
 
-def _apply_string_first_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                 utilities: UtilityFunctions) -> TextMatch:
+def _apply_string_first_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                 modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From outside a string, takes the next string."""
+  if _use_lexer_for_strings(index, modifier):
+    assert index.lexer is not None
+    span = index.lexer.next_span(input_match.text_range.end, SpanKind.STRING)
+    if span is None:
+      raise ValueError(f"No string after input match: {input_match}")
+    return _make_match(span.content_range.start, span.content_range.end)
+
+  text = index.text
   delimiter = "\"" if not modifier.delimiter else modifier.delimiter
 
   # Find the start of the next string.
-  start_index = _index_of_next_character(text, input_match.text_range.end, [delimiter])
+  start_index = _index_of_next_character(index, input_match.text_range.end, delimiter)
   # Check if the delimiter is tripled, like a docstring or markdown block.
   is_docstring = start_index < len(text) - 2 and text[start_index:start_index + 3] == delimiter * 3
   if is_docstring:
@@ -588,16 +870,23 @@ def _apply_string_first_modifier(text: str, input_match: TextMatch, modifier: Mo
   # Start from within the string.
   start_index = min(start_index + 1, len(text))
 
-  return _apply_string_modifier(text, _make_match(start_index, start_index), modifier, utilities)
+  return _apply_string_modifier(index, _make_match(start_index, start_index), modifier, utilities)
 
 
-def _apply_string_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                utilities: UtilityFunctions) -> TextMatch:
+def _apply_string_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From inside a string, takes the next string."""
+  if _use_lexer_for_strings(index, modifier):
+    current = _get_lexed_string_at(index, input_match)
+    start_index = input_match.text_range.end if current is None else current.text_range.end
+    return _apply_string_first_modifier(index, _make_match(start_index, start_index), modifier,
+                                        utilities)
+
+  text = index.text
   delimiter = "\"" if not modifier.delimiter else modifier.delimiter
 
   # Find the end of the current string.
-  start_index = _index_of_next_character(text, input_match.text_range.end, [delimiter])
+  start_index = _index_of_next_character(index, input_match.text_range.end, delimiter)
   # Check if the delimiter is tripled, like a docstring or markdown block.
   is_docstring = start_index < len(text) - 2 and text[start_index:start_index + 3] == delimiter * 3
   if is_docstring:
@@ -607,134 +896,125 @@ def _apply_string_next_modifier(text: str, input_match: TextMatch, modifier: Mod
   start_index = min(start_index + 1, len(text))
 
   # Find the next string after leaving the current one.
-  return _apply_string_first_modifier(text, _make_match(start_index, start_index), modifier,
+  return _apply_string_first_modifier(index, _make_match(start_index, start_index), modifier,
                                       utilities)
 
 
-def _apply_string_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                    utilities: UtilityFunctions) -> TextMatch:
+def _apply_string_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                    modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From inside a string, takes the previous string."""
+  if _use_lexer_for_strings(index, modifier):
+    assert index.lexer is not None
+    current = _get_lexed_string_at(index, input_match)
+    end_index = input_match.text_range.start if current is None else current.text_range.start
+    span = index.lexer.previous_span(end_index, SpanKind.STRING)
+    if span is None:
+      raise ValueError(f"No string before input match: {input_match}")
+    return _make_match(span.content_range.start, span.content_range.end)
+
+  text = index.text
   delimiter = "\"" if not modifier.delimiter else modifier.delimiter
 
   # Find the start of the current string.
-  index = _index_of_previous_character(text, input_match.text_range.start, [delimiter])
+  curr_index = _index_of_previous_character(index, input_match.text_range.start, delimiter)
   # Check if the delimiter is tripled, like a docstring or markdown block.
-  is_docstring = index > 2 and text[index - 2:index + 1] == delimiter * 3
+  is_docstring = curr_index > 2 and text[curr_index - 2:curr_index + 1] == delimiter * 3
   if is_docstring:
-    index -= 2
+    curr_index -= 2
 
   # Move outside the current string.
-  index = max(index - 1, 0)
+  curr_index = max(curr_index - 1, 0)
 
   # Find the end of the previous string.
-  index = _index_of_previous_character(text, index, [delimiter])
+  curr_index = _index_of_previous_character(index, curr_index, delimiter)
   # Check if the delimiter is tripled, like a docstring or markdown block.
-  is_docstring = index > 2 and text[index - 2:index + 1] == delimiter * 3
+  is_docstring = curr_index > 2 and text[curr_index - 2:curr_index + 1] == delimiter * 3
   if is_docstring:
-    index -= 2
+    curr_index -= 2
 
   # Move into the previous string.
-  index = max(index - 1, 0)
+  curr_index = max(curr_index - 1, 0)
 
   # Find the previous string before entering the current one.
-  return _apply_string_modifier(text, _make_match(index, index), modifier, utilities)
+  return _apply_string_modifier(index, _make_match(curr_index, curr_index), modifier, utilities)
 
 
-def _apply_python_scope_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                 utilities: UtilityFunctions) -> TextMatch:
+def _python_scope_at(index: ScramblerTextIndex, position: int) -> int:
+  """Gets the block of the indentation tree for the scope at the given position."""
+  block = index.indentation_tree.scope(index.line_number(position))
+  if block == -1:
+    raise ValueError("Could not find indentation level for Python scope")
+  return block
+
+
+def _python_scope_match(index: ScramblerTextIndex, block: int) -> TextMatch:
+  """Takes the lines of a block of the indentation tree, including the trailing line break."""
+  first_line, last_line = index.indentation_tree.block_lines(block)
+  last_line_range = index.line_range_by_number(last_line, include_trailing_line_break=True)
+  return _make_match(index.line_starts[first_line], last_line_range.end)
+
+
+def _apply_python_scope_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                 modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes the current scope in Python code."""
   del modifier, utilities
+  return _python_scope_match(index, _python_scope_at(index, input_match.text_range.start))
 
-  # Find the indentation level of the current or last non-empty line.
-  indentation_search_index = input_match.text_range.start
-  min_indentation_level = None
-  while indentation_search_index >= 0 and min_indentation_level is None:
-    line_range = _get_line_at_index(text,
-                                    indentation_search_index,
-                                    include_trailing_line_break=True)
-    line_text = line_range.extract(text)
-    # Make sure the line isn't just whitespace.
-    if line_text.strip() != "":
-      # We found a non-whitespace line. Use its indentation level.
-      min_indentation_level = len(line_text) - len(line_text.lstrip())
-      break
-    # Move to the previous line.
-    indentation_search_index = line_range.start - 1
 
-  # Make sure we found an indentation level.
-  if min_indentation_level is None:
-    raise ValueError("Could not find indentation level for Python scope")
+def _apply_python_scope_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                      modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
+  """Takes the next scope in Python code that shares a parent with the current one."""
+  del utilities
+  block = _python_scope_at(index, input_match.text_range.start)
+  block = index.indentation_tree.sibling(block, modifier.repeat)
+  if block == -1:
+    raise ValueError("No next Python scope")
+  return _python_scope_match(index, block)
 
-  # Find the start of the current scope.
-  start_line_range = _get_line_at_index(text,
-                                        input_match.text_range.start,
-                                        include_trailing_line_break=True)
-  first_non_whitespace_line_range = start_line_range
-  while start_line_range.start > 0:
-    previous_line_range = _get_line_at_index(text,
-                                             start_line_range.start - 1,
-                                             include_trailing_line_break=True)
-    previous_line_text = previous_line_range.extract(text)
-    is_whitespace = previous_line_text.strip() == ""
-    # Stop if we find a non-whitespace line with less indentation.
-    if not is_whitespace and len(previous_line_text) - len(
-        previous_line_text.lstrip()) < min_indentation_level:
-      break
-    start_line_range = previous_line_range
-    if not is_whitespace:
-      first_non_whitespace_line_range = start_line_range
-
-  # Find the end of the current scope.
-  end_line_range = start_line_range
-  last_non_whitespace_line_range = end_line_range
-  while end_line_range.end < len(text):
-    next_line_range = _get_line_at_index(text, end_line_range.end, include_trailing_line_break=True)
-    next_line_text = next_line_range.extract(text)
-    is_whitespace = next_line_text.strip() == ""
-    # Stop if we find a line with less indentation.
-    if not is_whitespace and len(next_line_text) - len(
-        next_line_text.lstrip()) < min_indentation_level:
-      break
-    end_line_range = next_line_range
-    if not is_whitespace:
-      last_non_whitespace_line_range = end_line_range
 
-  # Return the scope, excluding surrounding lines that are just whitespace.
-  return _make_match(first_non_whitespace_line_range.start, last_non_whitespace_line_range.end)
+def _apply_python_scope_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                          modifier: Modifier,
+                                          utilities: UtilityFunctions) -> TextMatch:
+  """Takes the previous scope in Python code that shares a parent with the current one."""
+  del utilities
+  block = _python_scope_at(index, input_match.text_range.start)
+  block = index.indentation_tree.sibling(block, -modifier.repeat)
+  if block == -1:
+    raise ValueError("No previous Python scope")
+  return _python_scope_match(index, block)
+
+
+def _apply_python_scope_parent_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                        modifier: Modifier,
+                                        utilities: UtilityFunctions) -> TextMatch:
+  """Takes the scope in Python code enclosing the current one."""
+  del utilities
+  tree = index.indentation_tree
+  block = _python_scope_at(index, input_match.text_range.start)
+  for _ in range(modifier.repeat):
+    block = tree.parent(block)
+    if block == -1:
+      raise ValueError("No parent Python scope")
+  return _python_scope_match(index, block)
 
 
-def _apply_c_scope_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_c_scope_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier: Modifier,
                             utilities: UtilityFunctions) -> TextMatch:
   """Takes the current scope in C-style code."""
   del modifier, utilities
+  text = index.text
 
-  # Find the first opening brace before the match. Keep track of the number of close braces.
-  close_braces = 0
-  start_index = input_match.text_range.start
-  while start_index > 0:
-    if text[start_index - 1] == "}":
-      close_braces += 1
-    elif text[start_index - 1] == "{":
-      if close_braces <= 0:
-        break
-      close_braces -= 1
-    start_index -= 1
+  # Find the first opening brace before the match that is not closed before it.
+  table = index.bracket_table
+  open_index = table.enclosing_open(input_match.text_range.start, "{")
+  start_index = open_index + 1
 
   # Don't include the newline after the opening brace if present.
   if (start_index < len(text) and text[start_index] == "\n"):
     start_index += 1
 
-  # Find the corresponding closing brace. Keep track of the number of open nested braces.
-  open_braces = 0
-  end_index = start_index
-  while end_index < len(text):
-    if text[end_index] == "{":
-      open_braces += 1
-    elif text[end_index] == "}":
-      if open_braces <= 0:
-        break
-      open_braces -= 1
-    end_index += 1
+  # Find the corresponding closing brace.
+  end_index = table.scope_end(open_index, start_index, "{")
 
   # Remove indentation before the closing brace.
   while end_index > start_index and text[end_index - 1] in [" ", "\t"]:
@@ -743,29 +1023,21 @@ def _apply_c_scope_modifier(text: str, input_match: TextMatch, modifier: Modifie
   return _make_match(start_index, end_index)
 
 
-def _apply_sentence_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_sentence_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier: Modifier,
                              utilities: UtilityFunctions) -> TextMatch:
   """Takes the current sentence. Suitable for English prose."""
   del modifier, utilities
+  text = index.text
 
   # Find the end of the previous sentence.
-  start_index = input_match.text_range.start
-  while start_index > 0:
-    if text[start_index - 1] in _SENTENCE_DELIMITERS:
-      break
-    start_index -= 1
+  start_index = index.previous_sentence_end(input_match.text_range.start) + 1
 
   # Remove leading whitespace from the range.
-  while start_index < len(text) and text[start_index] in [" ", "\t", "\n"]:
-    start_index += 1
+  start_index = index.skip_whitespace(start_index)
 
-  # Find the end of the current sentence.
-  end_index = input_match.text_range.end
-  while end_index < len(text):
-    if text[end_index] in _SENTENCE_DELIMITERS:
-      end_index += 1  # Include the delimiter.
-      break
-    end_index += 1
+  # Find the end of the current sentence. Include the delimiter.
+  end_index = index.next_sentence_end(input_match.text_range.end)
+  end_index = len(text) if end_index < 0 else end_index + 1
 
   # Prefer to include trailing spaces in the deletion range, as leading spaces may be indentation or
   # other formatting.
@@ -789,194 +1061,144 @@ def _apply_sentence_modifier(text: str, input_match: TextMatch, modifier: Modifi
                    TextRange(deletion_start_index, deletion_end_index))
 
 
-def _apply_sentence_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_sentence_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes the next sentence."""
+  text = index.text
   end_index = input_match.text_range.end
   # Special case: End of the current sentence is selected.
-  if input_match.text_range.length() > 0 and end_index > 0 and text[end_index -
-                                                                    1] in _SENTENCE_DELIMITERS:
-    return _apply_sentence_modifier(text, _make_match(end_index, end_index), modifier, utilities)
+  if input_match.text_range.length() > 0 and end_index > 0 and index.is_sentence_end(end_index - 1):
+    return _apply_sentence_modifier(index, _make_match(end_index, end_index), modifier, utilities)
   # Find the end of the sentence.
-  end_index = _index_of_next_character(text, input_match.text_range.end, _SENTENCE_DELIMITERS)
-  end_index = min(end_index + 1, len(text))
-  return _apply_sentence_modifier(text, _make_match(end_index, end_index), modifier, utilities)
+  end_index = index.next_sentence_end(input_match.text_range.end)
+  end_index = len(text) if end_index < 0 else end_index + 1
+  return _apply_sentence_modifier(index, _make_match(end_index, end_index), modifier, utilities)
 
 
-def _apply_sentence_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                      utilities: UtilityFunctions) -> TextMatch:
+def _apply_sentence_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                      modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes the previous sentence."""
   # Find the start of the previous sentence.
-  start_index = _index_of_previous_character(text, input_match.text_range.start,
-                                             _SENTENCE_DELIMITERS)
+  start_index = index.previous_sentence_end(min(input_match.text_range.start + 1, len(index)))
   start_index = max(start_index - 1, 0)
-  return _apply_sentence_modifier(text, _make_match(start_index, start_index), modifier, utilities)
+  return _apply_sentence_modifier(index, _make_match(start_index, start_index), modifier, utilities)
 
 
-def _apply_sentence_clause_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                    utilities: UtilityFunctions) -> TextMatch:
+def _apply_sentence_clause_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                    modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Expands the match to cover a clause in English prose. Doesn't include leading or trailing
   whitespace in the deletion range"""
   del modifier, utilities
-  clause_delimiters = [",", ".", "!", "?", "\n", "(", ")", ":", ";"]
-
   # Find the end of the previous clause.
-  start_index = input_match.text_range.start
-  while start_index > 0:
-    if text[start_index - 1] in clause_delimiters:
-      break
-    start_index -= 1
+  start_index = index.previous_clause_end(input_match.text_range.start) + 1
 
   # Remove leading whitespace from the range.
-  while start_index < len(text) and text[start_index] in [" ", "\t", "\n"]:
-    start_index += 1
+  start_index = index.skip_whitespace(start_index)
 
-  # Find the end of the current sentence.
-  end_index = input_match.text_range.end
-  while end_index < len(text):
-    if text[end_index] in clause_delimiters:
-      break
-    end_index += 1
+  # Find the end of the current clause.
+  end_index = index.next_clause_end(input_match.text_range.end)
+  if end_index < 0:
+    end_index = len(index)
 
   return TextMatch(TextRange(start_index, end_index))
 
 
-def _apply_brackets_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_brackets_modifier(index: ScramblerTextIndex, input_match: TextMatch, modifier: Modifier,
                              utilities: UtilityFunctions) -> TextMatch:
   """Takes the contents of surrounding brackets."""
   del modifier, utilities
 
-  # Find the first opening bracket before the match without a matching closing bracket.
-  start_index = input_match.text_range.start
-  nesting_level_by_bracket = {}
-  # Initialize nesting level at zero for all bracket types.
-  for bracket in _BRACKET_PAIRS:
-    nesting_level_by_bracket[bracket] = 0
-  opening_bracket = None
-  while start_index > 0:
-    c = text[start_index - 1]
-    if c in _BRACKET_PAIRS:
-      nesting_level_by_bracket[c] -= 1
-      if nesting_level_by_bracket[c] < 0:
-        opening_bracket = c
-        break
-    elif c in _BRACKET_PAIRS.values():
-      # Get key for value c
-      for bracket, close_bracket in _BRACKET_PAIRS.items():
-        if close_bracket == c:
-          nesting_level_by_bracket[bracket] += 1
-          break
-    start_index -= 1
-
-  # Make sure we found an opening bracket.
-  if opening_bracket is None:
+  # Find the innermost brackets around the match.
+  pair = index.bracket_table.enclosing_pair(input_match.text_range.start)
+  if pair is None:
     raise ValueError("Could not find opening bracket")
+  return _make_match(pair.start + 1, pair.end)
 
-  # Find the corresponding closing bracket.
-  end_index = start_index
-  nesting_level = 0
-  while end_index < len(text):
-    c = text[end_index]
-    if c == opening_bracket:
-      nesting_level += 1
-    elif c == _BRACKET_PAIRS[opening_bracket]:
-      if nesting_level == 0:
-        break
-      nesting_level -= 1
-    end_index += 1
-
-  return _make_match(start_index, end_index)
 
-
-def _apply_brackets_first_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                   utilities: UtilityFunctions) -> TextMatch:
+def _apply_brackets_first_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                   modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From outside a bracket, takes the next bracketed content."""
+  text = index.text
   # Find the start of the next bracketed content.
-  start_index = _index_of_next_character(text, input_match.text_range.end, _OPEN_BRACKETS)
+  start_index = _index_of_next_bracket(index, input_match.text_range.end, OPEN_BRACKETS)
   # Ignore < with a trailing space. It's most likely to be a comparison, not a bracket.
   while 0 < start_index < len(text) - 1 and text[start_index:start_index + 2] == "< ":
-    start_index = _index_of_next_character(text, start_index + 1, _OPEN_BRACKETS)
+    start_index = _index_of_next_bracket(index, start_index + 1, OPEN_BRACKETS)
   # Start from within the bracket.
   start_index = min(start_index + 1, len(text))
 
-  return _apply_brackets_modifier(text, _make_match(start_index, start_index), modifier, utilities)
+  return _apply_brackets_modifier(index, _make_match(start_index, start_index), modifier, utilities)
 
 
-def _apply_brackets_next_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_brackets_next_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From inside a bracket, takes the next bracketed content."""
+  text = index.text
   # Find the end of the current bracketed content.
-  start_index = _index_of_next_character(text, input_match.text_range.end, _CLOSE_BRACKETS)
+  start_index = _index_of_next_bracket(index, input_match.text_range.end, CLOSE_BRACKETS)
   # Ignore > with a leading space. It's most likely to be a comparison, not a bracket.
   while 0 < start_index < len(text) and text[start_index - 1:start_index + 1] == " >":
-    start_index = _index_of_next_character(text, start_index + 1, _CLOSE_BRACKETS)
+    start_index = _index_of_next_bracket(index, start_index + 1, CLOSE_BRACKETS)
   # Start from outside the bracket.
   start_index = min(start_index + 1, len(text))
 
   # Find the next bracketed content after leaving the current one.
-  return _apply_brackets_first_modifier(text, _make_match(start_index, start_index), modifier,
+  return _apply_brackets_first_modifier(index, _make_match(start_index, start_index), modifier,
                                         utilities)
 
 
-def _apply_brackets_previous_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                      utilities: UtilityFunctions) -> TextMatch:
+def _apply_brackets_previous_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                      modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """From inside a bracket, takes the previous bracketed content."""
+  text = index.text
   # Find the start of the current bracketed content.
-  index = _index_of_previous_character(text, input_match.text_range.start, _OPEN_BRACKETS)
+  curr_index = _index_of_previous_bracket(index, input_match.text_range.start, OPEN_BRACKETS)
   # Ignore < with a trailing space. It's most likely to be a comparison, not a bracket.
-  while 0 < index < len(text) - 1 and text[index:index + 2] == "< ":
-    index = _index_of_previous_character(text, index - 1, _OPEN_BRACKETS)
+  while 0 < curr_index < len(text) - 1 and text[curr_index:curr_index + 2] == "< ":
+    curr_index = _index_of_previous_bracket(index, curr_index - 1, OPEN_BRACKETS)
   # Move outside the current bracket.
-  index = max(index - 1, 0)
+  curr_index = max(curr_index - 1, 0)
 
   # Find the end of the previous bracketed content.
-  index = _index_of_previous_character(text, index, _CLOSE_BRACKETS)
+  curr_index = _index_of_previous_bracket(index, curr_index, CLOSE_BRACKETS)
   # Ignore > with a leading space. It's most likely to be a comparison, not a bracket.
-  while 0 < index < len(text) and text[index - 1:index + 1] == " >":
-    index = _index_of_previous_character(text, index - 1, _CLOSE_BRACKETS)
+  while 0 < curr_index < len(text) and text[curr_index - 1:curr_index + 1] == " >":
+    curr_index = _index_of_previous_bracket(index, curr_index - 1, CLOSE_BRACKETS)
   # Move into the previous bracket.
-  index = max(index - 1, 0)
+  curr_index = max(curr_index - 1, 0)
 
   # Find the previous bracketed content before entering the current one.
-  return _apply_brackets_modifier(text, _make_match(index, index), modifier, utilities)
+  return _apply_brackets_modifier(index, _make_match(curr_index, curr_index), modifier, utilities)
 
 
-def _apply_start_of_line_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_start_of_line_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes an empty match at the start of the line containing the match."""
   del modifier, utilities
-  line_range = _get_line_at_index(text,
-                                  input_match.text_range.start,
-                                  include_trailing_line_break=True)
+  line_range = index.line_range(input_match.text_range.start, include_trailing_line_break=True)
   return _make_match(line_range.start, line_range.start)
 
 
-def _apply_end_of_line_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                utilities: UtilityFunctions) -> TextMatch:
+def _apply_end_of_line_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes an empty match at the end of the line containing the input match."""
   del modifier, utilities
-  line_range = _get_line_at_index(text,
-                                  input_match.text_range.start,
-                                  include_trailing_line_break=True)
+  line_range = index.line_range(input_match.text_range.start, include_trailing_line_break=True)
   return _make_match(line_range.end, line_range.end)
 
 
-def _apply_between_whitespace_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_between_whitespace_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                       modifier: Modifier,
                                        utilities: UtilityFunctions) -> TextMatch:
   """Takes the contents of surrounding whitespace (including line breaks)."""
   del modifier, utilities
+  text = index.text
 
   delimiters = [" ", "\t", "\n"]
 
-  # Find whitespace before the input match.
-  start_index = input_match.text_range.start
-  while start_index > 0 and text[start_index - 1] not in delimiters:
-    start_index -= 1
-
-  # Find whitespace after the input match.
-  end_index = input_match.text_range.end
-  while end_index < len(text) and text[end_index] not in delimiters:
-    end_index += 1
+  # Find whitespace before and after the input match.
+  start_index = index.whitespace_before(input_match.text_range.start)
+  end_index = index.whitespace_after(input_match.text_range.end)
 
   # Try to include trailing whitespace in the deletion range.
   deletion_end_index = end_index
@@ -995,30 +1217,28 @@ def _apply_between_whitespace_modifier(text: str, input_match: TextMatch, modifi
                    TextRange(deletion_start_index, deletion_end_index))
 
 
-def _apply_markdown_link_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                                  utilities: UtilityFunctions) -> TextMatch:
+def _apply_markdown_link_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                  modifier: Modifier, utilities: UtilityFunctions) -> TextMatch:
   """Takes a full link in markdown syntax, including brackets. Example:
   [link text](http://example.com)"""
   del modifier, utilities
 
   # Find the start of the link: "["
-  start_index = input_match.text_range.start
-  while start_index > 0 and text[start_index] != "[":
-    start_index -= 1
+  start_index = _index_of_previous_character(index, input_match.text_range.start, "[")
 
   # Find the end of the link: ")"
-  end_index = start_index
-  while end_index < len(text) and text[end_index] != ")":
-    end_index += 1
+  end_index = _index_of_next_character(index, start_index, ")")
 
   return _make_match(start_index, end_index + 1)
 
 
-def _apply_markdown_section_end_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_markdown_section_end_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                         modifier: Modifier,
                                          utilities: UtilityFunctions) -> TextMatch:
   """Takes an empty selection before the line break on the last non-whitespace line in a markdown
   section."""
   del modifier, utilities
+  text = index.text
 
   # Regex that matches pound symbols followed by a space.
   heading_regex = re.compile(r"^#+ ", re.IGNORECASE)
@@ -1026,7 +1246,7 @@ def _apply_markdown_section_end_modifier(text: str, input_match: TextMatch, modi
   # Search backwards so we can start on a non-whitespace line.
   curr_index = input_match.text_range.end
   while curr_index > 0:
-    line_range = _get_line_at_index(text, curr_index, include_trailing_line_break=True)
+    line_range = index.line_range(curr_index, include_trailing_line_break=True)
     line_text = line_range.extract(text)
 
     if line_text.strip() != "":
@@ -1039,7 +1259,7 @@ def _apply_markdown_section_end_modifier(text: str, input_match: TextMatch, modi
   is_first_line = True
   result_index = curr_index
   while curr_index < len(text):
-    line_range = _get_line_at_index(text, curr_index, include_trailing_line_break=True)
+    line_range = index.line_range(curr_index, include_trailing_line_break=True)
     line_text = line_range.extract(text)
 
     # Ignore headings on the first line, otherwise terminate the search when we see a heading.
@@ -1058,23 +1278,21 @@ def _apply_markdown_section_end_modifier(text: str, input_match: TextMatch, modi
   return _make_match(result_index, result_index)
 
 
-def _apply_line_including_line_break_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_line_including_line_break_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                              modifier: Modifier,
                                               utilities: UtilityFunctions) -> TextMatch:
   """Takes the line containing the match."""
   del modifier, utilities
-  line_range = _get_line_at_index(text,
-                                  input_match.text_range.start,
-                                  include_trailing_line_break=True)
+  line_range = index.line_range(input_match.text_range.start, include_trailing_line_break=True)
   return TextMatch(line_range)
 
 
-def _apply_line_excluding_line_break_modifier(text: str, input_match: TextMatch, modifier: Modifier,
+def _apply_line_excluding_line_break_modifier(index: ScramblerTextIndex, input_match: TextMatch,
+                                              modifier: Modifier,
                                               utilities: UtilityFunctions) -> TextMatch:
   """Takes the line containing the match."""
   del modifier, utilities
-  line_range = _get_line_at_index(text,
-                                  input_match.text_range.start,
-                                  include_trailing_line_break=False)
+  line_range = index.line_range(input_match.text_range.start, include_trailing_line_break=False)
   return TextMatch(line_range)
 
 
@@ -1119,22 +1337,129 @@ _MODIFIER_FUNCTIONS = {
     ModifierType.MARKDOWN_SECTION_END: _apply_markdown_section_end_modifier,
     ModifierType.LINE_INCLUDING_LINE_BREAK: _apply_line_including_line_break_modifier,
     ModifierType.LINE_EXCLUDING_LINE_BREAK: _apply_line_excluding_line_break_modifier,
+    ModifierType.PYTHON_SCOPE_NEXT: _apply_python_scope_next_modifier,
+    ModifierType.PYTHON_SCOPE_PREVIOUS: _apply_python_scope_previous_modifier,
+    ModifierType.PYTHON_SCOPE_PARENT: _apply_python_scope_parent_modifier,
 }
 
+# Modifiers that apply `modifier.repeat` themselves. They find the nth match directly instead of
+# searching again from every intermediate match. Python scope movement walks the indentation tree,
+# so an intermediate scope is never looked up again from its first line.
+_REPEATED_MODIFIER_FUNCTIONS = {
+    ModifierType.TOKEN_NEXT: _apply_token_next_modifier_repeated,
+    ModifierType.TOKEN_PREVIOUS: _apply_token_previous_modifier_repeated,
+    ModifierType.WORD_SUBSTRING_NEXT: _apply_word_substring_next_modifier_repeated,
+    ModifierType.EXACT_WORD_NEXT: _apply_exact_word_next_modifier_repeated,
+    ModifierType.PHRASE_NEXT: _apply_phrase_next_modifier_repeated,
+    ModifierType.PYTHON_SCOPE_NEXT: _apply_python_scope_next_modifier,
+    ModifierType.PYTHON_SCOPE_PREVIOUS: _apply_python_scope_previous_modifier,
+    ModifierType.PYTHON_SCOPE_PARENT: _apply_python_scope_parent_modifier,
+}
 
-def apply_modifier(text: str, input_match: TextMatch, modifier: Modifier,
-                   utilities: UtilityFunctions) -> TextMatch:
-  """Applies a modifier to the given range and returns the new range."""
+
+def apply_modifier(text: str,
+                   input_match: TextMatch,
+                   modifier: Modifier,
+                   utilities: UtilityFunctions,
+                   language: str = "") -> TextMatch:
+  """Applies a modifier to the given range and returns the new range. If the language of the text
+  is given, string and comment modifiers use a lexer for that language."""
   if input_match.text_range.end > len(text):
     raise ValueError(f"Input match beyond end of text: {input_match}")
   if input_match.deletion_range is not None and input_match.deletion_range.end > len(text):
     raise ValueError(f"Input match deletion range beyond end of text: {input_match}")
 
   # Apply the modifier the requested number of times.
+  index = get_text_index(text, language)
+  modifier_function = _MODIFIER_FUNCTIONS[modifier.modifier_type]
+  repeat = modifier.repeat
+  if repeat > 1 and modifier.modifier_type in _REPEATED_MODIFIER_FUNCTIONS:
+    modifier_function = _REPEATED_MODIFIER_FUNCTIONS[modifier.modifier_type]
+    repeat = 1
   result = input_match
-  for _ in range(0, modifier.repeat):
-    result = _MODIFIER_FUNCTIONS[modifier.modifier_type](text, result, modifier, utilities)
+  for _ in range(0, repeat):
+    result = modifier_function(index, result, modifier, utilities)
     # No modifier is allowed to match outside the text.
     assert result.text_range.end <= len(text)
     assert result.deletion_range is None or result.deletion_range.end <= len(text)
   return result
+
+
+def _iter_token_matches(index: ScramblerTextIndex, start: int, modifier: Modifier,
+                        utilities: UtilityFunctions) -> Iterator[TextRange]:
+  """Iterates over the tokens after the given index."""
+  del modifier, utilities
+  token_range = index.token_after(start)
+  while token_range is not None:
+    yield token_range
+    token_range = index.token_after(token_range.end)
+
+
+def _iter_word_substring_modifier_matches(index: ScramblerTextIndex, start: int, modifier: Modifier,
+                                          utilities: UtilityFunctions) -> Iterator[TextRange]:
+  """Iterates over the tokens matching the modifier's substring after the given index."""
+  del utilities
+  return _iter_word_substring_matches(index.text, start, modifier.search)
+
+
+def _iter_exact_word_modifier_matches(index: ScramblerTextIndex, start: int, modifier: Modifier,
+                                      utilities: UtilityFunctions) -> Iterator[TextRange]:
+  """Iterates over the exact matches of the modifier's word after the given index."""
+  del utilities
+  return _iter_exact_word_matches(index.text, start, modifier.search)
+
+
+def _iter_phrase_matches(index: ScramblerTextIndex, start: int, modifier: Modifier,
+                         utilities: UtilityFunctions) -> Iterator[TextRange]:
+  """Iterates over the exact matches of the modifier's phrase after the given index."""
+  matcher = _get_phrase_matcher(modifier.search, utilities.get_homophones)
+  match = matcher.search(index.text, start)
+  while match is not None and match.start() != match.end():
+    yield TextRange(match.start(), match.end())
+    match = matcher.search(index.text, match.end())
+
+
+# Iterators over every match of a search modifier after an index, keyed by modifier type. Matches
+# are the same as for the next modifier of the same kind, whatever the direction of the modifier.
+_MATCH_ITERATORS = {
+    ModifierType.TOKEN_NEXT: _iter_token_matches,
+    ModifierType.TOKEN_PREVIOUS: _iter_token_matches,
+    ModifierType.WORD_SUBSTRING_CLOSEST: _iter_word_substring_modifier_matches,
+    ModifierType.WORD_SUBSTRING_NEXT: _iter_word_substring_modifier_matches,
+    ModifierType.WORD_SUBSTRING_PREVIOUS: _iter_word_substring_modifier_matches,
+    ModifierType.EXACT_WORD_CLOSEST: _iter_exact_word_modifier_matches,
+    ModifierType.EXACT_WORD_NEXT: _iter_exact_word_modifier_matches,
+    ModifierType.EXACT_WORD_PREVIOUS: _iter_exact_word_modifier_matches,
+    ModifierType.PHRASE_CLOSEST: _iter_phrase_matches,
+    ModifierType.PHRASE_NEXT: _iter_phrase_matches,
+    ModifierType.PHRASE_PREVIOUS: _iter_phrase_matches,
+}
+
+
+def find_all_matches(text: str,
+                     bounds: TextRange,
+                     modifier: Modifier,
+                     utilities: UtilityFunctions,
+                     language: str = "") -> list[TextMatch]:
+  """Finds every match of a search modifier inside the given range, in order. Each search starts
+  where the previous match ended, as when applying the next modifier of the same kind repeatedly,
+  so matches do not overlap. The direction and repeat count of the modifier are ignored. Phrases
+  only match exactly, as approximate matches are too loose to edit in bulk."""
+  if modifier.modifier_type not in _MATCH_ITERATORS:
+    raise ValueError(f"Unable to find all matches for modifier: {modifier.modifier_type}")
+  if modifier.modifier_type not in (ModifierType.TOKEN_NEXT,
+                                    ModifierType.TOKEN_PREVIOUS) and (not modifier.search):
+    raise ValueError("Unable to find all matches for an empty search")
+  if bounds.end > len(text):
+    raise ValueError(f"Bounds beyond end of text: {bounds}")
+
+  index = get_text_index(text, language)
+  result = []
+  for match in _MATCH_ITERATORS[modifier.modifier_type](index, bounds.start, modifier, utilities):
+    if match.end > bounds.end:
+      break
+    result.append(_maybe_add_token_deletion_range(text, match.start, match.end))
+    # An empty match would be found again by every later search.
+    if match.length() == 0:
+      break
+  return result
@@ -18,6 +18,63 @@ class ApplyModifierTestCase(unittest.TestCase):
                      Modifier(ModifierType.TOKEN_NEXT, 1), UTILITY_FUNCTIONS)
 
 
+class RepeatedSearchTestCase(unittest.TestCase):
+  """Tests for search modifiers that find the nth match directly."""
+
+  def _apply_one_at_a_time(self, text: str, input_match: TextMatch,
+                           modifier: Modifier) -> TextMatch:
+    single = Modifier(modifier.modifier_type, 1, modifier.search)
+    for _ in range(modifier.repeat):
+      input_match = apply_modifier(text, input_match, single, UTILITY_FUNCTIONS)
+    return input_match
+
+  def test_same_as_one_at_a_time(self):
+    text = "foo.bar foobar(foo, they're) there.foo _foo their foo"
+    modifiers = [
+        Modifier(ModifierType.TOKEN_NEXT, 3),
+        Modifier(ModifierType.TOKEN_PREVIOUS, 3),
+        Modifier(ModifierType.WORD_SUBSTRING_NEXT, 3, "foo"),
+        Modifier(ModifierType.WORD_SUBSTRING_NEXT, 2, "oo"),
+        Modifier(ModifierType.WORD_SUBSTRING_NEXT, 2, ".foo"),
+        Modifier(ModifierType.EXACT_WORD_NEXT, 2, "foo"),
+        Modifier(ModifierType.EXACT_WORD_NEXT, 2, ".foo"),
+        Modifier(ModifierType.PHRASE_NEXT, 2, "there"),
+    ]
+    for modifier in modifiers:
+      for cursor in range(0, len(text) + 1, 3):
+        input_match = TextMatch(TextRange(cursor, cursor))
+        try:
+          expected = self._apply_one_at_a_time(text, input_match, modifier)
+        except ValueError:
+          with self.assertRaises(ValueError):
+            apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+          continue
+        self.assertEqual(apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS), expected,
+                         f"{modifier} at {cursor}")
+
+  def test_exact_word_inside_word(self):
+    # Searching after the cursor treats the rest of the current word as a word of its own.
+    text = "xfoo foo foo"
+    result = apply_modifier(text, TextMatch(TextRange(1, 1)),
+                            Modifier(ModifierType.EXACT_WORD_NEXT, 2, "foo"), UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range, TextRange(5, 8))
+
+  def test_word_substring_at_cursor(self):
+    # The rest of the current word is a word start, as is "bazaar".
+    text = "foobar foobaz bazaar"
+    result = apply_modifier(text, TextMatch(TextRange(3, 3)),
+                            Modifier(ModifierType.WORD_SUBSTRING_NEXT, 2, "ba"), UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "bazaar")
+
+  def test_too_few_matches(self):
+    with self.assertRaises(ValueError):
+      apply_modifier("foo foo", TextMatch(TextRange(0, 0)),
+                     Modifier(ModifierType.EXACT_WORD_NEXT, 3, "foo"), UTILITY_FUNCTIONS)
+    with self.assertRaises(ValueError):
+      apply_modifier("a b", TextMatch(TextRange(0, 0)), Modifier(ModifierType.TOKEN_NEXT, 3),
+                     UTILITY_FUNCTIONS)
+
+
 class GetPhraseRegexTestCase(unittest.TestCase):
   """Tests for getting a regex to match a phrase."""
 
@@ -369,6 +426,16 @@ class WordSubstringClosestTestCase(unittest.TestCase):
 
 class PhraseNextTestCase(unittest.TestCase):
 
+  def test_homophone_functions_are_not_mixed(self):
+    text = "over their heads"
+    modifier = Modifier(ModifierType.PHRASE_NEXT, 1, "there")
+    result = apply_modifier(text, TextMatch(TextRange(0, 0)), modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "their")
+    # The regex cached for the same search with other homophones is not reused.
+    no_homophones = UtilityFunctions(lambda word: [word], lambda word: None)
+    with self.assertRaises(ValueError):
+      apply_modifier(text, TextMatch(TextRange(0, 0)), modifier, no_homophones)
+
   def test_first_token(self):
     text = "This is a test"
     input_match = TextMatch(TextRange(0, 0))
@@ -403,6 +470,32 @@ class PhraseNextTestCase(unittest.TestCase):
     with self.assertRaises(ValueError):
       apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
 
+  def test_approximate_match(self):
+    text = "Test recognition here"
+    input_match = TextMatch(TextRange(0, 0))
+    modifier = Modifier(ModifierType.PHRASE_NEXT, 1, "recognitoin", max_errors=2)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "recognition")
+    # Approximate matching is only a fallback for when there is no exact match.
+    text = "Test recognition recognitoin"
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "recognitoin")
+    self.assertEqual(result.text_range.start, 17)
+
+  def test_approximate_match_repeated(self):
+    text = "Test recognition and recognitien and recognitiion"
+    input_match = TextMatch(TextRange(0, 0))
+    modifier = Modifier(ModifierType.PHRASE_NEXT, 3, "recognition", max_errors=1)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range, TextRange(37, 49))
+
+  def test_approximate_match_too_short(self):
+    text = "This is a test"
+    input_match = TextMatch(TextRange(0, 0))
+    modifier = Modifier(ModifierType.PHRASE_NEXT, 1, "tst", max_errors=2)
+    with self.assertRaises(ValueError):
+      apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+
 
 class PhrasePreviousTestCase(unittest.TestCase):
 
@@ -440,6 +533,15 @@ class PhrasePreviousTestCase(unittest.TestCase):
     with self.assertRaises(ValueError):
       apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
 
+  def test_approximate_match(self):
+    text = "Test recognition here"
+    input_match = TextMatch(TextRange(21, 21))
+    modifier = Modifier(ModifierType.PHRASE_PREVIOUS, 1, "recognision", max_errors=2)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "recognition")
+    assert result.deletion_range is not None
+    self.assertEqual(result.deletion_range.extract(text), "recognition ")
+
 
 class PhraseClosestTestCase(unittest.TestCase):
 
@@ -495,6 +597,14 @@ class PhraseClosestTestCase(unittest.TestCase):
     with self.assertRaises(ValueError):
       apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
 
+  def test_approximate_match(self):
+    text = "Test recognitiom and another recognitiin"
+    modifier = Modifier(ModifierType.PHRASE_CLOSEST, 1, "recognition", max_errors=1)
+    result = apply_modifier(text, TextMatch(TextRange(20, 20)), modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range, TextRange(5, 16))
+    result = apply_modifier(text, TextMatch(TextRange(26, 26)), modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range, TextRange(29, 40))
+
 
 class ExactWordNextTestCase(unittest.TestCase):
 
@@ -669,6 +779,26 @@ class TestCommentModifier(unittest.TestCase):
       apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
 
 
+class TestCommentModifierWithLanguage(unittest.TestCase):
+
+  def test_hash_in_string(self):
+    text = "x = \"#a\"  # b"
+    input_match = TextMatch(TextRange(6, 6))
+    modifier = Modifier(ModifierType.COMMENT)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result, input_match)
+    input_match = TextMatch(TextRange(12, 12))
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "# b")
+
+  def test_block_comment(self):
+    text = "a /* \"b\"\n c */ d"
+    input_match = TextMatch(TextRange(7, 7))
+    modifier = Modifier(ModifierType.COMMENT)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "cpp")
+    self.assertEqual(result.text_range.extract(text), "/* \"b\"\n c */")
+
+
 class TestArgumentModifier(unittest.TestCase):
 
   def test_empty_string(self):
@@ -750,6 +880,15 @@ class TestArgumentModifier(unittest.TestCase):
     assert result.deletion_range is not None
     self.assertEqual(result.deletion_range.extract(text), ", f2(arg2)")
 
+  def test_delimiter_in_string(self):
+    text = "f(arg1, \"a, b\");"
+    input_match = TextMatch(TextRange(12, 12))
+    modifier = Modifier(ModifierType.ARGUMENT)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "\"a, b\"")
+    assert result.deletion_range is not None
+    self.assertEqual(result.deletion_range.extract(text), ", \"a, b\"")
+
 
 class TestArgumentFirstModifier(unittest.TestCase):
 
@@ -1026,6 +1165,58 @@ class TestStringPreviousModifier(unittest.TestCase):
     self.assertEqual(result.text_range.extract(text), "string1")
 
 
+class TestStringModifiersWithLanguage(unittest.TestCase):
+
+  def test_escaped_quote(self):
+    text = "s = \"a \\\" b\""
+    input_match = TextMatch(TextRange(10, 10))
+    modifier = Modifier(ModifierType.STRING)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "a \\\" b")
+
+  def test_single_quotes(self):
+    text = "f('a', 'b')"
+    input_match = TextMatch(TextRange(4, 4))
+    modifier = Modifier(ModifierType.STRING)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "a")
+
+  def test_delimiter_overrides_language(self):
+    text = "'a |b| c'"
+    input_match = TextMatch(TextRange(4, 4))
+    modifier = Modifier(ModifierType.STRING, delimiter="|")
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "b")
+
+  def test_skips_quotes_in_comments(self):
+    text = "x = 1  # \"a\"\ny = \"b\"\nz = 'c'"
+    modifier = Modifier(ModifierType.STRING_FIRST)
+    result = apply_modifier(text, TextMatch(TextRange(0, 0)), modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "b")
+    modifier = Modifier(ModifierType.STRING_NEXT)
+    result = apply_modifier(text, result, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "c")
+    modifier = Modifier(ModifierType.STRING_PREVIOUS)
+    result = apply_modifier(text, result, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "b")
+    with self.assertRaises(ValueError):
+      apply_modifier(text, result, modifier, UTILITY_FUNCTIONS, "python")
+
+  def test_next_from_outside_string(self):
+    text = "a \"b\" c \"d\""
+    input_match = TextMatch(TextRange(7, 7))
+    modifier = Modifier(ModifierType.STRING_NEXT)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "typescript")
+    self.assertEqual(result.text_range.extract(text), "d")
+
+  def test_docstring(self):
+    text = "x = 1\n\"\"\"a \"b\" c\"\"\""
+    input_match = TextMatch(TextRange(0, 0))
+    modifier = Modifier(ModifierType.STRING_FIRST)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS, "python")
+    self.assertEqual(result.text_range.extract(text), "a \"b\" c")
+
+
 class TestPythonScopeModifier(unittest.TestCase):
 
   def test_not_in_code(self):
@@ -1112,6 +1303,50 @@ class TestPythonScopeModifier(unittest.TestCase):
     self.assertEqual(result.text_range.end, 101)
 
 
+class TestPythonScopeMovementModifiers(unittest.TestCase):
+
+  TEXT = ("class A:\n"
+          "  def f(self):\n"
+          "    return 1\n"
+          "\n"
+          "  def g(self):\n"
+          "    return 2\n"
+          "\n"
+          "  def h(self):\n"
+          "    return 3\n")
+
+  def apply(self, modifier_type: ModifierType, index: int, repeat: int = 1) -> str:
+    modifier = Modifier(modifier_type, repeat)
+    result = apply_modifier(self.TEXT, TextMatch(TextRange(index, index)), modifier,
+                            UTILITY_FUNCTIONS)
+    return result.text_range.extract(self.TEXT)
+
+  def test_next(self):
+    index = self.TEXT.index("return 1")
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_NEXT, index), "    return 2\n")
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_NEXT, index, 2), "    return 3\n")
+    with self.assertRaises(ValueError):
+      self.apply(ModifierType.PYTHON_SCOPE_NEXT, index, 3)
+
+  def test_previous(self):
+    index = self.TEXT.index("return 3")
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_PREVIOUS, index), "    return 2\n")
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_PREVIOUS, index, 2), "    return 1\n")
+    with self.assertRaises(ValueError):
+      self.apply(ModifierType.PYTHON_SCOPE_PREVIOUS, index, 3)
+
+  def test_parent(self):
+    index = self.TEXT.index("return 2")
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_PARENT, index), self.TEXT[9:])
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_PARENT, index, 2), self.TEXT)
+    with self.assertRaises(ValueError):
+      self.apply(ModifierType.PYTHON_SCOPE_PARENT, index, 3)
+
+  def test_whitespace_line_uses_previous_scope(self):
+    index = self.TEXT.index("\n\n") + 1
+    self.assertEqual(self.apply(ModifierType.PYTHON_SCOPE_NEXT, index), "    return 2\n")
+
+
 class TestCScopeModifier(unittest.TestCase):
 
   def test_empty_string(self):
@@ -1250,6 +1485,14 @@ class TestSentenceModifier(unittest.TestCase):
     assert result.deletion_range is not None
     self.assertEqual(result.deletion_range.extract(text), "This is my sentence.")
 
+  def test_abbreviation(self):
+    text = "Some tools, e.g. this one, cost $1.50 per Mr. Smith. Others are free."
+    input_match = TextMatch(TextRange(5, 5))
+    modifier = Modifier(ModifierType.SENTENCE)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text),
+                     "Some tools, e.g. this one, cost $1.50 per Mr. Smith.")
+
 
 class TestSentenceNextModifier(unittest.TestCase):
 
@@ -1277,6 +1520,13 @@ class TestSentenceNextModifier(unittest.TestCase):
     assert result.deletion_range is not None
     self.assertEqual(result.deletion_range.extract(text), " Sentence two.")
 
+  def test_repeat_with_abbreviations(self):
+    text = "One, e.g. this. Two at 3.5 p.m. today! Three."
+    input_match = TextMatch(TextRange(0, 0))
+    modifier = Modifier(ModifierType.SENTENCE_NEXT, 2)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "Three.")
+
 
 class TestSentencePreviousModifier(unittest.TestCase):
 
@@ -1370,6 +1620,20 @@ class TestBracketModifier(unittest.TestCase):
     result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
     self.assertEqual(result.text_range.extract(text), "before[nest]after")
 
+  def test_bracket_in_string(self):
+    text = "f(x, \")\", y)"
+    input_match = TextMatch(TextRange(3, 3))
+    modifier = Modifier(ModifierType.BRACKETS)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "x, \")\", y")
+
+  def test_inside_string(self):
+    text = "f(\"a (b) c\")"
+    input_match = TextMatch(TextRange(7, 7))
+    modifier = Modifier(ModifierType.BRACKETS)
+    result = apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+    self.assertEqual(result.text_range.extract(text), "b")
+
 
 class TestBracketFirstModifier(unittest.TestCase):
 
@@ -1759,3 +2023,46 @@ class TestLineExcludingLineBreakModifier(unittest.TestCase):
     modifier = Modifier(ModifierType.LINE_EXCLUDING_LINE_BREAK)
     with self.assertRaises(ValueError):
       apply_modifier(text, input_match, modifier, UTILITY_FUNCTIONS)
+
+
+class TestFindAllMatches(unittest.TestCase):
+
+  def test_same_as_next_modifier(self):
+    text = "foo bar, foobar barfoo foo. baz_foo foo"
+    modifiers = [
+        Modifier(ModifierType.TOKEN_NEXT),
+        Modifier(ModifierType.WORD_SUBSTRING_NEXT, search="foo"),
+        Modifier(ModifierType.WORD_SUBSTRING_NEXT, search="ar"),
+        Modifier(ModifierType.EXACT_WORD_NEXT, search="foo"),
+        Modifier(ModifierType.PHRASE_NEXT, search="foo"),
+    ]
+    for modifier in modifiers:
+      expected = []
+      match = TextMatch(TextRange(0, 0))
+      while True:
+        try:
+          match = apply_modifier(text, match, modifier, UTILITY_FUNCTIONS)
+        except ValueError:
+          break
+        expected.append(match)
+      self.assertEqual(find_all_matches(text, TextRange(0, len(text)), modifier, UTILITY_FUNCTIONS),
+                       expected, modifier)
+
+  def test_bounds(self):
+    text = "foo (foo, foo) foo"
+    modifier = Modifier(ModifierType.EXACT_WORD_CLOSEST, search="foo")
+    self.assertEqual(find_all_matches(text, TextRange(5, 13), modifier, UTILITY_FUNCTIONS), [
+        TextMatch(TextRange(5, 8), TextRange(5, 10)),
+        TextMatch(TextRange(10, 13)),
+    ])
+    self.assertEqual(find_all_matches(text, TextRange(5, 12), modifier, UTILITY_FUNCTIONS),
+                     [TextMatch(TextRange(5, 8), TextRange(5, 10))])
+
+  def test_invalid_modifier(self):
+    with self.assertRaises(ValueError):
+      find_all_matches("(a)", TextRange(0, 3), Modifier(ModifierType.BRACKETS), UTILITY_FUNCTIONS)
+    with self.assertRaises(ValueError):
+      find_all_matches("a", TextRange(0, 1), Modifier(ModifierType.EXACT_WORD_NEXT, search=""),
+                       UTILITY_FUNCTIONS)
+    with self.assertRaises(ValueError):
+      find_all_matches("a", TextRange(0, 2), Modifier(ModifierType.TOKEN_NEXT), UTILITY_FUNCTIONS)
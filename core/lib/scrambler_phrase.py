@@ -0,0 +1,110 @@
+"""Phrase search for Scrambler modifiers and OCR. Each word of a phrase is expanded into its
+homophones, and the homophones are merged into a prefix tree so the regex engine compares a shared
+prefix like "the" in "there|their|they're" once per position instead of once per homophone. Phrases
+expanded to whole tokens are found without the leading `\\w*`, which would otherwise rescan every
+token from each of its characters."""
+
+import re
+from typing import Callable, Optional, Sequence
+
+# Characters allowed between the words of a phrase.
+PHRASE_SEPARATOR = r"[ .,\-\_\"]*"
+
+# Size of the first window checked for token characters before a phrase. Grows by
+# `_WINDOW_GROWTH` while the window is all token characters.
+_INITIAL_WINDOW = 64
+_WINDOW_GROWTH = 4
+
+_REGEX_TOKEN_CHARACTERS = re.compile(r"\w*")
+
+
+def get_phrase_alternatives(words: Sequence[str],
+                            get_homophones: Callable[[str], list[str]],
+                            reverse: bool = False) -> list[list[str]]:
+  """Gets the lowercase homophones of each word, in order. Words without homophones, or whose only
+  homophone is empty, are dropped. If `reverse` is set, the words, the order of their homophones and
+  the homophones themselves are reversed, for searching reversed text."""
+  word_alternatives = []
+  for word in words:
+    phones = [phone.lower() for phone in get_homophones(word)]
+    if not phones or phones == [""]:
+      continue
+    if reverse:
+      phones = [phone[::-1] for phone in reversed(phones)]
+    word_alternatives.append(phones)
+  if reverse:
+    word_alternatives.reverse()
+  return word_alternatives
+
+
+def get_prefix_tree_regex(alternatives: Sequence[str]) -> str:
+  """Gets a regex matching any of the given strings, tried in the given order. Consecutive strings
+  that share a prefix are merged, e.g. "there|their" becomes "the(?:re|ir)", which matches exactly
+  like the plain alternation."""
+  parts = []
+  i = 0
+  while i < len(alternatives):
+    if not alternatives[i]:
+      parts.append("")
+      i += 1
+      continue
+    # Merge the run of strings starting with the same character.
+    first = alternatives[i][0]
+    j = i + 1
+    while j < len(alternatives) and alternatives[j][:1] == first:
+      j += 1
+    if j == i + 1:
+      parts.append(re.escape(alternatives[i]))
+    else:
+      parts.append(re.escape(first) + get_prefix_tree_regex([a[1:] for a in alternatives[i:j]]))
+    i = j
+  if len(parts) == 1:
+    return parts[0]
+  return f"(?:{'|'.join(parts)})"  # pylint: disable=inconsistent-quotes
+
+
+def get_phrase_tree_regex(word_alternatives: Sequence[Sequence[str]]) -> str:
+  """Gets a regex for a phrase given the alternatives for each of its words. Matches the same text
+  as the regex from `get_phrase_regex`."""
+  return PHRASE_SEPARATOR.join(get_prefix_tree_regex(a) for a in word_alternatives)
+
+
+def get_expanded_phrase_regex(phrase_regex: str) -> str:
+  """Gets a regex for a phrase that also matches the rest of the tokens at either end."""
+  return f"\\w*{phrase_regex}\\w*"
+
+
+class PhraseMatcher:
+  """Finds a phrase expanded to whole tokens, with the same result as searching with the expanded
+  regex itself. The search first finds the phrase, then the start of the token it begins in, and
+  only then matches the expanded regex once. Both compiled regexes should come from the same
+  phrase regex."""
+
+  def __init__(self, phrase_regex: re.Pattern, expanded_regex: re.Pattern):
+    self._phrase_regex = phrase_regex
+    self._expanded_regex = expanded_regex
+    self.pattern = expanded_regex.pattern
+
+  def search(self, text: str, pos: int = 0) -> Optional[re.Match]:
+    """Finds the first match at or after `pos`, like `re.Pattern.search`."""
+    match = self._phrase_regex.search(text, pos)
+    if match is None:
+      return None
+    # The expanded regex matches at the earliest start that leads to a phrase. Later phrases start
+    # no earlier than this one, so that is the start of the token characters before it.
+    start = _token_run_start(text, match.start(), pos)
+    expanded_match = self._expanded_regex.match(text, start)
+    assert expanded_match is not None
+    return expanded_match
+
+
+def _token_run_start(text: str, index: int, limit: int) -> int:
+  """Gets the start of the run of token characters ending at `index`, not before `limit`."""
+  window = _INITIAL_WINDOW
+  while True:
+    start = max(index - window, limit)
+    match = _REGEX_TOKEN_CHARACTERS.match(text[start:index][::-1])
+    assert match is not None
+    if match.end() < index - start or start == limit:
+      return index - match.end()
+    window *= _WINDOW_GROWTH
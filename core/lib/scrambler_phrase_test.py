@@ -0,0 +1,88 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import random
+import re
+import unittest
+from .scrambler_phrase import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+_HOMOPHONES = [["there", "their", "they're"], ["to", "too", "two"], ["abc", "a", "ab"]]
+
+
+def _get_homophones(word: str) -> list[str]:
+  for phones in _HOMOPHONES:
+    if word in phones:
+      return phones
+  return [word]
+
+
+def _make_matcher(words: list[str], reverse: bool = False) -> PhraseMatcher:
+  phrase_regex = get_phrase_tree_regex(get_phrase_alternatives(words, _get_homophones, reverse))
+  return PhraseMatcher(re.compile(phrase_regex, re.IGNORECASE),
+                       re.compile(get_expanded_phrase_regex(phrase_regex), re.IGNORECASE))
+
+
+class PhraseAlternativesTestCase(unittest.TestCase):
+
+  def test_alternatives(self):
+    self.assertEqual(get_phrase_alternatives(["There", "", "b"], _get_homophones),
+                     [["there"], ["b"]])
+    self.assertEqual(get_phrase_alternatives(["to", "b"], _get_homophones),
+                     [["to", "too", "two"], ["b"]])
+
+  def test_reverse(self):
+    self.assertEqual(get_phrase_alternatives(["ab", "c"], _get_homophones, reverse=True),
+                     [["c"], ["ba", "a", "cba"]])
+
+
+class PrefixTreeRegexTestCase(unittest.TestCase):
+
+  def test_prefix_tree_regex(self):
+    self.assertEqual(get_prefix_tree_regex(["a"]), "a")
+    self.assertEqual(get_prefix_tree_regex(["there", "their", "they're"]), "the(?:re|ir|y're)")
+    self.assertEqual(get_prefix_tree_regex(["to", "too", "two"]), "t(?:o(?:|o)|wo)")
+
+  def test_order_is_kept(self):
+    # Strings that share a prefix are only merged when they are next to each other.
+    self.assertEqual(get_prefix_tree_regex(["abc", "b", "ab"]), "(?:abc|b|ab)")
+    regex = re.compile(get_prefix_tree_regex(["a", "ab", "abc"]))
+    self.assertEqual(regex.match("abc").group(), "a")
+
+  def test_escape(self):
+    self.assertEqual(get_prefix_tree_regex(["a.b", "a*"]), r"a(?:\.b|\*)")
+
+
+class PhraseMatcherTestCase(unittest.TestCase):
+
+  def test_search(self):
+    matcher = _make_matcher(["there", "to"])
+    text = "go xtheir-two-fold now"
+    match = matcher.search(text)
+    assert match is not None
+    self.assertEqual(match.span(), (3, 13))
+    # Searching from inside a token only expands back to where the search starts.
+    match = matcher.search(text, 4)
+    assert match is not None
+    self.assertEqual(match.span(), (4, 13))
+    self.assertIsNone(matcher.search(text, 5))
+
+  def test_same_as_expanded_regex(self):
+    rng = random.Random(0)
+    parts = ["there", "Their", "to", "too", "a", "ab", "abc", "x", " ", "-", "_", ".", "\n"]
+    for words in (["there", "to"], ["ab", "a"], ["too"], ["a", "a"]):
+      for reverse in (False, True):
+        matcher = _make_matcher(words, reverse)
+        regex = re.compile(matcher.pattern, re.IGNORECASE)
+        for _ in range(200):
+          text = "".join(rng.choice(parts) for _ in range(rng.randint(0, 20)))
+          pos = rng.randint(0, len(text))
+          expected = regex.search(text, pos)
+          match = matcher.search(text, pos)
+          self.assertEqual(None if match is None else match.span(),
+                           None if expected is None else expected.span())
+
+  def test_long_token(self):
+    text = "x" * 100_000 + "there" + "x" * 100_000
+    matcher = _make_matcher(["there"])
+    match = matcher.search(text)
+    assert match is not None
+    self.assertEqual(match.span(), (0, len(text)))
+    self.assertIsNone(_make_matcher(["to"]).search(text))
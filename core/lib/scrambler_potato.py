@@ -1,10 +1,14 @@
 """Support for Scrambler's potato mode, where only simple input commands are available for accessing
 and modifying text. Potato mode is used in editors where accessibility APIs do not work."""
 
+import bisect
 from dataclasses import dataclass
 from enum import Enum, unique
+import heapq
+from typing import Optional
 from .scrambler_types import Context, EditorAction, EditorActionType, TextRange
-from .scrambler_sim import simulate_actions
+from .scrambler_sim import simulate_actions_in_buffer
+from .scrambler_text_buffer import TextBuffer
 
 
 @unique
@@ -48,32 +52,433 @@ class PotatoEditorAction:
   repeat: int = 1
 
 
-def _move_before_text(text: str) -> list[PotatoEditorAction]:
-  """Generate actions to move before the given text."""
-  # TODO: Smarter navigation (by word, by line if word wrap disabled, etc.). Navigation by word is
-  # difficult because it works differently in different editors (e.g. handling of line ends and
-  # punctuation characters).
-  return [PotatoEditorAction(PotatoEditorActionType.GO_LEFT, repeat=len(text))]
+# Keys of potato actions that can be pressed repeatedly in a single key call, e.g. "left:37". Matches
+# the default implementations of the corresponding user actions. Line start and end are left out, as
+# some apps override them with key sequences and they are never repeated.
+_BATCHABLE_KEYS_BY_TYPE = {
+    PotatoEditorActionType.CLEAR: "backspace",
+    PotatoEditorActionType.GO_UP: "up",
+    PotatoEditorActionType.GO_DOWN: "down",
+    PotatoEditorActionType.GO_LEFT: "left",
+    PotatoEditorActionType.GO_RIGHT: "right",
+    PotatoEditorActionType.GO_WORD_LEFT: "alt-left",
+    PotatoEditorActionType.GO_WORD_RIGHT: "alt-right",
+    PotatoEditorActionType.EXTEND_UP: "shift-up",
+    PotatoEditorActionType.EXTEND_DOWN: "shift-down",
+    PotatoEditorActionType.EXTEND_LEFT: "shift-left",
+    PotatoEditorActionType.EXTEND_RIGHT: "shift-right",
+    PotatoEditorActionType.EXTEND_WORD_LEFT: "shift-alt-left",
+    PotatoEditorActionType.EXTEND_WORD_RIGHT: "shift-alt-right",
+}
 
 
-def _move_after_text(text: str) -> list[PotatoEditorAction]:
-  """Generate actions to move before the given text."""
-  # TODO: Smarter navigation (by word, by line if word wrap disabled, etc.). Navigation by word is
-  # difficult because it works differently in different editors (e.g. handling of line ends and
-  # punctuation characters).
-  return [PotatoEditorAction(PotatoEditorActionType.GO_RIGHT, repeat=len(text))]
+def get_batched_keys(action: PotatoEditorAction, max_batch_size: int) -> Optional[list[str]]:
+  """Gets key calls that press the key of a repeated action in batches of at most `max_batch_size`
+  presses, e.g. ["left:50", "left:12"]. Returns None if the action cannot be batched, in which case
+  it should be performed once per repetition."""
+  key = _BATCHABLE_KEYS_BY_TYPE.get(action.action_type)
+  if key is None or action.repeat < 2 or max_batch_size < 2:
+    return None
+  result: list[str] = []
+  remaining = action.repeat
+  while remaining > 0:
+    batch_size = min(remaining, max_batch_size)
+    result.append(key if batch_size == 1 else f"{key}:{batch_size}")
+    remaining -= batch_size
+  return result
+
+
+@dataclass(frozen=True)
+class PotatoProfile:
+  """How navigation keys behave in an editor. The navigation planner only uses the motions enabled
+  here, so the default profile moves by character only."""
+  # Whether GO_LINE_START and GO_LINE_END move to the start and end of a line in the text. Must be
+  # false if the editor wraps lines, as the keys then move to the start and end of the visual line.
+  line_motions: bool = False
+  # Whether GO_LINE_START first moves to the end of the indentation ("smart home").
+  line_start_skips_indentation: bool = False
+  # Whether GO_UP and GO_DOWN move by lines in the text, keeping the column where vertical movement
+  # started, clamped to the line length. Must be false if the editor wraps lines or uses a
+  # proportional font.
+  vertical_motions: bool = False
+  # Whether GO_WORD_LEFT and GO_WORD_RIGHT are used. Word motions skip whitespace, then move over a
+  # run of word characters.
+  word_motions: bool = False
+  # Whether runs of punctuation are stops for word motions, like words. Otherwise punctuation is
+  # skipped like whitespace.
+  punctuation_is_word: bool = False
+  # Whether word motions stop at line ends. A word motion from a line end then only crosses the
+  # line break.
+  word_motion_stops_at_line_end: bool = False
+
+
+# Only moves by character. Safe in any editor.
+CHARACTER_PROFILE = PotatoProfile()
+
+# CodeMirror, e.g. in Obsidian. Lines are usually wrapped, so only word motions are used.
+CODEMIRROR_PROFILE = PotatoProfile(word_motions=True,
+                                   punctuation_is_word=True,
+                                   word_motion_stops_at_line_end=True)
+
+# Character categories for word motions.
+_SPACE = 0
+_WORD = 1
+_PUNCTUATION = 2
+
+
+def _char_category(c: str, profile: PotatoProfile) -> int:
+  if c.isspace():
+    return _SPACE
+  if c.isalnum() or c == "_":
+    return _WORD
+  return _PUNCTUATION if profile.punctuation_is_word else _SPACE
+
+
+def _is_word_motion_barrier(c: str, profile: PotatoProfile) -> bool:
+  return profile.word_motion_stops_at_line_end and c == "\n"
+
+
+# Motions return the new cursor position, or None if it depends on text outside of the given text.
+# The given text is only the context around the cursor, so a motion that reaches either end of it
+# may continue further in the editor.
+
+
+def _word_right(text: str, pos: int, profile: PotatoProfile) -> Optional[int]:
+  if pos >= len(text):
+    return None
+  if _is_word_motion_barrier(text[pos], profile):
+    return pos + 1
+  i = pos
+  while (i < len(text) and _char_category(text[i], profile) == _SPACE and
+         not _is_word_motion_barrier(text[i], profile)):
+    i += 1
+  if i >= len(text):
+    return None
+  if _is_word_motion_barrier(text[i], profile):
+    return i
+  category = _char_category(text[i], profile)
+  while i < len(text) and _char_category(text[i], profile) == category:
+    i += 1
+  return i if i < len(text) else None
+
+
+def _word_left(text: str, pos: int, profile: PotatoProfile) -> Optional[int]:
+  if pos <= 0:
+    return None
+  if _is_word_motion_barrier(text[pos - 1], profile):
+    return pos - 1
+  i = pos
+  while (i > 0 and _char_category(text[i - 1], profile) == _SPACE and
+         not _is_word_motion_barrier(text[i - 1], profile)):
+    i -= 1
+  if i <= 0:
+    return None
+  if _is_word_motion_barrier(text[i - 1], profile):
+    return i
+  category = _char_category(text[i - 1], profile)
+  while i > 0 and _char_category(text[i - 1], profile) == category:
+    i -= 1
+  return i if i > 0 else None
 
 
-def _select_text(text: str) -> list[PotatoEditorAction]:
-  """Generate actions to select the given text."""
-  # TODO: Smarter navigation (by word, by line if word wrap disabled, etc.). Navigation by word is
-  # difficult because it works differently in different editors (e.g. handling of line ends and
-  # punctuation characters).
-  return [PotatoEditorAction(PotatoEditorActionType.EXTEND_RIGHT, repeat=len(text))]
+def _line_start(text: str, pos: int, profile: PotatoProfile) -> Optional[int]:
+  start = text.rfind("\n", 0, pos) + 1
+  if start == 0:
+    return None
+  if profile.line_start_skips_indentation:
+    indentation_end = start
+    while indentation_end < len(text) and text[indentation_end] in " \t":
+      indentation_end += 1
+    if indentation_end > start and pos != indentation_end:
+      return indentation_end
+  return start
 
 
-def _convert_set_selection_range(set_selection: TextRange, curr_text: str,
-                                 curr_selection: TextRange) -> list[PotatoEditorAction]:
+def _line_end(text: str, pos: int) -> Optional[int]:
+  end = text.find("\n", pos)
+  return None if end == -1 else end
+
+
+class _Lines:
+  """Line starts of a text, for vertical motions. The first and last lines may continue outside of
+  the text, so their column and length are unknown."""
+
+  def __init__(self, text: str):
+    self.starts = [0] + [i + 1 for i, c in enumerate(text) if c == "\n"]
+
+  def index(self, pos: int) -> int:
+    return bisect.bisect_right(self.starts, pos) - 1
+
+  def is_complete(self, index: int) -> bool:
+    return 0 < index < len(self.starts) - 1
+
+  def length(self, index: int) -> int:
+    return self.starts[index + 1] - 1 - self.starts[index]
+
+  def column(self, pos: int) -> Optional[int]:
+    index = self.index(pos)
+    return pos - self.starts[index] if index > 0 else None
+
+  def move(self, column: int, index: int) -> Optional[int]:
+    """Gets the position for a vertical motion to the given line."""
+    if not self.is_complete(index):
+      return None
+    return self.starts[index] + min(column, self.length(index))
+
+
+class PotatoEmulator:
+  """Emulates an editor in potato mode that behaves as described by a profile. Used to verify
+  navigation plans. Raises ValueError for actions whose result depends on text outside of the
+  emulated text, or that use motions the profile does not enable."""
+
+  def __init__(self, text: str, selection_range: TextRange, profile: PotatoProfile):
+    self.text = text
+    self.profile = profile
+    self.clipboard = ""
+    self._anchor = selection_range.start
+    self._cursor = selection_range.end
+    # Column kept across consecutive vertical motions.
+    self._goal_column: Optional[int] = None
+
+  @property
+  def selection_range(self) -> TextRange:
+    return TextRange(min(self._anchor, self._cursor), max(self._anchor, self._cursor))
+
+  def apply(self, actions: list[PotatoEditorAction]):
+    for action in actions:
+      for _ in range(action.repeat):
+        self._apply_once(action)
+
+  def _apply_once(self, action: PotatoEditorAction):
+    action_type = action.action_type
+    if action_type == PotatoEditorActionType.INSERT_TEXT:
+      self._replace_selection(action.text)
+    elif action_type in (PotatoEditorActionType.SET_CLIPBOARD_WITH_HISTORY,
+                         PotatoEditorActionType.SET_CLIPBOARD_NO_HISTORY):
+      self.clipboard = action.text
+    elif action_type == PotatoEditorActionType.CLEAR:
+      if self._anchor == self._cursor:
+        if self._cursor == 0:
+          raise ValueError("Clear at start of text")
+        self._anchor -= 1
+      self._replace_selection("")
+    elif action_type in _MOTIONS_BY_GO_ACTION:
+      selection = self.selection_range
+      if action_type == PotatoEditorActionType.GO_LEFT and selection.length() > 0:
+        self._set_cursor(selection.start, False)
+      elif action_type == PotatoEditorActionType.GO_RIGHT and selection.length() > 0:
+        self._set_cursor(selection.end, False)
+      else:
+        self._move(_MOTIONS_BY_GO_ACTION[action_type], False)
+    elif action_type in _MOTIONS_BY_EXTEND_ACTION:
+      self._move(_MOTIONS_BY_EXTEND_ACTION[action_type], True)
+    else:
+      raise ValueError(f"Unrecognized potato action type: {action_type}")
+
+  def _replace_selection(self, text: str):
+    selection = self.selection_range
+    self.text = self.text[:selection.start] + text + self.text[selection.end:]
+    self._set_cursor(selection.start + len(text), False)
+
+  def _set_cursor(self, pos: int, extend: bool):
+    self._cursor = pos
+    self._goal_column = None
+    if not extend:
+      self._anchor = pos
+
+  def _move(self, motion: "_Motion", extend: bool):
+    goal_column = None
+    if motion in (_Motion.UP, _Motion.DOWN):
+      lines = _Lines(self.text)
+      goal_column = self._goal_column
+      if goal_column is None:
+        goal_column = lines.column(self._cursor)
+      if goal_column is None or not self.profile.vertical_motions:
+        raise ValueError(f"Unsupported motion: {motion}")
+      line_delta = -1 if motion == _Motion.UP else 1
+      pos = lines.move(goal_column, lines.index(self._cursor) + line_delta)
+    else:
+      pos = _apply_motion(self.text, self._cursor, motion, self.profile)
+    if pos is None:
+      raise ValueError(f"Unsupported motion: {motion}")
+    self._set_cursor(pos, extend)
+    self._goal_column = goal_column
+
+
+@unique
+class _Motion(Enum):
+  LEFT = 1
+  RIGHT = 2
+  WORD_LEFT = 3
+  WORD_RIGHT = 4
+  LINE_START = 5
+  LINE_END = 6
+  UP = 7
+  DOWN = 8
+
+
+_MOTIONS_BY_GO_ACTION = {
+    PotatoEditorActionType.GO_LEFT: _Motion.LEFT,
+    PotatoEditorActionType.GO_RIGHT: _Motion.RIGHT,
+    PotatoEditorActionType.GO_WORD_LEFT: _Motion.WORD_LEFT,
+    PotatoEditorActionType.GO_WORD_RIGHT: _Motion.WORD_RIGHT,
+    PotatoEditorActionType.GO_LINE_START: _Motion.LINE_START,
+    PotatoEditorActionType.GO_LINE_END: _Motion.LINE_END,
+    PotatoEditorActionType.GO_UP: _Motion.UP,
+    PotatoEditorActionType.GO_DOWN: _Motion.DOWN,
+}
+_MOTIONS_BY_EXTEND_ACTION = {
+    PotatoEditorActionType.EXTEND_LEFT: _Motion.LEFT,
+    PotatoEditorActionType.EXTEND_RIGHT: _Motion.RIGHT,
+    PotatoEditorActionType.EXTEND_WORD_LEFT: _Motion.WORD_LEFT,
+    PotatoEditorActionType.EXTEND_WORD_RIGHT: _Motion.WORD_RIGHT,
+    PotatoEditorActionType.EXTEND_LINE_START: _Motion.LINE_START,
+    PotatoEditorActionType.EXTEND_LINE_END: _Motion.LINE_END,
+    PotatoEditorActionType.EXTEND_UP: _Motion.UP,
+    PotatoEditorActionType.EXTEND_DOWN: _Motion.DOWN,
+}
+_GO_ACTIONS_BY_MOTION = {motion: action for action, motion in _MOTIONS_BY_GO_ACTION.items()}
+_EXTEND_ACTIONS_BY_MOTION = {motion: action for action, motion in _MOTIONS_BY_EXTEND_ACTION.items()}
+_VERTICAL_ACTIONS = (PotatoEditorActionType.GO_UP, PotatoEditorActionType.GO_DOWN,
+                     PotatoEditorActionType.EXTEND_UP, PotatoEditorActionType.EXTEND_DOWN)
+
+
+def _apply_motion(text: str, pos: int, motion: _Motion, profile: PotatoProfile) -> Optional[int]:
+  """Applies a horizontal motion. Returns None if the result is unknown or the profile does not
+  enable the motion."""
+  if motion == _Motion.LEFT:
+    return pos - 1 if pos > 0 else None
+  if motion == _Motion.RIGHT:
+    return pos + 1 if pos < len(text) else None
+  if motion in (_Motion.WORD_LEFT, _Motion.WORD_RIGHT):
+    if not profile.word_motions:
+      return None
+    if motion == _Motion.WORD_LEFT:
+      return _word_left(text, pos, profile)
+    return _word_right(text, pos, profile)
+  if not profile.line_motions:
+    return None
+  if motion == _Motion.LINE_START:
+    return _line_start(text, pos, profile)
+  if motion == _Motion.LINE_END:
+    return _line_end(text, pos)
+  return None
+
+
+def _plan_character_motion(start: int, target: int, extend: bool) -> list[PotatoEditorAction]:
+  if start == target:
+    return []
+  motion = _Motion.LEFT if target < start else _Motion.RIGHT
+  actions_by_motion = _EXTEND_ACTIONS_BY_MOTION if extend else _GO_ACTIONS_BY_MOTION
+  return [PotatoEditorAction(actions_by_motion[motion], repeat=abs(target - start))]
+
+
+def _find_cheapest_motions(text: str, start: int, target: int, profile: PotatoProfile,
+                           after_vertical: bool,
+                           max_cost: int) -> Optional[list[tuple[_Motion, int]]]:
+  """Finds the cheapest sequence of motions from `start` to `target` that costs less than
+  `max_cost`. Every key press costs one. `after_vertical` is whether the cursor got to `start` with
+  a vertical motion. Returns a list of motions and their repeat counts, or None if there is no such
+  sequence."""
+  lines = _Lines(text)
+  target_line = lines.index(target)
+  horizontal_motions = [_Motion.LEFT, _Motion.RIGHT]
+  if profile.word_motions:
+    horizontal_motions += [_Motion.WORD_LEFT, _Motion.WORD_RIGHT]
+  if profile.line_motions:
+    horizontal_motions += [_Motion.LINE_START, _Motion.LINE_END]
+
+  # Dijkstra's algorithm over (position, whether the last motion was vertical). Vertical motions are
+  # only planned straight to the target line, as a single step repeated once per line. Consecutive
+  # vertical steps are never needed and would share a goal column.
+  start_state = (start, after_vertical)
+  costs = {start_state: 0}
+  previous: dict[tuple[int, bool], tuple[tuple[int, bool], _Motion, int]] = {}
+  queue = [(0, start, after_vertical)]
+  while queue:
+    cost, pos, after_vertical = heapq.heappop(queue)
+    state = (pos, after_vertical)
+    if cost > costs[state]:
+      continue
+    if pos == target:
+      result: list[tuple[_Motion, int]] = []
+      while state != start_state:
+        state, motion, repeat = previous[state]
+        result.append((motion, repeat))
+      result.reverse()
+      return result
+
+    steps: list[tuple[int, bool, _Motion, int]] = []
+    for motion in horizontal_motions:
+      next_pos = _apply_motion(text, pos, motion, profile)
+      if next_pos is not None:
+        steps.append((next_pos, False, motion, 1))
+    if profile.vertical_motions and not after_vertical:
+      line = lines.index(pos)
+      column = lines.column(pos)
+      if column is not None and line != target_line:
+        next_pos = lines.move(column, target_line)
+        if next_pos is not None:
+          motion = _Motion.UP if target_line < line else _Motion.DOWN
+          steps.append((next_pos, True, motion, abs(target_line - line)))
+
+    for next_pos, next_after_vertical, motion, repeat in steps:
+      next_state = (next_pos, next_after_vertical)
+      next_cost = cost + repeat
+      if next_cost < max_cost and next_cost < costs.get(next_state, max_cost):
+        costs[next_state] = next_cost
+        previous[next_state] = (state, motion, repeat)
+        heapq.heappush(queue, (next_cost, next_pos, next_after_vertical))
+  return None
+
+
+def _ends_with_vertical_motion(actions: list[PotatoEditorAction]) -> bool:
+  """Whether the given actions end with a vertical motion. Editors keep the goal column of a
+  vertical motion for the next one, so planning must not start with one."""
+  return len(actions) > 0 and actions[-1].action_type in _VERTICAL_ACTIONS
+
+
+def _plan_motion(buffer: TextBuffer, start: int, target: int, profile: PotatoProfile, extend: bool,
+                 after_vertical: bool) -> list[PotatoEditorAction]:
+  """Plans the cheapest key presses that move the cursor from `start` to `target`, or extend the
+  selection if `extend` is set. `after_vertical` is whether the previous action was a vertical
+  motion. Falls back to moving by character if no cheaper plan is found, or if the plan does not
+  reach the target when emulated."""
+  character_plan = _plan_character_motion(start, target, extend)
+  if start == target or profile == CHARACTER_PROFILE:
+    return character_plan
+  text = str(buffer)
+  motions = _find_cheapest_motions(text, start, target, profile, after_vertical,
+                                   abs(target - start))
+  if motions is None:
+    return character_plan
+
+  # Merge consecutive motions of the same type.
+  actions_by_motion = _EXTEND_ACTIONS_BY_MOTION if extend else _GO_ACTIONS_BY_MOTION
+  result: list[PotatoEditorAction] = []
+  for motion, repeat in motions:
+    action_type = actions_by_motion[motion]
+    if result and result[-1].action_type == action_type:
+      result[-1].repeat += repeat
+    else:
+      result.append(PotatoEditorAction(action_type, repeat=repeat))
+
+  emulator = PotatoEmulator(text, TextRange(start, start), profile)
+  try:
+    emulator.apply(result)
+  except ValueError:
+    return character_plan
+  expected_selection = TextRange(target, target)
+  if extend:
+    expected_selection = TextRange(min(start, target), max(start, target))
+  if emulator.selection_range != expected_selection:
+    return character_plan
+  return result
+
+
+def _convert_set_selection_range(set_selection: TextRange, curr_text: TextBuffer,
+                                 curr_selection: TextRange, profile: PotatoProfile,
+                                 after_vertical: bool) -> list[PotatoEditorAction]:
   """Converts selection range command to potato mode."""
   result: list[PotatoEditorAction] = []
 
@@ -93,20 +498,20 @@ def _convert_set_selection_range(set_selection: TextRange, curr_text: str,
       result.append(PotatoEditorAction(PotatoEditorActionType.GO_LEFT))
 
   # Move to start of selection.
-  if set_selection.start < cursor_pos:
-    result.extend(_move_before_text(curr_text[set_selection.start:cursor_pos]))
-  elif set_selection.start > cursor_pos:
-    result.extend(_move_after_text(curr_text[cursor_pos:set_selection.start]))
+  result.extend(
+      _plan_motion(curr_text, cursor_pos, set_selection.start, profile, False, after_vertical and
+                   not result))
 
   # Select until end.
-  if set_selection.end > set_selection.start:
-    result.extend(_select_text(curr_text[set_selection.start:set_selection.end]))
+  result.extend(
+      _plan_motion(curr_text, set_selection.start, set_selection.end, profile, True,
+                   _ends_with_vertical_motion(result)))
 
   return result
 
 
-def _convert_delete_range(delete_range: TextRange, curr_text: str,
-                          curr_selection: TextRange) -> list[PotatoEditorAction]:
+def _convert_delete_range(delete_range: TextRange, curr_text: TextBuffer, curr_selection: TextRange,
+                          profile: PotatoProfile, after_vertical: bool) -> list[PotatoEditorAction]:
   """Converts delete range command to potato mode."""
   result: list[PotatoEditorAction] = []
 
@@ -120,10 +525,9 @@ def _convert_delete_range(delete_range: TextRange, curr_text: str,
       result.append(PotatoEditorAction(PotatoEditorActionType.GO_LEFT))
 
   # Move to end of range.
-  if delete_range.end < cursor_pos:
-    result.extend(_move_before_text(curr_text[delete_range.end:cursor_pos]))
-  elif delete_range.end > cursor_pos:
-    result.extend(_move_after_text(curr_text[cursor_pos:delete_range.end]))
+  result.extend(
+      _plan_motion(curr_text, cursor_pos, delete_range.end, profile, False, after_vertical and
+                   not result))
 
   # Select until end.
   if delete_range.end > delete_range.start:
@@ -135,13 +539,19 @@ def _convert_delete_range(delete_range: TextRange, curr_text: str,
   return result
 
 
-def convert_actions_to_potato_mode(actions: list[EditorAction], text: str,
-                                   selection_range: TextRange) -> list[PotatoEditorAction]:
-  """Converts editor actions to the equivalent potato mode actions."""
-  curr_text = text
-  curr_selection = selection_range
+def convert_actions_to_potato_mode(
+    actions: list[EditorAction],
+    text: str,
+    selection_range: TextRange,
+    profile: PotatoProfile = CHARACTER_PROFILE) -> list[PotatoEditorAction]:
+  """Converts editor actions to the equivalent potato mode actions. Navigation only uses the motions
+  enabled in the given editor profile."""
+  # Only materialize the text when planning navigation needs it.
+  curr_text = TextBuffer(text)
+  context = Context(text, selection_range)
   result: list[PotatoEditorAction] = []
   for action in actions:
+    curr_selection = context.selection_range
     if action.action_type == EditorActionType.INSERT_TEXT:
       result.append(PotatoEditorAction(PotatoEditorActionType.INSERT_TEXT, action.text))
     elif action.action_type == EditorActionType.SET_CLIPBOARD_NO_HISTORY:
@@ -153,17 +563,27 @@ def convert_actions_to_potato_mode(actions: list[EditorAction], text: str,
     elif action.action_type == EditorActionType.SET_SELECTION_RANGE:
       if action.text_range is None:
         raise ValueError("Set selection range action has no range")
-      result.extend(_convert_set_selection_range(action.text_range, curr_text, curr_selection))
+      result.extend(
+          _convert_set_selection_range(action.text_range, curr_text, curr_selection, profile,
+                                       _ends_with_vertical_motion(result)))
     elif action.action_type == EditorActionType.DELETE_RANGE:
       if action.text_range is None:
         raise ValueError("Delete range action has no range")
-      result.extend(_convert_delete_range(action.text_range, curr_text, curr_selection))
+      result.extend(
+          _convert_delete_range(action.text_range, curr_text, curr_selection, profile,
+                                _ends_with_vertical_motion(result)))
+    elif action.action_type == EditorActionType.REPLACE_RANGE:
+      if action.text_range is None:
+        raise ValueError("Replace range action has no range")
+      # Select the range and type over it.
+      result.extend(
+          _convert_set_selection_range(action.text_range, curr_text, curr_selection, profile,
+                                       _ends_with_vertical_motion(result)))
+      result.append(PotatoEditorAction(PotatoEditorActionType.INSERT_TEXT, action.text))
     else:
       raise ValueError(f"Unrecognized editor action type: {action.action_type}")
 
-    # Update current state to simulate the action.
-    context = Context(curr_text, curr_selection)
-    simulate_actions(context, [action])
-    curr_text = context.text
-    curr_selection = context.selection_range
+    # Update current state to simulate the action. The buffer holds the text, so `context.text` is
+    # left as the original text.
+    simulate_actions_in_buffer(curr_text, context, [action])
   return result
@@ -0,0 +1,194 @@
+"""Sizing and caching of the text fetched around the cursor in potato mode. Fetching text in potato
+mode takes several selections and clipboard round trips, so commands fetch as few lines as their
+modifiers need and reuse the text from the previous command when the editor has not changed."""
+
+import copy
+from dataclasses import dataclass
+from enum import Enum, unique
+from typing import Any, Optional, Sequence
+from .scrambler_types import Context, Modifier, ModifierType
+
+
+@dataclass(frozen=True)
+class PotatoWindow:
+  """Number of lines to fetch before and after the cursor in potato mode."""
+  lines_before: int
+  lines_after: int
+
+  def covers(self, other: "PotatoWindow") -> bool:
+    """Whether this window includes all lines of the other window."""
+    return self.lines_before >= other.lines_before and self.lines_after >= other.lines_after
+
+
+# Largest window. Used for modifiers that may need many lines, such as scopes.
+FULL_WINDOW = PotatoWindow(25, 10)
+
+# Window for targets that are usually on a nearby line. Symmetric so that CLOSEST modifiers see as
+# much text on both sides of the cursor.
+_NEARBY_WINDOW = PotatoWindow(3, 3)
+
+# Window for targets that may span a few lines.
+_MULTI_LINE_WINDOW = PotatoWindow(10, 10)
+
+# Windows for modifier types. Types not listed here use the full window.
+_WINDOWS_BY_MODIFIER_TYPE = {
+    ModifierType.TOKEN_NEXT: _NEARBY_WINDOW,
+    ModifierType.TOKEN_PREVIOUS: _NEARBY_WINDOW,
+    ModifierType.WORD_SUBSTRING_CLOSEST: _NEARBY_WINDOW,
+    ModifierType.WORD_SUBSTRING_NEXT: _NEARBY_WINDOW,
+    ModifierType.WORD_SUBSTRING_PREVIOUS: _NEARBY_WINDOW,
+    ModifierType.EXACT_WORD_CLOSEST: _NEARBY_WINDOW,
+    ModifierType.EXACT_WORD_NEXT: _NEARBY_WINDOW,
+    ModifierType.EXACT_WORD_PREVIOUS: _NEARBY_WINDOW,
+    ModifierType.PHRASE_CLOSEST: _NEARBY_WINDOW,
+    ModifierType.PHRASE_NEXT: _NEARBY_WINDOW,
+    ModifierType.PHRASE_PREVIOUS: _NEARBY_WINDOW,
+    ModifierType.START_OF_LINE: _NEARBY_WINDOW,
+    ModifierType.END_OF_LINE: _NEARBY_WINDOW,
+    ModifierType.BETWEEN_WHITESPACE: _NEARBY_WINDOW,
+    ModifierType.LINE_INCLUDING_LINE_BREAK: _NEARBY_WINDOW,
+    ModifierType.LINE_EXCLUDING_LINE_BREAK: _NEARBY_WINDOW,
+    ModifierType.COMMENT: _MULTI_LINE_WINDOW,
+    ModifierType.ARGUMENT: _MULTI_LINE_WINDOW,
+    ModifierType.ARGUMENT_FIRST: _MULTI_LINE_WINDOW,
+    ModifierType.ARGUMENT_NEXT: _MULTI_LINE_WINDOW,
+    ModifierType.ARGUMENT_PREVIOUS: _MULTI_LINE_WINDOW,
+    ModifierType.FUNCTION_CALL: _MULTI_LINE_WINDOW,
+    ModifierType.FUNCTION_CALL_NEXT: _MULTI_LINE_WINDOW,
+    ModifierType.FUNCTION_CALL_PREVIOUS: _MULTI_LINE_WINDOW,
+    ModifierType.STRING: _MULTI_LINE_WINDOW,
+    ModifierType.STRING_FIRST: _MULTI_LINE_WINDOW,
+    ModifierType.STRING_NEXT: _MULTI_LINE_WINDOW,
+    ModifierType.STRING_PREVIOUS: _MULTI_LINE_WINDOW,
+    ModifierType.SENTENCE: _MULTI_LINE_WINDOW,
+    ModifierType.SENTENCE_NEXT: _MULTI_LINE_WINDOW,
+    ModifierType.SENTENCE_PREVIOUS: _MULTI_LINE_WINDOW,
+    ModifierType.SENTENCE_CLAUSE: _MULTI_LINE_WINDOW,
+    ModifierType.BRACKETS: _MULTI_LINE_WINDOW,
+    ModifierType.BRACKETS_FIRST: _MULTI_LINE_WINDOW,
+    ModifierType.BRACKETS_NEXT: _MULTI_LINE_WINDOW,
+    ModifierType.BRACKETS_PREVIOUS: _MULTI_LINE_WINDOW,
+    ModifierType.MARKDOWN_LINK: _MULTI_LINE_WINDOW,
+}
+
+# Cached contexts older than this are never used.
+_MAX_AGE_SECONDS = 10.0
+
+
+def get_potato_window(modifiers: Sequence[Modifier]) -> PotatoWindow:
+  """Gets the window to fetch for a command with the given modifiers. Repeated modifiers move
+  further from the cursor, so they use the full window."""
+  if not modifiers:
+    return FULL_WINDOW
+  lines_before = 0
+  lines_after = 0
+  for modifier in modifiers:
+    window = _WINDOWS_BY_MODIFIER_TYPE.get(modifier.modifier_type, FULL_WINDOW)
+    if modifier.repeat > 1:
+      window = FULL_WINDOW
+    lines_before = max(lines_before, window.lines_before)
+    lines_after = max(lines_after, window.lines_after)
+  return PotatoWindow(lines_before, lines_after)
+
+
+def expand_potato_window(window: PotatoWindow) -> Optional[PotatoWindow]:
+  """Gets a larger window to retry with when a command finds no match in the given window. Returns
+  None if the window is already the full window."""
+  if window.covers(FULL_WINDOW):
+    return None
+  return PotatoWindow(max(window.lines_before, FULL_WINDOW.lines_before),
+                      max(window.lines_after, FULL_WINDOW.lines_after))
+
+
+def get_context_window(context: Context) -> PotatoWindow:
+  """Gets the number of full lines before and after the selection in a potato mode context."""
+  return PotatoWindow(context.text.count("\n", 0, context.selection_range.start),
+                      context.text.count("\n", context.selection_range.end))
+
+
+@unique
+class PotatoValidation(Enum):
+  """Text to read from the editor to check that a cached context is still valid."""
+  # The selected text.
+  SELECTED_TEXT = 1
+  # The text from the start of the previous line to the cursor. Editors may stop at the end of the
+  # indentation, so only a suffix of it may be read. It must include the line break and occur only
+  # once in the cached text, as many lines start the same way, e.g. with `self.`.
+  LINES_BEFORE_CURSOR = 2
+
+
+class PotatoContextCache:
+  """Holds the potato mode context after the last command, along with the editor it belongs to. The
+  editor is identified by an arbitrary key, e.g. the active window."""
+
+  def __init__(self, max_age_seconds: float = _MAX_AGE_SECONDS):
+    self.max_age_seconds = max_age_seconds
+    self.hits = 0
+    self.misses = 0
+    self._context: Optional[Context] = None
+    self._editor_key: Any = None
+    self._stored_at = 0.0
+
+  def store(self, context: Context, editor_key: Any, now: float):
+    """Caches a copy of the given context. Should be called after the context has been updated to
+    reflect all actions performed in the editor."""
+    self._context = copy.copy(context)
+    self._editor_key = editor_key
+    self._stored_at = now
+
+  def invalidate(self):
+    self._context = None
+    self._editor_key = None
+
+  def _get_expected_text(self, validation: PotatoValidation) -> str:
+    assert self._context is not None
+    text = self._context.text
+    selection = self._context.selection_range
+    if validation == PotatoValidation.SELECTED_TEXT:
+      return selection.extract(text)
+    line_start = text.rfind("\n", 0, selection.start)
+    if line_start < 0:
+      return ""
+    return text[text.rfind("\n", 0, line_start) + 1:selection.start]
+
+  def validation(self, editor_key: Any, window: PotatoWindow,
+                 now: float) -> Optional[PotatoValidation]:
+    """Gets the text that must be read to validate the cached context for a command that needs the
+    given window. Returns None if the cache cannot be used, without needing to read any text."""
+    if (self._context is None or editor_key != self._editor_key or
+        now - self._stored_at > self.max_age_seconds or
+        not get_context_window(self._context).covers(window)):
+      return None
+    validation = PotatoValidation.LINES_BEFORE_CURSOR
+    if self._context.selection_range.length() > 0:
+      validation = PotatoValidation.SELECTED_TEXT
+    expected_text = self._get_expected_text(validation)
+    # Empty text cannot tell whether the editor changed.
+    if not expected_text.strip():
+      return None
+    # Lines that occur more than once cannot tell whether the cursor moved between them.
+    if (validation == PotatoValidation.LINES_BEFORE_CURSOR and
+        self._context.text.count(expected_text) > 1):
+      return None
+    return validation
+
+  def lookup(self, editor_key: Any, window: PotatoWindow, validation_text: Optional[str],
+             now: float) -> Optional[Context]:
+    """Gets the cached context if it is still valid. `validation_text` is the text read from the
+    editor for `validation`. Returns a copy, so callers may modify the result."""
+    validation = self.validation(editor_key, window, now)
+    if validation is None or validation_text is None or not validation_text.strip():
+      self.misses += 1
+      return None
+    expected_text = self._get_expected_text(validation)
+    if validation == PotatoValidation.SELECTED_TEXT:
+      valid = validation_text == expected_text
+    else:
+      assert self._context is not None
+      valid = ("\n" in validation_text and expected_text.endswith(validation_text) and
+               self._context.text.count(validation_text) == 1)
+    if not valid:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return copy.copy(self._context)
@@ -0,0 +1,89 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from .scrambler_potato_context import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_types import TextRange
+
+# Four lines before the cursor and four lines after it.
+_TEXT = "a\nb\nc\nd\nThe quick brown fox\ne\nf\ng\nh"
+
+
+class PotatoWindowTestCase(unittest.TestCase):
+
+  def test_get_window(self):
+    self.assertEqual(get_potato_window([Modifier(ModifierType.TOKEN_NEXT)]), PotatoWindow(3, 3))
+    self.assertEqual(
+        get_potato_window([Modifier(ModifierType.TOKEN_NEXT),
+                           Modifier(ModifierType.STRING)]), PotatoWindow(10, 10))
+    self.assertEqual(get_potato_window([Modifier(ModifierType.PYTHON_SCOPE)]), FULL_WINDOW)
+    self.assertEqual(get_potato_window([Modifier(ModifierType.TOKEN_NEXT, repeat=3)]), FULL_WINDOW)
+    self.assertEqual(get_potato_window([]), FULL_WINDOW)
+
+  def test_expand_window(self):
+    self.assertEqual(expand_potato_window(PotatoWindow(3, 3)), FULL_WINDOW)
+    self.assertEqual(expand_potato_window(PotatoWindow(10, 20)), PotatoWindow(25, 20))
+    self.assertIsNone(expand_potato_window(FULL_WINDOW))
+
+  def test_context_window(self):
+    self.assertEqual(get_context_window(Context(_TEXT, TextRange(12, 17))), PotatoWindow(4, 4))
+
+
+class PotatoContextCacheTestCase(unittest.TestCase):
+
+  def test_hit(self):
+    cache = PotatoContextCache()
+    cache.store(Context(_TEXT, TextRange(12, 12)), "editor", 0.0)
+    self.assertEqual(cache.validation("editor", PotatoWindow(3, 3), 1.0),
+                     PotatoValidation.LINES_BEFORE_CURSOR)
+    context = cache.lookup("editor", PotatoWindow(3, 3), "d\nThe ", 1.0)
+    assert context is not None
+    self.assertEqual(context.text, _TEXT)
+    self.assertEqual(context.selection_range, TextRange(12, 12))
+    # Editors may only select to the end of the indentation.
+    self.assertIsNotNone(cache.lookup("editor", PotatoWindow(3, 3), "\nThe ", 1.0))
+    # Without the line break, the position of the cursor is unknown.
+    self.assertIsNone(cache.lookup("editor", PotatoWindow(3, 3), "The ", 1.0))
+    self.assertEqual(cache.hits, 2)
+
+  def test_same_prefix_on_another_line(self):
+    text = "a = 1\n  self.x\nb = 2\n  self.y\nc = 3\n\n  self.z\n\n  self.w\nd"
+    cache = PotatoContextCache()
+    cursor = text.index("self.y") + len("self.")
+    cache.store(Context(text, TextRange(cursor, cursor)), "editor", 0.0)
+    self.assertIsNotNone(cache.lookup("editor", PotatoWindow(3, 3), "b = 2\n  self.", 0.0))
+    # The cursor was moved by hand to the same column of another line.
+    self.assertIsNone(cache.lookup("editor", PotatoWindow(3, 3), "a = 1\n  self.", 0.0))
+    # Suffixes that occur on other lines as well.
+    self.assertIsNone(cache.lookup("editor", PotatoWindow(3, 3), "\n  self.", 0.0))
+    # The cursor is on a line that occurs more than once, after the same line.
+    cache.store(Context(text, TextRange(text.index("z"), text.index("z"))), "editor", 0.0)
+    self.assertIsNone(cache.validation("editor", PotatoWindow(3, 3), 0.0))
+
+  def test_selected_text(self):
+    cache = PotatoContextCache()
+    cache.store(Context(_TEXT, TextRange(12, 17)), "editor", 0.0)
+    self.assertEqual(cache.validation("editor", PotatoWindow(3, 3), 0.0),
+                     PotatoValidation.SELECTED_TEXT)
+    self.assertIsNotNone(cache.lookup("editor", PotatoWindow(3, 3), "quick", 0.0))
+    self.assertIsNone(cache.lookup("editor", PotatoWindow(3, 3), "uick", 0.0))
+
+  def test_miss(self):
+    cache = PotatoContextCache(max_age_seconds=5.0)
+    self.assertIsNone(cache.validation("editor", PotatoWindow(3, 3), 0.0))
+    cache.store(Context(_TEXT, TextRange(12, 12)), "editor", 0.0)
+    # Changed text.
+    self.assertIsNone(cache.lookup("editor", PotatoWindow(3, 3), "d\nA ", 0.0))
+    # Different editor.
+    self.assertIsNone(cache.validation("other", PotatoWindow(3, 3), 0.0))
+    # Too old.
+    self.assertIsNone(cache.validation("editor", PotatoWindow(3, 3), 6.0))
+    # Window not covered by the cached text.
+    self.assertIsNone(cache.validation("editor", PotatoWindow(5, 3), 0.0))
+    self.assertEqual(cache.misses, 1)
+    cache.invalidate()
+    self.assertIsNone(cache.validation("editor", PotatoWindow(3, 3), 0.0))
+
+  def test_cannot_validate(self):
+    # The cursor is on the first line of the cached text, so there is no previous line to compare.
+    cache = PotatoContextCache()
+    cache.store(Context(_TEXT, TextRange(1, 1)), "editor", 0.0)
+    self.assertIsNone(cache.validation("editor", PotatoWindow(0, 3), 0.0))
@@ -2,6 +2,7 @@
 
 import unittest
 from .scrambler_potato import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_sim import simulate_actions
 
 
 class ConvertActionsTestCase(unittest.TestCase):
@@ -110,6 +111,24 @@ class ConvertActionsTestCase(unittest.TestCase):
             PotatoEditorAction(PotatoEditorActionType.CLEAR, repeat=2),
         ])
 
+  def test_replacement(self):
+    actions = [
+        EditorAction(EditorActionType.REPLACE_RANGE, TextRange(10, 14), "quiz"),
+    ]
+    result = convert_actions_to_potato_mode(actions, "This is a test.", TextRange(8, 9))
+    self.assertListEqual(
+        result,
+        [
+            # Collapse selection.
+            PotatoEditorAction(PotatoEditorActionType.GO_RIGHT, repeat=1),
+            # Move to start.
+            PotatoEditorAction(PotatoEditorActionType.GO_RIGHT, repeat=1),
+            # Select range.
+            PotatoEditorAction(PotatoEditorActionType.EXTEND_RIGHT, repeat=4),
+            # Type over it.
+            PotatoEditorAction(PotatoEditorActionType.INSERT_TEXT, text="quiz"),
+        ])
+
   def test_deletion_right(self):
     actions = [
         EditorAction(EditorActionType.DELETE_RANGE, TextRange(10, 14)),
@@ -125,3 +144,100 @@ class ConvertActionsTestCase(unittest.TestCase):
             # Delete range.
             PotatoEditorAction(PotatoEditorActionType.CLEAR, repeat=4),
         ])
+
+
+class PlanNavigationTestCase(unittest.TestCase):
+  """Tests for planning navigation with editor profiles."""
+
+  def _assert_plan_reaches(self, actions: list[EditorAction], text: str, selection_range: TextRange,
+                           profile: PotatoProfile):
+    result = convert_actions_to_potato_mode(actions, text, selection_range, profile)
+    context = Context(text, selection_range)
+    simulate_actions(context, actions)
+    emulator = PotatoEmulator(text, selection_range, profile)
+    emulator.apply(result)
+    self.assertEqual(emulator.text, context.text)
+    self.assertEqual(emulator.selection_range, context.selection_range)
+    return result
+
+  def test_word_motions(self):
+    text = "first\nThe quick brown.fox jumps over\nlast"
+    actions = [EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(32, 36))]
+    result = self._assert_plan_reaches(actions, text, TextRange(6, 6), CODEMIRROR_PROFILE)
+    # Moving to "over" by word and selecting it takes 8 key presses instead of 30.
+    self.assertEqual(sum(action.repeat for action in result), 8)
+    self.assertEqual(result[-1],
+                     PotatoEditorAction(PotatoEditorActionType.EXTEND_WORD_RIGHT, repeat=1))
+
+  def test_line_and_vertical_motions(self):
+    text = "first\n  short\n  a much longer line\nlast"
+    profile = PotatoProfile(line_motions=True, vertical_motions=True)
+    actions = [EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(34, 34))]
+    result = self._assert_plan_reaches(actions, text, TextRange(6, 6), profile)
+    self.assertListEqual(result, [
+        PotatoEditorAction(PotatoEditorActionType.GO_DOWN, repeat=1),
+        PotatoEditorAction(PotatoEditorActionType.GO_LINE_END, repeat=1),
+    ])
+
+  def test_vertical_motion_keeps_goal_column(self):
+    # Moving down twice keeps the original column, even though the middle line is shorter.
+    text = "first\nabcdef\nab\nabcdef\nlast"
+    emulator = PotatoEmulator(text, TextRange(11, 11), PotatoProfile(vertical_motions=True))
+    emulator.apply([PotatoEditorAction(PotatoEditorActionType.GO_DOWN, repeat=2)])
+    self.assertEqual(emulator.selection_range, TextRange(21, 21))
+
+  def test_smart_line_start(self):
+    text = "first\n    indented\nlast"
+    profile = PotatoProfile(line_motions=True, line_start_skips_indentation=True)
+    emulator = PotatoEmulator(text, TextRange(15, 15), profile)
+    emulator.apply([PotatoEditorAction(PotatoEditorActionType.GO_LINE_START)])
+    self.assertEqual(emulator.selection_range, TextRange(10, 10))
+    emulator.apply([PotatoEditorAction(PotatoEditorActionType.GO_LINE_START)])
+    self.assertEqual(emulator.selection_range, TextRange(6, 6))
+
+  def test_unknown_text_outside_context(self):
+    # Word and line motions that reach the ends of the context are not used, as the text may
+    # continue in the editor.
+    profile = PotatoProfile(line_motions=True, word_motions=True)
+    result = self._assert_plan_reaches(
+        [EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(0, 0))],
+        "The quick brown fox", TextRange(19, 19), profile)
+    self.assertListEqual(result, [
+        PotatoEditorAction(PotatoEditorActionType.GO_WORD_LEFT, repeat=3),
+        PotatoEditorAction(PotatoEditorActionType.GO_LEFT, repeat=4),
+    ])
+    with self.assertRaises(ValueError):
+      PotatoEmulator("The quick", TextRange(4, 4),
+                     profile).apply([PotatoEditorAction(PotatoEditorActionType.GO_WORD_LEFT)])
+
+  def test_deletion(self):
+    text = "first\nThe quick brown fox jumps over\nlast"
+    actions = [
+        EditorAction(EditorActionType.DELETE_RANGE, TextRange(16, 22)),
+        EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(6, 9)),
+        EditorAction(EditorActionType.INSERT_TEXT, text="A"),
+    ]
+    self._assert_plan_reaches(actions, text, TextRange(30, 32), CODEMIRROR_PROFILE)
+
+
+class BatchedKeysTestCase(unittest.TestCase):
+  """Tests for batching repeated key presses."""
+
+  def test_batches(self):
+    self.assertEqual(
+        get_batched_keys(PotatoEditorAction(PotatoEditorActionType.EXTEND_RIGHT, repeat=37), 50),
+        ["shift-right:37"])
+    self.assertEqual(
+        get_batched_keys(PotatoEditorAction(PotatoEditorActionType.GO_LEFT, repeat=21), 10),
+        ["left:10", "left:10", "left"])
+
+  def test_not_batched(self):
+    # Single key presses, disabled batching and actions without a fixed key are not batched.
+    self.assertIsNone(get_batched_keys(PotatoEditorAction(PotatoEditorActionType.GO_LEFT), 50))
+    self.assertIsNone(
+        get_batched_keys(PotatoEditorAction(PotatoEditorActionType.GO_LEFT, repeat=5), 1))
+    self.assertIsNone(
+        get_batched_keys(PotatoEditorAction(PotatoEditorActionType.GO_LINE_END, repeat=2), 50))
+    self.assertIsNone(
+        get_batched_keys(PotatoEditorAction(PotatoEditorActionType.INSERT_TEXT, "ab", repeat=2),
+                         50))
@@ -1,25 +1,46 @@
 """API for generating input actions to manipulate text in an editor."""
 
+from typing import Callable, Sequence
+from .scrambler_ax_window import INITIAL_RADIUS, expand_radius, read_window
 from .scrambler_commands import perform_command
-from .scrambler_modifiers import apply_modifier
-from .scrambler_types import Command, EditorAction, MatchCombinationType, TextMatch, TextRange, UtilityFunctions
+from .scrambler_modifiers import apply_modifier, find_all_matches
+from .scrambler_sim import simulate_actions
+from .scrambler_text_source import TextSource
+from .scrambler_types import Command, CommandType, Context, EditorAction, EditorActionType, MatchCombinationType, Modifier, ModifierType, TextMatch, TextRange, UtilityFunctions
 
+# Commands that can run on every match in a range. They edit the matched text in place and keep the
+# cursor where it was.
+_ALL_MATCHES_COMMAND_TYPES = (
+    CommandType.CLEAR_NO_MOVE,
+    CommandType.REPLACE,
+    CommandType.NEXT_HOMOPHONE,
+    CommandType.TITLE_CASE,
+    CommandType.LOWERCASE,
+    CommandType.UPPERCASE,
+    CommandType.REPLACE_WORD_MATCH_CASE,
+    CommandType.REPLACE_WITH_LAMBDA,
+)
 
-def run_command(command: Command, text: str, selection_range: TextRange,
-                utility_functions: UtilityFunctions) -> list[EditorAction]:
-  """Runs a command for navigating and manipulating text."""
+
+def run_command(command: Command,
+                text: str,
+                selection_range: TextRange,
+                utility_functions: UtilityFunctions,
+                language: str = "") -> list[EditorAction]:
+  """Runs a command for navigating and manipulating text. `language` is the programming language of
+  the text, if known, e.g. "python"."""
   # Start with the current selection range (or cursor position) and apply modifiers to it to get the
   # range of text we care about.
   match = TextMatch(selection_range)
   for modifier in command.modifiers:
-    match = apply_modifier(text, match, modifier, utility_functions)
+    match = apply_modifier(text, match, modifier, utility_functions, language)
 
   # If there are any extension modifiers provided, we apply them to our current match, then extend
   # the current match to incorporate the result.
   if len(command.extend_modifiers) > 0:
     extend_match = match
     for modifier in command.extend_modifiers:
-      extend_match = apply_modifier(text, extend_match, modifier, utility_functions)
+      extend_match = apply_modifier(text, extend_match, modifier, utility_functions, language)
     # Note: Deletion ranges are currently not supported for extended matches.
     if command.extend_type == MatchCombinationType.UP_TO_AND_INCLUDING:
       match = TextMatch(TextRange(match.text_range.start, extend_match.text_range.end))
@@ -29,3 +50,212 @@ def run_command(command: Command, text: str, selection_range: TextRange,
   # Get a set of editor actions required to implement the command on the matched range.
   return perform_command(command.command_type, text, selection_range, match, command.insert_text,
                          command.lambda_func, utility_functions)
+
+
+def _offset_action(action: EditorAction, offset: int) -> EditorAction:
+  """Moves the range of an editor action by the given offset."""
+  if action.text_range is None or offset == 0:
+    return action
+  return EditorAction(action.action_type,
+                      TextRange(action.text_range.start + offset, action.text_range.end + offset),
+                      action.text)
+
+
+def get_lexer_language(context: Context, language: str) -> str:
+  """Gets the language to pass to commands run in the given context. Strings and comments are lexed
+  from the start of the context text, so they are only found correctly if the context starts at the
+  start of the editor text. Otherwise, e.g. in potato mode or in a window that starts inside a
+  docstring, no language is used and delimiters inside strings and comments are skipped without the
+  lexer."""
+  if context.potato_mode or context.text_offset != 0:
+    return ""
+  return language
+
+
+def run_in_window(plan: Callable[[Context], list[EditorAction]],
+                  source: TextSource,
+                  selection_range: TextRange,
+                  radius: int = INITIAL_RADIUS) -> tuple[list[EditorAction], Context]:
+  """Plans editor actions on a window of text that is read on demand. The plan first runs on whole
+  lines within `radius` characters of the selection, and the window grows each time the plan raises
+  ValueError, as in `expand_radius`, until it covers the entire text or cannot grow. Reads stay
+  bounded when the plan finds no match at all. As in potato mode, targets
+  are only looked for in the window, so e.g. a closest match may be missed if a closer one is just
+  outside. `selection_range` is in source coordinates. Returns the editor actions along with the
+  context of the window they act on."""
+  while True:
+    context = read_window(source.read, selection_range, len(source), radius)
+    try:
+      return plan(context), context
+    except ValueError:
+      expanded_radius = expand_radius(radius, context)
+      if expanded_radius is None:
+        raise
+      radius = expanded_radius
+
+
+def run_command_on_source(command: Command,
+                          source: TextSource,
+                          selection_range: TextRange,
+                          utility_functions: UtilityFunctions,
+                          language: str = "",
+                          radius: int = INITIAL_RADIUS) -> list[EditorAction]:
+  """Runs a command on text that is read on demand, in a window that grows as in `run_in_window`.
+  Ranges of the selection and the resulting editor actions are in source coordinates."""
+
+  def plan(context: Context) -> list[EditorAction]:
+    return run_command(command, context.text, context.selection_range, utility_functions,
+                       get_lexer_language(context, language))
+
+  editor_actions, context = run_in_window(plan, source, selection_range, radius)
+  return [_offset_action(action, context.text_offset) for action in editor_actions]
+
+
+def _run_commands_in_context(commands: Sequence[Command], context: Context,
+                             utility_functions: UtilityFunctions, language: str,
+                             result: list[EditorAction]) -> str:
+  """Runs commands one after another, updating the given context with the simulated result of each
+  command. Appends the editor actions to `result` and returns the simulated clipboard contents."""
+  clipboard = ""
+  for command in commands:
+    editor_actions = run_command(command, context.text, context.selection_range, utility_functions,
+                                 language)
+    clipboard = simulate_actions(context, editor_actions) or clipboard
+    result.extend(editor_actions)
+  return clipboard
+
+
+def run_commands(commands: Sequence[Command],
+                 text: str,
+                 selection_range: TextRange,
+                 utility_functions: UtilityFunctions,
+                 language: str = "") -> list[EditorAction]:
+  """Runs a sequence of commands against a single snapshot of the text. Each command acts on the
+  text and selection left by the previous commands, so the resulting editor actions can be executed
+  in order without reading the editor between commands."""
+  result: list[EditorAction] = []
+  _run_commands_in_context(commands, Context(text, selection_range), utility_functions, language,
+                           result)
+  return result
+
+
+def _selection_after_edit(selection_range: TextRange, edit_range: TextRange,
+                          inserted_chars: int) -> TextRange:
+  """Gets the selection after replacing a range with the given number of characters. As for a single
+  replacement, a selection that touches the range moves after the inserted text, and a selection
+  after the range moves with the text."""
+  diff_chars = inserted_chars - edit_range.length()
+  if diff_chars == 0:
+    return selection_range
+  if edit_range.start <= selection_range.end and selection_range.start <= edit_range.end:
+    cursor = edit_range.start + inserted_chars
+    return TextRange(cursor, cursor)
+  if edit_range.start <= selection_range.start:
+    return TextRange(selection_range.start + diff_chars, selection_range.end + diff_chars)
+  return selection_range
+
+
+def run_command_on_all_matches(command: Command,
+                               scope_modifiers: Sequence[Modifier],
+                               text: str,
+                               selection_range: TextRange,
+                               utility_functions: UtilityFunctions,
+                               language: str = "") -> list[EditorAction]:
+  """Runs a command on every match of its modifiers inside a scope, e.g. to clear every "foo" in the
+  enclosing brackets. The scope is found by applying `scope_modifiers` to the selection, and is the
+  entire text if there are none. The first modifier of the command finds the matches and any others
+  are applied to each match. The edits are ordered from the last match to the first, so the ranges
+  of the remaining matches stay valid as the actions are executed. Only commands that edit the
+  matched text in place are supported."""
+  if command.command_type not in _ALL_MATCHES_COMMAND_TYPES:
+    raise ValueError(f"Unable to run command on all matches: {command.command_type}")
+  if not command.modifiers:
+    raise ValueError("Command has no modifiers to match")
+  if command.extend_modifiers:
+    raise ValueError("Extended matches are not supported for all matches")
+
+  scope = TextMatch(selection_range)
+  for modifier in scope_modifiers:
+    scope = apply_modifier(text, scope, modifier, utility_functions, language)
+  bounds = scope.text_range if scope_modifiers else TextRange(0, len(text))
+  matches = find_all_matches(text, bounds, command.modifiers[0], utility_functions, language)
+
+  result: list[EditorAction] = []
+  # Edited ranges and the number of characters inserted in each, from the last to the first.
+  edits: list[tuple[TextRange, int]] = []
+  # Start of the earliest edit so far. Earlier edits must end before it, and the first one inside
+  # the scope.
+  edits_start = bounds.end
+  for match in reversed(matches):
+    for modifier in command.modifiers[1:]:
+      match = apply_modifier(text, match, modifier, utility_functions, language)
+    if match.text_range.start < bounds.start or match.text_range.end > edits_start:
+      raise ValueError(f"Match outside of scope or overlapping a later match: {match}")
+    # Deletion ranges of neighboring matches can overlap, e.g. a trailing space and a leading one.
+    if match.deletion_range is not None and (match.deletion_range.start < bounds.start or
+                                             match.deletion_range.end > edits_start):
+      match = TextMatch(match.text_range)
+
+    editor_actions = perform_command(command.command_type, text, selection_range, match,
+                                     command.insert_text, command.lambda_func, utility_functions)
+    edit_range = None
+    inserted_chars = 0
+    for action in editor_actions:
+      if action.action_type == EditorActionType.DELETE_RANGE:
+        edit_range = action.text_range
+        result.append(action)
+      elif action.action_type == EditorActionType.INSERT_TEXT:
+        inserted_chars += len(action.text)
+        result.append(action)
+    if edit_range is None:
+      # The command left the match alone, e.g. a word without homophones.
+      continue
+    edits.append((edit_range, inserted_chars))
+    edits_start = edit_range.start
+  if not edits:
+    return result
+
+  # Move the selection as if the matches were edited from the first to the last, one command at a
+  # time. Ranges of later edits move with the text inserted before them.
+  selection_after = selection_range
+  offset = 0
+  for edit_range, inserted_chars in reversed(edits):
+    selection_after = _selection_after_edit(
+        selection_after, TextRange(edit_range.start + offset, edit_range.end + offset),
+        inserted_chars)
+    offset += inserted_chars - edit_range.length()
+  result.append(EditorAction(EditorActionType.SET_SELECTION_RANGE, selection_after))
+  return result
+
+
+def run_move_argument_command(move_left: bool,
+                              text: str,
+                              selection_range: TextRange,
+                              utility_functions: UtilityFunctions,
+                              language: str = "") -> list[EditorAction]:
+  """Moves the argument containing the selection before the previous argument or after the next
+  one. Cuts the argument to the clipboard, moves to the neighboring argument and inserts it there."""
+  context = Context(text, selection_range)
+  result: list[EditorAction] = []
+  cut_command = Command(CommandType.CUT_TO_CLIPBOARD, [Modifier(ModifierType.ARGUMENT)])
+  argument = _run_commands_in_context([cut_command], context, utility_functions, language, result)
+  if not argument:
+    raise ValueError("Argument is empty")
+
+  if move_left:
+    move_command = Command(CommandType.MOVE_CURSOR_BEFORE, [Modifier(ModifierType.ARGUMENT)])
+    insert_text = argument + ", "
+  else:
+    # The argument modifier prefers to delete leading commas instead of trailing ones, so we need
+    # to move right to get to the next argument. This causes odd behavior if the cursor is already
+    # in the rightmost argument, but it allows moving arguments that aren't the leftmost.
+    cursor = min(context.selection_range.end + 1, len(context.text))
+    result.append(EditorAction(EditorActionType.SET_SELECTION_RANGE, TextRange(cursor, cursor)))
+    simulate_actions(context, result[-1:])
+    move_command = Command(CommandType.MOVE_CURSOR_AFTER, [Modifier(ModifierType.ARGUMENT)])
+    insert_text = ", " + argument
+  _run_commands_in_context([move_command], context, utility_functions, language, result)
+
+  # Re-insert the cut argument.
+  result.append(EditorAction(EditorActionType.INSERT_TEXT, text=insert_text))
+  return result
@@ -1,8 +1,14 @@
 # pylint: disable=missing-module-docstring, missing-class-docstring
+import random
+import time
 import unittest
 from .scrambler_run import *  # pylint: disable=wildcard-import, unused-wildcard-import
+from .scrambler_ax_window import MAX_RADIUS
+from .scrambler_commands import perform_command
+from .scrambler_modifiers import apply_modifier
 from .scrambler_sim import simulate_actions
 from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_text_source import PagedTextSource, StringTextSource
 from .scrambler_types import CommandType, Context, MatchCombinationType, Modifier, ModifierType, UtilityFunctions
 
 
@@ -101,3 +107,265 @@ class RunCommandTestCase(unittest.TestCase):
     self.assertEqual(context.text, "Lorem dolor sit amet.")
     self.assertEqual(context.selection_range, TextRange(0, 0))
     self.assertEqual(clipboard, "")
+
+
+class RunCommandsTestCase(unittest.TestCase):
+  """Tests for running several commands against one snapshot."""
+
+  def test_chained_commands(self):
+    test_string = "Lorem ipsum dolor sit amet."
+    commands = [
+        Command(CommandType.CLEAR_NO_MOVE, _get_substring_modifiers("ips")),
+        Command(CommandType.REPLACE, _get_substring_modifiers("dol"), insert_text="pain"),
+        Command(CommandType.MOVE_CURSOR_AFTER, _get_substring_modifiers("sit")),
+    ]
+    actions = run_commands(commands, test_string, TextRange(0, 0), UTILITY_FUNCTIONS)
+    context = Context(test_string, TextRange(0, 0))
+    simulate_actions(context, actions)
+    self.assertEqual(context.text, "Lorem pain sit amet.")
+    self.assertEqual(context.selection_range, TextRange(14, 14))
+
+  def test_matches_separate_commands(self):
+    test_string = "Lorem ipsum dolor sit amet."
+    commands = [
+        Command(CommandType.CUT_TO_CLIPBOARD, _get_substring_modifiers("dol")),
+        Command(CommandType.BRING, _get_substring_modifiers("ips")),
+    ]
+    context = Context(test_string, TextRange(27, 27))
+    for command in commands:
+      simulate_actions(
+          context, run_command(command, context.text, context.selection_range, UTILITY_FUNCTIONS))
+    batched_context = Context(test_string, TextRange(27, 27))
+    simulate_actions(batched_context,
+                     run_commands(commands, test_string, TextRange(27, 27), UTILITY_FUNCTIONS))
+    self.assertEqual(batched_context, context)
+
+  def test_unmatched_target(self):
+    commands = [
+        Command(CommandType.CLEAR_NO_MOVE, _get_substring_modifiers("ips")),
+        Command(CommandType.SELECT, _get_substring_modifiers("ips")),
+    ]
+    with self.assertRaises(ValueError):
+      run_commands(commands, "Lorem ipsum", TextRange(0, 0), UTILITY_FUNCTIONS)
+
+  def test_no_commands(self):
+    self.assertEqual(run_commands([], "Lorem", TextRange(0, 0), UTILITY_FUNCTIONS), [])
+
+
+class GetLexerLanguageTestCase(unittest.TestCase):
+
+  def test_start_of_text(self):
+    context = Context("foo", TextRange(0, 0), potato_mode=False)
+    self.assertEqual(get_lexer_language(context, "python"), "python")
+
+  def test_window_inside_string(self):
+    # The window starts at the end of a docstring, so its closing quotes look like an opening quote.
+    text = '  the end of a long docstring.\n  """\n  result = foo(alpha, beta)\n  return result\n'
+    cursor = text.index("beta")
+    context = Context(text, TextRange(cursor, cursor), potato_mode=False, text_offset=500)
+    language = get_lexer_language(context, "python")
+    self.assertEqual(language, "")
+    command = Command(CommandType.SELECT, [Modifier(ModifierType.ARGUMENT)])
+    actions = run_command(command, text, context.selection_range, UTILITY_FUNCTIONS, language)
+    self.assertEqual(actions[0].text_range.extract(text), "beta")
+
+  def test_potato_mode(self):
+    self.assertEqual(get_lexer_language(Context("foo", TextRange(0, 0)), "python"), "")
+
+
+class RunCommandOnSourceTestCase(unittest.TestCase):
+  """Tests for running commands on text that is read on demand."""
+
+  def setUp(self):
+    self.text = "".join(f"line {i} lorem ipsum\n" for i in range(10000)) + "last target"
+    self.source = PagedTextSource(lambda r: r.extract(self.text), len(self.text), page_chars=1000)
+
+  def test_same_as_string(self):
+    selection = TextRange(100000, 100000)
+    commands = [
+        Command(CommandType.SELECT, [Modifier(ModifierType.TOKEN_NEXT)]),
+        Command(CommandType.CLEAR_MOVE_CURSOR, _get_substring_modifiers("lor")),
+        Command(CommandType.REPLACE, _get_phrase_modifiers("ipsum"), insert_text="x"),
+    ]
+    for command in commands:
+      self.assertEqual(run_command_on_source(command, self.source, selection, UTILITY_FUNCTIONS),
+                       run_command(command, self.text, selection, UTILITY_FUNCTIONS))
+    # Only the pages around the selection are read.
+    self.assertLess(self.source.chars_fetched, 10000)
+
+  def test_target_outside_window(self):
+    selection = TextRange(0, 0)
+    command = Command(CommandType.SELECT, [Modifier(ModifierType.EXACT_WORD_NEXT, search="target")])
+    self.assertEqual(
+        run_command_on_source(command, self.source, selection, UTILITY_FUNCTIONS, radius=100),
+        run_command(command, self.text, selection, UTILITY_FUNCTIONS))
+    self.assertEqual(self.source.chars_fetched, len(self.text))
+
+  def test_no_match(self):
+    command = Command(CommandType.SELECT, _get_substring_modifiers("xyz"))
+    with self.assertRaises(ValueError):
+      run_command_on_source(command, self.source, TextRange(5, 5), UTILITY_FUNCTIONS)
+
+  def test_no_match_in_long_text(self):
+    text = self.text * 5
+    source = PagedTextSource(lambda r: r.extract(text), len(text), page_chars=1000)
+    command = Command(CommandType.SELECT, _get_substring_modifiers("xyz"))
+    with self.assertRaises(ValueError):
+      run_command_on_source(command, source, TextRange(500000, 500000), UTILITY_FUNCTIONS)
+    # The window stops growing at `MAX_RADIUS` instead of reading the entire text.
+    self.assertLessEqual(source.chars_fetched, 2 * MAX_RADIUS + 2 * source.page_chars)
+
+  def test_window_grows(self):
+    window_lengths = []
+
+    def plan(context: Context) -> list[EditorAction]:
+      window_lengths.append(len(context.text))
+      if "last target" not in context.text:
+        raise ValueError("Not found")
+      return []
+
+    editor_actions, context = run_in_window(plan, self.source, TextRange(100000, 100000))
+    self.assertEqual(editor_actions, [])
+    self.assertEqual(context.chars_after_text, 0)
+    self.assertGreater(len(window_lengths), 1)
+    # Pages read for smaller windows are not read again.
+    self.assertLessEqual(self.source.chars_fetched, len(self.text))
+
+  def test_string_source(self):
+    command = Command(CommandType.SELECT, _get_substring_modifiers("ips"))
+    self.assertEqual(
+        run_command_on_source(command, StringTextSource("Lorem ipsum"), TextRange(0, 0),
+                              UTILITY_FUNCTIONS),
+        run_command(command, "Lorem ipsum", TextRange(0, 0), UTILITY_FUNCTIONS))
+
+
+class RunCommandOnAllMatchesTestCase(unittest.TestCase):
+  """Tests for running a command on every match in a scope."""
+
+  def _run(self, command: Command, scope_modifiers: list[Modifier], text: str,
+           selection_range: TextRange) -> Context:
+    actions = run_command_on_all_matches(command, scope_modifiers, text, selection_range,
+                                         UTILITY_FUNCTIONS)
+    context = Context(text, selection_range)
+    simulate_actions(context, actions)
+    return context
+
+  def test_whole_text(self):
+    command = Command(CommandType.UPPERCASE,
+                      [Modifier(ModifierType.EXACT_WORD_CLOSEST, search="foo")])
+    context = self._run(command, [], "foo bar food, foo.", TextRange(5, 5))
+    self.assertEqual(context.text, "FOO bar food, FOO.")
+    self.assertEqual(context.selection_range, TextRange(5, 5))
+
+  def test_scope(self):
+    command = Command(CommandType.CLEAR_NO_MOVE,
+                      [Modifier(ModifierType.EXACT_WORD_CLOSEST, search="foo")])
+    context = self._run(command, [Modifier(ModifierType.BRACKETS)], "foo(foo, bar, foo) foo",
+                        TextRange(10, 10))
+    self.assertEqual(context.text, "foo(bar, ) foo")
+    self.assertEqual(context.selection_range, TextRange(5, 5))
+
+  def test_edits_back_to_front(self):
+    command = Command(CommandType.REPLACE, [Modifier(ModifierType.WORD_SUBSTRING_NEXT, search="a")],
+                      insert_text="xyz")
+    actions = run_command_on_all_matches(command, [], "a b a b a", TextRange(0, 0),
+                                         UTILITY_FUNCTIONS)
+    deletions = [
+        action.text_range.start
+        for action in actions
+        if action.action_type == EditorActionType.DELETE_RANGE
+    ]
+    self.assertEqual(deletions, [8, 4, 0])
+    self.assertEqual(actions[-1], EditorAction(EditorActionType.SET_SELECTION_RANGE,
+                                               TextRange(3, 3)))
+
+  def test_neighboring_deletion_ranges(self):
+    command = Command(CommandType.CLEAR_NO_MOVE,
+                      [Modifier(ModifierType.EXACT_WORD_NEXT, search="foo")])
+    self.assertEqual(self._run(command, [], "foo foo.", TextRange(0, 0)).text, ".")
+    # Deletion ranges stay inside the scope.
+    context = self._run(command, [Modifier(ModifierType.BETWEEN_WHITESPACE)], "x foo,foo y",
+                        TextRange(3, 3))
+    self.assertEqual(context.text, "x  y")
+
+  def test_no_matches(self):
+    command = Command(CommandType.CLEAR_NO_MOVE,
+                      [Modifier(ModifierType.EXACT_WORD_NEXT, search="foo")])
+    self.assertEqual(
+        run_command_on_all_matches(command, [], "bar", TextRange(0, 0), UTILITY_FUNCTIONS), [])
+
+  def test_unsupported(self):
+    with self.assertRaises(ValueError):
+      run_command_on_all_matches(Command(CommandType.SELECT, _get_substring_modifiers("a")), [],
+                                 "a a", TextRange(0, 0), UTILITY_FUNCTIONS)
+    with self.assertRaises(ValueError):
+      run_command_on_all_matches(
+          Command(CommandType.CLEAR_NO_MOVE, [Modifier(ModifierType.BRACKETS)]), [], "(a)",
+          TextRange(1, 1), UTILITY_FUNCTIONS)
+
+  def test_same_as_repeated_command(self):
+    # Replacing the next match after the previous replacement as many times as there are matches
+    # gives the same result. Deletion ranges depend on the text around each match, so clearing
+    # matches one at a time can remove different whitespace.
+    rng = random.Random(0)
+    for _ in range(300):
+      text = "".join(rng.choice(["foo", "bar", " ", ", ", ".", "x"]) for _ in range(12))
+      cursor = rng.randint(0, len(text))
+      selection_range = TextRange(cursor, rng.randint(cursor, len(text)))
+      insert_text = rng.choice(["", "o", "quux"])
+      command = Command(CommandType.REPLACE,
+                        [Modifier(ModifierType.WORD_SUBSTRING_NEXT, search="o")],
+                        insert_text=insert_text)
+      context = self._run(command, [], text, selection_range)
+
+      expected = Context(text, selection_range)
+      match = TextMatch(TextRange(0, 0))
+      while True:
+        try:
+          match = apply_modifier(expected.text, match, command.modifiers[0], UTILITY_FUNCTIONS)
+        except ValueError:
+          break
+        simulate_actions(
+            expected,
+            perform_command(CommandType.REPLACE, expected.text, expected.selection_range, match,
+                            insert_text, None, UTILITY_FUNCTIONS))
+        edit_end = match.text_range.start + len(insert_text)
+        match = TextMatch(TextRange(edit_end, edit_end))
+      self.assertEqual(context.text, expected.text, text)
+      self.assertEqual(context.selection_range, expected.selection_range, text)
+
+  def test_many_matches(self):
+    text = "".join(f"value_{i} = foo(bar, foo)\n" for i in range(5000))
+    command = Command(CommandType.REPLACE,
+                      [Modifier(ModifierType.EXACT_WORD_CLOSEST, search="foo")],
+                      insert_text="baz")
+    cursor = len(text) // 2
+    start_time = time.perf_counter()
+    actions = run_command_on_all_matches(command, [], text, TextRange(cursor, cursor),
+                                         UTILITY_FUNCTIONS)
+    # Takes about half a second. The limit leaves room for slow or loaded machines.
+    self.assertLess(time.perf_counter() - start_time, 10)
+    context = Context(text, TextRange(cursor, cursor))
+    simulate_actions(context, actions)
+    self.assertEqual(context.text, text.replace("foo", "baz"))
+    self.assertEqual(context.selection_range, TextRange(cursor, cursor))
+    self.assertEqual(len(actions), 2 * 10000 + 1)
+
+
+class RunMoveArgumentCommandTestCase(unittest.TestCase):
+
+  def test_move_left(self):
+    test_string = "f(a, b, c)"
+    actions = run_move_argument_command(True, test_string, TextRange(8, 8), UTILITY_FUNCTIONS)
+    context = Context(test_string, TextRange(8, 8))
+    clipboard = simulate_actions(context, actions)
+    self.assertEqual(context.text, "f(a, c, b)")
+    self.assertEqual(clipboard, "c")
+
+  def test_move_right(self):
+    test_string = "f(a, b, c)"
+    actions = run_move_argument_command(False, test_string, TextRange(5, 5), UTILITY_FUNCTIONS)
+    context = Context(test_string, TextRange(5, 5))
+    simulate_actions(context, actions)
+    self.assertEqual(context.text, "f(a, c, b)")
+    self.assertEqual(context.selection_range, TextRange(9, 9))
@@ -0,0 +1,137 @@
+"""Backward and closest text search for Scrambler modifiers. Searching backwards from the cursor used
+to reverse the entire text before it, which costs a full copy of the document for every "last" or
+"closest" command. Here we only reverse a window before the cursor, growing it until a match is
+found. Closest searches grow windows on both sides of the cursor together, so a nearby match on one
+side does not wait for a scan of the whole document on the other."""
+
+import re
+from typing import Callable, Optional, Union
+from .scrambler_phrase import PhraseMatcher
+
+# Size of the first window searched before the cursor. Grows by `_WINDOW_GROWTH` on each miss.
+_INITIAL_WINDOW = 256
+_WINDOW_GROWTH = 4
+
+# Characters that may end a search window. None of these can be matched by a token character (\w)
+# or by a phrase separator, so a match can only include one if it appears in the search itself.
+_BARRIER_CHARACTERS = "\n\t;:()[]{}<>!?=/|#*&%$@+~`^\\'"
+
+
+def _get_barriers(literals: str) -> list[str]:
+  """Gets the characters that may end a search window for a regex matching the given literals."""
+  if not literals:
+    return []
+  return [c for c in _BARRIER_CHARACTERS if c not in literals]
+
+
+def _search_window_backward(text: str, end: int, window: int, reversed_regex: Union[re.Pattern,
+                                                                                    PhraseMatcher],
+                            barriers: list[str]) -> tuple[Optional[re.Match], int]:
+  """Searches the reversed text in a window of at least `window` characters before `end`, extended
+  back to a barrier. Returns the first match and the number of characters before `end` that were
+  searched: no match in the rest of the text starts closer to `end` than that. Returns `end` as the
+  count if the whole text before `end` was searched."""
+  window_start = end - window
+  if not barriers or window_start <= 0:
+    return reversed_regex.search(text[:end][::-1]), end
+
+  # Find a barrier at or before the start of the window. Only look back another window's length so
+  # we don't scan the whole document for characters that are not present.
+  barrier_search_start = max(window_start - window, 0)
+  barrier_index = max(text.rfind(c, barrier_search_start, window_start + 1) for c in barriers)
+  if barrier_index < 0:
+    return None, 0
+  # Repeat the barrier so `$` cannot match right before a barrier that is a line break.
+  window_text = text[barrier_index:end][::-1] + text[barrier_index]
+  return reversed_regex.search(window_text), end - barrier_index
+
+
+def _search_window_forward(text: str, start: int, window: int, regex: Union[re.Pattern,
+                                                                            PhraseMatcher],
+                           barriers: list[str]) -> tuple[Optional[re.Match], int]:
+  """Searches the text in a window of at least `window` characters after `start`, extended forward
+  to a barrier. Returns the first match and the number of characters after `start` that were
+  searched: no match in the rest of the text starts closer to `start` than that. Returns the length
+  of the text after `start` as the count if all of it was searched."""
+  window_end = start + window
+  if not barriers or window_end >= len(text):
+    return regex.search(text[start:]), len(text) - start
+
+  # Find a barrier at or after the end of the window, looking ahead another window's length.
+  barrier_indices = [text.find(c, window_end, window_end + window) for c in barriers]
+  barrier_index = min((i for i in barrier_indices if i >= 0), default=-1)
+  if barrier_index < 0:
+    return None, 0
+  # Repeat the barrier to mirror `_search_window_backward`.
+  window_text = text[start:barrier_index + 1] + text[barrier_index]
+  return regex.search(window_text), barrier_index - start
+
+
+def search_backward(text: str, end: int, reversed_regex: Union[re.Pattern, PhraseMatcher],
+                    literals: str) -> Optional[re.Match]:
+  """Finds the first match of `reversed_regex` in the reversed text before `end`. The result is
+  identical to `reversed_regex.search(text[:end][::-1])`, including match positions, which are
+  relative to `end`.
+
+  `reversed_regex` may only match characters in `literals`, token characters and phrase separators.
+  It may also match a single non-token character as its final element (e.g. the end of a word).
+  A window of text is safe to search on its own if it starts with a character that the regex cannot
+  match in any other way: no match can start at that character, and no match attempt inside the
+  window can look beyond it."""
+  barriers = _get_barriers(literals)
+  window = _INITIAL_WINDOW
+  while True:
+    match, searched = _search_window_backward(text, end, window, reversed_regex, barriers)
+    if match is not None or searched == end:
+      return match
+    window *= _WINDOW_GROWTH
+
+
+def _match_start(match: re.Match) -> int:
+  """Gets the start of a match."""
+  return match.start()
+
+
+def search_closest(
+    text: str,
+    start: int,
+    end: int,
+    regex: Union[re.Pattern, PhraseMatcher],
+    reversed_regex: Union[re.Pattern, PhraseMatcher],
+    literals: str,
+    forward_distance: Callable[[re.Match], int] = _match_start,
+    backward_distance: Callable[[re.Match], int] = _match_start
+) -> tuple[Optional[re.Match], Optional[re.Match]]:
+  """Finds the closest match around a cursor from `start` to `end`. Returns the first match of
+  `regex` in `text[end:]` and of `reversed_regex` in the reversed text before `start`, like
+  `search_backward`. Windows on both sides of the cursor grow together, and the search stops as soon
+  as no match in the rest of the text could be closer, so one of the results may be None even if
+  the text has a match in that direction. The forward match is the closest if its distance is
+  strictly smaller than the backward match's.
+
+  Both regexes must follow the rules of `search_backward`, with `regex` only matching a non-token
+  character as its first element. The distance functions give the distance of a match from the
+  cursor, and must not be smaller than the start of the match."""
+  barriers = _get_barriers(literals)
+  match_forward: Optional[re.Match] = None
+  match_backward: Optional[re.Match] = None
+  forward_done = backward_done = False
+  # Number of characters on each side of the cursor where all matches have been found.
+  searched_forward = searched_backward = 0
+  window = _INITIAL_WINDOW
+  while True:
+    if not forward_done:
+      match_forward, searched_forward = _search_window_forward(text, end, window, regex, barriers)
+      forward_done = match_forward is not None or searched_forward == len(text) - end
+    if not backward_done:
+      match_backward, searched_backward = _search_window_backward(text, start, window,
+                                                                  reversed_regex, barriers)
+      backward_done = match_backward is not None or searched_backward == start
+
+    if forward_done and backward_done:
+      return match_forward, match_backward
+    if match_forward is not None and forward_distance(match_forward) < searched_backward:
+      return match_forward, None
+    if match_backward is not None and backward_distance(match_backward) <= searched_forward:
+      return None, match_backward
+    window *= _WINDOW_GROWTH
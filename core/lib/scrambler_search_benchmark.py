@@ -0,0 +1,60 @@
+"""Benchmark for backward and closest searches with a match a few lines from the cursor, with the
+cursor near the end of the text and in the middle of it. Latency should stay flat as the document
+grows. Run from the repository root:
+
+python3 -m core.lib.scrambler_search_benchmark"""
+
+import timeit
+from .scrambler_modifiers import apply_modifier
+from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_types import Modifier, ModifierType, TextMatch, TextRange
+
+_DOCUMENT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+_MODIFIERS = [
+    Modifier(ModifierType.WORD_SUBSTRING_PREVIOUS, search="target"),
+    Modifier(ModifierType.WORD_SUBSTRING_CLOSEST, search="target"),
+    Modifier(ModifierType.EXACT_WORD_PREVIOUS, search="target"),
+    Modifier(ModifierType.EXACT_WORD_CLOSEST, search="target"),
+    Modifier(ModifierType.PHRASE_PREVIOUS, search="their target"),
+    Modifier(ModifierType.PHRASE_CLOSEST, search="their target"),
+]
+_ITERATIONS = 20
+
+# A match a few lines before the cursor, at the end of a large document.
+_LINE = "def function_name(argument, other_argument):  # Comment.\n"
+_SUFFIX = "x = their target\n" + _LINE * 20
+
+
+def _make_document(size: int) -> str:
+  return _LINE * ((size - len(_SUFFIX)) // len(_LINE)) + _SUFFIX
+
+
+def _print_table(title: str, documents: list[str], cursors: list[int], modifiers: list[Modifier]):
+  print(f"{title:<28}" + "".join(f"{size:>12,}" for size in _DOCUMENT_SIZES))
+  for modifier in modifiers:
+    row = f"{modifier.modifier_type.name:<28}"
+    for text, cursor in zip(documents, cursors):
+      input_match = TextMatch(TextRange(cursor, cursor))
+      seconds = timeit.timeit(
+          lambda t=text, m=input_match, mod=modifier: apply_modifier(t, m, mod, UTILITY_FUNCTIONS),
+          number=_ITERATIONS)
+      row += f"{seconds / _ITERATIONS * 1000:>10.3f}ms"
+    print(row)
+
+
+def main():
+  documents = [_make_document(size) for size in _DOCUMENT_SIZES]
+  _print_table("cursor at end", documents, [len(text) for text in documents], _MODIFIERS)
+  # The cursor a few lines after the match, with the rest of the document after the cursor.
+  documents = [
+      document[len(document) // 2:] + document[:len(document) // 2] for document in documents
+  ]
+  cursors = [len(document) - len(document) // 2 for document in documents]
+  closest_modifiers = [
+      modifier for modifier in _MODIFIERS if modifier.modifier_type.name.endswith("_CLOSEST")
+  ]
+  _print_table("cursor in middle", documents, cursors, closest_modifiers)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,120 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import re
+import unittest
+from .scrambler_search import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+_WORD_START_REGEX = re.compile(r"(\w*oof)($|[^\w])", re.IGNORECASE)
+_EXACT_WORD_REGEX = re.compile(r"\boof\b", re.IGNORECASE)
+
+
+class SearchBackwardTestCase(unittest.TestCase):
+
+  def assert_same_match(self, text: str, end: int, regex: re.Pattern, literals: str):
+    expected = regex.search(text[:end][::-1])
+    actual = search_backward(text, end, regex, literals)
+    if expected is None:
+      self.assertIsNone(actual)
+      return
+    assert actual is not None
+    self.assertEqual(actual.regs, expected.regs)
+
+  def test_short_text(self):
+    text = "foo bar foobar"
+    self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+    self.assert_same_match(text, 7, _WORD_START_REGEX, "foo")
+    self.assert_same_match(text, len(text), _EXACT_WORD_REGEX, "foo")
+
+  def test_match_near_cursor(self):
+    text = "x;\n" * 10000 + "foo\n" + "bar " * 100
+    self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+    self.assert_same_match(text, len(text), _EXACT_WORD_REGEX, "foo")
+
+  def test_match_far_from_cursor(self):
+    text = "foo\n" + "bar;\n" * 10000
+    self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+    self.assert_same_match(text, len(text), _EXACT_WORD_REGEX, "foo")
+
+  def test_no_match(self):
+    text = "bar;\n" * 10000
+    self.assertIsNone(search_backward(text, len(text), _WORD_START_REGEX, "foo"))
+
+  def test_match_across_window_boundary(self):
+    # Tokens that span the start of a window must be matched in full.
+    for padding in range(240, 270):
+      text = "\n" + "x" * 1000 + "foo" + "\n" + " " * padding
+      self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+
+  def test_line_break_at_window_start(self):
+    for padding in range(250, 260):
+      text = "a\nfoo\n" + " " * padding
+      self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+
+  def test_search_contains_barriers(self):
+    regex = re.compile(re.escape("(\n;"[::-1]), re.IGNORECASE)
+    text = "a(\n;b" + "c;\n" * 1000
+    self.assert_same_match(text, len(text), regex, "(\n;")
+
+  def test_no_barriers(self):
+    text = "foo " + "bar " * 1000
+    self.assert_same_match(text, len(text), _WORD_START_REGEX, "foo")
+
+  def test_empty_literals(self):
+    regex = re.compile(r"\w+", re.IGNORECASE)
+    text = "foo;\n" * 1000
+    self.assert_same_match(text, len(text), regex, "")
+
+
+class SearchClosestTestCase(unittest.TestCase):
+
+  def assert_same_closest(self, text: str, start: int, end: int, literals: str):
+    regex = re.compile(re.escape(literals), re.IGNORECASE)
+    reversed_regex = re.compile(re.escape(literals[::-1]), re.IGNORECASE)
+    expected_forward = regex.search(text[end:])
+    expected_backward = reversed_regex.search(text[:start][::-1])
+    match_forward, match_backward = search_closest(text, start, end, regex, reversed_regex,
+                                                   literals)
+    if expected_forward is not None and (expected_backward is None or
+                                         expected_forward.start() < expected_backward.start()):
+      assert match_forward is not None
+      self.assertEqual(match_forward.span(), expected_forward.span())
+    elif expected_backward is not None:
+      assert match_backward is not None
+      self.assertEqual(match_backward.span(), expected_backward.span())
+      if match_forward is not None:
+        self.assertEqual(match_forward.span(), expected_forward.span())
+    else:
+      self.assertIsNone(match_forward)
+      self.assertIsNone(match_backward)
+
+  def test_short_text(self):
+    text = "foo bar foo"
+    for cursor in range(len(text) + 1):
+      self.assert_same_closest(text, cursor, cursor, "foo")
+
+  def test_match_near_cursor(self):
+    text = "foo;\n" + "bar;\n" * 10000 + "foo;\n" + "bar;\n" * 10000
+    cursor = len(text) // 2 + 10
+    self.assert_same_closest(text, cursor, cursor, "foo")
+    match_forward, match_backward = search_closest(text, cursor, cursor, re.compile("foo"),
+                                                   re.compile("oof"), "foo")
+    # The far side is not searched once the near match is known to be closest.
+    self.assertIsNone(match_forward)
+    assert match_backward is not None
+
+  def test_tie_prefers_backward(self):
+    text = "foo;\n" * 1000 + "foo  foo" + ";\n" * 1000
+    cursor = 5000 + 4
+    for end in range(cursor, cursor + 2):
+      self.assert_same_closest(text, cursor, end, "foo")
+
+  def test_no_match(self):
+    text = "bar;\n" * 10000
+    self.assertEqual(search_closest(text, 100, 100, re.compile("foo"), re.compile("oof"), "foo"),
+                     (None, None))
+
+  def test_match_across_window_boundary(self):
+    for padding in range(240, 270):
+      text = " " * padding + "\n" + "x" * 1000 + "foo" + "\n" + " " * padding
+      cursor = padding
+      self.assert_same_closest(text, cursor, cursor, "xfoo")
+      self.assert_same_closest(text, len(text), len(text), "xfoo")
@@ -0,0 +1,112 @@
+"""Detects when an editor has caught up with Scrambler's editor actions. Instead of sleeping a fixed
+time after every action, the editor state is polled with a short backoff until it matches the state
+simulated by `scrambler_sim`. Typical settle times are learned per app, so slow apps are not polled
+needlessly often."""
+
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Optional
+from .scrambler_types import Context, TextRange
+
+# Delay before the first poll after an immediate check fails, if nothing has been learned yet.
+_INITIAL_DELAY_MS = 2.0
+
+# Longest delay between two polls.
+_MAX_DELAY_MS = 20.0
+
+# Give up waiting after this long. Matches the fixed sleep used before settle detection, so an
+# editor whose state cannot be verified is never waited on for longer than before.
+_TIMEOUT_MS = 50.0
+
+# Weight of the latest settle time in the learned typical settle time of an app.
+_LEARNING_RATE = 0.25
+
+
+@dataclass(frozen=True)
+class EditorState:
+  """State of an editor that can be cheaply read through the accessibility API."""
+  # Selection in editor coordinates.
+  selection_range: TextRange
+  # Length of the full editor text. None if unknown, in which case it is not compared.
+  text_length: Optional[int] = None
+
+  def matches(self, other: "EditorState") -> bool:
+    """Whether the two states agree on everything known about both."""
+    if self.selection_range != other.selection_range:
+      return False
+    return self.text_length is None or other.text_length is None or self.text_length == other.text_length
+
+
+def get_expected_state(context: Context) -> EditorState:
+  """Gets the editor state expected after simulating editor actions on the given context. The text
+  length is only known if the context holds the entire editor text, or a window of it with a known
+  number of characters after it."""
+  selection_range = TextRange(context.selection_range.start + context.text_offset,
+                              context.selection_range.end + context.text_offset)
+  text_length = None
+  if context.chars_after_text is not None:
+    text_length = context.text_offset + len(context.text) + context.chars_after_text
+  elif context.text_offset == 0:
+    text_length = len(context.text)
+  return EditorState(selection_range, text_length)
+
+
+class SettleDetector:
+  """Waits for editors to reflect the expected state. `clock` returns seconds and `sleep` takes
+  seconds, so both can be replaced in tests."""
+
+  def __init__(self,
+               initial_delay_ms: float = _INITIAL_DELAY_MS,
+               max_delay_ms: float = _MAX_DELAY_MS,
+               timeout_ms: float = _TIMEOUT_MS,
+               learning_rate: float = _LEARNING_RATE,
+               clock: Callable[[], float] = time.perf_counter,
+               sleep: Callable[[float], Any] = time.sleep):
+    if initial_delay_ms <= 0 or max_delay_ms < initial_delay_ms:
+      raise ValueError(f"Invalid delays: {initial_delay_ms}, {max_delay_ms}")
+    if timeout_ms <= 0:
+      raise ValueError(f"Invalid timeout: {timeout_ms}")
+    if not 0 < learning_rate <= 1:
+      raise ValueError(f"Invalid learning rate: {learning_rate}")
+    self.initial_delay_ms = initial_delay_ms
+    self.max_delay_ms = max_delay_ms
+    self.timeout_ms = timeout_ms
+    self.learning_rate = learning_rate
+    self._clock = clock
+    self._sleep = sleep
+    self._typical_settle_ms: dict[Any, float] = {}
+
+  def typical_settle_ms(self, app_key: Any) -> Optional[float]:
+    """Gets the learned settle time of an app. None if nothing has been learned for it yet."""
+    return self._typical_settle_ms.get(app_key)
+
+  def _learn(self, app_key: Any, settle_ms: float):
+    typical = self._typical_settle_ms.get(app_key)
+    if typical is None:
+      self._typical_settle_ms[app_key] = settle_ms
+    else:
+      self._typical_settle_ms[app_key] = typical + self.learning_rate * (settle_ms - typical)
+
+  def wait(self, app_key: Any, expected: EditorState,
+           read_state: Callable[[], Optional[EditorState]]) -> bool:
+    """Polls `read_state` until it matches `expected` or the timeout is reached. `read_state`
+    returns None if the state cannot be read. Returns whether the editor settled. The first delay is
+    the learned settle time of the app and later delays double, up to the maximum delay."""
+    start = self._clock()
+    typical = self._typical_settle_ms.get(app_key, self.initial_delay_ms)
+    delay_ms = min(max(typical, self.initial_delay_ms), self.max_delay_ms)
+    while True:
+      state = read_state()
+      elapsed_ms = (self._clock() - start) * 1000
+      if state is not None and state.matches(expected):
+        self._learn(app_key, elapsed_ms)
+        return True
+      remaining_ms = self.timeout_ms - elapsed_ms
+      if remaining_ms <= 0:
+        # Only learn from timeouts if the state could be read. An unreadable state says nothing
+        # about how long the app takes to settle.
+        if state is not None:
+          self._learn(app_key, elapsed_ms)
+        return False
+      self._sleep(min(delay_ms, remaining_ms) / 1000)
+      delay_ms = min(delay_ms * 2, self.max_delay_ms)
@@ -0,0 +1,124 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from typing import Optional
+from .scrambler_settle import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+    self.sleeps: list[float] = []
+
+  def __call__(self) -> float:
+    return self.now
+
+  def sleep(self, seconds: float):
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+class _FakeElement:
+  """Element that reaches its final state once the given time has passed."""
+
+  def __init__(self, clock: _FakeClock, settle_seconds: float, final_state: Optional[EditorState]):
+    self.clock = clock
+    self.settle_seconds = settle_seconds
+    self.final_state = final_state
+    self.reads = 0
+
+  def read_state(self) -> Optional[EditorState]:
+    self.reads += 1
+    if self.final_state is None:
+      return None
+    if self.clock.now >= self.settle_seconds:
+      return self.final_state
+    return EditorState(TextRange(0, 0), 0)
+
+
+def _make_detector(clock: _FakeClock) -> SettleDetector:
+  return SettleDetector(initial_delay_ms=2.0,
+                        max_delay_ms=8.0,
+                        timeout_ms=50.0,
+                        learning_rate=0.5,
+                        clock=clock,
+                        sleep=clock.sleep)
+
+
+class EditorStateTestCase(unittest.TestCase):
+
+  def test_matches(self):
+    state = EditorState(TextRange(1, 2), 10)
+    self.assertTrue(state.matches(EditorState(TextRange(1, 2), 10)))
+    self.assertTrue(state.matches(EditorState(TextRange(1, 2))))
+    self.assertFalse(state.matches(EditorState(TextRange(1, 3), 10)))
+    self.assertFalse(state.matches(EditorState(TextRange(1, 2), 11)))
+
+  def test_expected_state(self):
+    self.assertEqual(get_expected_state(Context("abc", TextRange(1, 2))),
+                     EditorState(TextRange(1, 2), 3))
+    self.assertEqual(get_expected_state(Context("abc", TextRange(1, 2), text_offset=5)),
+                     EditorState(TextRange(6, 7)))
+    self.assertEqual(
+        get_expected_state(Context("abc", TextRange(1, 2), text_offset=5, chars_after_text=4)),
+        EditorState(TextRange(6, 7), 12))
+
+
+class SettleDetectorTestCase(unittest.TestCase):
+
+  def test_already_settled(self):
+    clock = _FakeClock()
+    element = _FakeElement(clock, 0.0, EditorState(TextRange(3, 3), 5))
+    self.assertTrue(
+        _make_detector(clock).wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertEqual(element.reads, 1)
+    self.assertEqual(clock.sleeps, [])
+
+  def test_backoff(self):
+    clock = _FakeClock()
+    element = _FakeElement(clock, 0.020, EditorState(TextRange(3, 3), 5))
+    detector = _make_detector(clock)
+    self.assertTrue(detector.wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertEqual([round(seconds * 1000) for seconds in clock.sleeps], [2, 4, 8, 8])
+    self.assertAlmostEqual(detector.typical_settle_ms("app") or 0, 22.0)
+    self.assertIsNone(detector.typical_settle_ms("other app"))
+
+  def test_learns_settle_time(self):
+    clock = _FakeClock()
+    detector = _make_detector(clock)
+    element = _FakeElement(clock, 0.006, EditorState(TextRange(3, 3), 5))
+    self.assertTrue(detector.wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertAlmostEqual(detector.typical_settle_ms("app") or 0, 6.0)
+
+    # The first delay is the learned settle time.
+    clock.now = 0.0
+    clock.sleeps.clear()
+    self.assertTrue(detector.wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertEqual([round(seconds * 1000) for seconds in clock.sleeps], [6])
+    self.assertAlmostEqual(detector.typical_settle_ms("app") or 0, 6.0)
+
+  def test_timeout(self):
+    clock = _FakeClock()
+    detector = _make_detector(clock)
+    element = _FakeElement(clock, 1.0, EditorState(TextRange(3, 3), 5))
+    self.assertFalse(detector.wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertAlmostEqual(clock.now, 0.050)
+    self.assertAlmostEqual(detector.typical_settle_ms("app") or 0, 50.0)
+
+  def test_unreadable(self):
+    clock = _FakeClock()
+    detector = _make_detector(clock)
+    element = _FakeElement(clock, 0.0, None)
+    self.assertFalse(detector.wait("app", EditorState(TextRange(3, 3), 5), element.read_state))
+    self.assertAlmostEqual(clock.now, 0.050)
+    self.assertIsNone(detector.typical_settle_ms("app"))
+
+  def test_invalid_settings(self):
+    with self.assertRaises(ValueError):
+      SettleDetector(initial_delay_ms=0)
+    with self.assertRaises(ValueError):
+      SettleDetector(initial_delay_ms=10, max_delay_ms=5)
+    with self.assertRaises(ValueError):
+      SettleDetector(timeout_ms=0)
+    with self.assertRaises(ValueError):
+      SettleDetector(learning_rate=0)
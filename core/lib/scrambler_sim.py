@@ -1,18 +1,21 @@
 """Utils for simulating text editor actions."""
 
+from .scrambler_text_buffer import TextBuffer
 from .scrambler_types import Context, EditorAction, EditorActionType, TextRange
 
 
-def simulate_actions(context: Context, actions: list[EditorAction]) -> str:
-  """Simulates a set of input commands on an editor context. Updates the given context to reflect
-  the result of the actions and returns the clipboard contents."""
+def simulate_actions_in_buffer(buffer: TextBuffer, context: Context,
+                               actions: list[EditorAction]) -> str:
+  """Simulates a set of input commands on the text in `buffer`. Updates the selection and editor
+  mode of the given context, but not its text, and returns the clipboard contents. Edits take
+  O(log n) time, so long action lists on large texts do not copy the text for every action."""
   clipboard = ""
 
   # Verify selection is inside text.
-  if context.selection_range.end > len(context.text):
+  if context.selection_range.end > len(buffer):
     raise ValueError("Selection range outside of text")
 
-  # Apply actions to the given context.
+  # Apply actions to the given buffer and context.
   for action in actions:
     if action.action_type == EditorActionType.SET_SELECTION_RANGE:
       if action.text_range is None:
@@ -23,8 +26,7 @@ def simulate_actions(context: Context, actions: list[EditorAction]) -> str:
       else:
         context.editor_mode = "i"
     elif action.action_type == EditorActionType.INSERT_TEXT:
-      context.text = context.text[0:context.selection_range.
-                                  start] + action.text + context.text[context.selection_range.end:]
+      buffer.replace(context.selection_range.start, context.selection_range.end, action.text)
       context.selection_range = TextRange(context.selection_range.start + len(action.text),
                                           context.selection_range.start + len(action.text))
       context.editor_mode = "i"
@@ -34,12 +36,34 @@ def simulate_actions(context: Context, actions: list[EditorAction]) -> str:
     elif action.action_type == EditorActionType.DELETE_RANGE:
       if action.text_range is None:
         raise ValueError("Delete range action has no text range")
-      context.text = context.text[0:action.text_range.start] + context.text[action.text_range.end:]
+      # Parts of the range beyond the end of the text are ignored, as when slicing a string.
+      buffer.delete(min(action.text_range.start, len(buffer)),
+                    min(action.text_range.end, len(buffer)))
       context.selection_range = TextRange(action.text_range.start, action.text_range.start)
       context.editor_mode = "i"
+    elif action.action_type == EditorActionType.REPLACE_RANGE:
+      if action.text_range is None:
+        raise ValueError("Replace range action has no text range")
+      # Same as deleting the range and inserting the text.
+      buffer.replace(min(action.text_range.start, len(buffer)),
+                     min(action.text_range.end, len(buffer)), action.text)
+      cursor = action.text_range.start + len(action.text)
+      context.selection_range = TextRange(cursor, cursor)
+      context.editor_mode = "i"
 
     # Verify selection is still inside text after action.
-    if context.selection_range.end > len(context.text):
+    if context.selection_range.end > len(buffer):
       raise ValueError("Selection range outside of text")
 
   return clipboard
+
+
+def simulate_actions(context: Context, actions: list[EditorAction]) -> str:
+  """Simulates a set of input commands on an editor context. Updates the given context to reflect
+  the result of the actions and returns the clipboard contents."""
+  buffer = TextBuffer(context.text)
+  try:
+    return simulate_actions_in_buffer(buffer, context, actions)
+  finally:
+    # Keep the edits made before an invalid action, as when editing the text directly.
+    context.text = str(buffer)
@@ -50,6 +50,15 @@ class SimulateActionsTestCase(unittest.TestCase):
     self.assertEqual(context.editor_mode, "i")
     self.assertEqual(clipboard, "")
 
+  def test_replace_range(self):
+    context = Context("This is a test", TextRange(0, 0), editor_mode="v")
+    clipboard = simulate_actions(
+        context, [EditorAction(EditorActionType.REPLACE_RANGE, TextRange(5, 7), "was")])
+    self.assertEqual(context.selection_range, TextRange(8, 8))
+    self.assertEqual(context.text, "This was a test")
+    self.assertEqual(context.editor_mode, "i")
+    self.assertEqual(clipboard, "")
+
   def test_invalid_input(self):
     # Index OOB
     with self.assertRaises(ValueError):
@@ -0,0 +1,144 @@
+"""Piece table for simulating edits on large texts. Python strings are immutable, so every insertion
+or deletion on a `str` copies the whole text. A piece table only records which ranges of the
+original text and the inserted texts make up the current text, so edits take O(log n) time in the
+number of pieces and the text is only copied when it is read."""
+
+import random
+from typing import Optional
+
+
+class _Piece:
+  """A range of a source string, stored as a node of a treap ordered by position. `length` is the
+  total length of the subtree rooted at this node."""
+  __slots__ = ("source", "start", "end", "priority", "left", "right", "length")
+
+  def __init__(self, source: str, start: int, end: int, priority: float):
+    self.source = source
+    self.start = start
+    self.end = end
+    self.priority = priority
+    self.left: Optional[_Piece] = None
+    self.right: Optional[_Piece] = None
+    self.length = end - start
+
+
+def _length(node: Optional[_Piece]) -> int:
+  return 0 if node is None else node.length
+
+
+def _update(node: _Piece):
+  node.length = _length(node.left) + (node.end - node.start) + _length(node.right)
+
+
+def _split(node: Optional[_Piece], pos: int) -> tuple[Optional[_Piece], Optional[_Piece]]:
+  """Splits a subtree into the first `pos` characters and the rest."""
+  if node is None:
+    return None, None
+  left_length = _length(node.left)
+  piece_length = node.end - node.start
+  if pos <= left_length:
+    left, node.left = _split(node.left, pos)
+    _update(node)
+    return left, node
+  if pos >= left_length + piece_length:
+    node.right, right = _split(node.right, pos - left_length - piece_length)
+    _update(node)
+    return node, right
+  # Split the piece itself. The second half keeps the priority of the node, so it can take over
+  # its right subtree without breaking the heap order.
+  offset = node.start + pos - left_length
+  right_piece = _Piece(node.source, offset, node.end, node.priority)
+  right_piece.right = node.right
+  _update(right_piece)
+  node.end = offset
+  node.right = None
+  _update(node)
+  return node, right_piece
+
+
+def _merge(left: Optional[_Piece], right: Optional[_Piece]) -> Optional[_Piece]:
+  """Concatenates two subtrees."""
+  if left is None:
+    return right
+  if right is None:
+    return left
+  if left.priority > right.priority:
+    left.right = _merge(left.right, right)
+    _update(left)
+    return left
+  right.left = _merge(left, right.left)
+  _update(right)
+  return right
+
+
+def _collect(node: Optional[_Piece], start: int, end: int, result: list[str]):
+  """Appends the parts of the subtree's text between `start` and `end` to `result`."""
+  if node is None or start >= end:
+    return
+  left_length = _length(node.left)
+  if start < left_length:
+    _collect(node.left, start, min(end, left_length), result)
+  piece_length = node.end - node.start
+  piece_start = max(start - left_length, 0)
+  piece_end = min(end - left_length, piece_length)
+  if piece_start < piece_end:
+    result.append(node.source[node.start + piece_start:node.start + piece_end])
+  right_start = left_length + piece_length
+  if end > right_start:
+    _collect(node.right, max(start - right_start, 0), end - right_start, result)
+
+
+class TextBuffer:
+  """Mutable text backed by a piece table. The full text is built on demand and cached until the
+  next edit."""
+
+  def __init__(self, text: str = ""):
+    self._root: Optional[_Piece] = None
+    if text:
+      self._root = _Piece(text, 0, len(text), random.random())
+    self._text: Optional[str] = text
+
+  def __len__(self) -> int:
+    return _length(self._root)
+
+  def __str__(self) -> str:
+    if self._text is None:
+      self._text = self.slice(0, len(self))
+    return self._text
+
+  def _check_range(self, start: int, end: int):
+    if start < 0 or end < start or end > len(self):
+      raise ValueError(f"Invalid range: {start}-{end}")
+
+  def slice(self, start: int, end: int) -> str:
+    """Gets the text between the given positions."""
+    self._check_range(start, end)
+    if self._text is not None:
+      return self._text[start:end]
+    parts: list[str] = []
+    _collect(self._root, start, end, parts)
+    return "".join(parts)
+
+  def insert(self, pos: int, text: str):
+    """Inserts text at the given position."""
+    self._check_range(pos, pos)
+    if not text:
+      return
+    left, right = _split(self._root, pos)
+    self._root = _merge(_merge(left, _Piece(text, 0, len(text), random.random())), right)
+    self._text = None
+
+  def delete(self, start: int, end: int):
+    """Deletes the text between the given positions."""
+    self._check_range(start, end)
+    if start == end:
+      return
+    left, rest = _split(self._root, start)
+    _, right = _split(rest, end - start)
+    self._root = _merge(left, right)
+    self._text = None
+
+  def replace(self, start: int, end: int, text: str):
+    """Replaces the text between the given positions."""
+    self.delete(start, end)
+    self.insert(start, text)
@@ -0,0 +1,70 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import random
+import unittest
+from .scrambler_text_buffer import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class TextBufferTestCase(unittest.TestCase):
+
+  def test_empty(self):
+    buffer = TextBuffer()
+    self.assertEqual(len(buffer), 0)
+    self.assertEqual(str(buffer), "")
+    buffer.insert(0, "abc")
+    self.assertEqual(str(buffer), "abc")
+
+  def test_insert(self):
+    buffer = TextBuffer("hello world")
+    buffer.insert(5, ",")
+    buffer.insert(0, "> ")
+    buffer.insert(len(buffer), "!")
+    self.assertEqual(str(buffer), "> hello, world!")
+    self.assertEqual(len(buffer), 15)
+
+  def test_delete(self):
+    buffer = TextBuffer("hello, world")
+    buffer.delete(5, 7)
+    self.assertEqual(str(buffer), "helloworld")
+    buffer.delete(3, 3)
+    self.assertEqual(str(buffer), "helloworld")
+    buffer.delete(0, len(buffer))
+    self.assertEqual(str(buffer), "")
+
+  def test_replace(self):
+    buffer = TextBuffer("hello world")
+    buffer.replace(6, 11, "there")
+    buffer.replace(0, 5, "hi")
+    self.assertEqual(str(buffer), "hi there")
+
+  def test_slice(self):
+    buffer = TextBuffer("hello world")
+    buffer.insert(5, " big")
+    self.assertEqual(buffer.slice(2, 12), "llo big wo")
+    self.assertEqual(buffer.slice(4, 4), "")
+    str(buffer)
+    self.assertEqual(buffer.slice(6, 9), "big")
+
+  def test_invalid_range(self):
+    buffer = TextBuffer("abc")
+    with self.assertRaises(ValueError):
+      buffer.insert(4, "x")
+    with self.assertRaises(ValueError):
+      buffer.delete(2, 1)
+    with self.assertRaises(ValueError):
+      buffer.slice(-1, 2)
+
+  def test_random_edits(self):
+    rng = random.Random(0)
+    text = "The quick brown fox\njumps over the lazy dog."
+    buffer = TextBuffer(text)
+    for _ in range(500):
+      start = rng.randint(0, len(text))
+      end = rng.randint(start, min(len(text), start + 10))
+      inserted = "".join(rng.choice("ab\n ") for _ in range(rng.randint(0, 5)))
+      buffer.replace(start, end, inserted)
+      text = text[:start] + inserted + text[end:]
+      self.assertEqual(len(buffer), len(text))
+      start = rng.randint(0, len(text))
+      end = rng.randint(start, len(text))
+      self.assertEqual(buffer.slice(start, end), text[start:end])
+    self.assertEqual(str(buffer), text)
@@ -0,0 +1,124 @@
+"""Sources of editor text for Scrambler commands. Commands used to need the entire text of the editor
+up front, even when the target is the next word. A text source reads text on demand instead, so a
+command can run on a window around the selection and only read more when its target is not found
+there. Adapters cover plain strings and paged reads through the accessibility API."""
+
+import abc
+from typing import Callable, Iterator, Optional
+from .scrambler_ax_window import MAX_READ_CHARS, read_pages
+from .scrambler_types import TextRange
+
+# Size of the chunks returned by the chunk iterators, by default.
+DEFAULT_CHUNK_CHARS = 4096
+
+
+class TextSource(abc.ABC):
+  """Text that is read on demand. Offsets are in characters from the start of the text."""
+
+  @abc.abstractmethod
+  def __len__(self) -> int:
+    """Gets the length of the text."""
+
+  @abc.abstractmethod
+  def read(self, text_range: TextRange) -> str:
+    """Gets the text in the given range."""
+
+  def chunks_forward(self, start: int, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """Iterates over the text from `start` to the end in chunks of up to `chunk_chars`
+    characters."""
+    if chunk_chars < 1:
+      raise ValueError(f"Invalid chunk size: {chunk_chars}")
+    length = len(self)
+    for chunk_start in range(start, length, chunk_chars):
+      yield self.read(TextRange(chunk_start, min(chunk_start + chunk_chars, length)))
+
+  def chunks_backward(self, end: int, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """Iterates over the text before `end` towards the start in chunks of up to `chunk_chars`
+    characters. Each chunk is in its original order, not reversed."""
+    if chunk_chars < 1:
+      raise ValueError(f"Invalid chunk size: {chunk_chars}")
+    for chunk_end in range(end, 0, -chunk_chars):
+      yield self.read(TextRange(max(chunk_end - chunk_chars, 0), chunk_end))
+
+
+class StringTextSource(TextSource):
+  """A text source for text that is already in memory."""
+
+  def __init__(self, text: str):
+    self.text = text
+    # The whole text was fetched to create the source.
+    self.chars_fetched = len(text)
+    self.bytes_fetched = len(text.encode("utf-8"))
+
+  def __len__(self) -> int:
+    return len(self.text)
+
+  def read(self, text_range: TextRange) -> str:
+    _check_range(text_range, len(self.text))
+    return text_range.extract(self.text)
+
+
+class PagedTextSource(TextSource):
+  """A text source that reads fixed-size pages of editor text and keeps them. `read_range` reads a
+  range of editor text of up to `page_chars` characters, and returns None if it cannot. Reads raise
+  RuntimeError if a page cannot be read. The editor text must not change while the source is in
+  use."""
+
+  def __init__(self,
+               read_range: Callable[[TextRange], Optional[str]],
+               length: int,
+               page_chars: int = MAX_READ_CHARS):
+    if page_chars < 1:
+      raise ValueError(f"Invalid page size: {page_chars}")
+    self._read_range = read_range
+    self._length = length
+    self.page_chars = page_chars
+    self._pages: dict[int, str] = {}
+    self.reads = 0
+    self.chars_fetched = 0
+    self.bytes_fetched = 0
+
+  def __len__(self) -> int:
+    return self._length
+
+  def _fetch(self, first_page: int, last_page: int):
+    """Reads a run of consecutive pages that have not been read yet."""
+    fetch_range = TextRange(first_page * self.page_chars,
+                            min((last_page + 1) * self.page_chars, self._length))
+    text = read_pages(self._counted_read, fetch_range, self.page_chars)
+    if text is None:
+      raise RuntimeError(f"Unable to read editor text: {fetch_range}")
+    for page in range(first_page, last_page + 1):
+      self._pages[page] = text[(page - first_page) * self.page_chars:(page - first_page + 1) *
+                               self.page_chars]
+
+  def _counted_read(self, text_range: TextRange) -> Optional[str]:
+    text = self._read_range(text_range)
+    self.reads += 1
+    if text is not None:
+      self.chars_fetched += len(text)
+      self.bytes_fetched += len(text.encode("utf-8"))
+    return text
+
+  def read(self, text_range: TextRange) -> str:
+    _check_range(text_range, self._length)
+    if text_range.length() == 0:
+      return ""
+    first_page = text_range.start // self.page_chars
+    last_page = (text_range.end - 1) // self.page_chars
+    missing_start = None
+    for page in range(first_page, last_page + 2):
+      if page <= last_page and page not in self._pages:
+        if missing_start is None:
+          missing_start = page
+      elif missing_start is not None:
+        self._fetch(missing_start, page - 1)
+        missing_start = None
+    text = "".join(self._pages[page] for page in range(first_page, last_page + 1))
+    offset = first_page * self.page_chars
+    return text[text_range.start - offset:text_range.end - offset]
+
+
+def _check_range(text_range: TextRange, length: int):
+  if text_range.start < 0 or text_range.end > length:
+    raise ValueError(f"Range outside of text: {text_range}, length: {length}")
@@ -0,0 +1,61 @@
+"""Benchmark for how much editor text Scrambler commands read from each kind of text source, with the
+cursor in the middle of the document. A string source holds the entire text before the command
+runs, while paged sources only read the pages a command needs. Targets further than `MAX_RADIUS`
+from the cursor are not found in documents longer than `MAX_FULL_READ_CHARS`. Run from the repository root:
+
+python3 -m core.lib.scrambler_text_source_benchmark"""
+
+from typing import Callable
+from .scrambler_run import run_command_on_source
+from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_text_source import PagedTextSource, StringTextSource, TextSource
+from .scrambler_types import Command, CommandType, Modifier, ModifierType, TextRange
+
+_DOCUMENT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+_COMMANDS = [
+    Command(CommandType.SELECT, [Modifier(ModifierType.TOKEN_NEXT)]),
+    Command(CommandType.SELECT, [Modifier(ModifierType.PHRASE_CLOSEST, search="their target")]),
+    Command(CommandType.SELECT, [Modifier(ModifierType.PYTHON_SCOPE)]),
+    # The only match is at the end of the document.
+    Command(CommandType.SELECT, [Modifier(ModifierType.EXACT_WORD_NEXT, search="last")]),
+]
+
+_LINE = "def function_name(argument, other_argument):  # Comment.\n"
+_MIDDLE = "x = their target\n"
+_SUFFIX = "last\n"
+
+
+def _make_document(size: int) -> str:
+  half = _LINE * ((size - len(_MIDDLE) - len(_SUFFIX)) // len(_LINE) // 2)
+  return half + _MIDDLE + half + _SUFFIX
+
+
+# Creates each kind of source for a document.
+_SOURCE_FACTORIES: list[tuple[str, Callable[[str], TextSource]]] = [
+    ("string", StringTextSource),
+    ("accessibility pages", lambda text: PagedTextSource(lambda r: r.extract(text), len(text))),
+]
+
+
+def main():
+  documents = [_make_document(size) for size in _DOCUMENT_SIZES]
+  for command in _COMMANDS:
+    print(f"{command.modifiers[0].modifier_type.name:<28}" +
+          "".join(f"{size:>12,}" for size in _DOCUMENT_SIZES))
+    for name, make_source in _SOURCE_FACTORIES:
+      row = f"  {name:<26}"
+      for text in documents:
+        source = make_source(text)
+        cursor = text.index(_MIDDLE)
+        try:
+          run_command_on_source(command, source, TextRange(cursor, cursor), UTILITY_FUNCTIONS)
+        except ValueError:
+          row += f"{'not found':>12}"
+          continue
+        row += f"{source.bytes_fetched / 1000:>10.1f}KB"
+      print(row)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,94 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import unittest
+from typing import Optional
+from .scrambler_text_source import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+_TEXT = "".join(f"line {i}\n" for i in range(1000))
+
+
+class _FakeReader:
+
+  def __init__(self, text: str, fail: bool = False):
+    self.text = text
+    self.fail = fail
+    self.reads: list[TextRange] = []
+
+  def read_range(self, text_range: TextRange) -> Optional[str]:
+    self.reads.append(text_range)
+    return None if self.fail else text_range.extract(self.text)
+
+
+class StringTextSourceTestCase(unittest.TestCase):
+
+  def test_abstract(self):
+    with self.assertRaises(TypeError):
+      TextSource()  # pylint: disable=abstract-class-instantiated
+
+  def test_read(self):
+    source = StringTextSource("abcdef")
+    self.assertEqual(len(source), 6)
+    self.assertEqual(source.read(TextRange(1, 4)), "bcd")
+    self.assertEqual(source.bytes_fetched, 6)
+    with self.assertRaises(ValueError):
+      source.read(TextRange(4, 7))
+
+  def test_chunks(self):
+    source = StringTextSource("abcdefg")
+    self.assertEqual(list(source.chunks_forward(1, 3)), ["bcd", "efg"])
+    self.assertEqual(list(source.chunks_backward(6, 4)), ["cdef", "ab"])
+    self.assertEqual(list(source.chunks_forward(7, 3)), [])
+    self.assertEqual(list(source.chunks_backward(0, 3)), [])
+    with self.assertRaises(ValueError):
+      list(source.chunks_forward(0, 0))
+
+
+class PagedTextSourceTestCase(unittest.TestCase):
+
+  def test_read(self):
+    reader = _FakeReader(_TEXT)
+    source = PagedTextSource(reader.read_range, len(_TEXT), page_chars=100)
+    self.assertEqual(source.read(TextRange(150, 420)), _TEXT[150:420])
+    self.assertEqual(
+        reader.reads,
+        [TextRange(100, 200),
+         TextRange(200, 300),
+         TextRange(300, 400),
+         TextRange(400, 500)])
+    self.assertEqual(source.chars_fetched, 400)
+
+  def test_pages_are_kept(self):
+    reader = _FakeReader(_TEXT)
+    source = PagedTextSource(reader.read_range, len(_TEXT), page_chars=100)
+    source.read(TextRange(250, 260))
+    source.read(TextRange(50, 450))
+    self.assertEqual(source.read(TextRange(0, 500)), _TEXT[:500])
+    self.assertEqual(source.reads, 5)
+
+  def test_last_page(self):
+    reader = _FakeReader(_TEXT)
+    source = PagedTextSource(reader.read_range, len(_TEXT), page_chars=1000)
+    self.assertEqual(source.read(TextRange(len(_TEXT) - 5, len(_TEXT))), _TEXT[-5:])
+    self.assertEqual(reader.reads[-1].end, len(_TEXT))
+
+  def test_empty_read(self):
+    reader = _FakeReader(_TEXT)
+    source = PagedTextSource(reader.read_range, len(_TEXT))
+    self.assertEqual(source.read(TextRange(5, 5)), "")
+    self.assertEqual(reader.reads, [])
+
+  def test_chunks(self):
+    source = PagedTextSource(_FakeReader(_TEXT).read_range, len(_TEXT), page_chars=100)
+    self.assertEqual("".join(source.chunks_forward(10, 64)), _TEXT[10:])
+    self.assertEqual("".join(reversed(list(source.chunks_backward(500, 64)))), _TEXT[:500])
+
+  def test_failed_read(self):
+    source = PagedTextSource(_FakeReader(_TEXT, fail=True).read_range, len(_TEXT))
+    with self.assertRaises(RuntimeError):
+      source.read(TextRange(0, 10))
+
+  def test_bytes_fetched(self):
+    text = "é" * 10
+    source = PagedTextSource(_FakeReader(text).read_range, len(text))
+    source.read(TextRange(0, 10))
+    self.assertEqual(source.chars_fetched, 10)
+    self.assertEqual(source.bytes_fetched, 20)
@@ -0,0 +1,107 @@
+"""Latency records for Scrambler commands. Each command is split into phases, such as reading the
+editor context and executing editor actions, so slow commands can be attributed to a phase."""
+
+from collections import deque
+import contextlib
+from dataclasses import asdict, dataclass, field
+import json
+import math
+import time
+from typing import Callable, Iterator, Optional, Sequence
+
+# Phases of a command, in the order they run.
+PHASE_GET_CONTEXT = "get_context"
+PHASE_RUN_COMMAND = "run_command"
+PHASE_EXECUTE_ACTIONS = "execute_actions"
+PHASE_TOTAL = "total"
+
+
+@dataclass
+class CommandTiming:
+  """Timings for a single command."""
+  # Wall clock time when the command started, in seconds since the epoch.
+  timestamp: float
+  # Name of the command, e.g. "SELECT".
+  command: str
+  modifier_types: list[str] = field(default_factory=list)
+  text_length: int = 0
+  potato_mode: bool = False
+  editor_action_count: int = 0
+  # Duration of each phase in milliseconds.
+  phases_ms: dict[str, float] = field(default_factory=dict)
+  # Error raised by the command, if any.
+  error: Optional[str] = None
+  # Key presses in potato mode, and the number of calls used to send them. Repeated keys are sent in
+  # batches, so there are usually fewer calls than key presses.
+  key_presses: int = 0
+  key_dispatches: int = 0
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+  """Gets a percentile of the given values using the nearest rank method, e.g. `fraction=0.95` for
+  the 95th percentile."""
+  if not values:
+    raise ValueError("No values")
+  if not 0 <= fraction <= 1:
+    raise ValueError(f"Invalid percentile: {fraction}")
+  ordered = sorted(values)
+  rank = max(math.ceil(fraction * len(ordered)), 1)
+  return ordered[rank - 1]
+
+
+class TimingRecorder:
+  """Ring buffer of the most recent command timings."""
+
+  def __init__(self, max_records: int, clock: Callable[[], float] = time.perf_counter):
+    if max_records < 1:
+      raise ValueError(f"Invalid number of records: {max_records}")
+    self._records: deque[CommandTiming] = deque(maxlen=max_records)
+    self._clock = clock
+
+  def __len__(self) -> int:
+    return len(self._records)
+
+  def records(self) -> list[CommandTiming]:
+    """Gets the recorded timings, oldest first."""
+    return list(self._records)
+
+  def clear(self):
+    self._records.clear()
+
+  def record(self, timing: CommandTiming):
+    """Adds a timing, dropping the oldest one if the buffer is full."""
+    self._records.append(timing)
+
+  @contextlib.contextmanager
+  def phase(self, timing: Optional[CommandTiming], phase: str) -> Iterator[None]:
+    """Context manager that adds the time spent in its body to the given phase. Phases that run more
+    than once in a command are summed. Does nothing if `timing` is None, so callers can disable
+    recording."""
+    if timing is None:
+      yield
+      return
+    start = self._clock()
+    try:
+      yield
+    finally:
+      elapsed_ms = (self._clock() - start) * 1000
+      timing.phases_ms[phase] = timing.phases_ms.get(phase, 0.0) + elapsed_ms
+
+  def phase_names(self) -> list[str]:
+    """Gets the names of all recorded phases, in the order they were first seen."""
+    names: dict[str, None] = {}
+    for timing in self._records:
+      names.update(dict.fromkeys(timing.phases_ms))
+    return list(names)
+
+  def phase_percentiles(
+      self, phase: str, fractions: Sequence[float] = (0.5, 0.95)) -> Optional[list[float]]:
+    """Gets percentiles of the given phase in milliseconds. None if the phase was never recorded."""
+    values = [timing.phases_ms[phase] for timing in self._records if phase in timing.phases_ms]
+    if not values:
+      return None
+    return [percentile(values, fraction) for fraction in fractions]
+
+  def to_json(self) -> str:
+    """Serializes all records for offline analysis."""
+    return json.dumps([asdict(timing) for timing in self._records], indent=2)
@@ -0,0 +1,102 @@
+# pylint: disable=missing-module-docstring, missing-class-docstring
+import json
+import unittest
+from .scrambler_timing import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+class PercentileTestCase(unittest.TestCase):
+
+  def test_percentile(self):
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    self.assertEqual(percentile(values, 0.0), 1.0)
+    self.assertEqual(percentile(values, 0.5), 3.0)
+    self.assertEqual(percentile(values, 0.95), 5.0)
+    self.assertEqual(percentile(values, 1.0), 5.0)
+
+  def test_invalid(self):
+    with self.assertRaises(ValueError):
+      percentile([], 0.5)
+    with self.assertRaises(ValueError):
+      percentile([1.0], 1.5)
+
+
+class TimingRecorderTestCase(unittest.TestCase):
+
+  def test_ring_buffer(self):
+    recorder = TimingRecorder(2)
+    for i in range(3):
+      recorder.record(CommandTiming(i, f"command{i}"))
+    self.assertEqual(len(recorder), 2)
+    self.assertEqual([timing.command for timing in recorder.records()], ["command1", "command2"])
+    recorder.clear()
+    self.assertEqual(len(recorder), 0)
+
+  def test_invalid_size(self):
+    with self.assertRaises(ValueError):
+      TimingRecorder(0)
+
+  def test_phase(self):
+    clock = _FakeClock()
+    recorder = TimingRecorder(10, clock)
+    timing = CommandTiming(0, "SELECT")
+    with recorder.phase(timing, PHASE_GET_CONTEXT):
+      clock.now += 0.002
+    with recorder.phase(timing, PHASE_RUN_COMMAND):
+      clock.now += 0.001
+    with recorder.phase(timing, PHASE_GET_CONTEXT):
+      clock.now += 0.003
+    self.assertAlmostEqual(timing.phases_ms[PHASE_GET_CONTEXT], 5.0)
+    self.assertAlmostEqual(timing.phases_ms[PHASE_RUN_COMMAND], 1.0)
+
+  def test_phase_with_error(self):
+    clock = _FakeClock()
+    recorder = TimingRecorder(10, clock)
+    timing = CommandTiming(0, "SELECT")
+    with self.assertRaises(ValueError):
+      with recorder.phase(timing, PHASE_RUN_COMMAND):
+        clock.now += 0.001
+        raise ValueError("Failed")
+    self.assertAlmostEqual(timing.phases_ms[PHASE_RUN_COMMAND], 1.0)
+
+  def test_phase_disabled(self):
+    recorder = TimingRecorder(10)
+    with recorder.phase(None, PHASE_TOTAL):
+      pass
+    self.assertEqual(len(recorder), 0)
+
+  def test_phase_percentiles(self):
+    recorder = TimingRecorder(10)
+    for i in range(1, 5):
+      recorder.record(CommandTiming(0, "SELECT", phases_ms={PHASE_TOTAL: float(i)}))
+    recorder.record(CommandTiming(0, "SELECT", phases_ms={PHASE_GET_CONTEXT: 1.0}))
+    self.assertEqual(recorder.phase_names(), [PHASE_TOTAL, PHASE_GET_CONTEXT])
+    self.assertEqual(recorder.phase_percentiles(PHASE_TOTAL), [2.0, 4.0])
+    self.assertIsNone(recorder.phase_percentiles(PHASE_EXECUTE_ACTIONS))
+
+  def test_to_json(self):
+    recorder = TimingRecorder(10)
+    recorder.record(
+        CommandTiming(1.5, "SELECT", ["WORD"], 100, False, 1, {PHASE_TOTAL: 2.0}, "ValueError"))
+    self.assertEqual(json.loads(recorder.to_json()), [{
+        "timestamp": 1.5,
+        "command": "SELECT",
+        "modifier_types": ["WORD"],
+        "text_length": 100,
+        "potato_mode": False,
+        "editor_action_count": 1,
+        "phases_ms": {
+            "total": 2.0
+        },
+        "error": "ValueError",
+        "key_presses": 0,
+        "key_dispatches": 0
+    }])
@@ -1,24 +1,52 @@
 """Types used by the Scrambler API for navigating and editing text."""
 
-from dataclasses import dataclass, field
+from dataclasses import FrozenInstanceError, dataclass, field
 from enum import Enum, unique
 from typing import Any, Callable, Optional
 
+# Largest valid text position. Guards against ranges computed from corrupted indices.
+_MAX_TEXT_POSITION = 100000000
+
 
-@dataclass(frozen=True)
 class TextRange:
   """A range of characters in some text. May have zero length (start == end), in which case it
-  represents a cursor position (empty selection). This class is intended to be immutable."""
-  start: int = 0
-  end: int = 0
+  represents a cursor position (empty selection). This class is immutable.
+
+  Many ranges are created for every command, so this is a slotted class rather than a dataclass.
+  Equality, hashing and repr behave as for a frozen dataclass."""
+  __slots__ = ("start", "end")
+  __match_args__ = ("start", "end")
+  start: int
+  end: int
 
   def __init__(self, start: int, end: int):
     if start < 0 or end < start:
       raise ValueError(f"Invalid range: {start}-{end}")
-    if end > 100000000:
+    if end > _MAX_TEXT_POSITION:
       raise ValueError(f"End value too large: {end}")
-    object.__setattr__(self, "start", start)
-    object.__setattr__(self, "end", end)
+    _set_text_range_start(self, start)
+    _set_text_range_end(self, end)
+
+  def __eq__(self, other: object) -> bool:
+    if other.__class__ is not self.__class__:
+      return NotImplemented
+    assert isinstance(other, TextRange)
+    return self.start == other.start and self.end == other.end
+
+  def __hash__(self) -> int:
+    return hash((self.start, self.end))
+
+  def __repr__(self) -> str:
+    return f"{self.__class__.__qualname__}(start={self.start!r}, end={self.end!r})"
+
+  def __setattr__(self, name: str, value: Any):
+    raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+  def __delattr__(self, name: str):
+    raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+  def __reduce__(self):
+    return (TextRange, (self.start, self.end))
 
   def length(self):
     """Returns the length of this range. Non negative, zero if start and end positions are the
@@ -32,14 +60,45 @@ class TextRange:
     return text[self.start:self.end]
 
 
-@dataclass
+# Setters for the slots of `TextRange`, which bypass `__setattr__`.
+_set_text_range_start = TextRange.start.__set__  # type: ignore[attr-defined]
+_set_text_range_end = TextRange.end.__set__  # type: ignore[attr-defined]
+
+
+def unchecked_text_range(start: int, end: int) -> TextRange:
+  """Creates a text range without validating it. Only for hot paths where the range is known to be
+  valid, e.g. the span of a regex match."""
+  result = object.__new__(TextRange)
+  _set_text_range_start(result, start)
+  _set_text_range_end(result, end)
+  return result
+
+
 class TextMatch:
   """A text range matched by a target or modifier. Includes extra metadata to help with text
-  manipulation."""
+  manipulation. Slotted like `TextRange`, with the equality and repr of a dataclass."""
+  __slots__ = ("text_range", "deletion_range")
+  __match_args__ = ("text_range", "deletion_range")
   # The range that was matched.
   text_range: TextRange
   # Optional text range to use when deleting the match. May include comma and space separators, etc.
-  deletion_range: Optional[TextRange] = None
+  deletion_range: Optional[TextRange]
+
+  def __init__(self, text_range: TextRange, deletion_range: Optional[TextRange] = None):
+    self.text_range = text_range
+    self.deletion_range = deletion_range
+
+  def __eq__(self, other: object) -> bool:
+    if other.__class__ is not self.__class__:
+      return NotImplemented
+    assert isinstance(other, TextMatch)
+    return self.text_range == other.text_range and self.deletion_range == other.deletion_range
+
+  __hash__ = None  # type: ignore[assignment]
+
+  def __repr__(self) -> str:
+    return (f"{self.__class__.__qualname__}(text_range={self.text_range!r}, "
+            f"deletion_range={self.deletion_range!r})")
 
 
 @unique
@@ -111,6 +170,10 @@ class ModifierType(Enum):
   # line wrapping.
   LINE_INCLUDING_LINE_BREAK = 39
   LINE_EXCLUDING_LINE_BREAK = 40
+  # Move between Python scopes in the same enclosing scope, or take the enclosing scope.
+  PYTHON_SCOPE_NEXT = 41
+  PYTHON_SCOPE_PREVIOUS = 42
+  PYTHON_SCOPE_PARENT = 43
 
 
 @dataclass
@@ -123,6 +186,9 @@ class Modifier:
   search: str = ""
   # Delimiter for modifiers where applicable. Empty string to use default.
   delimiter: str = ""
+  # Maximum number of misrecognized characters for phrase modifiers when there is no exact match.
+  # Zero to only match phrases exactly.
+  max_errors: int = 0
 
 
 @unique
@@ -208,16 +274,43 @@ class EditorActionType(Enum):
   # Deletes the given text range. Leaves the cursor at the start of the deleted range.
   # Vim-style editors should end in insert mode.
   DELETE_RANGE = 5
+  # Replaces the given text range with the given text. Leaves the cursor after the inserted text.
+  # Vim-style editors should end in insert mode. Only produced by `scrambler_fusion` for editors that
+  # support it.
+  REPLACE_RANGE = 6
 
 
-@dataclass
 class EditorAction:
-  """A text editing action. Used as output from scrambler."""
+  """A text editing action. Used as output from scrambler. Slotted like `TextRange`, with the
+  equality and repr of a dataclass."""
+  __slots__ = ("action_type", "text_range", "text")
+  __match_args__ = ("action_type", "text_range", "text")
   action_type: EditorActionType
   # Text range for selection, deletion, etc.
-  text_range: Optional[TextRange] = None
+  text_range: Optional[TextRange]
   # Text to insert, copy to the clipboard, etc.
-  text: str = ""
+  text: str
+
+  def __init__(self,
+               action_type: EditorActionType,
+               text_range: Optional[TextRange] = None,
+               text: str = ""):
+    self.action_type = action_type
+    self.text_range = text_range
+    self.text = text
+
+  def __eq__(self, other: object) -> bool:
+    if other.__class__ is not self.__class__:
+      return NotImplemented
+    assert isinstance(other, EditorAction)
+    return (self.action_type == other.action_type and self.text_range == other.text_range and
+            self.text == other.text)
+
+  __hash__ = None  # type: ignore[assignment]
+
+  def __repr__(self) -> str:
+    return (f"{self.__class__.__qualname__}(action_type={self.action_type!r}, "
+            f"text_range={self.text_range!r}, text={self.text!r})")
 
 
 @dataclass
@@ -245,6 +338,9 @@ class Context:
   # The starting offset of `text` in the active editor. Used when we are not operating on the entire
   # contents of the editor. Not used in potato mode.
   text_offset: int = 0
+  # Number of characters in the editor after the end of `text`, when `text` is a window of the editor
+  # text read through the accessibility API. None if unknown.
+  chars_after_text: Optional[int] = None
   # The element that contains the text we are editing. Not used outside of AX accessibility mode.
   editor_element: Any = None
   # The current editor mode. Empty string if not applicable.
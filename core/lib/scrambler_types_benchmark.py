@@ -0,0 +1,51 @@
+"""Microbenchmark for creating the core Scrambler types and for `apply_modifier` throughput, which
+creates many of them. Run from the repository root:
+
+python3 -m core.lib.scrambler_types_benchmark"""
+
+import timeit
+from .scrambler_index import clear_text_index_cache
+from .scrambler_modifiers import apply_modifier
+from .scrambler_test_util import UTILITY_FUNCTIONS
+from .scrambler_types import (EditorAction, EditorActionType, Modifier, ModifierType, TextMatch,
+                              TextRange, unchecked_text_range)
+
+_CONSTRUCTION_ITERATIONS = 1_000_000
+_MODIFIER_ITERATIONS = 2_000
+
+_CONSTRUCTORS = {
+    "TextRange": lambda: TextRange(1, 2),
+    "unchecked_text_range": lambda: unchecked_text_range(1, 2),
+    "TextMatch": lambda: TextMatch(TextRange(1, 2), TextRange(0, 2)),
+    "EditorAction": lambda: EditorAction(EditorActionType.INSERT_TEXT, TextRange(1, 2), "text"),
+}
+
+# Modifiers that create several ranges and matches per call.
+_MODIFIERS = [
+    Modifier(ModifierType.TOKEN_NEXT, repeat=5),
+    Modifier(ModifierType.WORD_SUBSTRING_NEXT, search="target"),
+    Modifier(ModifierType.ARGUMENT),
+    Modifier(ModifierType.LINE_INCLUDING_LINE_BREAK),
+]
+
+_TEXT = "def function_name(argument, other_argument):  # Comment.\n" * 50 + "x = target\n"
+
+
+def main():
+  for name, constructor in _CONSTRUCTORS.items():
+    seconds = timeit.timeit(constructor, number=_CONSTRUCTION_ITERATIONS)
+    print(f"{name:<28}{seconds / _CONSTRUCTION_ITERATIONS * 1e9:>10.1f}ns")
+
+  # Warm the text index, so the timings measure the modifiers rather than indexing.
+  clear_text_index_cache()
+  input_match = TextMatch(TextRange(30, 30))
+  for modifier in _MODIFIERS:
+    apply_modifier(_TEXT, input_match, modifier, UTILITY_FUNCTIONS)
+    seconds = timeit.timeit(
+        lambda m=modifier: apply_modifier(_TEXT, input_match, m, UTILITY_FUNCTIONS),
+        number=_MODIFIER_ITERATIONS)
+    print(f"{modifier.modifier_type.name:<28}{_MODIFIER_ITERATIONS / seconds:>10.0f}/s")
+
+
+if __name__ == "__main__":
+  main()
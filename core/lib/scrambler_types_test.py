@@ -1,4 +1,6 @@
 # pylint: disable=missing-module-docstring, missing-class-docstring
+import copy
+import pickle
 import unittest
 from .scrambler_types import *  # pylint: disable=wildcard-import, unused-wildcard-import
 
@@ -55,3 +57,64 @@ class TextRangeTestCase(unittest.TestCase):
     # Huge range.
     with self.assertRaises(ValueError):
       TextRange(0, 500000000)
+
+  def test_equality_and_hash(self):
+    self.assertEqual(TextRange(1, 2), TextRange(1, 2))
+    self.assertNotEqual(TextRange(1, 2), TextRange(1, 3))
+    self.assertNotEqual(TextRange(1, 2), (1, 2))
+    self.assertEqual(hash(TextRange(1, 2)), hash((1, 2)))
+    self.assertEqual(len({TextRange(1, 2), TextRange(1, 2), TextRange(0, 2)}), 2)
+
+  def test_repr(self):
+    self.assertEqual(repr(TextRange(1, 2)), "TextRange(start=1, end=2)")
+
+  def test_immutable(self):
+    text_range = TextRange(1, 2)
+    with self.assertRaises(AttributeError):
+      text_range.start = 0  # type: ignore[misc]
+    with self.assertRaises(AttributeError):
+      text_range.other = 0  # type: ignore[attr-defined]
+
+  def test_copy(self):
+    text_range = TextRange(1, 2)
+    self.assertEqual(copy.copy(text_range), text_range)
+    self.assertEqual(copy.deepcopy(text_range), text_range)
+    self.assertEqual(pickle.loads(pickle.dumps(text_range)), text_range)
+
+  def test_unchecked(self):
+    self.assertEqual(unchecked_text_range(1, 2), TextRange(1, 2))
+    self.assertEqual(hash(unchecked_text_range(1, 2)), hash(TextRange(1, 2)))
+
+
+class TextMatchTestCase(unittest.TestCase):
+
+  def test_equality(self):
+    self.assertEqual(TextMatch(TextRange(1, 2)), TextMatch(TextRange(1, 2), None))
+    self.assertNotEqual(TextMatch(TextRange(1, 2)), TextMatch(TextRange(1, 2), TextRange(0, 2)))
+    with self.assertRaises(TypeError):
+      hash(TextMatch(TextRange(1, 2)))
+
+  def test_repr(self):
+    self.assertEqual(repr(TextMatch(TextRange(1, 2))),
+                     "TextMatch(text_range=TextRange(start=1, end=2), deletion_range=None)")
+
+  def test_slots(self):
+    with self.assertRaises(AttributeError):
+      TextMatch(TextRange(1, 2)).other = 0  # type: ignore[attr-defined]
+
+
+class EditorActionTestCase(unittest.TestCase):
+
+  def test_equality(self):
+    self.assertEqual(EditorAction(EditorActionType.INSERT_TEXT, text="a"),
+                     EditorAction(EditorActionType.INSERT_TEXT, None, "a"))
+    self.assertNotEqual(EditorAction(EditorActionType.INSERT_TEXT, text="a"),
+                        EditorAction(EditorActionType.INSERT_TEXT, text="b"))
+    with self.assertRaises(TypeError):
+      hash(EditorAction(EditorActionType.INSERT_TEXT))
+
+  def test_repr(self):
+    self.assertEqual(
+        repr(EditorAction(EditorActionType.DELETE_RANGE, TextRange(1, 2))),
+        "EditorAction(action_type=<EditorActionType.DELETE_RANGE: 5>, "
+        "text_range=TextRange(start=1, end=2), text='')")
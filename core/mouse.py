@@ -13,13 +13,18 @@ from talon.experimental import ocr
 from talon.types import Rect
 from talon.skia.typeface import Typeface
 from .lib.ocr_util import get_closest_ocr_result_index
-from .lib.scrambler_modifiers import get_phrase_regex
+from .lib.regex_cache import get_search_regex
+from .lib.scrambler_phrase import get_phrase_alternatives, get_phrase_tree_regex
 from .lib.url_util import extract_url
 from .user_settings import append_to_csv, load_coords_from_csv
 
 mod = Module()
 ctx = Context()
 
+# Homophone function for OCR searches. Kept in one place so that cached search regexes built with it
+# are found again.
+_get_all_homophones = actions.user.get_all_homophones
+
 
 @dataclass()
 class MouseCoordinateDelta:
@@ -169,8 +174,10 @@ def _ocr_search(s: str, use_active_window: bool = False):
   global _regex_from_last_search
   global _target_rects_from_last_search
 
-  regex_str = get_phrase_regex(s.split(), actions.user.get_all_homophones)
-  _regex_from_last_search = re.compile(regex_str, re.IGNORECASE)
+  _regex_from_last_search = get_search_regex(
+      s, "ocr_phrase",
+      lambda: get_phrase_tree_regex(get_phrase_alternatives(s.split(), _get_all_homophones)),
+      _get_all_homophones)
 
   results = _ocr_active_window() if use_active_window else _ocr_active_context()
   _target_rects_from_last_search = []
@@ -14,6 +14,11 @@ from ..core.scrambler import ScramblerMatch
 mod = Module()
 ctx = Context()
 
+# Homophone functions for OCR commands. Created once so that cached search regexes built with them
+# are found again.
+_UTILITY_FUNCTIONS = st.UtilityFunctions(actions.user.get_all_homophones,
+                                         actions.user.get_next_homophone)
+
 
 def _mouse_select_text(start: Tuple[float, float], end: Tuple[float, float], button: int = 0):
   """Selects text between the given screen coordinates."""
@@ -41,8 +46,7 @@ def _run_command(command: st.Command, expand_to_ocr_results: bool = False):
   # Run OCR and turn the result into a context we can use.
   ocr_results = _ocr_active_screen()
   context = ocr_util.create_ocr_scrambler_context(ocr_results, actions.mouse_x(), actions.mouse_y())
-  utility_functions = st.UtilityFunctions(actions.user.get_all_homophones,
-                                          actions.user.get_next_homophone)
+  utility_functions = _UTILITY_FUNCTIONS
 
   # Uncomment the following line to disable trying to infer a cursor position from the current mouse
   # coords.
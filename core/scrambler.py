@@ -4,10 +4,13 @@
 # pyright: reportSelfClsParameterName=false, reportGeneralTypeIssues=false
 # mypy: ignore-errors
 
+from pathlib import Path
+from tempfile import gettempdir
+import time
 from typing import Callable, Optional
-from talon import Context, Module, actions, clip, types, ui
-from .lib import number_util, scrambler_potato, scrambler_run, scrambler_sim, scrambler_types as st
-from .scrambler_captures import ScramblerMatch
+from talon import Context, Module, actions, imgui, types, ui
+from .lib import number_util, scrambler_ax_window, scrambler_context_cache, scrambler_fusion, scrambler_potato, scrambler_potato_context, scrambler_run, scrambler_settle, scrambler_sim, scrambler_text_source, scrambler_timing, scrambler_types as st
+from .scrambler_captures import ScramblerMatch, setting_phrase_max_errors
 
 mod = Module()
 ctx = Context()
@@ -15,15 +18,62 @@ ctx = Context()
 # Whether to log all commands run for debugging.
 _LOG_COMMANDS = True
 
+# Whether to reuse the context from the previous command when the editor has not changed since.
+# Avoids reading the full text through the accessibility API for chained commands.
+_CACHE_CONTEXT = True
+
+# Whether to reuse the potato mode context from the previous command if the editor has not changed.
+# Avoids selecting and copying the text around the cursor again for chained commands.
+_CACHE_POTATO_CONTEXT = True
+
+# Whether to wait for the editor to reflect each editor action instead of sleeping a fixed time.
+_DETECT_SETTLE = True
+
+# Whether to record how long each phase of a command takes.
+_RECORD_TIMINGS = True
+
+# Number of commands to keep timings for.
+_MAX_TIMING_RECORDS = 200
+
 # Accessibility APIs appear to be limited to this many characters.
-_MAX_ACCESSIBLITY_API_CHARS = 10000
+_MAX_ACCESSIBLITY_API_CHARS = scrambler_ax_window.MAX_READ_CHARS
 
 # Require at least this many characters after the selection before the accessibility API limit.
 _MIN_CHARS_AFTER_ACCESSIBLITY_API_LIMIT = 1000
 
-# Lines to fetch in potato mode.
-_POTATO_LINES_BEFORE = 25
-_POTATO_LINES_AFTER = 10
+# Context after the last command run through the accessibility API.
+_context_cache = scrambler_context_cache.ContextCache()
+
+# Context after the last command run in potato mode.
+_potato_context_cache = scrambler_potato_context.PotatoContextCache()
+
+# Lines to fetch in potato mode for the command currently running.
+_potato_window = scrambler_potato_context.FULL_WINDOW
+
+# Pages of editor text read for the command currently running, in documents longer than the
+# accessibility API limit. Kept while the window around the selection grows, so no page is read
+# twice.
+_ax_source: Optional[scrambler_text_source.PagedTextSource] = None
+
+# Homophone functions for scrambler commands. Created once so that cached search regexes built with
+# them are found again.
+_UTILITY_FUNCTIONS = st.UtilityFunctions(actions.user.get_all_homophones,
+                                         actions.user.get_next_homophone)
+
+# Waits for the editor after each editor action and learns how long each app takes.
+_settle_detector = scrambler_settle.SettleDetector(sleep=actions.sleep)
+
+# Whether the editor was confirmed to reflect every action of the previous command.
+_last_actions_settled = False
+
+# Timings of recent commands, and the timing of the command currently running, if any.
+_timings = scrambler_timing.TimingRecorder(_MAX_TIMING_RECORDS)
+_current_timing: Optional[scrambler_timing.CommandTiming] = None
+
+# Phases of getting the context, in addition to the phases in `scrambler_timing`.
+_PHASE_ENHANCED_UI_WAIT = "enhanced_ui_wait"
+_PHASE_POTATO_CONTEXT = "potato_context"
+_PHASE_SETTLE = "settle"
 
 # Input action functions keyed by potato action type.
 _POTATO_INPUT_ACTIONS_BY_TYPE = {
@@ -91,6 +141,35 @@ def _make_command(command_type: st.CommandType,
 
 def _get_context_potato_mode() -> st.Context:
   """Gets scrambler context in potato mode."""
+  with _timings.phase(_current_timing, _PHASE_POTATO_CONTEXT):
+    if _CACHE_POTATO_CONTEXT:
+      cached_context = _get_cached_context_potato_mode()
+      if cached_context is not None:
+        return cached_context
+    return _read_context_potato_mode()
+
+
+def _get_cached_context_potato_mode() -> Optional[st.Context]:
+  """Gets the cached potato mode context if it covers the lines the current command needs and the
+  editor has not changed. Only reads the selection or the text from the start of the previous line
+  to the cursor."""
+  now = time.monotonic()
+  editor_key = ui.active_window().id
+  validation = _potato_context_cache.validation(editor_key, _potato_window, now)
+  validation_text = None
+  if validation == scrambler_potato_context.PotatoValidation.SELECTED_TEXT:
+    validation_text = actions.user.scrambler_get_selected_text_potato_mode()
+  elif validation == scrambler_potato_context.PotatoValidation.LINES_BEFORE_CURSOR:
+    actions.user.extend_up()
+    actions.user.extend_line_start()
+    validation_text = actions.user.scrambler_get_selected_text_potato_mode()
+    if len(validation_text) > 0:
+      actions.user.right()
+  return _potato_context_cache.lookup(editor_key, _potato_window, validation_text, now)
+
+
+def _read_context_potato_mode() -> st.Context:
+  """Reads scrambler context in potato mode by selecting text around the cursor."""
   # Check if we already have a selection.
   # Note: Editors that copy the entire line when nothing is selected should override this action to
   # return an empty string. Otherwise, many actions in scrambler will break, especially for targets
@@ -122,8 +201,56 @@ def _get_context_potato_mode() -> st.Context:
   return st.Context(text_before + text_after, selection_range, potato_mode=True)
 
 
+def _read_text_range(element, text_range: st.TextRange) -> Optional[str]:
+  """Reads part of the text of an accessibility element. Returns None if the element does not
+  support reading text ranges."""
+  try:
+    return element.AXStringForRange(types.span.Span(text_range.start, text_range.end))
+  except (AttributeError, TypeError, ui.UIErr):
+    return None
+
+
+def _get_cached_context(focused_element) -> Optional[st.Context]:
+  """Gets the cached context for the focused element if the selection, the length of the text and
+  the text around the selection are unchanged. Only reads the selection, the text length and a small
+  window of text."""
+  now = time.monotonic()
+  state = _read_editor_state(focused_element)
+  if state is None:
+    return None
+  window = _context_cache.validation_window(focused_element, state.selection_range,
+                                            state.text_length, now)
+  window_text = None if window is None else _read_text_range(focused_element, window)
+  context = _context_cache.lookup(focused_element, state.selection_range, state.text_length,
+                                  window_text, now)
+  if context is not None:
+    context.editor_element = focused_element
+  return context
+
+
+def _read_context_window(focused_element) -> Optional[st.Context]:
+  """Reads a window of text around the selection if the focused element has more text than the
+  accessibility API returns at once. Returns None if the text is short enough to read in full, or if
+  it cannot be read in pages."""
+  global _ax_source
+  state = _read_editor_state(focused_element)
+  if (state is None or state.text_length is None or
+      state.text_length <= _MAX_ACCESSIBLITY_API_CHARS):
+    return None
+  source = scrambler_text_source.PagedTextSource(
+      lambda text_range: _read_text_range(focused_element, text_range), state.text_length)
+  try:
+    context = scrambler_ax_window.read_window(source.read, state.selection_range, state.text_length)
+  except RuntimeError:
+    return None
+  _ax_source = source
+  context.editor_element = focused_element
+  return context
+
+
 def _get_context() -> st.Context:
   """Gets context for scrambler to act in."""
+  global _last_actions_settled
   # Go straight to Potato mode if it is being forced.
   if actions.user.scrambler_force_potato_mode():
     return _get_context_potato_mode()
@@ -143,11 +270,14 @@ def _get_context() -> st.Context:
         # This can throw an exception but still succeed in enabling enhanced UI.
         pass
       # Pause for UI to update before we try to access the focused element.
-      actions.sleep("500ms")
+      with _timings.phase(_current_timing, _PHASE_ENHANCED_UI_WAIT):
+        actions.sleep("500ms")
 
   # Short pause to make scrambler commands more chainable. Allows UI to update from previous
-  # commands.
-  actions.sleep("20ms")
+  # commands. Not needed if the editor was confirmed to have caught up with them.
+  if not _last_actions_settled:
+    actions.sleep("20ms")
+  _last_actions_settled = False
 
   # Try to get the focused element. If we can't, we'll fallback to potato mode.
   focused_element = None
@@ -163,6 +293,17 @@ def _get_context() -> st.Context:
     print("Scrambler: Missing required accessibility API attributes. Falling back to potato mode.")
     return _get_context_potato_mode()
 
+  # Reuse the context from the previous command if the editor has not changed since.
+  if _CACHE_CONTEXT:
+    cached_context = _get_cached_context(focused_element)
+    if cached_context is not None:
+      return cached_context
+
+  # Read documents longer than the accessibility API limit in pages around the selection.
+  window_context = _read_context_window(focused_element)
+  if window_context is not None:
+    return window_context
+
   # Try to get the remaining required data. Log a warning and fallback to potato mode if we can't.
   try:
     text: str = focused_element.AXValue
@@ -197,13 +338,51 @@ def _get_context() -> st.Context:
   return st.Context(text, selection_range, potato_mode=False, editor_element=focused_element)
 
 
+def _read_editor_state(element) -> Optional[scrambler_settle.EditorState]:
+  """Reads the selection and text length of an accessibility element without reading its text.
+  Returns None if the selection cannot be read."""
+  try:
+    selection_span: types.span.Span = element.AXSelectedTextRange
+  except (AttributeError, ui.UIErr):
+    return None
+  try:
+    text_length: Optional[int] = element.AXNumberOfCharacters
+  except (AttributeError, ui.UIErr):
+    text_length = None
+  return scrambler_settle.EditorState(st.TextRange(selection_span.left, selection_span.right),
+                                      text_length)
+
+
+def _wait_for_editor(context: st.Context, app_key: str) -> bool:
+  """Waits for the editor to reflect the given simulated context. Returns whether it did."""
+  if not _DETECT_SETTLE or context.editor_element is None:
+    actions.sleep("50ms")
+    return False
+  with _timings.phase(_current_timing, _PHASE_SETTLE):
+    return _settle_detector.wait(app_key, scrambler_settle.get_expected_state(context),
+                                 lambda: _read_editor_state(context.editor_element))
+
+
 def _execute_editor_actions_potato_mode(editor_actions: list[st.EditorAction], context: st.Context):
   """Executes a set of editor actions in potato mode, given a scrambler context."""
   # Convert the actions to potato mode.
-  potato_actions = scrambler_potato.convert_actions_to_potato_mode(editor_actions, context.text,
-                                                                   context.selection_range)
+  potato_actions = scrambler_potato.convert_actions_to_potato_mode(
+      editor_actions, context.text, context.selection_range,
+      actions.user.scrambler_potato_profile())
 
+  max_key_batch = actions.user.scrambler_potato_max_key_batch()
+  key_presses = 0
+  key_dispatches = 0
   for action in potato_actions:
+    # Send repeated keys in batches, e.g. "left:37", rather than one action call per key press.
+    batched_keys = scrambler_potato.get_batched_keys(action, max_key_batch)
+    if batched_keys is not None:
+      for keys in batched_keys:
+        actions.key(keys)
+      key_presses += action.repeat
+      key_dispatches += len(batched_keys)
+      continue
+
     for _ in range(0, action.repeat):
       # Some actions require a text argument.
       if action.action_type in (scrambler_potato.PotatoEditorActionType.INSERT_TEXT,
@@ -212,15 +391,24 @@ def _execute_editor_actions_potato_mode(editor_actions: list[st.EditorAction], c
         _POTATO_INPUT_ACTIONS_BY_TYPE[action.action_type](action.text)
       else:
         _POTATO_INPUT_ACTIONS_BY_TYPE[action.action_type]()
+        key_presses += 1
+      key_dispatches += 1
+
+  if _current_timing is not None:
+    _current_timing.key_presses += key_presses
+    _current_timing.key_dispatches += key_dispatches
 
 
 def _execute_editor_actions(editor_actions: list[st.EditorAction], context: st.Context):
   """Executes a set of editor actions, given a scrambler context."""
+  global _last_actions_settled
   # Execute in potato mode if necessary.
   if context.potato_mode:
     _execute_editor_actions_potato_mode(editor_actions, context)
     return
 
+  app_key = ui.active_app().bundle
+  settled = True
   for action in editor_actions:
     if action.action_type == st.EditorActionType.INSERT_TEXT:
       actions.user.scrambler_insert_text_action(action, context)
@@ -236,27 +424,181 @@ def _execute_editor_actions(editor_actions: list[st.EditorAction], context: st.C
       if action.text_range is None:
         raise ValueError("Delete range action with missing range.")
       actions.user.scrambler_delete_range_action(action, context)
+    elif action.action_type == st.EditorActionType.REPLACE_RANGE:
+      if action.text_range is None:
+        raise ValueError("Replace range action with missing range.")
+      actions.user.scrambler_replace_range_action(action, context)
 
     # Update context with the action.
     scrambler_sim.simulate_actions(context, [action])
 
-    # Sleep to let the UI catch up to the commands.
-    actions.sleep("50ms")
+    # Clipboard actions do not change the editor, so there is nothing to wait for.
+    if action.action_type in (st.EditorActionType.SET_CLIPBOARD_NO_HISTORY,
+                              st.EditorActionType.SET_CLIPBOARD_WITH_HISTORY):
+      continue
+
+    # Let the UI catch up to the commands.
+    settled = _wait_for_editor(context, app_key) and settled
+
+  _last_actions_settled = settled
+
+
+def _run_editor_actions(editor_actions: list[st.EditorAction], context: st.Context):
+  """Executes editor actions planned against the given context and caches the resulting context."""
+  # Each action waits for the editor to settle, so execute as few actions as possible. Potato mode
+  # converts the actions to key presses instead.
+  if not context.potato_mode:
+    editor_actions = scrambler_fusion.fuse_actions(editor_actions,
+                                                   actions.user.scrambler_fused_action_types())
+  if _LOG_COMMANDS:
+    print(f"Scrambler editor actions: {editor_actions}")
+  # The cached context is stale once the editor starts changing. Only cache the new context if every
+  # action succeeded, as it is then in sync with the editor.
+  _context_cache.invalidate()
+  _potato_context_cache.invalidate()
+  _execute_editor_actions(editor_actions, context)
+  if _CACHE_POTATO_CONTEXT and context.potato_mode:
+    _potato_context_cache.store(context, ui.active_window().id, time.monotonic())
+  elif _CACHE_CONTEXT and not context.potato_mode and context.editor_element is not None:
+    _context_cache.store(context, context.editor_element, time.monotonic())
+
+
+def _run_planned_command(name: str, modifiers: list[st.Modifier],
+                         plan: Callable[[st.Context, st.UtilityFunctions], list[st.EditorAction]]):
+  """Gets the context, plans editor actions for it and executes them. Records how long each phase
+  takes."""
+  global _current_timing, _potato_window, _ax_source
+  timing = None
+  if _RECORD_TIMINGS:
+    timing = scrambler_timing.CommandTiming(time.time(), name,
+                                            [modifier.modifier_type.name for modifier in modifiers])
+  _current_timing = timing
+  _potato_window = scrambler_potato_context.get_potato_window(modifiers)
+  try:
+    with _timings.phase(timing, scrambler_timing.PHASE_TOTAL):
+      utility_functions = _UTILITY_FUNCTIONS
+      while True:
+        _ax_source = None
+        with _timings.phase(timing, scrambler_timing.PHASE_GET_CONTEXT):
+          context = actions.user.scrambler_get_context()
+        if _LOG_COMMANDS:
+          print(f"Scrambler context: {context}")
+        if timing is not None:
+          timing.text_length = len(context.text)
+          timing.potato_mode = context.potato_mode
+
+        try:
+          with _timings.phase(timing, scrambler_timing.PHASE_RUN_COMMAND):
+            if _ax_source is not None:
+              # Grow the window of a long document until the target is in it.
+              editor_element = context.editor_element
+              editor_actions, context = scrambler_run.run_in_window(
+                  lambda window: plan(window, utility_functions), _ax_source,
+                  st.TextRange(context.selection_range.start + context.text_offset,
+                               context.selection_range.end + context.text_offset))
+              context.editor_element = editor_element
+            else:
+              editor_actions = plan(context, utility_functions)
+          break
+        except ValueError:
+          # The target may be outside of the text fetched for the command, in potato mode or in a
+          # cached window of a long document. Retry with more text.
+          if context.potato_mode:
+            expanded_window = scrambler_potato_context.expand_potato_window(_potato_window)
+            if expanded_window is None:
+              raise
+            _potato_window = expanded_window
+          elif _ax_source is None and scrambler_ax_window.is_window(context):
+            # Read the window again in pages, so that it can grow.
+            _context_cache.invalidate()
+          else:
+            raise
+      if timing is not None:
+        timing.editor_action_count = len(editor_actions)
+
+      with _timings.phase(timing, scrambler_timing.PHASE_EXECUTE_ACTIONS):
+        _run_editor_actions(editor_actions, context)
+  except Exception as e:
+    if timing is not None:
+      timing.error = f"{type(e).__name__}: {e}"
+    raise
+  finally:
+    _current_timing = None
+    _potato_window = scrambler_potato_context.FULL_WINDOW
+    _ax_source = None
+    if timing is not None:
+      _timings.record(timing)
 
 
 def _run_command(command: st.Command):
   """Runs the given command and executes the resulting input actions."""
-  context = actions.user.scrambler_get_context()
   if _LOG_COMMANDS:
     print(f"Scrambler command: {command}")
-    print(f"Scrambler context: {context}")
-  utility_functions = st.UtilityFunctions(actions.user.get_all_homophones,
-                                          actions.user.get_next_homophone)
-  editor_actions = scrambler_run.run_command(command, context.text, context.selection_range,
-                                             utility_functions)
+
+  def plan(context: st.Context, utility_functions: st.UtilityFunctions) -> list[st.EditorAction]:
+    return scrambler_run.run_command(
+        command, context.text, context.selection_range, utility_functions,
+        scrambler_run.get_lexer_language(context, actions.code.language()))
+
+  _run_planned_command(command.command_type.name, command.modifiers + command.extend_modifiers,
+                       plan)
+
+
+def _run_command_on_all_matches(command: st.Command, scope_modifiers: list[st.Modifier]):
+  """Runs the given command on every match in a scope and executes the resulting input actions."""
   if _LOG_COMMANDS:
-    print(f"Scrambler editor actions: {editor_actions}")
-  _execute_editor_actions(editor_actions, context)
+    print(f"Scrambler command on all matches: {command}, scope: {scope_modifiers}")
+
+  def plan(context: st.Context, utility_functions: st.UtilityFunctions) -> list[st.EditorAction]:
+    return scrambler_run.run_command_on_all_matches(
+        command, scope_modifiers, context.text, context.selection_range, utility_functions,
+        scrambler_run.get_lexer_language(context, actions.code.language()))
+
+  _run_planned_command(f"{command.command_type.name}_ALL", scope_modifiers + command.modifiers,
+                       plan)
+
+
+def _run_move_argument_command(move_left: bool):
+  """Moves the current argument, planning every step against a single context."""
+
+  def plan(context: st.Context, utility_functions: st.UtilityFunctions) -> list[st.EditorAction]:
+    return scrambler_run.run_move_argument_command(
+        move_left, context.text, context.selection_range, utility_functions,
+        scrambler_run.get_lexer_language(context, actions.code.language()))
+
+  _run_planned_command("MOVE_ARGUMENT_LEFT" if move_left else "MOVE_ARGUMENT_RIGHT",
+                       [st.Modifier(st.ModifierType.ARGUMENT)], plan)
+
+
+def _get_timings_file_path() -> Path:
+  """Returns the path that command timings are written to."""
+  return Path(gettempdir()) / "scrambler-timings.json"
+
+
+@imgui.open(y=0)
+def _timings_gui(gui: imgui.GUI):
+  """Creates a gui displaying latency percentiles for each phase of recent commands."""
+  gui.text(f"Scrambler Timings ({len(_timings)} commands)")
+  gui.line()
+  for phase in _timings.phase_names():
+    percentiles = _timings.phase_percentiles(phase)
+    if percentiles is not None:
+      gui.text(f"{phase}: p50 {percentiles[0]:.1f}ms, p95 {percentiles[1]:.1f}ms")
+  records = _timings.records()
+  if records:
+    last = records[-1]
+    gui.line()
+    gui.text(f"Last: {last.command} {' '.join(last.modifier_types)}")
+    gui.text(f"{last.text_length} chars, potato mode: {last.potato_mode}, "
+             f"{last.phases_ms.get(scrambler_timing.PHASE_TOTAL, 0.0):.1f}ms")
+    if last.key_presses > 0:
+      gui.text(f"{last.key_presses} key presses in {last.key_dispatches} calls")
+  key_presses = sum(record.key_presses for record in records)
+  if key_presses > 0:
+    key_dispatches = sum(record.key_dispatches for record in records)
+    gui.line()
+    gui.text(f"Potato mode: {key_presses} key presses in {key_dispatches} calls, "
+             f"{key_presses - key_dispatches} calls saved by batching")
 
 
 @mod.action_class
@@ -279,11 +621,22 @@ class Actions:
     in some apps that do not properly implement the accessibility API."""
     return False
 
+  def scrambler_potato_profile() -> scrambler_potato.PotatoProfile:
+    """Gets how navigation keys behave in the active editor, for planning key presses in potato
+    mode. Defaults to moving by character, which works in any editor."""
+    return scrambler_potato.CHARACTER_PROFILE
+
+  def scrambler_potato_max_key_batch() -> int:
+    """Gets the maximum number of repeated key presses to send in a single key call in potato mode.
+    Apps that drop keys when they are sent quickly should override this to return 1, which sends
+    every key press through its own action."""
+    return 50
+
   def scrambler_potato_get_text_before_cursor():
     """"Get text before the cursor for use in potato mode. Can be overridden in apps that
     have unusual text selection behavior."""
     # Select a few lines above the cursor.
-    for _ in range(0, _POTATO_LINES_BEFORE):
+    for _ in range(0, _potato_window.lines_before):
       actions.user.extend_up()
     actions.user.extend_line_start()
 
@@ -296,7 +649,7 @@ class Actions:
     """"Get text after the cursor for use in potato mode. Can be overridden in apps that
     have unusual text selection behavior."""
     # Select a few lines below the cursor.
-    for _ in range(0, _POTATO_LINES_AFTER):
+    for _ in range(0, _potato_window.lines_after):
       actions.user.extend_down()
     actions.user.extend_line_end()
 
@@ -333,12 +686,40 @@ class Actions:
     del context
     actions.user.insert_via_clipboard(editor_action.text)
 
+  def scrambler_replace_range_action(editor_action: st.EditorAction, context: st.Context):
+    """Replaces a text range in an editor with the given text, given a context. Must delete the
+    range if the text is empty. The default selects the range and pastes over it, so editors that
+    override `scrambler_set_selection_action` must replace the selection when pasting."""
+    if editor_action.text_range is None:
+      raise ValueError("Replace range action with missing range.")
+    if not editor_action.text:
+      # Pasting nothing would leave the range selected.
+      actions.user.scrambler_delete_range_action(editor_action, context)
+      return
+    actions.user.scrambler_set_selection_action(editor_action, context)
+    actions.user.insert_via_clipboard(editor_action.text)
+
+  def scrambler_fused_action_types() -> list:
+    """Gets the fused editor action types that the editor supports. Scrambler rewrites editor
+    actions into fewer actions of these types before executing them. Editors that support
+    `REPLACE_RANGE` must implement `scrambler_replace_range_action` as it is documented."""
+    return list(scrambler_fusion.FUSED_ACTION_TYPES)
+
   def scrambler_run_command(command_type: st.CommandType, match: ScramblerMatch):
     """Runs the given command."""
     command = st.Command(command_type, match.modifiers, match.extend_modifiers,
                          match.combination_type)
     _run_command(command)
 
+  def scrambler_run_command_on_all_matches(command_type: st.CommandType,
+                                           match: ScramblerMatch,
+                                           scope: Optional[ScramblerMatch] = None):
+    """Runs the given command on every match in a scope, or in the entire context if no scope is
+    given."""
+    command = st.Command(command_type, match.modifiers, match.extend_modifiers,
+                         match.combination_type)
+    _run_command_on_all_matches(command, scope.modifiers if scope is not None else [])
+
   def scrambler_run_select_command(match: ScramblerMatch):
     """Runs a selection command on the given match."""
     command = st.Command(st.CommandType.SELECT, match.modifiers, match.extend_modifiers,
@@ -355,50 +736,31 @@ class Actions:
     command = _make_command(st.CommandType.REPLACE_WORD_MATCH_CASE, match, insert_text=word)
     _run_command(command)
 
+  def scrambler_timings_toggle():
+    """Shows or hides latency percentiles for recent scrambler commands."""
+    if _timings_gui.showing:
+      _timings_gui.hide()
+    else:
+      _timings_gui.show()
+
+  def scrambler_timings_dump():
+    """Writes timings for recent scrambler commands to a JSON file for offline analysis."""
+    file_path = _get_timings_file_path()
+    with file_path.open("w") as out_file:
+      out_file.write(_timings.to_json())
+    actions.app.notify(f"Wrote {len(_timings)} scrambler timings to {file_path}")
+
+  def scrambler_timings_clear():
+    """Clears timings for recent scrambler commands."""
+    _timings.clear()
+
   def scrambler_move_argument_left():
     """Moves the current argument to the left."""
-    # Use a scrambler command to capture and delete the argument.
-    command = st.Command(st.CommandType.CUT_TO_CLIPBOARD, [st.Modifier(st.ModifierType.ARGUMENT)])
-    with clip.capture() as s:
-      _run_command(command)
-    try:
-      argument = s.text()
-    except clip.NoChange as exc:
-      raise ValueError("No argument captured") from exc
-    if not argument:
-      raise ValueError("Argument is empty")
-
-    # Move before the argument that is now under the cursor.
-    command = st.Command(st.CommandType.MOVE_CURSOR_BEFORE, [st.Modifier(st.ModifierType.ARGUMENT)])
-    _run_command(command)
-
-    # Re-insert the deleted argument.
-    actions.user.insert_via_clipboard(argument + ", ")
+    _run_move_argument_command(move_left=True)
 
   def scrambler_move_argument_right():
     """Moves the current argument to the right."""
-    # Use a scrambler command to capture and delete the argument.
-    command = st.Command(st.CommandType.CUT_TO_CLIPBOARD, [st.Modifier(st.ModifierType.ARGUMENT)])
-    with clip.capture() as s:
-      _run_command(command)
-    try:
-      argument = s.text()
-    except clip.NoChange as exc:
-      raise ValueError("No argument captured") from exc
-    if not argument:
-      raise ValueError("Argument is empty")
-
-    # The argument modifier prefers to delete leading commas instead of trailing ones, so we need
-    # to move right to get to the next argument. This causes odd behavior if the cursor is already
-    # in the rightmost argument, but it allows moving arguments that aren't the leftmost.
-    actions.key("right")
-
-    # Move after the argument that is now under the cursor.
-    command = st.Command(st.CommandType.MOVE_CURSOR_AFTER, [st.Modifier(st.ModifierType.ARGUMENT)])
-    _run_command(command)
-
-    # Re-insert the deleted argument.
-    actions.user.insert_via_clipboard(", " + argument)
+    _run_move_argument_command(move_left=False)
 
   def scrambler_insert_line_below_current():
     """Inserts a line below the current line without moving the cursor to it."""
@@ -501,7 +863,11 @@ class Actions:
     """Finds the nearest homophone for the given word and swaps it to the word."""
     # TODO: This will match the word itself and word substrings. Also add ordinal and search
     # direction.
-    modifiers = [st.Modifier(st.ModifierType.PHRASE_CLOSEST, search=word)]
+    modifiers = [
+        st.Modifier(st.ModifierType.PHRASE_CLOSEST,
+                    search=word,
+                    max_errors=setting_phrase_max_errors.get())
+    ]
     command = st.Command(st.CommandType.REPLACE, modifiers, insert_text=word)
     _run_command(command)
 
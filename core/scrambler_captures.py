@@ -11,6 +11,12 @@ from talon import Context, Module, actions, grammar
 from .lib import scrambler_types as st
 
 mod = Module()
+setting_phrase_max_errors = mod.setting(
+    "scrambler_phrase_max_errors",
+    type=int,
+    desc="Maximum number of misrecognized characters when no phrase matches exactly. Zero to only "
+    + "match phrases exactly.",
+    default=0)
 ctx = Context()
 
 _COMMAND_TYPES_BY_SPOKEN = {
@@ -92,6 +98,21 @@ _OBJECT_MOVEMENT_TYPES_BY_SPOKEN = {
 mod.list("scrambler_object_movement_type", desc="Countable object match types")
 ctx.lists["self.scrambler_object_movement_type"] = _OBJECT_MOVEMENT_TYPES_BY_SPOKEN.keys()
 
+# Object expansion and movement types that only exist for Python scopes, keyed by spoken form.
+# Languages with another scope modifier clear these lists.
+_PYTHON_SCOPE_EXPANSION_TYPES_BY_SPOKEN = {
+    "parent scope": (st.ModifierType.PYTHON_SCOPE_PARENT, None),
+}
+mod.list("scrambler_python_scope_expansion_type", desc="Object expansion match types for Python")
+ctx.lists["self.scrambler_python_scope_expansion_type"] = (
+    _PYTHON_SCOPE_EXPANSION_TYPES_BY_SPOKEN.keys())
+_PYTHON_SCOPE_MOVEMENT_TYPES_BY_SPOKEN = {
+    "scope": (st.ModifierType.PYTHON_SCOPE, None),
+}
+mod.list("scrambler_python_scope_movement_type", desc="Countable object match types for Python")
+ctx.lists["self.scrambler_python_scope_movement_type"] = (
+    _PYTHON_SCOPE_MOVEMENT_TYPES_BY_SPOKEN.keys())
+
 
 @unique
 class SearchDirection(Enum):
@@ -182,10 +203,14 @@ def scrambler_single_word_command_type(m) -> st.CommandType:
   return _SINGLE_WORD_COMMAND_TYPES_BY_SPOKEN[m.scrambler_single_word_command_type]
 
 
-@mod.capture(rule="{self.scrambler_object_expansion_type}")
+@mod.capture(rule="{self.scrambler_object_expansion_type}|" +
+             "{self.scrambler_python_scope_expansion_type}")
 def scrambler_object_expansion_type(m) -> Tuple[st.ModifierType, Optional[str]]:
   """Maps a spoken object expansion type to the type info."""
-  return _OBJECT_EXPANSION_TYPES_BY_SPOKEN[m.scrambler_object_expansion_type]
+  try:
+    return _OBJECT_EXPANSION_TYPES_BY_SPOKEN[m.scrambler_object_expansion_type]
+  except AttributeError:
+    return _PYTHON_SCOPE_EXPANSION_TYPES_BY_SPOKEN[m.scrambler_python_scope_expansion_type]
 
 
 @mod.capture(rule="{self.scrambler_object_count_type}")
@@ -194,10 +219,14 @@ def scrambler_object_count_type(m) -> Tuple[st.ModifierType, Optional[str]]:
   return _OBJECT_COUNT_TYPES_BY_SPOKEN[m.scrambler_object_count_type]
 
 
-@mod.capture(rule="{self.scrambler_object_movement_type}")
+@mod.capture(rule="{self.scrambler_object_movement_type}|" +
+             "{self.scrambler_python_scope_movement_type}")
 def scrambler_object_movement_type(m) -> Tuple[st.ModifierType, Optional[str]]:
   """Maps a spoken object movement type to the type info."""
-  return _OBJECT_MOVEMENT_TYPES_BY_SPOKEN[m.scrambler_object_movement_type]
+  try:
+    return _OBJECT_MOVEMENT_TYPES_BY_SPOKEN[m.scrambler_object_movement_type]
+  except AttributeError:
+    return _PYTHON_SCOPE_MOVEMENT_TYPES_BY_SPOKEN[m.scrambler_python_scope_movement_type]
 
 
 @mod.capture(rule="{self.scrambler_search_direction}")
@@ -317,7 +346,8 @@ def scrambler_substring(m) -> ScramblerMatch:
       modifier_type = st.ModifierType.PHRASE_NEXT
     else:
       modifier_type = st.ModifierType.PHRASE_PREVIOUS
-    return ScramblerMatch([st.Modifier(modifier_type, repeat, phrase)])
+    return ScramblerMatch(
+        [st.Modifier(modifier_type, repeat, phrase, max_errors=setting_phrase_max_errors.get())])
   except AttributeError:
     pass
 
@@ -429,6 +459,12 @@ def scrambler_object_movement(m) -> ScramblerMatch:
           [st.Modifier(st.ModifierType.SENTENCE_NEXT, repeat, delimiter=delimiter)])
     return ScramblerMatch(
         [st.Modifier(st.ModifierType.SENTENCE_PREVIOUS, repeat, delimiter=delimiter)])
+  elif modifier_type == st.ModifierType.PYTHON_SCOPE:
+    if direction == SearchDirection.FORWARD:
+      return ScramblerMatch(
+          [st.Modifier(st.ModifierType.PYTHON_SCOPE_NEXT, repeat, delimiter=delimiter)])
+    return ScramblerMatch(
+        [st.Modifier(st.ModifierType.PYTHON_SCOPE_PREVIOUS, repeat, delimiter=delimiter)])
   elif modifier_type == st.ModifierType.ARGUMENT:
     if direction == SearchDirection.FORWARD:
       return ScramblerMatch(
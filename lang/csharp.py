@@ -14,6 +14,10 @@ ctx.matches = r"""
 tag: user.lang_csharp
 """
 
+# Moving between scopes and to the enclosing scope is only supported for Python scopes.
+ctx.lists["user.scrambler_python_scope_expansion_type"] = []
+ctx.lists["user.scrambler_python_scope_movement_type"] = []
+
 
 @ctx.action_class("user")
 class ExtensionActions: